@@ -79,6 +79,17 @@ except ImportError:
     except ImportError:
         create_query_instance = None
 
+# Memoized view models for the paginated views
+try:
+    from .view_cache import get_view_cache
+except ImportError:
+    from Systems.PnW.MA.view_cache import get_view_cache
+
+try:
+    from .freshness import CURRENT_TURN
+except ImportError:
+    from Systems.PnW.MA.freshness import CURRENT_TURN
+
 # Import Bloc AllianceManager with alias to avoid name clash
 try:
     from .bloc import AllianceManager as BlocAllianceManager
@@ -98,6 +109,34 @@ except Exception:
         def leadership_role_check():
             return commands.check(lambda ctx: True)
 
+
+def _embed_cacheable(embed: Any) -> bool:
+    """Error pages are rebuilt on the next click instead of being memoized."""
+    return embed is not None and not str(getattr(embed, 'title', '') or '').startswith('❌')
+
+
+def _precompute_alliance_pages(source_view: Any, nations: List[Dict], skip: str) -> None:
+    """Build the sibling pages for ``nations`` in the background so the next button click is a lookup."""
+    if not nations:
+        return
+    cache = get_view_cache()
+    pages = (
+        ('alliance.full_mill', FullMillView, '_build_full_mill_embed'),
+        ('alliance.totals', AllianceTotalsView, '_build_alliance_totals_embed'),
+        ('alliance.improvements', ImprovementsView, '_build_improvements_embed'),
+        ('alliance.projects', ProjectTotalsView, '_build_project_totals_embed'),
+    )
+    for kind, view_cls, builder in pages:
+        if kind == skip or cache.has(cache.make_key(kind, nations)):
+            continue
+        try:
+            page_view = view_cls(source_view.author_id, source_view.bot, source_view.alliance_cog, nations)
+        except Exception:
+            continue
+        build = getattr(page_view, builder)
+        cache.precompute(kind, nations, lambda build=build: build(nations), cacheable=_embed_cacheable)
+
+
 class FullMillView(discord.ui.View):
     """View for displaying Full Mill calculations and alliance data."""
     
@@ -117,7 +156,17 @@ class FullMillView(discord.ui.View):
         return True
 
     async def generate_full_mill_embed(self, nations: List[Dict] = None) -> discord.Embed:
-        """Generate the full mill embed without handling interaction."""
+        """Generate the full mill embed (memoized per snapshot) without handling interaction."""
+        current_nations = nations or self.current_nations
+        if not current_nations:
+            return await self._build_full_mill_embed(nations)
+        embed = await get_view_cache().get_or_build(
+            'alliance.full_mill', current_nations, lambda: self._build_full_mill_embed(current_nations), cacheable=_embed_cacheable
+        )
+        _precompute_alliance_pages(self, current_nations, skip='alliance.full_mill')
+        return embed.copy()
+
+    async def _build_full_mill_embed(self, nations: List[Dict] = None) -> discord.Embed:
         try:
             # Use provided nations or current nations
             current_nations = nations or self.current_nations
@@ -217,7 +266,7 @@ class FullMillView(discord.ui.View):
                 inline=False
             )
             
-            embed.set_footer(text=f"Generated at {datetime.now().strftime('%H:%M:%S')} | Use Alliance Totals button to refresh data")
+            embed.set_footer(text=f"Generated at {datetime.now().strftime('%H:%M:%S')} | Use Alliance Totals button to refresh data{self.alliance_cog.data_age_note(current_nations)}")
             
             return embed
             
@@ -361,7 +410,17 @@ class AllianceTotalsView(discord.ui.View):
         return True
         
     async def generate_alliance_totals_embed(self, nations: List[Dict] = None) -> discord.Embed:
-        """Generate the alliance totals embed without handling interaction."""
+        """Generate the alliance totals embed (memoized per snapshot) without handling interaction."""
+        current_nations = nations or self.current_nations
+        if not current_nations:
+            return await self._build_alliance_totals_embed(nations)
+        embed = await get_view_cache().get_or_build(
+            'alliance.totals', current_nations, lambda: self._build_alliance_totals_embed(current_nations), cacheable=_embed_cacheable
+        )
+        _precompute_alliance_pages(self, current_nations, skip='alliance.totals')
+        return embed.copy()
+
+    async def _build_alliance_totals_embed(self, nations: List[Dict] = None) -> discord.Embed:
         try:
             current_nations = nations or self.current_nations
             if not current_nations:
@@ -532,7 +591,7 @@ class AllianceTotalsView(discord.ui.View):
             embed.add_field(name=f"⏰ Inactive 7–13 Days - Total: {len(seven_to_thirteen)}", value=_make_links(seven_to_thirteen, with_days=True), inline=False)
             embed.add_field(name=f"📅 Inactive 14+ Days - Total: {len(fourteen_plus)}", value=_make_links(fourteen_plus, with_days=True), inline=False)
             
-            embed.set_footer(text=f"Generated at {datetime.now().strftime('%H:%M:%S')} | Use other buttons to view different data")
+            embed.set_footer(text=f"Generated at {datetime.now().strftime('%H:%M:%S')} | Use other buttons to view different data{self.alliance_cog.data_age_note(current_nations)}")
             
             return embed
             
@@ -676,7 +735,17 @@ class ImprovementsView(discord.ui.View):
         return True
         
     async def generate_improvements_embed(self, nations: List[Dict] = None) -> discord.Embed:
-        """Generate the improvements breakdown embed without handling interaction."""
+        """Generate the improvements breakdown embed (memoized per snapshot) without handling interaction."""
+        current_nations = nations or self.current_nations
+        if not current_nations:
+            return await self._build_improvements_embed(nations)
+        embed = await get_view_cache().get_or_build(
+            'alliance.improvements', current_nations, lambda: self._build_improvements_embed(current_nations), cacheable=_embed_cacheable
+        )
+        _precompute_alliance_pages(self, current_nations, skip='alliance.improvements')
+        return embed.copy()
+
+    async def _build_improvements_embed(self, nations: List[Dict] = None) -> discord.Embed:
         try:
             current_nations = nations or self.current_nations
             if not current_nations:
@@ -799,7 +868,7 @@ class ImprovementsView(discord.ui.View):
                 inline=False
             )
             
-            embed.set_footer(text=f"Generated at {datetime.now().strftime('%H:%M:%S')} | Use other buttons to view different data")
+            embed.set_footer(text=f"Generated at {datetime.now().strftime('%H:%M:%S')} | Use other buttons to view different data{self.alliance_cog.data_age_note(current_nations)}")
             
             return embed
             
@@ -936,6 +1005,17 @@ class ProjectTotalsView(discord.ui.View):
         return True
 
     async def generate_project_totals_embed(self, nations: List[Dict] = None) -> discord.Embed:
+        """Generate the project totals embed (memoized per snapshot) without handling interaction."""
+        current_nations = nations or self.current_nations
+        if not current_nations:
+            return await self._build_project_totals_embed(nations)
+        embed = await get_view_cache().get_or_build(
+            'alliance.projects', current_nations, lambda: self._build_project_totals_embed(current_nations), cacheable=_embed_cacheable
+        )
+        _precompute_alliance_pages(self, current_nations, skip='alliance.projects')
+        return embed.copy()
+
+    async def _build_project_totals_embed(self, nations: List[Dict] = None) -> discord.Embed:
         try:
             current_nations = nations or self.current_nations
             if not current_nations:
@@ -1258,7 +1338,7 @@ class AllianceManager(commands.Cog):
             
             if alliance_data and isinstance(alliance_data, dict) and 'nations' in alliance_data:
                 nations = alliance_data.get('nations', [])
-                if nations:
+                if nations and not self._snapshot_past_ceiling(alliance_id, alliance_data):
                     self.logger.info(f"get_alliance_nations: Loaded {len(nations)} nations from alliance file {alliance_file_key}")
                     return nations
             
@@ -1267,7 +1347,8 @@ class AllianceManager(commands.Cog):
             if bloc_dir.exists():
                 # Look for the specific alliance file
                 specific_file = bloc_dir / f'alliance_{alliance_id}.json'
-                if specific_file.exists():
+                # With a query system the API path below handles expired snapshots instead
+                if specific_file.exists() and not self.query_system:
                     try:
                         file_data = await user_data_manager.get_json_data(f'alliance_{alliance_id}', {})
                         if isinstance(file_data, dict) and 'nations' in file_data:
@@ -1278,9 +1359,10 @@ class AllianceManager(commands.Cog):
                         self.logger.warning(f"Error loading specific alliance file {specific_file.name}: {e}")
                         return None
             
-            # Fallback to API if files not available
+            # Fallback to the query system if files are missing or too old; it serves any snapshot
+            # fetched this turn (e.g. by another projection's caller) before going to the API
             if self.query_system:
-                nations = await self.query_system.get_alliance_nations(alliance_id, bot=self.bot, force_refresh=True)
+                nations = await self.query_system.get_alliance_nations(alliance_id, bot=self.bot, freshness=CURRENT_TURN)
                 if nations:
                     self.logger.info(f"get_alliance_nations: Retrieved {len(nations)} nations for alliance {alliance_id} from API")
                     return nations
@@ -1291,6 +1373,38 @@ class AllianceManager(commands.Cog):
         except Exception as e:
             self._log_error(f"Error fetching alliance data for alliance {alliance_id}", e, "get_alliance_nations")
             raise RuntimeError(f"Failed to fetch alliance data: {str(e)}")
+
+    def _snapshot_past_ceiling(self, alliance_id: str, alliance_data: Dict[str, Any]) -> bool:
+        """Stale-while-revalidate check for a loaded alliance file.
+
+        Past the TTL a background refresh is scheduled and the file is still served; only a
+        snapshot older than the hard ceiling (or of unknown age) forces a foreground refresh.
+        """
+        if not self.query_system:
+            return False
+        try:
+            age = (datetime.now() - datetime.fromisoformat(alliance_data.get('last_updated'))).total_seconds()
+        except Exception:
+            return False
+        self.query_system.record_snapshot_age(alliance_id, age)
+        if age < self.query_system.cache_ttl_seconds:
+            return False
+        if age >= self.query_system.stale_ceiling_seconds():
+            self.logger.info(f"get_alliance_nations: alliance_{alliance_id} is {int(age)}s old (past staleness ceiling), refreshing now")
+            return True
+        self.query_system.revalidate_alliance_nations(alliance_id, bot=self.bot)
+        return False
+
+    def data_age_note(self, nations: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Footer marker for the oldest stale alliance snapshot behind ``nations``, e.g. ``" | Data 74m old (refreshing)"``."""
+        if not self.query_system:
+            return ""
+        alliance_ids = {str(n.get('alliance_id')) for n in (nations or []) if isinstance(n, dict) and n.get('alliance_id')}
+        if not alliance_ids:
+            return ""
+        oldest = max(alliance_ids, key=lambda aid: self.query_system.get_snapshot_age(aid) or 0.0)
+        note = self.query_system.snapshot_age_note(oldest)
+        return f" | {note}" if note else ""
             
     def get_active_nations(self, nations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Filter nations to exclude vacation mode and applicant members using centralized logic."""
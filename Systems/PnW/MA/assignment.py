@@ -0,0 +1,325 @@
+"""Global attacker-to-target assignment for counters and blitzes.
+
+``plan_assignments`` takes every target and every available member at once
+and returns one non-conflicting plan, instead of running the single-target
+``DestroyCog.find_optimal_attackers`` search again and again.
+
+The plan is a min-cost flow on a bipartite network:
+
+    source -> attacker   capacity = open offensive slots
+    attacker -> target   capacity 1, only when the target is in war range;
+                         cost = -(matchup value of the attacker vs the target)
+    target -> sink       one arc per open slot (at most three per target),
+                         each with a decreasing fill bonus, so covering
+                         another target beats stacking a third attacker
+                         unless the matchup is clearly better
+
+Successive shortest paths (Dijkstra with potentials) augment while a path
+still adds value, so the result maximises the total matchup value. Every
+intermediate flow is a valid plan, so a time budget only trades optimality
+for latency: when it runs out the plan found so far is returned.
+"""
+
+import heapq
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+MAX_ATTACKERS_PER_TARGET = 3
+BASE_OFFENSIVE_SLOTS = 5
+DEFENSIVE_SLOTS = 3
+
+# Matchup weights per battle type (airstrikes decide most wars, navies the fewest)
+_DIMENSION_WEIGHTS = (('ground', 0.35), ('air', 0.40), ('naval', 0.25))
+# Extra value for filling a target's 1st / 2nd / 3rd slot, in matchup units
+DEFAULT_FILL_BONUS = (0.30, 0.15, 0.0)
+# Costs are integers; matchup values (0..1) are scaled by this
+_SCALE = 1000
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _num(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except Exception:
+        return 0.0
+
+
+def nation_id(nation: Dict[str, Any]) -> int:
+    try:
+        return int(nation.get('id') or nation.get('nation_id') or 0)
+    except Exception:
+        return 0
+
+
+def in_war_range(attacker_score: float, target_score: float) -> bool:
+    """Attackers can declare on nations from 75% to 250% of their own score."""
+    if attacker_score <= 0:
+        return False
+    return attacker_score * 0.75 <= target_score <= attacker_score * 2.5
+
+
+def offensive_slots(nation: Dict[str, Any]) -> int:
+    """Open offensive war slots (5, plus one each for Pirate Economy and Advanced Pirate Economy)."""
+    total = BASE_OFFENSIVE_SLOTS
+    for project in ('pirate_economy', 'advanced_pirate_economy'):
+        if nation.get(project) is True:
+            total += 1
+    return max(0, total - int(_num(nation.get('offensive_wars_count'))))
+
+
+def defensive_slots(nation: Dict[str, Any]) -> int:
+    """Open defensive war slots; beige and vacation-mode nations cannot be declared on."""
+    if _num(nation.get('beige_turns')) > 0 or _num(nation.get('vacation_mode_turns')) > 0:
+        return 0
+    return max(0, DEFENSIVE_SLOTS - int(_num(nation.get('defensive_wars_count'))))
+
+
+def _strength(nation: Dict[str, Any]) -> Dict[str, float]:
+    return {
+        'ground': _num(nation.get('soldiers')) * 1.75 + _num(nation.get('tanks')) * 40.0,
+        'air': _num(nation.get('aircraft')),
+        'naval': _num(nation.get('ships')),
+    }
+
+
+def matchup_value(attacker: Dict[str, Any], target: Dict[str, Any], attacker_strength: Optional[Dict[str, float]] = None, target_strength: Optional[Dict[str, float]] = None) -> float:
+    """How well ``attacker`` fights ``target``, in 0..1 (0.5 is an even fight in every battle type)."""
+    a = attacker_strength or _strength(attacker)
+    t = target_strength or _strength(target)
+    value = 0.0
+    for dim, weight in _DIMENSION_WEIGHTS:
+        mine, theirs = a[dim], t[dim]
+        share = mine / (mine + theirs) if (mine + theirs) > 0 else 0.5
+        value += weight * share
+    return value
+
+
+def _activity_factor(nation: Dict[str, Any], now: datetime) -> float:
+    """Down-weight members who have not logged in recently (they may never declare)."""
+    raw = nation.get('last_active')
+    if not raw:
+        return 1.0
+    try:
+        seen = datetime.fromisoformat(str(raw).replace('Z', '+00:00'))
+        if seen.tzinfo is None:
+            seen = seen.replace(tzinfo=timezone.utc)
+        hours = (now - seen).total_seconds() / 3600.0
+    except Exception:
+        return 1.0
+    if hours <= 24:
+        return 1.0
+    if hours <= 72:
+        return 0.8
+    return 0.5
+
+
+@dataclass
+class AssignmentPlan:
+    # target id -> attacker ids, strongest matchup first
+    assignments: Dict[int, List[int]] = field(default_factory=dict)
+    # attacker id -> target ids
+    by_attacker: Dict[int, List[int]] = field(default_factory=dict)
+    # (attacker id, target id) -> matchup value
+    values: Dict[Tuple[int, int], float] = field(default_factory=dict)
+    # target id -> open slots left unfilled (targets nobody could be assigned to included)
+    unfilled: Dict[int, int] = field(default_factory=dict)
+    # target id -> number of members in range with a free slot
+    candidates: Dict[int, int] = field(default_factory=dict)
+    total_value: float = 0.0
+    elapsed: float = 0.0
+    # False when the time budget ran out before the plan was optimal
+    complete: bool = True
+
+    @property
+    def war_count(self) -> int:
+        return sum(len(v) for v in self.assignments.values())
+
+
+class _FlowNetwork:
+    """Adjacency-list residual graph for successive-shortest-path min-cost flow."""
+
+    def __init__(self, size: int):
+        self.size = size
+        # Edge arrays: to, capacity, cost; edge i and i ^ 1 are a residual pair
+        self.to: List[int] = []
+        self.cap: List[int] = []
+        self.cost: List[int] = []
+        self.adj: List[List[int]] = [[] for _ in range(size)]
+
+    def add_edge(self, u: int, v: int, cap: int, cost: int) -> int:
+        self.adj[u].append(len(self.to))
+        self.to.append(v)
+        self.cap.append(cap)
+        self.cost.append(cost)
+        self.adj[v].append(len(self.to))
+        self.to.append(u)
+        self.cap.append(0)
+        self.cost.append(-cost)
+        return len(self.to) - 2
+
+    def _initial_potentials(self, source: int) -> List[float]:
+        # Bellman-Ford (queue based); the network starts acyclic, so this is quick
+        inf = float('inf')
+        dist = [inf] * self.size
+        dist[source] = 0
+        queue = [source]
+        queued = [False] * self.size
+        queued[source] = True
+        head = 0
+        while head < len(queue):
+            u = queue[head]
+            head += 1
+            queued[u] = False
+            for e in self.adj[u]:
+                if self.cap[e] > 0 and dist[u] + self.cost[e] < dist[self.to[e]]:
+                    v = self.to[e]
+                    dist[v] = dist[u] + self.cost[e]
+                    if not queued[v]:
+                        queued[v] = True
+                        queue.append(v)
+        return [d if d < inf else 0 for d in dist]
+
+    def run(self, source: int, sink: int, deadline: Optional[float] = None) -> bool:
+        """Augment along negative-cost paths until none is left; False if ``deadline`` cut it short."""
+        inf = float('inf')
+        potential = self._initial_potentials(source)
+        while True:
+            if deadline is not None and time.monotonic() > deadline:
+                return False
+            dist = [inf] * self.size
+            prev_edge = [-1] * self.size
+            dist[source] = 0
+            heap = [(0, source)]
+            while heap:
+                d, u = heapq.heappop(heap)
+                if d > dist[u]:
+                    continue
+                pu = potential[u]
+                for e in self.adj[u]:
+                    if self.cap[e] <= 0:
+                        continue
+                    v = self.to[e]
+                    nd = d + self.cost[e] + pu - potential[v]
+                    if nd < dist[v]:
+                        dist[v] = nd
+                        prev_edge[v] = e
+                        heapq.heappush(heap, (nd, v))
+            if dist[sink] == inf:
+                return True
+            for v in range(self.size):
+                if dist[v] < inf:
+                    potential[v] += dist[v]
+            # potential[sink] is now the real cost of the cheapest path; stop once it adds nothing
+            if potential[sink] - potential[source] >= 0:
+                return True
+            push = inf
+            v = sink
+            while v != source:
+                e = prev_edge[v]
+                push = min(push, self.cap[e])
+                v = self.to[e ^ 1]
+            v = sink
+            while v != source:
+                e = prev_edge[v]
+                self.cap[e] -= push
+                self.cap[e ^ 1] += push
+                v = self.to[e ^ 1]
+
+
+def plan_assignments(
+    targets: Iterable[Dict[str, Any]],
+    attackers: Iterable[Dict[str, Any]],
+    max_per_target: int = MAX_ATTACKERS_PER_TARGET,
+    fill_bonus: Sequence[float] = DEFAULT_FILL_BONUS,
+    time_budget: Optional[float] = None,
+    logger: Optional[logging.Logger] = None,
+) -> AssignmentPlan:
+    """Assign ``attackers`` to ``targets`` maximising total matchup value.
+
+    Each attacker takes at most its open offensive slots and one war per target;
+    each target gets at most ``max_per_target`` attackers and no more than its open
+    defensive slots. ``time_budget`` (seconds, default ``PNW_ASSIGN_TIME_BUDGET``
+    or 10) bounds the search.
+    """
+    started = time.monotonic()
+    budget = _env_number('PNW_ASSIGN_TIME_BUDGET', 10.0) if time_budget is None else time_budget
+    now = datetime.now(timezone.utc)
+    plan = AssignmentPlan()
+
+    target_list: List[Dict[str, Any]] = []
+    seen_targets = set()
+    for t in targets or []:
+        tid = nation_id(t)
+        if tid and tid not in seen_targets:
+            seen_targets.add(tid)
+            target_list.append(t)
+    attacker_list: List[Dict[str, Any]] = []
+    seen_attackers = set()
+    for a in attackers or []:
+        aid = nation_id(a)
+        if aid and aid not in seen_attackers and aid not in seen_targets and offensive_slots(a) > 0:
+            seen_attackers.add(aid)
+            attacker_list.append(a)
+
+    # Node layout: 0 source, 1 sink, then attackers, then targets
+    source, sink = 0, 1
+    a_base = 2
+    t_base = a_base + len(attacker_list)
+    net = _FlowNetwork(t_base + len(target_list))
+
+    target_slots = []
+    for j, t in enumerate(target_list):
+        slots = min(max(0, int(max_per_target)), defensive_slots(t))
+        target_slots.append(slots)
+        for k in range(slots):
+            bonus = fill_bonus[k] if k < len(fill_bonus) else 0.0
+            net.add_edge(t_base + j, sink, 1, -int(round(bonus * _SCALE)))
+
+    target_strengths = [_strength(t) for t in target_list]
+    target_scores = [_num(t.get('score')) for t in target_list]
+    pair_edges: List[Tuple[int, int, int]] = []
+    for i, a in enumerate(attacker_list):
+        net.add_edge(source, a_base + i, offensive_slots(a), 0)
+        a_score = _num(a.get('score'))
+        a_strength = _strength(a)
+        activity = _activity_factor(a, now)
+        for j, t in enumerate(target_list):
+            if not target_slots[j] or not in_war_range(a_score, target_scores[j]):
+                continue
+            value = matchup_value(a, t, a_strength, target_strengths[j]) * activity
+            plan.values[(nation_id(a), nation_id(t))] = value
+            plan.candidates[nation_id(t)] = plan.candidates.get(nation_id(t), 0) + 1
+            edge = net.add_edge(a_base + i, t_base + j, 1, -max(1, int(round(value * _SCALE))))
+            pair_edges.append((edge, i, j))
+
+    plan.complete = net.run(source, sink, deadline=started + budget if budget and budget > 0 else None)
+
+    for edge, i, j in pair_edges:
+        if net.cap[edge] == 0:
+            aid, tid = nation_id(attacker_list[i]), nation_id(target_list[j])
+            plan.assignments.setdefault(tid, []).append(aid)
+            plan.by_attacker.setdefault(aid, []).append(tid)
+            plan.total_value += plan.values[(aid, tid)]
+    for tid, attacker_ids in plan.assignments.items():
+        attacker_ids.sort(key=lambda aid: plan.values[(aid, tid)], reverse=True)
+    for j, t in enumerate(target_list):
+        tid = nation_id(t)
+        missing = target_slots[j] - len(plan.assignments.get(tid, []))
+        if missing > 0:
+            plan.unfilled[tid] = missing
+    plan.elapsed = time.monotonic() - started
+    (logger or logging.getLogger(__name__)).info(
+        f"plan_assignments: {plan.war_count} wars on {len(plan.assignments)}/{len(target_list)} targets "
+        f"from {len(attacker_list)} attackers in {plan.elapsed:.2f}s" + ("" if plan.complete else " (time budget reached)")
+    )
+    return plan
@@ -47,6 +47,32 @@ from config import (
     get_guild_id_from_context,
 )
 
+try:
+    from Systems.PnW.MA.image_cache import content_key, get_image_cache  # type: ignore
+except Exception:
+    content_key = None
+    get_image_cache = None
+
+try:
+    from Systems.PnW.MA.flag_cache import get_flag_cache  # type: ignore
+except Exception:
+    get_flag_cache = None
+
+try:
+    from Systems.PnW.MA.audit_rules import MMR_KEYS, MMR_PROFILES, get_audit_engine  # type: ignore
+except ImportError:
+    from .audit_rules import MMR_KEYS, MMR_PROFILES, get_audit_engine
+
+try:
+    from Systems.PnW.MA.freshness import CURRENT_TURN, freshness_command  # type: ignore
+except ImportError:
+    from .freshness import CURRENT_TURN, freshness_command
+
+try:
+    from Systems.PnW.MA.treaty_graph import DEFENSE_TYPES, normalize_treaty_type  # type: ignore
+except ImportError:
+    from .treaty_graph import DEFENSE_TYPES, normalize_treaty_type
+
 # Optional import of AERO bloc definitions
 try:
     from Systems.PnW.MA.bloc import AERO_ALLIANCES  # type: ignore
@@ -113,6 +139,12 @@ class AuditManager(commands.Cog):
         self.cybertron_id = CYBERTRON_ALLIANCE_ID
         # Track the last posted treaties message per channel to edit instead of posting new
         self.treaties_message_map: Dict[int, int] = {}
+        self.audit_engine = get_audit_engine()
+
+    async def cog_unload(self):
+        """Close the flag cache's HTTP session; it is reopened on the next fetch."""
+        if get_flag_cache is not None:
+            await get_flag_cache().close()
 
     # Dynamic autocomplete for mmr_mode: only suggest when view=="mmr"
     async def _mmr_mode_autocomplete(self, interaction: discord.Interaction, current: str):
@@ -192,6 +224,9 @@ class AuditManager(commands.Cog):
             if aiohttp is None or Image is None or io is None:
                 # Dependencies not available; skip image processing
                 return None
+            if get_flag_cache is not None:
+                # Disk-cached original, revalidated only when stale
+                return await get_flag_cache().get_image(url)
             timeout = aiohttp.ClientTimeout(total=10)
             async with aiohttp.ClientSession(timeout=timeout) as session:
                 async with session.get(url) as resp:
@@ -208,27 +243,7 @@ class AuditManager(commands.Cog):
         """Normalize various treaty type labels/abbreviations to canonical keys.
         Returns one of: 'MDP', 'MDoAP', 'ODP', 'ODoAP', 'Protectorate', 'NAP', 'PIAT', 'Extension'.
         """
-        s = (ttype or '').strip().lower()
-        s_compact = s.replace(' ', '').replace('-', '')
-        # Direct abbreviation hits
-        if s_compact in {"mdp"} or s.startswith("mutual defense"):
-            return "MDP"
-        if s_compact in {"mdoap"} or s.startswith("mutual defense/optional aggression") or s_compact in {"mutualdefenseoptionalaggression"}:
-            return "MDoAP"
-        if s_compact in {"odp"} or s.startswith("optional defense"):
-            return "ODP"
-        if s_compact in {"odoap"} or s.startswith("optional defense/optional aggression") or s_compact in {"optionaldefenseoptionalaggression"}:
-            return "ODoAP"
-        if s_compact in {"protectorate", "prot"}:
-            return "Protectorate"
-        if s_compact in {"nap"} or s.startswith("non-aggression") or s.startswith("no aggression"):
-            return "NAP"
-        if s_compact in {"piat"} or s.startswith("peace, intelligence and aid"):
-            return "PIAT"
-        if s_compact in {"extension", "ext"} or s.startswith("extension"):
-            return "Extension"
-        # Fallback to original for unknown types
-        return ttype.strip() or ""
+        return normalize_treaty_type(ttype)
 
     def _resize_flag_image(self, img: "Image.Image", size: tuple[int, int] = (24, 24)) -> Optional["Image.Image"]:
         """Resize the given PIL image to size, maintaining aspect ratio and adding padding if needed."""
@@ -250,6 +265,13 @@ class AuditManager(commands.Cog):
         except Exception:
             return None
 
+    async def _fetch_resized_flag(self, url: str, size: tuple[int, int]) -> Optional["Image.Image"]:
+        """Resized flag, served from the flag cache's in-memory variants when possible."""
+        if get_flag_cache is not None:
+            return await get_flag_cache().get_variant(url, size)
+        img = await self._fetch_flag_image(url)
+        return self._resize_flag_image(img, size) if img is not None else None
+
     async def _compose_treaty_web_image(self, treaties: List[Dict[str, Any]], center_alliance_id: Optional[int] = None) -> Optional[discord.File]:
         """
         Create the treaty web image using pulled alliance flags with three tiers:
@@ -350,22 +372,46 @@ class AuditManager(commands.Cog):
                     if types & target_types:  # Has at least one of the target treaty types
                         non_aero_partners.append(p)
 
+        # Rendered webs are content-addressed by everything that affects the drawing
+        cache_key: Optional[str] = None
+        if content_key is not None:
+            def _sig(items: List[Dict[str, Any]]) -> List[Any]:
+                return sorted(
+                    (int(p.get('id') or 0), p.get('name'), p.get('acr'), p.get('flag_url'),
+                     sorted(partner_types.get(int(p.get('id') or 0)) or []))
+                    for p in items
+                )
+            cache_key = content_key('treaty_web', {
+                'center': center_id,
+                'center_flag': cy_flag_url,
+                'prime': _sig([prime_bank_entry]) if prime_bank_entry else [],
+                'inner': _sig(inner_partners),
+                'aero': _sig(aero_partners),
+                'outer': _sig(non_aero_partners),
+            })
+            cached = await get_image_cache().get(cache_key)
+            if cached is not None:
+                return discord.File(io.BytesIO(cached), filename="treaty_web.png")
+
         # Center flag size
         CENTER_SIZE = 80  # Slightly smaller center flag
 
+        # Download every missing flag at once (capped concurrency) before the rings are laid out
+        if get_flag_cache is not None:
+            ring_partners = inner_partners + aero_partners + non_aero_partners + ([prime_bank_entry] if prime_bank_entry else [])
+            await get_flag_cache().prefetch([cy_flag_url or ''] + [p.get('flag_url') or '' for p in ring_partners])
+
         # Fetch and place center alliance flag
-        cy_img = await self._fetch_flag_image(cy_flag_url or '')
-        if cy_img:
-            cy_img = self._resize_flag_image(cy_img, (CENTER_SIZE, CENTER_SIZE))
+        cy_img = await self._fetch_resized_flag(cy_flag_url or '', (CENTER_SIZE, CENTER_SIZE))
 
         # Helper to fetch and resize list of flags (with placeholder if missing)
         async def fetch_resized(list_items: List[Dict[str, Any]], size: int) -> List[Dict[str, Any]]:
-            tasks = [self._fetch_flag_image(p.get('flag_url') or '') for p in list_items]
-            raws = await asyncio.gather(*tasks) if tasks else []
+            tasks = [self._fetch_resized_flag(p.get('flag_url') or '', (size, size)) for p in list_items]
+            flags = await asyncio.gather(*tasks) if tasks else []
             out: List[Dict[str, Any]] = []
-            for i, raw in enumerate(raws):
-                if raw:
-                    resized = self._resize_flag_image(raw, (size, size))
+            for i, flag in enumerate(flags):
+                if flag:
+                    resized = flag
                 else:
                     # Create a simple placeholder if flag missing
                     ph = Image.new("RGBA", (size, size), (40, 40, 40, 200)) if Image else None
@@ -728,6 +774,8 @@ class AuditManager(commands.Cog):
         # Export PNG to buffer
         buf = io.BytesIO()
         canvas.save(buf, format='PNG')
+        if cache_key is not None:
+            await get_image_cache().put(cache_key, buf.getvalue())
         buf.seek(0)
         return discord.File(buf, filename="treaty_web.png")
 
@@ -739,8 +787,11 @@ class AuditManager(commands.Cog):
             if Image is None or ImageDraw is None or ImageFont is None:
                 return None
             font = ImageFont.load_default()
-            # Build rows info: (flag_img, text)
-            rows: List[tuple[Optional["Image.Image"], str]] = []
+            # Filename based on title
+            safe_name = ''.join(c for c in title if c.isalnum()).lower() or "category"
+            filename = f"treaties_{safe_name}.png"
+            # Row text and flag URL per treaty partner
+            row_specs: List[tuple[str, str]] = []
             for t in items:
                 a1 = t.get('alliance1') or {}
                 a2 = t.get('alliance2') or {}
@@ -749,11 +800,19 @@ class AuditManager(commands.Cog):
                 name = (other.get('name') or 'Unknown').strip()
                 acr = (other.get('acronym') or '').strip()
                 text = f"{name} ({acr})" if acr else name
-                flag_url = (other.get('flag') or '').strip()
-                img = await self._fetch_flag_image(flag_url)
-                if img is not None:
-                    img = self._resize_flag_image(img, (24, 24))
-                rows.append((img, text))
+                row_specs.append((text, (other.get('flag') or '').strip()))
+
+            # Same title and rows render the same image
+            cache_key: Optional[str] = None
+            if content_key is not None:
+                cache_key = content_key('treaty_category', {'title': title, 'row_height': row_height, 'rows': row_specs})
+                cached = await get_image_cache().get(cache_key)
+                if cached is not None and io is not None:
+                    return discord.File(io.BytesIO(cached), filename=filename)
+
+            # Build rows info: (flag_img, text)
+            flags = await asyncio.gather(*[self._fetch_resized_flag(flag_url, (24, 24)) for _, flag_url in row_specs])
+            rows: List[tuple[Optional["Image.Image"], str]] = [(img, text) for img, (text, _) in zip(flags, row_specs)]
 
             # Determine image width by measuring text
             max_text_w = 0
@@ -789,15 +848,15 @@ class AuditManager(commands.Cog):
                 return None
             buf = io.BytesIO()
             canvas.save(buf, format='PNG')
+            if cache_key is not None:
+                await get_image_cache().put(cache_key, buf.getvalue())
             buf.seek(0)
-            # Filename based on title
-            safe_name = ''.join(c for c in title if c.isalnum()).lower() or "category"
-            file = discord.File(buf, filename=f"treaties_{safe_name}.png")
+            file = discord.File(buf, filename=filename)
             return file
         except Exception:
             return None
 
-    async def _get_alliance_nations(self, alliance_id: int, force_refresh: bool = True) -> List[Dict[str, Any]]:
+    async def _get_alliance_nations(self, alliance_id: int, force_refresh: bool = False) -> List[Dict[str, Any]]:
         """Use AllianceManager cog if available to fetch nations; otherwise return empty list."""
         try:
             alliance_cog = self.bot.get_cog('AllianceManager')
@@ -816,23 +875,10 @@ class AuditManager(commands.Cog):
 
     async def _get_combined_nations(self) -> List[Dict[str, Any]]:
         """Fetch nations from Cybertron only."""
-        cy = await self._get_alliance_nations(self.cybertron_id, force_refresh=True)
+        cy = await self._get_alliance_nations(self.cybertron_id)
         # AllianceManager returns nations for the specific alliance; no extra filter needed.
         return cy or []
 
-    def _filter_active_members(self, nations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Exclude applicants and vacation mode for resource checks."""
-        active = []
-        for n in nations:
-            pos = (n.get('alliance_position', '') or '').strip().upper()
-            if pos == 'APPLICANT':
-                continue
-            vm = int(n.get('vacation_mode_turns', 0) or 0)
-            if vm > 0:
-                continue
-            active.append(n)
-        return active
-
     def _format_treaties_chunks(self, treaties: List[Dict[str, Any]]) -> List[str]:
         """Format treaties into plain-text chunks under 2000 chars, grouped by type.
         - Shows all treaties
@@ -958,7 +1004,30 @@ class AuditManager(commands.Cog):
             messages.append(current)
         return messages
 
-    def _format_treaties_embed(self, treaties: List[Dict[str, Any]], center_alliance_id: Optional[int] = None, center_name: Optional[str] = None) -> discord.Embed:
+    async def _treaty_chain_lines(self, query_system: Any, center_id: int, max_hops: int = 3) -> List[str]:
+        """Alliances a war against the center would pull in beyond its direct partners, with their defense chain.
+
+        Answered from the shared treaty graph; only stale parts of the neighbourhood are refetched.
+        """
+        try:
+            graph = await query_system.get_treaty_graph([int(center_id)], hops=max_hops - 1, types=DEFENSE_TYPES)
+            chain = graph.pulled_into_war(int(center_id), max_hops=max_hops)
+        except Exception as e:
+            self.logger.warning(f"Treaty chain unavailable for alliance {center_id}: {e}")
+            return []
+        lines: List[str] = []
+        for aid, path in sorted(chain.items(), key=lambda kv: (len(kv[1]), graph.name(kv[0]).lower())):
+            if len(path) < 2:
+                continue
+            steps: List[str] = []
+            node = int(center_id)
+            for edge in path:
+                node = edge.other(node)
+                steps.append(f"{graph.name(node)} ({edge.treaty_type})")
+            lines.append(" → ".join(steps))
+        return lines
+
+    def _format_treaties_embed(self, treaties: List[Dict[str, Any]], center_alliance_id: Optional[int] = None, center_name: Optional[str] = None, chain_lines: Optional[List[str]] = None) -> discord.Embed:
         """Format treaties into a rich Discord embed with proper categories and emojis.
         Uses regular URLs (not angle-bracketed) since embeds don't auto-expand links in embed fields.
         """
@@ -1119,6 +1188,17 @@ class AuditManager(commands.Cog):
                 else:
                     embed.add_field(name=field_name, value=field_value, inline=False)
 
+        # Alliances pulled in through a defense-treaty chain, beyond the direct partners above
+        if chain_lines:
+            shown: List[str] = []
+            for line in chain_lines:
+                if len("\n".join(shown + [line])) > 990:
+                    break
+                shown.append(line)
+            more = len(chain_lines) - len(shown)
+            value = "\n".join(shown) + (f"\n… and {more} more" if more else "")
+            embed.add_field(name=f"⛓️ Treaty Chain ({len(chain_lines)})", value=value, inline=False)
+
         # If no treaties found, add a field indicating this
         if not embed.fields:
             embed.add_field(name="📭 No Treaties", value="No treaties found.", inline=False)
@@ -1311,23 +1391,28 @@ class AuditManager(commands.Cog):
                 return
 
             # Pre-refresh Cybertron alliance data before building the audit embed
+            nations: List[Dict[str, Any]] = []
             try:
                 alliance_cog = self.bot.get_cog('AllianceManager')
                 if alliance_cog and hasattr(alliance_cog, 'query_system') and getattr(alliance_cog, 'query_system', None):
-                    # Use centralized query system to force refresh and persist to alliance file
-                    await alliance_cog.query_system.get_alliance_nations(
-                        str(getattr(alliance_cog, 'cybertron_alliance_id', self.cybertron_id)),
-                        bot=self.bot,
-                        force_refresh=True
-                    )
+                    # Any snapshot from the current turn answers the audit; the audit projection only
+                    # requests the fields the audit views read and persists to its own snapshot
+                    with freshness_command('audit'):
+                        nations = await alliance_cog.query_system.get_alliance_nations(
+                            str(getattr(alliance_cog, 'cybertron_alliance_id', self.cybertron_id)),
+                            bot=self.bot,
+                            freshness=CURRENT_TURN,
+                            projection='audit'
+                        ) or []
                 elif alliance_cog and hasattr(alliance_cog, 'get_alliance_nations'):
-                    # Fallback: call AllianceManager getter with refresh flag (may read file)
-                    await alliance_cog.get_alliance_nations(str(self.cybertron_id), force_refresh=True)
+                    # Fallback: AllianceManager getter (reads the alliance file while it is fresh enough)
+                    await alliance_cog.get_alliance_nations(str(self.cybertron_id))
             except Exception as e:
                 # Non-fatal: continue with whatever data is available
                 self.logger.warning(f"Pre-refresh before /audit failed: {e}")
 
-            nations = await self._get_combined_nations()
+            if not nations:
+                nations = await self._get_combined_nations()
             if not nations:
                 if hasattr(ctx, 'interaction') and ctx.interaction:
                     await ctx.interaction.followup.send("❌ No alliance data found for Cybertron.")
@@ -1335,203 +1420,46 @@ class AuditManager(commands.Cog):
                     await ctx.reply("❌ No alliance data found for Cybertron.")
                 return
 
-            active_members = self._filter_active_members(nations)
+            # All categories of the selected view are evaluated in one pass (see audit_rules.py)
+            report = self.audit_engine.run(
+                nations,
+                modes=(view,),
+                mmr_mode=mmr_mode or "basic",
+                alliance_id=self.cybertron_id,
+            )
 
             # New: MMR Build audit
             if view == "mmr":
                 try:
-                    # Thresholds per city average
-                    if (mmr_mode or "basic") == "max":
-                        thresh = {"barracks": 5.0, "factory": 5.0, "air": 5.0, "drydock": 3.0}
-                        title = "⚙️ MMR Build Audit — Max"
-                        note = "Shows ALL nations below 5/5/5/3 per-city average."
-                    else:
-                        thresh = {"barracks": 0.0, "factory": 2.0, "air": 5.0, "drydock": 1.0}
-                        title = "⚙️ MMR Build Audit — Basic"
-                        note = "Shows nations below minimum 0/2/5/1 per-city average (more is fine)."
-
-                    # Use a small epsilon to avoid floating-point rounding issues (display is 1 decimal)
-                    EPSILON = 0.05
-
-                    def compute_mmr_avgs(n: Dict[str, Any]) -> Dict[str, float]:
-                        cities = n.get("cities") or []
-                        num = len(cities) if isinstance(cities, list) else (n.get("num_cities") or 0)
-                        if not num:
-                            return {"barracks": 0.0, "factory": 0.0, "air": 0.0, "drydock": 0.0, "num": 0,
-                                    "b_total": 0, "f_total": 0, "a_total": 0, "d_total": 0}
-                        b = f = a = d = 0
-                        for c in cities or []:
-                            if not isinstance(c, dict):
-                                continue
-                            b += c.get("barracks", 0) or 0
-                            # Factories are keyed as "factory" in city data
-                            f += c.get("factory", 0) or 0
-                            # Air can be "airforcebase" or sometimes "hangar" depending on source
-                            a += (c.get("airforcebase", 0) or c.get("hangar", 0) or 0)
-                            d += c.get("drydock", 0) or 0
-                        return {
-                            "barracks": b / float(num),
-                            "factory": f / float(num),
-                            "air": a / float(num),
-                            "drydock": d / float(num),
-                            "num": float(num),
-                            "b_total": int(b),
-                            "f_total": int(f),
-                            "a_total": int(a),
-                            "d_total": int(d),
-                        }
-
-                    def _normalize_avgs(avg: Dict[str, float]) -> Dict[str, float]:
-                        # Round to one decimal to match displayed values
-                        return {
-                            "barracks": round(float(avg.get("barracks", 0.0) or 0.0), 1),
-                            "factory": round(float(avg.get("factory", 0.0) or 0.0), 1),
-                            "air": round(float(avg.get("air", 0.0) or 0.0), 1),
-                            "drydock": round(float(avg.get("drydock", 0.0) or 0.0), 1),
-                            "num": float(avg.get("num", 0.0) or 0.0),
-                        }
-
-                    def below_threshold(avg: Dict[str, float]) -> bool:
-                        navg = _normalize_avgs(avg)
-                        def is_below(key: str) -> bool:
-                            t = float(thresh.get(key, 0.0) or 0.0)
-                            a = float(navg.get(key, 0.0) or 0.0)
-                            if t <= 0:
-                                return False
-                            # Treat values within EPSILON of threshold as meeting the threshold
-                            return (a + EPSILON) < t
-                        return any(is_below(k) for k in ("barracks", "factory", "air", "drydock"))
-                    # Compute a single percent-off metric relative to thresholds
-                    def compute_percent_off(avg: Dict[str, float], thr: Dict[str, float]) -> float:
-                        keys = ("barracks", "factory", "air", "drydock")
-                        total_thr = sum(v for k, v in thr.items() if k in keys and v > 0)
-                        if total_thr <= 0:
-                            return 0.0
-                        navg = _normalize_avgs(avg)
-                        deficit_sum = 0.0
-                        for k in keys:
-                            t = float(thr.get(k, 0.0) or 0.0)
-                            a = float(navg.get(k, 0.0) or 0.0)
-                            if t > 0 and (a + EPSILON) < t:
-                                deficit_sum += (t - a)
-                        return max(0.0, min(100.0, (deficit_sum / total_thr) * 100.0))
-
-                    # Bucket offenders by percent off to avoid massive single-field values
-                    bucket_50_plus: List[Dict[str, Any]] = []  # 50% or more off
-                    bucket_25_49: List[Dict[str, Any]] = []    # 25% to 49% off
-                    bucket_10_24: List[Dict[str, Any]] = []    # 10% to 24% off
-                    bucket_0_9: List[Dict[str, Any]] = []      # 0% to 9% off
-
-                    for n in active_members:
-                        avg = compute_mmr_avgs(n)
-                        if avg["num"] <= 0:
-                            continue
-                        if below_threshold(avg):
-                            perc = compute_percent_off(avg, thresh)
-                            mmr_str = f"{avg['barracks']:.1f}/{avg['factory']:.1f}/{avg['air']:.1f}/{avg['drydock']:.1f}"
-                            # Compute target totals for selected mode (thresholds are per-city)
-                            try:
-                                num_cities = int(round(float(avg.get("num", 0) or 0)))
-                            except Exception:
-                                num_cities = 0
-                            totals_map = {
-                                "barracks": int(round((thresh.get("barracks", 0) or 0) * num_cities)),
-                                "factory": int(round((thresh.get("factory", 0) or 0) * num_cities)),
-                                "air": int(round((thresh.get("air", 0) or 0) * num_cities)),
-                                "drydock": int(round((thresh.get("drydock", 0) or 0) * num_cities)),
-                            }
-                            current_totals = {
-                                "barracks": int(avg.get("b_total", 0) or 0),
-                                "factory": int(avg.get("f_total", 0) or 0),
-                                "air": int(avg.get("a_total", 0) or 0),
-                                "drydock": int(avg.get("d_total", 0) or 0),
-                            }
-                            # Identify which single category is below, if any
-                            navg = {
-                                "barracks": round(float(avg.get("barracks", 0.0) or 0.0), 1),
-                                "factory": round(float(avg.get("factory", 0.0) or 0.0), 1),
-                                "air": round(float(avg.get("air", 0.0) or 0.0), 1),
-                                "drydock": round(float(avg.get("drydock", 0.0) or 0.0), 1),
-                            }
-                            below_keys = []
-                            for k in ("barracks", "factory", "air", "drydock"):
-                                tval = float(thresh.get(k, 0.0) or 0.0)
-                                aval = float(navg.get(k, 0.0) or 0.0)
-                                if tval > 0 and (aval + EPSILON) < tval:
-                                    below_keys.append(k)
-                            enriched = dict(n)
-                            enriched["__mmr_avg"] = avg
-                            enriched["__mmr_percent_off"] = perc
-                            enriched["__mmr_str"] = mmr_str
-                            enriched["__mmr_totals"] = totals_map
-                            enriched["__mmr_current_totals"] = current_totals
-                            enriched["__mmr_below_keys"] = below_keys
-                            if perc >= 50.0:
-                                bucket_50_plus.append(enriched)
-                            elif perc >= 25.0:
-                                bucket_25_49.append(enriched)
-                            elif perc >= 10.0:
-                                bucket_10_24.append(enriched)
-                            else:
-                                bucket_0_9.append(enriched)
-
+                    profile = MMR_PROFILES[report.mmr_mode]
                     embed = discord.Embed(
-                        title=title,
-                        description=note,
+                        title=profile["title"],
+                        description=profile["note"],
                         color=discord.Color.orange(),
                         timestamp=datetime.now(timezone.utc)
                     )
                     # Add categorized fields with automatic chunking under 1024 chars per field
                     def suffix_builder(nation: Dict[str, Any]) -> Optional[str]:
                         try:
-                            totals = nation.get("__mmr_totals", {}) or {}
-                            current = nation.get("__mmr_current_totals", {}) or {}
-                            avg = nation.get("__mmr_avg", {}) or {}
-                            mode_label = "Max" if (mmr_mode or "basic") == "max" else "Basic"
                             mmr_s = str(nation.get("__mmr_str", ""))
-                            # Normalize per-city averages to 1dp for comparison against thresholds with EPSILON
-                            navg = {
-                                "barracks": round(float(avg.get("barracks", 0.0) or 0.0), 1),
-                                "factory": round(float(avg.get("factory", 0.0) or 0.0), 1),
-                                "air": round(float(avg.get("air", 0.0) or 0.0), 1),
-                                "drydock": round(float(avg.get("drydock", 0.0) or 0.0), 1),
-                            }
-                            # Compute needed totals with threshold tolerance so display matches "at-threshold" logic
-                            def need_for(key: str) -> int:
-                                t = float(thresh.get(key, 0.0) or 0.0)
-                                a = float(navg.get(key, 0.0) or 0.0)
-                                if t <= 0:
-                                    return 0
-                                if (a + EPSILON) >= t:
-                                    return 0
-                                required_total = int(round(t * float(avg.get("num", 0.0) or 0.0)))
-                                current_total = int(current.get(key, 0) or 0)
-                                return max(0, required_total - current_total)
-
-                            need_b = need_for("barracks")
-                            need_f = need_for("factory")
-                            need_a = need_for("air")
-                            need_d = need_for("drydock")
-                            needed_str = f"{need_b}/{need_f}/{need_a}/{need_d}"
+                            # Needed totals already apply the threshold tolerance, so display matches "at-threshold" logic
+                            needed = nation.get("__mmr_needed", {}) or {}
+                            needed_str = "/".join(str(int(needed.get(k, 0) or 0)) for k in MMR_KEYS)
                             # Two-line suffix: current build on line 1, target line shows needed totals in B/F/A/D (no text list)
-                            return f" - {mmr_s}\n   * Target {mode_label}: {needed_str}"
+                            return f" - {mmr_s}\n   * Target {profile['label']}: {needed_str}"
                         except Exception:
                             return None
 
-                    total_offenders = (
-                        len(bucket_50_plus) + len(bucket_25_49) + len(bucket_10_24) + len(bucket_0_9)
-                    )
+                    total_offenders = report.offenders("mmr")
 
                     if total_offenders == 0:
                         embed.add_field(name="Members Below Threshold", value="✅ All members meet the threshold.", inline=False)
                     else:
                         # Use emojis to signal severity
-                        self._add_category_fields(embed, "50%+ off", "🟥", bucket_50_plus, suffix_builder=suffix_builder)
-                        self._add_category_fields(embed, "25–49% off", "🟧", bucket_25_49, suffix_builder=suffix_builder)
-                        self._add_category_fields(embed, "10–24% off", "🟨", bucket_10_24, suffix_builder=suffix_builder)
-                        self._add_category_fields(embed, "0–9% off", "🟩", bucket_0_9, suffix_builder=suffix_builder)
+                        for rule in report.rules_for("mmr"):
+                            self._add_category_fields(embed, rule.label, rule.emoji, report.categories[rule.key], suffix_builder=suffix_builder)
 
-                    embed.set_footer(text=f"Active members checked: {len(active_members)} • Offenders: {total_offenders}")
+                    embed.set_footer(text=f"Active members checked: {report.checked} • Offenders: {total_offenders}")
 
                     if hasattr(ctx, 'interaction') and ctx.interaction:
                         await ctx.interaction.followup.send(embed=embed)
@@ -1551,72 +1479,25 @@ class AuditManager(commands.Cog):
                         await ctx.reply(embed=embed)
                     return
 
-            # Resource-based issues (use active members set) - exclude zero values from "less than" categories
-            food_lt_10k = [n for n in active_members if 0 < (n.get('food', 0) or 0) < 50000]
-            uran_lt_500 = [n for n in active_members if 0 < (n.get('uranium', 0) or 0) < 1000]
-            food_zero = [n for n in active_members if (n.get('food', 0) or 0) == 0]
-            uran_zero = [n for n in active_members if (n.get('uranium', 0) or 0) == 0]
-
-            # Color-based issues (use active members set)
-            beige = [n for n in active_members if (n.get('color', '') or '').strip().upper() == 'BEIGE']
-            grey = [n for n in active_members if (n.get('color', '') or '').strip().upper() in ('GREY', 'GRAY')]
-            wrong_color = [
-                n for n in active_members
-                if (n.get('color', '') or '').strip().upper() not in ('LIME', 'GREY', 'GRAY', 'BEIGE')
-            ]
-
-            # Inactivity (use non-VM/non-applicants for meaningful review) - non-overlapping ranges
-            inactive_7_to_13: List[Dict[str, Any]] = []
-            inactive_14_to_23: List[Dict[str, Any]] = []
-            inactive_24_plus: List[Dict[str, Any]] = []
-            for n in active_members:
-                d = _days_inactive(n)
-                if isinstance(d, int):
-                    if 7 <= d <= 13:
-                        inactive_7_to_13.append(n)
-                    elif 14 <= d <= 23:
-                        inactive_14_to_23.append(n)
-                    elif d >= 24:
-                        inactive_24_plus.append(n)
-
             embed = discord.Embed(
                 title="🧮 Audit Issues",
                 description="Irregularities in the Cybertron alliance.",
                 color=discord.Color.orange()
             )
 
-            # Determine view filter via dropdown Literal; no default
-            view_key = view
-
-            if view_key == "resources":
-                # Only show food/uranium categories
-                self._add_category_fields(
-                    embed,
-                    "Food < 50,000",
-                    "🍞",
-                    food_lt_10k,
-                    suffix_builder=lambda n: f"- {int(n.get('food', 0)):,}"
-                )
+            # Only the selected view's rules were evaluated; no default 'all' view
+            for rule in report.rules_for(view):
+                suffix_builder = None
+                if rule.suffix:
+                    suffix_builder = (lambda key: lambda n: f"- {int(n.get(key, 0)):,}")(rule.suffix)
                 self._add_category_fields(
                     embed,
-                    "Uranium < 1,000",
-                    "☢️",
-                    uran_lt_500,
-                    suffix_builder=lambda n: f"- {int(n.get('uranium', 0)):,}"
+                    rule.label,
+                    rule.emoji,
+                    report.categories.get(rule.key, []),
+                    with_days=rule.with_days,
+                    suffix_builder=suffix_builder
                 )
-                self._add_category_fields(embed, "Food = 0", "🚫", food_zero)
-                self._add_category_fields(embed, "Uranium = 0", "🚫", uran_zero)
-            elif view_key == "inactives":
-                # Only show inactivity categories
-                self._add_category_fields(embed, "Inactive 7-13 days", "⏲️", inactive_7_to_13, with_days=True)
-                self._add_category_fields(embed, "Inactive 14-23 days", "⚠️", inactive_14_to_23, with_days=True)
-                self._add_category_fields(embed, "Inactive 24+ days", "🛑", inactive_24_plus, with_days=True)
-            elif view_key == "color":
-                # Show color categories: Beige, Grey, and Wrong Color (not Lime)
-                self._add_category_fields(embed, "Beige", "🩼", beige)
-                self._add_category_fields(embed, "Grey", "⚪", grey)
-                self._add_category_fields(embed, "Wrong Color", "🎨", wrong_color)
-            # No default 'all' view — users must select one
 
             embed.set_footer(text=f"Generated at {datetime.now().strftime('%H:%M:%S')} | Excludes APPLICANTS and Vacation Mode")
 
@@ -1648,6 +1529,7 @@ class AuditManager(commands.Cog):
 
             # Fetch treaties via AllianceManager's query system if available
             treaties: List[Dict[str, Any]] = []
+            chain_lines: List[str] = []
             center_id: Optional[int] = None
             center_name: Optional[str] = None
             try:
@@ -1686,6 +1568,7 @@ class AuditManager(commands.Cog):
                     # Explicitly force fresh data from API on each use
                     res = await alliance_cog.query_system.get_alliance_treaties(str(center_id), force_refresh=True)
                     treaties = res or []
+                    chain_lines = await self._treaty_chain_lines(alliance_cog.query_system, int(center_id))
                 else:
                     # Fall back gracefully
                     treaties = []
@@ -1694,7 +1577,7 @@ class AuditManager(commands.Cog):
 
             # Generate treaty web image and rich embed
             treaty_file = await self._compose_treaty_web_image(treaties, center_alliance_id=center_id or 0)
-            embed = self._format_treaties_embed(treaties, center_alliance_id=center_id or 0, center_name=center_name)
+            embed = self._format_treaties_embed(treaties, center_alliance_id=center_id or 0, center_name=center_name, chain_lines=chain_lines)
             files: List[discord.File] = []
             if treaty_file:
                 embed.set_image(url=f"attachment://{treaty_file.filename}")
@@ -1794,17 +1677,19 @@ class TreatiesRefreshView(discord.ui.View):
             pass
         try:
             treaties: List[Dict[str, Any]] = []
+            chain_lines: List[str] = []
             try:
                 alliance_cog = self.cog.bot.get_cog('AllianceManager')
                 if alliance_cog and hasattr(alliance_cog, 'query_system') and alliance_cog.query_system:
                     res = await alliance_cog.query_system.get_alliance_treaties(str(self.alliance_id), force_refresh=True)
                     treaties = res or []
+                    chain_lines = await self.cog._treaty_chain_lines(alliance_cog.query_system, int(self.alliance_id))
             except Exception as qerr:
                 self.cog.logger.error(f"Refresh treaties query error: {qerr}")
 
             # Generate treaty web image and new embed
             treaty_file = await self.cog._compose_treaty_web_image(treaties, center_alliance_id=int(self.alliance_id))
-            embed = self.cog._format_treaties_embed(treaties, center_alliance_id=int(self.alliance_id))
+            embed = self.cog._format_treaties_embed(treaties, center_alliance_id=int(self.alliance_id), chain_lines=chain_lines)
             files: List[discord.File] = []
             if treaty_file:
                 embed.set_image(url=f"attachment://{treaty_file.filename}")
@@ -0,0 +1,368 @@
+"""Declarative audit rules evaluated in one pass over an alliance snapshot.
+
+Each ``/audit`` view (resources, inactives, color, mmr) is a set of
+``AuditRule`` rows: a fact name, a comparison and a threshold. The engine
+compiles the rules for the requested modes into one list and walks the
+members once, testing every rule against a row of per-nation facts.
+
+Facts (food, uranium, colour, last-active time, MMR building totals) are
+extracted once per nation record and cached; records are replaced on every
+refresh, so a cached row is never reused for newer data. MMR thresholds are
+a four-value vector (barracks / factory / air / drydock) and the deficit
+against a vector is computed once per nation and shared by all buckets.
+
+Reports are cached per snapshot, mode set and game turn, so a scheduled
+report and an ``/audit`` invocation in the same turn share one evaluation.
+``run_bloc`` audits every bloc alliance at once.
+"""
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+try:
+    from .city_cache import get_city_cache
+    from .turns import turn_id
+    from .view_cache import snapshot_token
+except ImportError:
+    from Systems.PnW.MA.city_cache import get_city_cache
+    from Systems.PnW.MA.turns import turn_id
+    from Systems.PnW.MA.view_cache import snapshot_token
+
+AUDIT_MODES = ('resources', 'inactives', 'color', 'mmr')
+
+MMR_KEYS = ('barracks', 'factory', 'air', 'drydock')
+# Averages are displayed to one decimal; values within EPSILON of a threshold meet it
+MMR_EPSILON = 0.05
+
+MMR_PROFILES: Dict[str, Dict[str, Any]] = {
+    'basic': {
+        'thresholds': (0.0, 2.0, 5.0, 1.0),
+        'title': "⚙️ MMR Build Audit — Basic",
+        'note': "Shows nations below minimum 0/2/5/1 per-city average (more is fine).",
+        'label': "Basic",
+    },
+    'max': {
+        'thresholds': (5.0, 5.0, 5.0, 3.0),
+        'title': "⚙️ MMR Build Audit — Max",
+        'note': "Shows ALL nations below 5/5/5/3 per-city average.",
+        'label': "Max",
+    },
+}
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+@dataclass(frozen=True)
+class AuditRule:
+    """One audit category: members whose ``fact`` satisfies ``op``/``value``.
+
+    Ops: ``open`` (lo < x < hi), ``range`` (lo <= x <= hi, hi None = open
+    ended), ``eq``, ``in``, ``not_in`` and ``mmr_off`` (percent below the
+    MMR threshold vector, lo <= pct < hi).
+    """
+    key: str
+    mode: str
+    label: str
+    emoji: str
+    fact: str
+    op: str
+    value: Any
+    with_days: bool = False
+    suffix: Optional[str] = None
+
+
+RULES: Tuple[AuditRule, ...] = (
+    # Zero values have their own categories, so "less than" excludes them
+    AuditRule('food_low', 'resources', "Food < 50,000", "🍞", 'food', 'open', (0, 50000), suffix='food'),
+    AuditRule('uranium_low', 'resources', "Uranium < 1,000", "☢️", 'uranium', 'open', (0, 1000), suffix='uranium'),
+    AuditRule('food_zero', 'resources', "Food = 0", "🚫", 'food', 'eq', 0),
+    AuditRule('uranium_zero', 'resources', "Uranium = 0", "🚫", 'uranium', 'eq', 0),
+    AuditRule('inactive_7', 'inactives', "Inactive 7-13 days", "⏲️", 'days_inactive', 'range', (7, 13), with_days=True),
+    AuditRule('inactive_14', 'inactives', "Inactive 14-23 days", "⚠️", 'days_inactive', 'range', (14, 23), with_days=True),
+    AuditRule('inactive_24', 'inactives', "Inactive 24+ days", "🛑", 'days_inactive', 'range', (24, None), with_days=True),
+    AuditRule('beige', 'color', "Beige", "🩼", 'color', 'in', frozenset({'BEIGE'})),
+    AuditRule('grey', 'color', "Grey", "⚪", 'color', 'in', frozenset({'GREY', 'GRAY'})),
+    AuditRule('wrong_color', 'color', "Wrong Color", "🎨", 'color', 'not_in', frozenset({'LIME', 'GREY', 'GRAY', 'BEIGE'})),
+    AuditRule('mmr_50', 'mmr', "50%+ off", "🟥", 'mmr', 'mmr_off', (50.0, None)),
+    AuditRule('mmr_25', 'mmr', "25–49% off", "🟧", 'mmr', 'mmr_off', (25.0, 50.0)),
+    AuditRule('mmr_10', 'mmr', "10–24% off", "🟨", 'mmr', 'mmr_off', (10.0, 25.0)),
+    AuditRule('mmr_0', 'mmr', "0–9% off", "🟩", 'mmr', 'mmr_off', (0.0, 10.0)),
+)
+
+
+def _last_active_utc(value: Any) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        if isinstance(value, str):
+            last = value.strip()
+            if last.endswith('Z'):
+                last = last.replace('Z', '+00:00')
+            if '+' not in last and last.count(':') >= 2:
+                last += '+00:00'
+            dt = datetime.fromisoformat(last)
+        else:
+            dt = value
+        if dt.tzinfo is None:
+            return dt.replace(tzinfo=timezone.utc)
+        return dt.astimezone(timezone.utc)
+    except Exception:
+        return None
+
+
+class NationFacts:
+    """Values the audit rules read from one nation record, extracted once."""
+
+    __slots__ = ('record', 'active', 'food', 'uranium', 'color', 'last_active', 'num_cities', 'mmr_totals', '_mmr')
+
+    def __init__(self, n: Dict[str, Any]):
+        self.record = n
+        pos = (n.get('alliance_position', '') or '').strip().upper()
+        try:
+            vm = int(n.get('vacation_mode_turns', 0) or 0)
+        except Exception:
+            vm = 0
+        # Applicants and vacation mode are excluded from every audit view
+        self.active = pos != 'APPLICANT' and vm <= 0
+        self.food = n.get('food', 0) or 0
+        self.uranium = n.get('uranium', 0) or 0
+        self.color = (n.get('color', '') or '').strip().upper()
+        self.last_active = _last_active_utc(n.get('last_active'))
+        cities = n.get('cities') or []
+        self.num_cities = len(cities) if isinstance(cities, list) else (n.get('num_cities') or 0)
+        # Barracks / factory / air / drydock totals; the city cache folds "hangar" into air
+        self.mmr_totals = get_city_cache().nation_totals(n).mmr
+        self._mmr: Dict[Tuple[float, ...], Optional[Dict[str, Any]]] = {}
+
+    def mmr_avgs(self) -> Tuple[float, ...]:
+        num = float(self.num_cities or 0)
+        if not num:
+            return (0.0, 0.0, 0.0, 0.0)
+        return tuple(t / num for t in self.mmr_totals)
+
+    def mmr_deficit(self, thresholds: Tuple[float, ...]) -> Optional[Dict[str, Any]]:
+        """Shortfall against ``thresholds``, or None if the nation meets them (memoized per vector)."""
+        if thresholds in self._mmr:
+            return self._mmr[thresholds]
+        result = None
+        if self.num_cities:
+            avgs = self.mmr_avgs()
+            rounded = tuple(round(v, 1) for v in avgs)
+            below = tuple(t > 0 and (v + MMR_EPSILON) < t for v, t in zip(rounded, thresholds))
+            if any(below):
+                total_thr = sum(t for t in thresholds if t > 0)
+                deficit = sum(t - v for v, t, b in zip(rounded, thresholds, below) if b)
+                result = {
+                    'avgs': avgs,
+                    'percent_off': max(0.0, min(100.0, deficit / total_thr * 100.0)) if total_thr > 0 else 0.0,
+                    'below_keys': [k for k, b in zip(MMR_KEYS, below) if b],
+                    'targets': [int(round(t * self.num_cities)) for t in thresholds],
+                    'needed': [
+                        max(0, int(round(t * float(self.num_cities))) - cur) if b else 0
+                        for t, cur, b in zip(thresholds, self.mmr_totals, below)
+                    ],
+                }
+        self._mmr[thresholds] = result
+        return result
+
+
+def _compile(rule: AuditRule, mmr_thresholds: Tuple[float, ...]) -> Callable[[NationFacts, Optional[datetime]], bool]:
+    op, value = rule.op, rule.value
+    if rule.fact == 'days_inactive':
+        lo, hi = value
+
+        def test(f: NationFacts, now: Optional[datetime]) -> bool:
+            if f.last_active is None or now is None:
+                return False
+            days = (now - f.last_active).days
+            return days >= lo and (hi is None or days <= hi)
+        return test
+    if op == 'mmr_off':
+        lo, hi = value
+
+        def test(f: NationFacts, now: Optional[datetime]) -> bool:
+            deficit = f.mmr_deficit(mmr_thresholds)
+            if deficit is None:
+                return False
+            pct = deficit['percent_off']
+            return pct >= lo and (hi is None or pct < hi)
+        return test
+    getter = lambda f: getattr(f, rule.fact)  # noqa: E731
+    if op == 'open':
+        lo, hi = value
+        return lambda f, now: lo < getter(f) < hi
+    if op == 'range':
+        lo, hi = value
+        return lambda f, now: getter(f) >= lo and (hi is None or getter(f) <= hi)
+    if op == 'eq':
+        return lambda f, now: getter(f) == value
+    if op == 'in':
+        return lambda f, now: getter(f) in value
+    if op == 'not_in':
+        return lambda f, now: getter(f) not in value
+    raise ValueError(f"Unknown audit rule op: {op}")
+
+
+@dataclass
+class AuditReport:
+    """Members per rule for one alliance snapshot."""
+    alliance_id: Optional[str]
+    modes: Tuple[str, ...]
+    mmr_mode: str
+    turn: str
+    rules: List[AuditRule]
+    categories: Dict[str, List[Dict[str, Any]]]
+    checked: int
+    generated_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    duration_ms: float = 0.0
+
+    def rules_for(self, mode: str) -> List[AuditRule]:
+        return [r for r in self.rules if r.mode == mode]
+
+    def offenders(self, mode: Optional[str] = None) -> int:
+        return sum(len(self.categories.get(r.key, [])) for r in self.rules if mode is None or r.mode == mode)
+
+    def summary(self) -> Dict[str, int]:
+        """Offender counts per rule key, for reports."""
+        return {r.key: len(self.categories.get(r.key, [])) for r in self.rules}
+
+
+class AuditEngine:
+    """Compiles audit rules and evaluates them with cached facts and reports."""
+
+    def __init__(
+        self,
+        rules: Iterable[AuditRule] = RULES,
+        max_reports: Optional[int] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.logger = logger or logging.getLogger(__name__)
+        self.rules: Tuple[AuditRule, ...] = tuple(rules)
+        self.max_reports = int(max_reports or _env_number('PNW_AUDIT_REPORT_CACHE', 64))
+        # id(record) -> facts; a fact row holds its record, so the id cannot be reused while cached
+        self.max_facts = int(_env_number('PNW_AUDIT_FACT_CACHE', 20000))
+        self._facts: Dict[int, NationFacts] = {}
+        # key -> (report, audited records); the records keep their fact rows valid
+        self._reports: 'OrderedDict[Hashable, Tuple[AuditReport, List[Dict[str, Any]]]]' = OrderedDict()
+        self.stats: Dict[str, int] = {'reports': 0, 'report_hits': 0, 'facts_built': 0, 'facts_reused': 0}
+
+    def facts(self, n: Dict[str, Any]) -> NationFacts:
+        cached = self._facts.get(id(n))
+        if cached is not None and cached.record is n:
+            self.stats['facts_reused'] += 1
+            return cached
+        facts = NationFacts(n)
+        self._facts[id(n)] = facts
+        self.stats['facts_built'] += 1
+        return facts
+
+    def _prune_facts(self) -> None:
+        if len(self._facts) <= self.max_facts:
+            return
+        # Drop rows for records no cached report refers to (older snapshots)
+        live = {id(r) for _, records in self._reports.values() for r in records}
+        self._facts = {k: v for k, v in self._facts.items() if k in live}
+
+    def run(
+        self,
+        nations: List[Dict[str, Any]],
+        modes: Iterable[str] = AUDIT_MODES,
+        mmr_mode: str = 'basic',
+        alliance_id: Optional[Any] = None,
+        now: Optional[datetime] = None,
+    ) -> AuditReport:
+        """Evaluate every rule of ``modes`` over ``nations`` in one pass."""
+        modes = tuple(m for m in AUDIT_MODES if m in set(modes))
+        mmr_mode = mmr_mode if mmr_mode in MMR_PROFILES else 'basic'
+        turn = turn_id(now)
+        records = [n for n in nations or [] if isinstance(n, dict)]
+        key = (snapshot_token(records), modes, mmr_mode, turn, str(alliance_id))
+        cached = self._reports.get(key)
+        if cached is not None:
+            self._reports.move_to_end(key)
+            self.stats['report_hits'] += 1
+            return cached[0]
+
+        started = time.perf_counter()
+        now_utc = now.astimezone(timezone.utc) if now is not None else datetime.now(timezone.utc)
+        thresholds = tuple(MMR_PROFILES[mmr_mode]['thresholds'])
+        rules = [r for r in self.rules if r.mode in modes]
+        compiled = [(r.key, _compile(r, thresholds)) for r in rules]
+        categories: Dict[str, List[Dict[str, Any]]] = {r.key: [] for r in rules}
+        checked = 0
+        for n in records:
+            f = self.facts(n)
+            if not f.active:
+                continue
+            checked += 1
+            for rule_key, test in compiled:
+                if test(f, now_utc):
+                    categories[rule_key].append(n)
+
+        if 'mmr' in modes:
+            for r in rules:
+                if r.mode == 'mmr':
+                    categories[r.key] = [self._mmr_row(n, thresholds) for n in categories[r.key]]
+
+        report = AuditReport(
+            alliance_id=str(alliance_id) if alliance_id is not None else None,
+            modes=modes,
+            mmr_mode=mmr_mode,
+            turn=turn,
+            rules=rules,
+            categories=categories,
+            checked=checked,
+            duration_ms=(time.perf_counter() - started) * 1000.0,
+        )
+        self._reports[key] = (report, records)
+        while len(self._reports) > self.max_reports:
+            self._reports.popitem(last=False)
+        self._prune_facts()
+        self.stats['reports'] += 1
+        return report
+
+    def _mmr_row(self, n: Dict[str, Any], thresholds: Tuple[float, ...]) -> Dict[str, Any]:
+        """Copy of ``n`` with the ``__mmr_*`` keys the MMR embed reads."""
+        f = self.facts(n)
+        deficit = f.mmr_deficit(thresholds) or {}
+        avgs = deficit.get('avgs') or f.mmr_avgs()
+        row = dict(n)
+        row['__mmr_avg'] = dict(zip(MMR_KEYS, avgs), num=float(f.num_cities or 0))
+        row['__mmr_percent_off'] = deficit.get('percent_off', 0.0)
+        row['__mmr_str'] = "/".join(f"{v:.1f}" for v in avgs)
+        row['__mmr_totals'] = dict(zip(MMR_KEYS, deficit.get('targets') or []))
+        row['__mmr_current_totals'] = dict(zip(MMR_KEYS, f.mmr_totals))
+        row['__mmr_below_keys'] = list(deficit.get('below_keys') or [])
+        row['__mmr_needed'] = dict(zip(MMR_KEYS, deficit.get('needed') or [0, 0, 0, 0]))
+        return row
+
+    def clear(self) -> None:
+        self._facts.clear()
+        self._reports.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self.stats)
+        out['cached_reports'] = len(self._reports)
+        out['cached_facts'] = len(self._facts)
+        return out
+
+
+_engine: Optional[AuditEngine] = None
+
+
+def get_audit_engine() -> AuditEngine:
+    """Process-wide audit engine shared by /audit and scheduled reports."""
+    global _engine
+    if _engine is None:
+        _engine = AuditEngine()
+    return _engine
@@ -12,7 +12,6 @@ import sys
 import random
 import logging
 import traceback
-import time
 from pathlib import Path
 try:
     import pnwkit
@@ -53,6 +52,11 @@ except ImportError:
     except ImportError:
         create_query_instance = None
 
+try:
+    from .freshness import FRESH, within
+except ImportError:
+    from Systems.PnW.MA.freshness import FRESH, within
+
 # Import AERO_ALLIANCES and leadership role check
 try:
     from .bloc import AERO_ALLIANCES
@@ -1439,7 +1443,6 @@ class BlitzParties(commands.Cog):
         self.api_key = PANDW_API_KEY
         self.user_data_manager = UserDataManager()
         self._cache_expiry_seconds: int = 3600  
-        self._alliance_nations_cache: Dict[str, Dict] = {}
         self.logger = logging.getLogger(f"{__name__}.BlitzParties")
         self.error_count = 0
         try:
@@ -1635,6 +1638,9 @@ class BlitzParties(commands.Cog):
             if bloc_dir.exists():
                 all_nations = []
                 for alliance_file in bloc_dir.glob('alliance_*.json'):
+                    # Skip projection snapshots (alliance_<id>_<projection>) so nations aren't counted twice
+                    if not alliance_file.stem[len('alliance_'):].isdigit():
+                        continue
                     try:
                         file_data = await user_data_manager.get_json_data(alliance_file.stem, {})
                         if isinstance(file_data, dict) and 'nations' in file_data:
@@ -1646,26 +1652,11 @@ class BlitzParties(commands.Cog):
                 if all_nations:
                     self.logger.debug(f"get_alliance_nations: Loaded {len(all_nations)} total nations from all alliance files")
                     return all_nations
-            cache_key = str(alliance_id)
-            if not force_refresh and cache_key in self._alliance_nations_cache:
-                entry = self._alliance_nations_cache[cache_key]
-                if time.time() - entry.get('timestamp', 0) < self._cache_expiry_seconds:
-                    data = entry.get('data') or []
-                    if data:
-                        self.logger.debug(f"get_alliance_nations: Local cache hit for alliance {alliance_id} ({len(data)} nations)")
-                        return data
             if self.query_instance:
+                # Nations already held by the shared repository are reused for up to an hour
                 self.logger.debug(f"get_alliance_nations: Using query instance for alliance {alliance_id}")
-                nations = await self.query_instance.get_alliance_nations(alliance_id, bot=self.bot, force_refresh=force_refresh)
-                if nations:
-                    self._alliance_nations_cache[cache_key] = { 'data': nations, 'timestamp': time.time() }
-                return nations
-            if self.query_instance:
-                self.logger.debug(f"get_alliance_nations: Using centralized query instance for alliance {alliance_id}")
-                nations = await self.query_instance.get_alliance_nations(alliance_id, bot=self.bot, force_refresh=force_refresh)
-                if nations:
-                    self._alliance_nations_cache[cache_key] = { 'data': nations, 'timestamp': time.time() }
-                return nations
+                freshness = FRESH if force_refresh else within(self._cache_expiry_seconds)
+                return await self.query_instance.get_alliance_nations(alliance_id, bot=self.bot, freshness=freshness)
             else:
                 error_msg = "Query instance not available and AllianceManager not found"
                 self.logger.error(f"get_alliance_nations: {error_msg}")
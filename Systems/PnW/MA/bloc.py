@@ -5,7 +5,7 @@ import json
 import os
 from collections import defaultdict
 from datetime import datetime
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 import asyncio
 import random
 import logging
@@ -104,6 +104,36 @@ except ImportError:
     except ImportError:
         create_query_instance = None
 
+# Priority classes for the shared PnW API scheduler
+try:
+    from .scheduler import BACKGROUND, NEAR_REAL_TIME, api_priority
+except ImportError:
+    from Systems.PnW.MA.scheduler import BACKGROUND, NEAR_REAL_TIME, api_priority
+
+# Turn clock for the background bloc prefetch
+try:
+    from .turns import TurnRefreshScheduler, turn_id
+except ImportError:
+    from Systems.PnW.MA.turns import TurnRefreshScheduler, turn_id
+
+# Versioned bloc snapshot history
+try:
+    from .snapshot_history import get_bloc_history
+except ImportError:
+    from Systems.PnW.MA.snapshot_history import get_bloc_history
+
+# Memoized view models for the paginated views
+try:
+    from .view_cache import get_view_cache
+except ImportError:
+    from Systems.PnW.MA.view_cache import get_view_cache
+
+# Binary alliance snapshots written next to the JSON files
+try:
+    from .snapshot_file import open_snapshot, read_snapshot, sidecar_path, source_stamp, write_snapshot
+except ImportError:
+    from Systems.PnW.MA.snapshot_file import open_snapshot, read_snapshot, sidecar_path, source_stamp, write_snapshot
+
 # Define AERO alliance configuration
 AERO_ALLIANCES = {
     'cybertron': {
@@ -150,6 +180,51 @@ AERO_ALLIANCES = {
     }
 }
 
+
+def _embed_cacheable(value: Any) -> bool:
+    """Error pages are rebuilt on the next click instead of being memoized."""
+    embed = value[0] if isinstance(value, tuple) else value
+    return embed is not None and not str(getattr(embed, 'title', '') or '').startswith('❌')
+
+
+def _view_filters(alliance_key: Optional[str], selected_alliances: Optional[List[str]]) -> Tuple:
+    """View state that changes a detail page's output, mirroring the views' __init__ defaults."""
+    return (alliance_key, tuple(selected_alliances or [alliance_key]))
+
+
+def _bloc_records(bloc_data: Dict[str, Any]) -> List[Any]:
+    """All nation records of a bloc snapshot, for view cache keys."""
+    records: List[Any] = []
+    for nations in (bloc_data or {}).values():
+        if isinstance(nations, list):
+            records.extend(nations)
+        else:
+            records.append(nations)
+    return records
+
+
+def _precompute_detail_pages(source_view: Any, nations: List[Dict], alliance_key: str, selected_alliances: Optional[List[str]], skip: Optional[str] = None) -> None:
+    """Build the military / improvements / projects pages for ``nations`` in the background."""
+    if not nations or alliance_key not in AERO_ALLIANCES:
+        return
+    cache = get_view_cache()
+    filters = _view_filters(alliance_key, selected_alliances)
+    pages = (
+        ('bloc.military', MilitaryView, '_build_military_embed'),
+        ('bloc.improvements', ImprovementsView, '_build_improvements_embed'),
+        ('bloc.projects', ProjectTotalsView, '_build_project_totals_embed'),
+    )
+    for kind, view_cls, builder in pages:
+        if kind == skip or cache.has(cache.make_key(kind, nations, filters)):
+            continue
+        try:
+            page_view = view_cls(source_view.author_id, source_view.bot, source_view.alliance_cog, nations, alliance_key, selected_alliances)
+        except Exception:
+            continue
+        build = getattr(page_view, builder)
+        cache.precompute(kind, nations, lambda build=build: build(nations), filters=filters, cacheable=_embed_cacheable)
+
+
 class AllianceSelect(discord.ui.Select):
     """Dropdown menu for selecting alliance or bloc totals."""
     
@@ -825,7 +900,13 @@ class BlocTotalsView(discord.ui.View):
         return True
 
     async def generate_bloc_totals_embed(self) -> discord.Embed:
-        """Generate the bloc totals overview embed."""
+        """Generate the bloc totals overview embed (memoized per snapshot)."""
+        embed = await get_view_cache().get_or_build(
+            'bloc.totals', _bloc_records(self.bloc_data), self._build_bloc_totals_embed, cacheable=_embed_cacheable
+        )
+        return embed.copy()
+
+    async def _build_bloc_totals_embed(self) -> discord.Embed:
         try:
             if not self.bloc_data:
                 return discord.Embed(
@@ -911,7 +992,25 @@ class BlocTotalsView(discord.ui.View):
             )
 
     async def generate_custom_bloc_embed(self, selected_alliances: List[str]) -> discord.Embed:
-        """Generate bloc totals embed for selected alliance combinations."""
+        """Generate bloc totals embed for selected alliance combinations (memoized per snapshot and selection)."""
+        async def build():
+            built = await self._build_custom_bloc_embed(selected_alliances)
+            return built, self.current_combined_nations
+        
+        embed, combined_nations = await get_view_cache().get_or_build(
+            'bloc.custom', _bloc_records(self.bloc_data), build,
+            filters=(tuple(selected_alliances),), cacheable=_embed_cacheable
+        )
+        if combined_nations is not None:
+            self.current_combined_nations = combined_nations
+            # The detail buttons open these next; have them ready
+            primary_alliance_key = selected_alliances[0] if selected_alliances else self.alliance_keys[0]
+            if primary_alliance_key == "cybertron_combined":
+                primary_alliance_key = "cybertron"
+            _precompute_detail_pages(self, combined_nations, primary_alliance_key, selected_alliances)
+        return embed.copy()
+
+    async def _build_custom_bloc_embed(self, selected_alliances: List[str]) -> discord.Embed:
         try:
             if not self.bloc_data:
                 return discord.Embed(
@@ -1011,7 +1110,31 @@ class BlocTotalsView(discord.ui.View):
             )
 
     async def generate_alliance_embed(self, alliance_key: str, nations: List[Dict]) -> discord.Embed:
-        """Generate embed for a specific alliance."""
+        """Generate embed for a specific alliance (memoized), precomputing its neighbours."""
+        cache = get_view_cache()
+        records = nations if isinstance(nations, list) else []
+        embed = await cache.get_or_build(
+            'bloc.alliance', records, lambda: self._build_alliance_embed(alliance_key, nations),
+            filters=(alliance_key,), cacheable=_embed_cacheable
+        )
+        index = self.current_alliance_index
+        if alliance_key in self.alliance_keys:
+            index = self.alliance_keys.index(alliance_key)
+            for neighbour in {self.alliance_keys[index - 1], self.alliance_keys[(index + 1) % len(self.alliance_keys)]}:
+                neighbour_nations = self.bloc_data.get(neighbour, [])
+                if isinstance(neighbour_nations, list):
+                    cache.precompute(
+                        'bloc.alliance', neighbour_nations,
+                        lambda key=neighbour, group=neighbour_nations: self._build_alliance_embed(key, group),
+                        filters=(neighbour,), cacheable=_embed_cacheable
+                    )
+        # The footer depends on the view and the clock, so it is set on the copy, not cached
+        embed = embed.copy()
+        if _embed_cacheable(embed):
+            embed.set_footer(text=f"Generated at {datetime.now().strftime('%H:%M:%S')} | Alliance {index + 1} of {len(self.alliance_keys)}")
+        return embed
+
+    async def _build_alliance_embed(self, alliance_key: str, nations: List[Dict]) -> discord.Embed:
         try:
             alliance_config = AERO_ALLIANCES[alliance_key]
             
@@ -1113,8 +1236,6 @@ class BlocTotalsView(discord.ui.View):
             )
             embed.add_field(name="⚔️ Military Units", value=military_units, inline=False)
             
-            embed.set_footer(text=f"Generated at {datetime.now().strftime('%H:%M:%S')} | Alliance {self.current_alliance_index + 1} of {len(self.alliance_keys)}")
-            
             return embed
             
         except Exception as e:
@@ -1292,17 +1413,26 @@ class AllianceManager:
         self.logger = logging.getLogger(__name__)
         
         # Set up cache file path
-        self.bloc_cache_file = os.path.join('Systems', 'Data', 'Bloc', 'bloc_cache.json')
+        self.bloc_cache_file = os.path.join(self.bloc_dir, 'bloc_cache.json')
         
         # Initialize bloc data and load from cache
         self.bloc_data = {}
         self.last_update = None
+        # Game turn the held snapshot was fetched in (see turns.turn_id)
+        self.snapshot_turn: Optional[str] = None
+        self._refresh_lock = asyncio.Lock()
+        self.history = get_bloc_history()
         
         # Load existing cache if available
         self.load_bloc_cache()
         
         self.logger.info(f"AllianceManager initialized with cache file: {self.bloc_cache_file}")
     
+    @property
+    def bloc_dir(self) -> str:
+        """Bloc directory under the UserDataManager data path, independent of the working directory."""
+        return str(UserDataManager().json_path / 'Bloc')
+    
     def load_bloc_cache(self):
         """Load bloc data from individual alliance files in Bloc directory."""
         try:
@@ -1311,9 +1441,11 @@ class AllianceManager:
             # Initialize empty bloc data
             self.bloc_data = {}
             self.last_update = None
+            self.snapshot_turn = None
+            loaded_turns = []
             
             # Path to Bloc directory
-            bloc_dir = os.path.join('Systems', 'Data', 'Bloc')
+            bloc_dir = self.bloc_dir
             
             if not os.path.exists(bloc_dir):
                 self.logger.warning(f"Bloc directory does not exist: {bloc_dir}")
@@ -1335,8 +1467,8 @@ class AllianceManager:
                 
                 if os.path.exists(file_path):
                     try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            alliance_data = json.load(f)
+                        # Decoded from the binary sidecar when it is current, else the JSON file
+                        alliance_data = read_snapshot(file_path)
                             
                         # Extract alliance ID from filename
                         alliance_id = filename.replace('alliance_', '').replace('.json', '')
@@ -1357,6 +1489,8 @@ class AllianceManager:
                                 self.bloc_data[alliance_key] = []
                                 self.logger.warning(f"No nations found in {filename}")
                             
+                            loaded_turns.append(alliance_data.get('turn_id') or '')
+                            
                             # Update last_update if this file is newer
                             if alliance_data.get('last_update'):
                                 if not self.last_update or alliance_data['last_update'] > self.last_update:
@@ -1369,6 +1503,10 @@ class AllianceManager:
             
             self.logger.info(f"Successfully loaded {loaded_count} alliances from individual files")
             
+            # The snapshot is only as current as its oldest alliance
+            if loaded_turns and all(loaded_turns):
+                self.snapshot_turn = min(loaded_turns)
+            
             # If no data was loaded, try to set a default last_update
             if loaded_count > 0 and not self.last_update:
                 self.last_update = datetime.now().isoformat()
@@ -1386,7 +1524,7 @@ class AllianceManager:
             self.logger.info(f"Attempting to save bloc data to individual alliance files")
             
             # Path to Bloc directory
-            bloc_dir = os.path.join('Systems', 'Data', 'Bloc')
+            bloc_dir = self.bloc_dir
             
             # Ensure directory exists
             if not os.path.exists(bloc_dir):
@@ -1411,11 +1549,13 @@ class AllianceManager:
                         # If we have a list of nations, wrap it in the expected format
                         save_data = {
                             'nations': alliance_data,
-                            'last_update': datetime.now().isoformat()
+                            'last_update': datetime.now().isoformat(),
+                            'turn_id': self.snapshot_turn
                         }
                     elif isinstance(alliance_data, dict):
                         # If it's already a dict, update the last_update
                         alliance_data['last_update'] = datetime.now().isoformat()
+                        alliance_data['turn_id'] = self.snapshot_turn
                         save_data = alliance_data
                     else:
                         self.logger.warning(f"Unexpected data type for {alliance_key}: {type(alliance_data)}")
@@ -1423,7 +1563,11 @@ class AllianceManager:
                     
                     # Save to individual file
                     with open(file_path, 'w', encoding='utf-8') as f:
-                        json.dump(save_data, f, indent=2)
+                        json.dump(save_data, f, separators=(',', ':'))
+                    try:
+                        write_snapshot(sidecar_path(file_path), save_data, source=source_stamp(file_path))
+                    except Exception as sidecar_error:
+                        self.logger.warning(f"Binary snapshot save failed for {alliance_key}: {sidecar_error}")
                     
                     saved_count += 1
                     self.logger.info(f"Saved alliance data for {alliance_key} to {filename}")
@@ -1438,15 +1582,56 @@ class AllianceManager:
             import traceback
             self.logger.error(f"Full traceback: {traceback.format_exc()}")
     
+    def alliance_totals(self, alliance_key: str) -> Dict[str, float]:
+        """Nation count plus score, city and unit totals for one bloc alliance.
+
+        Sums the held bloc data when it is loaded; otherwise reads the index columns of the
+        alliance's binary snapshot, so no nation or city is decoded.
+        """
+        fields = ('score', 'num_cities', 'soldiers', 'tanks', 'aircraft', 'ships', 'missiles', 'nukes')
+        nations = self.bloc_data.get(alliance_key)
+        if nations:
+            totals = {'nations': float(len(nations))}
+            for field in fields:
+                if field == 'num_cities':
+                    totals[field] = float(sum(len(n.get('cities') or []) or (n.get('num_cities') or 0) for n in nations))
+                else:
+                    totals[field] = float(sum(n.get(field) or 0 for n in nations))
+            return totals
+        config = AERO_ALLIANCES.get(alliance_key)
+        if not config:
+            return {}
+        snapshot = open_snapshot(os.path.join(self.bloc_dir, f"alliance_{config['id']}.json"))
+        if snapshot is None:
+            return {}
+        with snapshot:
+            totals = snapshot.totals(fields)
+            totals['nations'] = float(len(snapshot))
+        return totals
+
     def calculate_full_mill_data(self, nations: List[Dict]) -> Dict[str, Any]:
         """Calculate full military data for a list of nations."""
         return calculate_full_mill_data(nations)
     
-    async def get_alliance_nations(self, alliance_id: int) -> List[Dict]:
-        """Get nations for a specific alliance from individual alliance files in Bloc directory."""
+    async def get_alliance_nations(self, alliance_id: int, force_refresh: bool = False) -> List[Dict]:
+        """Get nations for a specific alliance from individual alliance files in Bloc directory.
+        
+        With ``force_refresh`` the local files are skipped and query.py fetches from the API.
+        """
         try:
             self.logger.info(f"Getting nations for alliance {alliance_id}")
             
+            if force_refresh and create_query_instance:
+                try:
+                    query_instance = create_query_instance()
+                    nations_data = await query_instance.get_alliance_nations(str(alliance_id), bot=self.bot, force_refresh=True)
+                    if nations_data:
+                        self.logger.info(f"Fetched fresh data for alliance {alliance_id} ({len(nations_data)} nations)")
+                        return nations_data
+                    self.logger.warning(f"Forced refresh returned no data for alliance {alliance_id}, falling back to cache")
+                except Exception as e:
+                    self.logger.error(f"Forced refresh failed for alliance {alliance_id}: {e}")
+            
             # Priority 1: Load from individual alliance files in Bloc directory
             user_data_manager = UserDataManager()
             alliance_id_str = str(alliance_id)
@@ -1485,7 +1670,7 @@ class AllianceManager:
             # Priority 2: Try loading the specific alliance file from Bloc directory
             try:
                 from pathlib import Path
-                bloc_dir = Path('Systems/Data/Bloc')
+                bloc_dir = Path(self.bloc_dir)
                 if bloc_dir.exists():
                     # Look for the specific alliance file
                     specific_file = bloc_dir / f'alliance_{alliance_id}.json'
@@ -1735,8 +1920,8 @@ class AllianceManager:
             self.logger.error(f"Data was: {type(nations_data)}")
             return []
     
-    async def fetch_bloc_data(self) -> Dict[str, List[Dict]]:
-        """Fetch data for all AERO alliances with 1.5 second delay between API calls."""
+    async def fetch_bloc_data(self, force_refresh: bool = False, stagger_seconds: float = 1.5) -> Dict[str, List[Dict]]:
+        """Fetch data for all AERO alliances, waiting ``stagger_seconds`` (plus up to 20% jitter) between API calls."""
         bloc_data = {}
         user_data_manager = UserDataManager()
         
@@ -1751,7 +1936,7 @@ class AllianceManager:
                 
                 if alliance_id:  # Only fetch if alliance ID is configured
                     self.logger.debug(f"Fetching nations for alliance {alliance_key} (ID: {alliance_id})")
-                    nations = await self.get_alliance_nations(alliance_id)
+                    nations = await self.get_alliance_nations(alliance_id, force_refresh=force_refresh)
                     bloc_data[alliance_key] = nations
                     self.logger.info(f"Fetched {len(nations)} nations for {alliance_name} (ID: {alliance_id})")
                     
@@ -1760,7 +1945,7 @@ class AllianceManager:
                         valid_nations = [n for n in nations if isinstance(n, dict) and n.get('id')]
                         self.logger.debug(f"Alliance {alliance_key}: {len(valid_nations)}/{len(nations)} nations are valid (have ID)")
                     
-                    await asyncio.sleep(1.5)
+                    await asyncio.sleep(stagger_seconds * random.uniform(1.0, 1.2))
                 else:
                     self.logger.warning(f"No alliance ID configured for {alliance_key}")
                     bloc_data[alliance_key] = []
@@ -1773,24 +1958,48 @@ class AllianceManager:
         self.logger.info(f"Completed fetch_bloc_data: {len(bloc_data)} alliances processed")
         return bloc_data
     
-    async def refresh_bloc_data(self) -> bool:
-        """Refresh all bloc data and update individual alliance files."""
+    async def refresh_bloc_data(
+        self,
+        force_refresh: bool = False,
+        stagger_seconds: float = 1.5,
+        priority: str = NEAR_REAL_TIME,
+    ) -> bool:
+        """Refresh all bloc data and update individual alliance files.
+        
+        Concurrent callers (a manual refresh during the turn prefetch) wait for the
+        running refresh instead of starting a second crawl.
+        """
+        if self._refresh_lock.locked():
+            async with self._refresh_lock:
+                return bool(self.bloc_data)
+        async with self._refresh_lock:
+            return await self._refresh_bloc_data(force_refresh, stagger_seconds, priority)
+    
+    async def _refresh_bloc_data(self, force_refresh: bool, stagger_seconds: float, priority: str) -> bool:
         try:
             self.logger.info("Starting refresh_bloc_data...")
+            fetch_turn = turn_id()
             
-            # Fetch fresh data
+            # Fetch fresh data; the bloc crawl yields to interactive commands in the API scheduler
             self.logger.debug("Fetching fresh bloc data...")
-            new_bloc_data = await self.fetch_bloc_data()
+            with api_priority(priority):
+                new_bloc_data = await self.fetch_bloc_data(force_refresh=force_refresh, stagger_seconds=stagger_seconds)
             self.logger.debug(f"Fetched bloc data for {len(new_bloc_data)} alliances")
             
             # Update cache
             self.bloc_data = new_bloc_data
             self.last_update = datetime.now().isoformat()
+            self.snapshot_turn = fetch_turn
             self.logger.debug(f"Updated cache with timestamp: {self.last_update}")
             
-            # Save the main bloc cache
-            self.logger.debug("Saving main bloc cache...")
-            self.save_bloc_cache()
+            # Record the refresh as a new history version (delta-compressed, written off the event loop);
+            # the current per-alliance files are written below through UserDataManager
+            version = await self.history.append(
+                self.bloc_data,
+                turn=self.snapshot_turn,
+                meta={'forced': force_refresh},
+            )
+            self.logger.debug(f"Stored bloc snapshot as history version {version}")
             
             # Save each alliance's data to its individual file
             user_data_manager = UserDataManager()
@@ -1812,6 +2021,7 @@ class AllianceManager:
                             'nations': nations,
                             'alliance_id': str(alliance_id),
                             'last_updated': self.last_update,
+                            'turn_id': self.snapshot_turn,
                             'total_nations': len(nations)
                         }
                         alliance_file_key = f'alliance_{alliance_id}'
@@ -1869,6 +2079,54 @@ class AllianceManager:
         if cache_age is None:
             return True
         return cache_age > max_age_minutes
+    
+    def is_current_turn(self, turn: Optional[str] = None) -> bool:
+        """True if the held snapshot was fetched during ``turn`` (default: the current game turn)."""
+        if not self.snapshot_turn or not self.bloc_data:
+            return False
+        return self.snapshot_turn >= (turn or turn_id())
+    
+    async def get_turn_history(self, last_n_turns: int = 12) -> List[Tuple[str, Dict[str, List[Dict]]]]:
+        """Bloc snapshots for the last ``last_n_turns`` recorded turns as (turn_id, bloc_data), oldest first."""
+        try:
+            return await self.history.per_turn(last_n_turns)
+        except Exception as e:
+            self.logger.error(f"Error reading bloc history: {e}")
+            return []
+    
+    async def prefetch_turn(self, turn: str) -> bool:
+        """Background refresh run by the turn scheduler.
+        
+        Alliances are spread over ``PNW_TURN_REFRESH_SPREAD`` seconds at background
+        priority so the prefetch never competes with officers' commands. Extra alliance
+        ids in ``PNW_TURN_PREFETCH_ALLIANCES`` (comma separated) are warmed in the
+        query.py cache afterwards.
+        """
+        configured = [cfg for cfg in AERO_ALLIANCES.values() if cfg.get('id')]
+        try:
+            spread = float(os.getenv('PNW_TURN_REFRESH_SPREAD', '300'))
+        except ValueError:
+            spread = 300.0
+        stagger = spread / max(1, len(configured))
+        
+        self.logger.info(f"Turn {turn}: prefetching {len(configured)} bloc alliances over ~{spread:.0f}s")
+        ok = await self.refresh_bloc_data(force_refresh=True, stagger_seconds=stagger, priority=BACKGROUND)
+        
+        bloc_ids = {str(cfg['id']) for cfg in configured}
+        extra_ids = [
+            a.strip() for a in os.getenv('PNW_TURN_PREFETCH_ALLIANCES', '').split(',')
+            if a.strip() and a.strip() not in bloc_ids
+        ]
+        if extra_ids and create_query_instance:
+            query_instance = create_query_instance()
+            with api_priority(BACKGROUND):
+                for alliance_id in extra_ids:
+                    await asyncio.sleep(stagger * random.uniform(1.0, 1.2))
+                    try:
+                        await query_instance.get_alliance_nations(alliance_id, bot=self.bot, force_refresh=True)
+                    except Exception as e:
+                        self.logger.warning(f"Turn {turn}: prefetch failed for alliance {alliance_id}: {e}")
+        return ok
 
 
 class BlocManager(commands.Cog):
@@ -1881,17 +2139,31 @@ class BlocManager(commands.Cog):
         try:
             self.logger.info("Initializing BlocManager...")
             self.alliance_manager = AllianceManager(bot)
+            self.turn_scheduler = TurnRefreshScheduler(
+                'bloc',
+                self.alliance_manager.prefetch_turn,
+                is_current=self.alliance_manager.is_current_turn,
+                logger=self.logger,
+            )
             self.logger.info("BlocManager initialized successfully")
         except Exception as e:
             self.logger.error(f"Failed to initialize BlocManager: {e}")
             self.logger.error(f"Full traceback: {traceback.format_exc()}")
             raise
     
+    async def cog_load(self):
+        """Start the turn-aligned bloc prefetch."""
+        if os.getenv('PNW_TURN_REFRESH_ENABLED', '1') != '0':
+            self.turn_scheduler.start()
+    
+    async def cog_unload(self):
+        self.turn_scheduler.stop()
+    
     async def fetch_all_bloc_data(self) -> Dict[str, List[Dict]]:
         """Fetch all AERO bloc data."""
         try:
-            # Check if cache is stale and refresh if needed
-            if self.alliance_manager.is_cache_stale():
+            # Data prefetched this turn is served as-is; otherwise refresh once it goes stale
+            if not self.alliance_manager.is_current_turn() and self.alliance_manager.is_cache_stale():
                 await self.alliance_manager.refresh_bloc_data()
             
             # Return the current bloc data
@@ -2095,7 +2367,6 @@ class BlocManager(commands.Cog):
         """Show AERO bloc cache status."""
         try:
             cache_age = self.alliance_manager.get_cache_age()
-            bloc_data = self.alliance_manager.get_bloc_data()
             
             embed = discord.Embed(
                 title="📊 AERO Bloc Status",
@@ -2117,12 +2388,29 @@ class BlocManager(commands.Cog):
                     inline=False
                 )
             
+            # Turn prefetch
+            status = self.turn_scheduler.get_status()
+            turn_lines = [
+                f"**Snapshot turn:** {self.alliance_manager.snapshot_turn or 'unknown'}"
+                f"{' (current)' if self.alliance_manager.is_current_turn() else ''}",
+                f"**Current turn:** {status['current_turn']}",
+                f"**Scheduler:** {'running' if status['running'] else 'stopped'}",
+            ]
+            if status['next_run_at']:
+                turn_lines.append(f"**Next prefetch:** {status['next_run_at'][11:19]} UTC")
+            embed.add_field(name="🔁 Turn Prefetch", value="\n".join(turn_lines), inline=False)
+            
             # Alliance breakdown
             alliance_status = []
+            total_nations = 0
             for alliance_key, alliance_config in AERO_ALLIANCES.items():
-                nations = bloc_data.get(alliance_key, [])
+                # Read from the snapshot index columns when the alliance is not held in memory
+                totals = self.alliance_manager.alliance_totals(alliance_key)
+                count = int(totals.get('nations', 0))
+                total_nations += count
                 alliance_status.append(
-                    f"{alliance_config['emoji']} **{alliance_config['name']}**: {len(nations)} nations"
+                    f"{alliance_config['emoji']} **{alliance_config['name']}**: {count} nations"
+                    f" · {totals.get('score', 0):,.0f} score"
                 )
             
             embed.add_field(
@@ -2132,7 +2420,6 @@ class BlocManager(commands.Cog):
             )
             
             # Total nations
-            total_nations = sum(len(nations) for nations in bloc_data.values())
             embed.add_field(
                 name="📊 Totals",
                 value=f"**Total Nations:** {total_nations:,}",
@@ -2186,7 +2473,18 @@ class MilitaryView(discord.ui.View):
         return True
 
     async def generate_military_embed(self, nations: List[Dict] = None) -> discord.Embed:
-        """Generate the military analysis embed."""
+        """Generate the military analysis embed (memoized per snapshot and selection)."""
+        current_nations = nations or self.current_nations
+        if not current_nations:
+            return await self._build_military_embed(nations)
+        embed = await get_view_cache().get_or_build(
+            'bloc.military', current_nations, lambda: self._build_military_embed(current_nations),
+            filters=_view_filters(self.alliance_key, self.selected_alliances), cacheable=_embed_cacheable
+        )
+        _precompute_detail_pages(self, current_nations, self.alliance_key, self.selected_alliances, skip='bloc.military')
+        return embed.copy()
+
+    async def _build_military_embed(self, nations: List[Dict] = None) -> discord.Embed:
         try:
             # Handle multiple selected alliances
             if hasattr(self, 'selected_alliances') and len(self.selected_alliances) > 1:
@@ -2413,7 +2711,18 @@ class ImprovementsView(discord.ui.View):
         return True
 
     async def generate_improvements_embed(self, nations: List[Dict] = None) -> discord.Embed:
-        """Generate the improvements breakdown embed."""
+        """Generate the improvements breakdown embed (memoized per snapshot and selection)."""
+        current_nations = nations or self.current_nations
+        if not current_nations:
+            return await self._build_improvements_embed(nations)
+        embed = await get_view_cache().get_or_build(
+            'bloc.improvements', current_nations, lambda: self._build_improvements_embed(current_nations),
+            filters=_view_filters(self.alliance_key, self.selected_alliances), cacheable=_embed_cacheable
+        )
+        _precompute_detail_pages(self, current_nations, self.alliance_key, self.selected_alliances, skip='bloc.improvements')
+        return embed.copy()
+
+    async def _build_improvements_embed(self, nations: List[Dict] = None) -> discord.Embed:
         try:
             # Handle multiple selected alliances
             if hasattr(self, 'selected_alliances') and len(self.selected_alliances) > 1:
@@ -2762,7 +3071,18 @@ class ProjectTotalsView(discord.ui.View):
         return True
 
     async def generate_project_totals_embed(self, nations: List[Dict] = None) -> discord.Embed:
-        """Generate the project totals embed."""
+        """Generate the project totals embed (memoized per snapshot and selection)."""
+        current_nations = nations or self.current_nations
+        if not current_nations:
+            return await self._build_project_totals_embed(nations)
+        embed = await get_view_cache().get_or_build(
+            'bloc.projects', current_nations, lambda: self._build_project_totals_embed(current_nations),
+            filters=_view_filters(self.alliance_key, self.selected_alliances), cacheable=_embed_cacheable
+        )
+        _precompute_detail_pages(self, current_nations, self.alliance_key, self.selected_alliances, skip='bloc.projects')
+        return embed.copy()
+
+    async def _build_project_totals_embed(self, nations: List[Dict] = None) -> discord.Embed:
         try:
             # Handle multiple selected alliances
             if hasattr(self, 'selected_alliances') and len(self.selected_alliances) > 1:
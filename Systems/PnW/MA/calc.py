@@ -8,6 +8,30 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 from config import ARIES_NATION_ID, CARNAGE_NATION_ID, PRIMAL_NATION_ID
 
+# Metrics precomputed at ingest (see derived.py)
+try:
+    from .derived import precomputed
+except ImportError:
+    from Systems.PnW.MA.derived import precomputed
+
+# Per-city facts memoized by city fingerprint (see city_cache.py)
+try:
+    from .city_cache import get_city_cache
+except ImportError:
+    from Systems.PnW.MA.city_cache import get_city_cache
+
+# Per-nation improvement counters, in display order, with the city field each one sums
+_IMPROVEMENT_FIELDS = {
+    'coalpower': 'coal_power', 'oilpower': 'oil_power', 'nuclearpower': 'nuclear_power', 'windpower': 'wind_power',
+    'oilwell': 'oil_well', 'coalmine': 'coal_mine', 'uramine': 'uranium_mine', 'ironmine': 'iron_mine',
+    'bauxitemine': 'bauxite_mine', 'leadmine': 'lead_mine', 'farm': 'farm',
+    'gasrefinery': 'gasrefinery', 'steelmill': 'steel_mill', 'aluminumrefinery': 'aluminum_refinery',
+    'munitionsfactory': 'munitions_factory',
+    'policestation': 'police_station', 'hospital': 'hospital', 'bank': 'bank', 'supermarket': 'supermarket',
+    'shopping_mall': 'shopping_mall', 'stadium': 'stadium', 'subway': 'subway', 'recyclingcenter': 'recycling_center',
+    'barracks': 'barracks', 'factory': 'factory', 'hangar': 'airforcebase', 'drydock': 'drydock',
+}
+
 
 class AllianceCalculator:
     def __init__(self):
@@ -79,36 +103,8 @@ class AllianceCalculator:
                     if not cities:
                         continue                    
                     total_cities += len(cities)
-                    for city in cities:
-                        if not isinstance(city, dict):
-                            continue
-                        improvements['coalpower'] += self._safe_get(city, 'coal_power', 0, int)
-                        improvements['oilpower'] += self._safe_get(city, 'oil_power', 0, int)
-                        improvements['nuclearpower'] += self._safe_get(city, 'nuclear_power', 0, int)
-                        improvements['windpower'] += self._safe_get(city, 'wind_power', 0, int)
-                        improvements['oilwell'] += self._safe_get(city, 'oil_well', 0, int)
-                        improvements['coalmine'] += self._safe_get(city, 'coal_mine', 0, int)
-                        improvements['uramine'] += self._safe_get(city, 'uranium_mine', 0, int)
-                        improvements['ironmine'] += self._safe_get(city, 'iron_mine', 0, int)
-                        improvements['bauxitemine'] += self._safe_get(city, 'bauxite_mine', 0, int)
-                        improvements['leadmine'] += self._safe_get(city, 'lead_mine', 0, int)
-                        improvements['farm'] += self._safe_get(city, 'farm', 0, int)
-                        improvements['gasrefinery'] += self._safe_get(city, 'gasrefinery', 0, int)
-                        improvements['steelmill'] += self._safe_get(city, 'steel_mill', 0, int)
-                        improvements['aluminumrefinery'] += self._safe_get(city, 'aluminum_refinery', 0, int)
-                        improvements['munitionsfactory'] += self._safe_get(city, 'munitions_factory', 0, int)
-                        improvements['factory'] += self._safe_get(city, 'factory', 0, int)
-                        improvements['policestation'] += self._safe_get(city, 'police_station', 0, int)
-                        improvements['hospital'] += self._safe_get(city, 'hospital', 0, int)
-                        improvements['bank'] += self._safe_get(city, 'bank', 0, int)
-                        improvements['supermarket'] += self._safe_get(city, 'supermarket', 0, int)
-                        improvements['shopping_mall'] += self._safe_get(city, 'shopping_mall', 0, int)
-                        improvements['stadium'] += self._safe_get(city, 'stadium', 0, int)
-                        improvements['subway'] += self._safe_get(city, 'subway', 0, int)
-                        improvements['recyclingcenter'] += self._safe_get(city, 'recycling_center', 0, int)
-                        improvements['barracks'] += self._safe_get(city, 'barracks', 0, int)
-                        improvements['hangar'] += self._safe_get(city, 'airforcebase', 0, int)
-                        improvements['drydock'] += self._safe_get(city, 'drydock', 0, int)             
+                    for key, count in self.nation_improvement_totals(nation).items():
+                        improvements[key] += count
                 except Exception as e:
                     self._log_error(f"Error processing improvements for nation: {e}", e, "calculate_improvements_data")
                     continue
@@ -139,6 +135,17 @@ class AllianceCalculator:
                 'total_power': 0, 'total_improvements': 0, 'total_cities': 0, 'avg_per_city': 0, 'active_nations': 0
             }
 
+    def nation_improvement_totals(self, nation: Dict[str, Any]) -> Dict[str, int]:
+        """Improvement counts summed over one nation's cities (precomputed at ingest when available)."""
+        cached = precomputed(nation, 'improvement_totals')
+        if cached is not None:
+            return cached
+        return self._compute_nation_improvement_totals(nation)
+
+    def _compute_nation_improvement_totals(self, nation: Dict[str, Any]) -> Dict[str, int]:
+        totals = get_city_cache().nation_totals(nation)
+        return {key: totals.count(field) for key, field in _IMPROVEMENT_FIELDS.items()}
+
     async def calculate_improvements_data_multi_alliance(self, alliance_data: Dict[str, List[Dict[str, Any]]], selected_alliances: List[str] = None) -> Dict[str, Any]:
         """
         Calculate comprehensive improvements data for multiple alliances efficiently.
@@ -752,6 +759,12 @@ class AllianceCalculator:
             }
     
     def calculate_military_purchase_limits(self, nation: Dict[str, Any]) -> Dict[str, int]:
+        cached = precomputed(nation, 'purchase_limits')
+        if cached is not None:
+            return dict(cached)
+        return self._compute_military_purchase_limits(nation)
+
+    def _compute_military_purchase_limits(self, nation: Dict[str, Any]) -> Dict[str, int]:
         cities_data = nation.get('cities', [])
         num_cities = nation.get('num_cities', 0)
         total_barracks = 0
@@ -916,6 +929,12 @@ class AllianceCalculator:
         Balanced 5/5/5/3 military build = higher score
         More strategic projects = higher score
         """
+        cached = precomputed(nation, 'combat_score')
+        if cached is not None:
+            return cached
+        return self._compute_combat_score(nation)
+
+    def _compute_combat_score(self, nation: Dict[str, Any]) -> float:
         try:
             # Get infrastructure stats
             infra_stats = self.calculate_infrastructure_stats(nation)
@@ -1026,6 +1045,12 @@ class AllianceCalculator:
         }
     
     def calculate_infrastructure_stats(self, nation: Dict[str, Any]) -> Dict[str, float]:
+        cached = precomputed(nation, 'infrastructure_stats')
+        if cached is not None:
+            return dict(cached)
+        return self._compute_infrastructure_stats(nation)
+
+    def _compute_infrastructure_stats(self, nation: Dict[str, Any]) -> Dict[str, float]:
         cities_data = nation.get('cities', [])
         num_cities = nation.get('num_cities', 0)       
         if not isinstance(cities_data, list) or len(cities_data) == 0:
@@ -1100,6 +1125,12 @@ class AllianceCalculator:
         return compatibility
     
     def calculate_building_ratios(self, nation: Dict[str, Any]) -> Dict[str, float]:
+        cached = precomputed(nation, 'building_ratios')
+        if cached is not None:
+            return dict(cached)
+        return self._compute_building_ratios(nation)
+
+    def _compute_building_ratios(self, nation: Dict[str, Any]) -> Dict[str, float]:
         cities_data = nation.get('cities', [])
         num_cities = nation.get('num_cities', len(cities_data))        
         if not cities_data or num_cities == 0:
@@ -1110,15 +1141,7 @@ class AllianceCalculator:
                 'drydock_ratio': 0.0,
                 'mmr_string': '0/0/0/0'
             }        
-        total_barracks = 0
-        total_factories = 0
-        total_airforcebases = 0
-        total_drydocks = 0        
-        for city in cities_data:
-            total_barracks += city.get('barracks', 0)
-            total_factories += city.get('factory', 0)
-            total_airforcebases += city.get('airforcebase', 0)
-            total_drydocks += city.get('drydock', 0)
+        total_barracks, total_factories, total_airforcebases, total_drydocks = get_city_cache().nation_totals(nation).mmr
         barracks_ratio = total_barracks / num_cities
         factories_ratio = total_factories / num_cities
         airforcebase_ratio = total_airforcebases / num_cities
@@ -1527,6 +1550,12 @@ class AllianceCalculator:
         }
 
     def _calculate_strategic_value(self, nation: Dict[str, Any]) -> float:
+        cached = precomputed(nation, 'strategic_value')
+        if cached is not None:
+            return cached
+        return self._compute_strategic_value(nation)
+
+    def _compute_strategic_value(self, nation: Dict[str, Any]) -> float:
         try:
             score = 0.0
             try:
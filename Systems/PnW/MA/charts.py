@@ -0,0 +1,547 @@
+"""Pillow chart renderers for the MA cogs.
+
+Every renderer takes a ``ChartSpec`` (plain, picklable data) and returns PNG
+bytes, so it can run in a worker process through ``render.RenderService``.
+Nothing here imports discord or touches the network; renderers are looked up
+by ``ChartSpec.kind`` in ``RENDERERS``.
+"""
+
+import math
+from dataclasses import dataclass, field
+from functools import lru_cache
+from io import BytesIO
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+try:
+    from PIL import Image, ImageDraw, ImageFont
+    PIL_AVAILABLE = True
+except Exception:
+    Image = None
+    ImageDraw = None
+    ImageFont = None
+    PIL_AVAILABLE = False
+
+RGB = Tuple[int, int, int]
+
+BACKGROUND: RGB = (26, 26, 26)
+WHITE: RGB = (255, 255, 255)
+GREY: RGB = (220, 220, 220)
+HOME_BLUE: RGB = (46, 134, 222)
+AWAY_RED: RGB = (231, 76, 60)
+AWAY_ORANGE: RGB = (230, 126, 34)
+
+# Category colours for the war cost pies
+WAR_COST_PALETTE: Dict[str, RGB] = {
+    "Resource": (46, 134, 222),   # Blue (legacy alias)
+    "Consumption": (46, 134, 222),   # Blue
+    "Units": (230, 126, 34),      # Orange
+    "Infra": (142, 68, 173),      # Purple
+    "Loot": (39, 174, 96),        # Green
+}
+
+
+@dataclass
+class ChartSpec:
+    """Picklable description of one chart.
+
+    ``series`` holds one value list per party aligned with ``labels``; ``names`` are the
+    party names for legends and ``palette`` their colours. Renderer-specific switches
+    go in ``options``.
+    """
+
+    kind: str
+    labels: List[str] = field(default_factory=list)
+    series: List[List[float]] = field(default_factory=list)
+    names: List[str] = field(default_factory=list)
+    palette: List[RGB] = field(default_factory=list)
+    size: Optional[Tuple[int, int]] = None
+    title: str = ""
+    filename: str = "chart.png"
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    def color(self, idx: int, default: RGB) -> RGB:
+        try:
+            return tuple(self.palette[idx])  # type: ignore[return-value]
+        except Exception:
+            return default
+
+    def dims(self, width: int, height: int) -> Tuple[int, int]:
+        if self.size:
+            return int(self.size[0]), int(self.size[1])
+        return width, height
+
+
+RENDERERS: Dict[str, Callable[[ChartSpec], bytes]] = {}
+
+
+def renderer(kind: str) -> Callable[[Callable[[ChartSpec], bytes]], Callable[[ChartSpec], bytes]]:
+    def _register(fn: Callable[[ChartSpec], bytes]) -> Callable[[ChartSpec], bytes]:
+        RENDERERS[kind] = fn
+        return fn
+    return _register
+
+
+def render_spec(spec: ChartSpec) -> bytes:
+    """Render ``spec`` in the current process."""
+    if not PIL_AVAILABLE:
+        raise RuntimeError("Pillow is not installed")
+    fn = RENDERERS.get(spec.kind)
+    if fn is None:
+        raise KeyError(f"unknown chart kind: {spec.kind}")
+    return fn(spec)
+
+
+@lru_cache(maxsize=32)
+def get_font(size: int = 16) -> Optional[Any]:
+    """Load (once per process) the emoji-capable font used by all charts."""
+    if not PIL_AVAILABLE:
+        return None
+    try:
+        return ImageFont.truetype("C:\\Windows\\Fonts\\seguiemj.ttf", size)
+    except Exception:
+        try:
+            return ImageFont.truetype("C:\\Windows\\Fonts\\segoeui.ttf", size)
+        except Exception:
+            try:
+                return ImageFont.truetype("arial.ttf", size)
+            except Exception:
+                return ImageFont.load_default()
+
+
+def fmt_money_short(x: float) -> str:
+    """Format large monetary values into short form using two decimals (e.g., 2.00M, 4.56B)."""
+    try:
+        val = abs(float(x or 0))
+    except Exception:
+        val = 0.0
+    if val >= 1_000_000_000_000:
+        return f"{val / 1_000_000_000_000:.2f}T"
+    if val >= 1_000_000_000:
+        return f"{val / 1_000_000_000:.2f}B"
+    if val >= 1_000_000:
+        return f"{val / 1_000_000:.2f}M"
+    if val >= 1_000:
+        return f"{val / 1_000:.2f}K"
+    return f"{int(round(val)):,}"
+
+
+def _png(img: Any) -> bytes:
+    bio = BytesIO()
+    img.save(bio, format="PNG")
+    return bio.getvalue()
+
+
+def _series(spec: ChartSpec, idx: int) -> List[float]:
+    vals = list(spec.series[idx]) if idx < len(spec.series) else []
+    return vals + [0] * (len(spec.labels) - len(vals))
+
+
+def _legend(draw: Any, width: int, names: Sequence[str], colors: Sequence[RGB], font: Any, y: int = 10) -> None:
+    for i, (name, color) in enumerate(zip(names[:2], colors[:2])):
+        x = width - 320 + i * 120
+        draw.rectangle([x, y + 2, x + 10, y + 12], fill=color)
+        draw.text((x + 15, y), f"{name}", fill=GREY, font=font)
+
+
+# ---------------------------------------------------------------------------
+# /compare charts
+# ---------------------------------------------------------------------------
+
+@renderer("bars")
+def bar_chart(spec: ChartSpec) -> bytes:
+    """Horizontal paired bars, one row per label."""
+    labels = spec.labels
+    a_counts = [int(v or 0) for v in _series(spec, 0)]
+    b_counts = [int(v or 0) for v in _series(spec, 1)]
+    a_color = spec.color(0, HOME_BLUE)
+    b_color = spec.color(1, AWAY_ORANGE)
+
+    # Dimensions - increased spacing to prevent overlapping
+    bar_h = 16  # Slightly smaller bars
+    gap = 6     # Increased gap between bars
+    row_h = bar_h * 2 + gap + 20  # More space for each row
+    top_pad = 50
+    left_pad = 140
+    right_pad = 40
+    bottom_pad = 40
+    width, height = spec.dims(900, top_pad + bottom_pad + max(1, len(labels)) * row_h)
+
+    img = Image.new("RGB", (width, height), BACKGROUND)
+    draw = ImageDraw.Draw(img)
+    font_title = get_font(20)
+    font_label = get_font(16)
+    font_small = get_font(14)
+
+    # Title and legend
+    draw.text((left_pad, 15), spec.title, fill=WHITE, font=font_title)
+    _legend(draw, width, spec.names, [a_color, b_color], font_small)
+
+    max_val = max([0] + a_counts + b_counts)
+    usable_w = width - left_pad - right_pad
+    scale = (usable_w - 60) / max_val if max_val > 0 else 1.0
+
+    for idx, lbl in enumerate(labels):
+        y = top_pad + idx * row_h
+        a_val = a_counts[idx]
+        b_val = b_counts[idx]
+        draw.text((10, y + 2), lbl, fill=GREY, font=font_label)
+        a_w = int(a_val * scale)
+        b_w = int(b_val * scale)
+        # A bar (top), B bar (bottom with gap)
+        draw.rectangle([left_pad, y, left_pad + a_w, y + bar_h], fill=a_color)
+        draw.rectangle([left_pad, y + bar_h + gap, left_pad + b_w, y + bar_h + gap + bar_h], fill=b_color)
+        draw.text((left_pad + a_w + 6, y), f"{a_val}", fill=(200, 200, 200), font=font_small)
+        draw.text((left_pad + b_w + 6, y + bar_h + gap), f"{b_val}", fill=(200, 200, 200), font=font_small)
+
+    return _png(img)
+
+
+@renderer("city_distribution")
+def city_chart(spec: ChartSpec) -> bytes:
+    """Vertical bar chart: city ranges along the X axis, nation counts as side-by-side bars."""
+    labels = spec.labels
+    a_counts = [int(v or 0) for v in _series(spec, 0)]
+    b_counts = [int(v or 0) for v in _series(spec, 1)]
+    a_color = spec.color(0, HOME_BLUE)
+    b_color = spec.color(1, AWAY_RED)
+    include_title = bool(spec.options.get("include_title", True))
+    include_legend = bool(spec.options.get("include_legend", True))
+
+    width, height = spec.dims(900, 460)
+    # Adjust top padding depending on whether title/legend are included
+    top_pad = 60 if (include_title or include_legend) else 24
+    left_pad = 70
+    right_pad = 40
+    bottom_pad = 90  # space for horizontal labels
+
+    img = Image.new("RGB", (width, height), BACKGROUND)
+    draw = ImageDraw.Draw(img)
+    font_title = get_font(20)
+    font_axis = get_font(14)
+    font_small = get_font(14)
+
+    if include_title:
+        draw.text((left_pad, 15), spec.title or "City Distribution", fill=WHITE, font=font_title)
+    if include_legend:
+        _legend(draw, width, spec.names, [a_color, b_color], font_small)
+
+    max_val = max([0] + a_counts + b_counts)
+    usable_h = height - top_pad - bottom_pad
+    scale = usable_h / max_val if max_val > 0 else 1.0
+
+    # X-axis layout
+    usable_w = width - left_pad - right_pad
+    n = max(1, len(labels))
+    step = int(usable_w / n)
+    bar_w = max(10, min(22, step // 3))
+    x0 = left_pad
+    y_base = height - bottom_pad
+
+    draw.line([left_pad, y_base, width - right_pad, y_base], fill=(200, 200, 200), width=1)
+
+    for i, lbl in enumerate(labels):
+        cx = x0 + i * step + step // 2
+        # A and B bar x positions (side-by-side)
+        ax = cx - bar_w - 2
+        bx = cx + 2
+        a_h = int(a_counts[i] * scale)
+        b_h = int(b_counts[i] * scale)
+        if a_h > 0:
+            draw.rectangle([ax, y_base - a_h, ax + bar_w, y_base], fill=a_color)
+            a_txt = f"{a_counts[i]}"
+            atw = int(draw.textlength(a_txt, font=font_small))
+            draw.text((ax + (bar_w - atw) // 2, max(top_pad + 4, y_base - a_h - 16)), a_txt, fill=GREY, font=font_small)
+        if b_h > 0:
+            draw.rectangle([bx, y_base - b_h, bx + bar_w, y_base], fill=b_color)
+            b_txt = f"{b_counts[i]}"
+            btw = int(draw.textlength(b_txt, font=font_small))
+            draw.text((bx + (bar_w - btw) // 2, max(top_pad + 4, y_base - b_h - 16)), b_txt, fill=GREY, font=font_small)
+        # X-axis labels (city ranges), horizontally along the axis
+        l_tw = int(draw.textlength(lbl, font=font_axis))
+        draw.text((cx - l_tw // 2, y_base + 8), lbl, fill=GREY, font=font_axis)
+
+    return _png(img)
+
+
+@renderer("military_groups")
+def military_chart(spec: ChartSpec) -> bytes:
+    """Grouped vertical bars per unit: [Home Current, Away Current, Home Daily, Away Daily].
+
+    ``series`` is (home_current, away_current, home_daily, away_daily); each unit group
+    is scaled to its own maximum.
+    """
+    labels = spec.labels
+    a_current, b_current, a_daily, b_daily = (_series(spec, i) for i in range(4))
+    a_color = spec.color(0, HOME_BLUE)
+    b_color = spec.color(1, AWAY_RED)
+    include_title = bool(spec.options.get("include_title", True))
+    include_legend = bool(spec.options.get("include_legend", True))
+
+    width, height = spec.dims(900, 520)
+    top_pad = 60 if (include_title or include_legend) else 24
+    left_pad = 70
+    right_pad = 40
+    bottom_pad = 120  # space for unit labels under grouped bars
+
+    img = Image.new("RGB", (width, height), BACKGROUND)
+    draw = ImageDraw.Draw(img)
+    font_title = get_font(20)
+    font_axis = get_font(14)
+    font_small = get_font(12)
+    font_bar = get_font(12)
+
+    if include_title:
+        draw.text((left_pad, 15), spec.title or "Units: Current & Daily", fill=WHITE, font=font_title)
+    if include_legend:
+        _legend(draw, width, spec.names, [a_color, b_color], font_small)
+
+    usable_h = height - top_pad - bottom_pad
+    usable_w = width - left_pad - right_pad
+    group_count = max(1, len(labels))
+    step = int(usable_w / group_count)
+    # Bars tight within group; small gap between bars, larger gap between groups
+    bar_w = 22
+    bar_gap = 4
+    x0 = left_pad
+    y_base = height - bottom_pad
+
+    draw.line([left_pad, y_base, width - right_pad, y_base], fill=(200, 200, 200), width=1)
+
+    def paste_vertical_text(text: str, rect: Tuple[int, int, int, int], color: RGB, font: Any) -> None:
+        bx1, by1, bx2, by2 = rect
+        bar_h = by2 - by1
+        tw = int(draw.textlength(text, font=font))
+        th = font.getbbox(text)[3] - font.getbbox(text)[1]
+        tx_img = Image.new("RGBA", (tw + 4, th + 4), (0, 0, 0, 0))
+        tx_draw = ImageDraw.Draw(tx_img)
+        tx_draw.text((2, 2), text, fill=color + (255,), font=font)
+        rot = tx_img.rotate(90, expand=True)
+        # Center on bar; if bar too short, place just above the bar
+        cx = (bx1 + bx2) // 2
+        cy = (by1 + by2) // 2
+        px = int(cx - rot.width / 2)
+        py = int(cy - rot.height / 2)
+        if bar_h < rot.height + 4:
+            py = max(by1 - rot.height - 2, top_pad + 2)
+        img.paste(rot, (px, py), rot)
+
+    for i, lbl in enumerate(labels):
+        a_c, b_c, a_d, b_d = (int(s[i] or 0) for s in (a_current, b_current, a_daily, b_daily))
+
+        # Scale all four bars to the unit group's maximum
+        g_max = max(a_c, b_c, a_d, b_d, 1)
+        scale = usable_h / g_max
+
+        gx = x0 + i * step + step // 2
+        group_w = bar_w * 4 + bar_gap * 3
+        gl = gx - group_w // 2
+
+        bars = (
+            (a_c, a_color, f"Cur {a_c:,}"),
+            (b_c, b_color, f"Cur {b_c:,}"),
+            (a_d, a_color, f"Day {a_d:,}"),
+            (b_d, b_color, f"Day {b_d:,}"),
+        )
+        for slot, (value, color, text) in enumerate(bars):
+            x1 = gl + (bar_w + bar_gap) * slot
+            bar_h = int(value * scale)
+            if bar_h > 0:
+                rect = (x1, y_base - bar_h, x1 + bar_w, y_base)
+                draw.rectangle(list(rect), fill=color)
+                paste_vertical_text(text, rect, GREY, font_bar)
+
+        # Unit label shown once centered under the 4 bars
+        unit_tw = int(draw.textlength(lbl, font=font_axis))
+        draw.text((gx - unit_tw // 2, y_base + 10), lbl, fill=GREY, font=font_axis)
+
+    return _png(img)
+
+
+@renderer("stack")
+def stacked_charts(spec: ChartSpec) -> bytes:
+    """Render ``options['parts']`` (ChartSpecs) and stack them under one title and legend."""
+    parts = [Image.open(BytesIO(render_spec(p))).convert("RGB") for p in spec.options.get("parts") or []]
+    if not parts:
+        raise ValueError("stack chart needs at least one part")
+    header_h = 48
+    spacing = int(spec.options.get("spacing", 16))
+    combined_w = max(p.width for p in parts)
+    combined_h = header_h + sum(p.height for p in parts) + spacing * (len(parts) - 1)
+    combined = Image.new("RGB", (combined_w, combined_h), BACKGROUND)
+    draw = ImageDraw.Draw(combined)
+
+    draw.text((16, 12), spec.title, fill=WHITE, font=get_font(20))
+    font_small = get_font(14)
+    for i, name in enumerate(spec.names[:2]):
+        x = combined_w - 300 + i * 100
+        draw.rectangle([x, 14, x + 10, 24], fill=spec.color(i, HOME_BLUE if i == 0 else AWAY_RED))
+        draw.text((x + 15, 12), name, fill=GREY, font=font_small)
+
+    y = header_h
+    for p in parts:
+        combined.paste(p, (0, y))
+        y += p.height + spacing
+    return _png(combined)
+
+
+# ---------------------------------------------------------------------------
+# /wars charts
+# ---------------------------------------------------------------------------
+
+@renderer("war_cost_pies")
+def war_cost_pies(spec: ChartSpec) -> bytes:
+    """Side-by-side cost pies for Home and Away; ``series`` holds totals per category."""
+    categories = spec.labels
+    home_vals = _series(spec, 0)
+    away_vals = _series(spec, 1)
+    home_name, away_name = (list(spec.names) + ["Home", "Away"])[:2]
+
+    width, height = spec.dims(900, 420)
+    pad = 20
+    title_h = 40
+    legend_h = 48
+    pie_area_h = height - title_h - legend_h - (pad * 2)
+    pie_diameter = min(260, pie_area_h)
+    # Space pies slightly further apart horizontally
+    home_center = (int(width * 0.24), title_h + pad + pie_area_h // 2)
+    away_center = (int(width * 0.76), title_h + pad + pie_area_h // 2)
+    radius = pie_diameter // 2
+
+    # Ordered colors aligned to categories
+    colors = [spec.color(i, WAR_COST_PALETTE.get(cat, (200, 200, 200))) for i, cat in enumerate(categories)]
+
+    img = Image.new("RGB", (width, height), BACKGROUND)
+    draw = ImageDraw.Draw(img)
+    font_title = get_font(20)
+    font_small = get_font(14)
+    font_label = get_font(16)
+
+    draw.text((pad, 10), spec.title or "War Cost Breakdown", fill=WHITE, font=font_title)
+    draw.text((home_center[0] - 30, title_h), home_name, fill=GREY, font=font_label)
+    draw.text((away_center[0] - 28, title_h), away_name, fill=GREY, font=font_label)
+
+    def _fmt_money(x: float) -> str:
+        try:
+            return f"${int(float(x or 0)):,}"
+        except Exception:
+            return "$0"
+
+    def _draw_pie(center: Tuple[int, int], vals: List[float]) -> None:
+        total = sum(abs(float(v or 0)) for v in vals)
+        bbox = [center[0] - radius, center[1] - radius, center[0] + radius, center[1] + radius]
+        if total <= 0:
+            # Draw a faint circle to indicate empty
+            draw.ellipse(bbox, outline=(90, 90, 90), width=2)
+            return
+        start_angle = 0.0
+        for idx, v in enumerate(vals):
+            end_angle = start_angle + 360.0 * abs(float(v or 0)) / total
+            draw.pieslice(bbox, start=start_angle, end=end_angle, fill=colors[idx])
+            start_angle = end_angle
+
+    def _draw_slice_labels(center: Tuple[int, int], vals: List[float]) -> None:
+        """Short-form value inside each slice; slices of 3% or less stay unlabeled."""
+        total = sum(abs(float(v or 0)) for v in vals)
+        if total <= 0:
+            return
+        start_angle = 0.0
+        for v in vals:
+            val = abs(float(v or 0))
+            frac = val / total
+            if frac <= 0.03:
+                continue
+            ang = math.radians(start_angle + (360.0 * frac) / 2.0)
+            label_r = int(radius * 0.60)
+            x1 = center[0] + int(label_r * math.cos(ang))
+            y1 = center[1] + int(label_r * math.sin(ang))
+            val_txt = fmt_money_short(val)
+            try:
+                bbox1 = draw.textbbox((0, 0), val_txt, font=font_small)
+                tw1 = bbox1[2] - bbox1[0]
+                th1 = bbox1[3] - bbox1[1]
+            except Exception:
+                tw1, th1 = 40, 12
+            draw.text((x1 - tw1 // 2, y1 - th1 // 2), val_txt, fill=(250, 250, 250), font=font_small)
+            start_angle += 360.0 * frac
+
+    _draw_pie(home_center, home_vals)
+    _draw_pie(away_center, away_vals)
+    _draw_slice_labels(home_center, home_vals)
+    _draw_slice_labels(away_center, away_vals)
+
+    # Title bounding boxes so outside labels avoid overlapping them
+    try:
+        home_title_bbox = draw.textbbox((home_center[0] - 30, title_h), home_name, font=font_label)
+        away_title_bbox = draw.textbbox((away_center[0] - 28, title_h), away_name, font=font_label)
+    except Exception:
+        home_title_bbox = (home_center[0] - 50, title_h - 10, home_center[0] + 50, title_h + 10)
+        away_title_bbox = (away_center[0] - 50, title_h - 10, away_center[0] + 50, title_h + 10)
+
+    def _rects_intersect(a, b) -> bool:
+        return not (a[2] < b[0] or a[0] > b[2] or a[3] < b[1] or a[1] > b[3])
+
+    def _draw_outside_labels(center: Tuple[int, int], vals: List[float], title_bbox: Tuple[int, int, int, int]) -> None:
+        """Category name and percentage beside each slice, nudged vertically to avoid overlaps."""
+        total = sum(abs(float(v or 0)) for v in vals)
+        if total <= 0:
+            return
+        placed: List[Tuple[int, int, int, int]] = []
+        start_angle = 0.0
+        for idx, v in enumerate(vals):
+            frac = abs(float(v or 0)) / total
+            if frac <= 0.03:
+                start_angle += 360.0 * frac
+                continue
+            ang = math.radians(start_angle + (360.0 * frac) / 2.0)
+            label_r = radius + 24
+            x1 = center[0] + int(label_r * math.cos(ang))
+            y1 = center[1] + int(label_r * math.sin(ang))
+            name_txt = categories[idx]
+            pct_txt = f"{int(round(100.0 * frac))}%"
+            try:
+                bbox1 = draw.textbbox((0, 0), name_txt, font=font_small)
+                tw1 = bbox1[2] - bbox1[0]
+                th1 = bbox1[3] - bbox1[1]
+            except Exception:
+                tw1, th1 = 40, 12
+            try:
+                bbox2 = draw.textbbox((0, 0), pct_txt, font=font_small)
+                tw2 = bbox2[2] - bbox2[0]
+                th2 = bbox2[3] - bbox2[1]
+            except Exception:
+                tw2, th2 = 24, 12
+            block_w = max(tw1, tw2)
+            block_h = th1 + th2 + 2
+            tx = x1 + 6 if math.cos(ang) >= 0 else x1 - block_w - 6
+            ty = y1 - block_h // 2
+            rect = (tx, ty, tx + block_w, ty + block_h)
+
+            def _overlaps_any(r) -> bool:
+                return _rects_intersect(r, title_bbox) or any(_rects_intersect(r, pr) for pr in placed)
+
+            i = 0
+            direction = -1
+            while _overlaps_any(rect) and i < 30:
+                ty += direction * 12
+                rect = (tx, ty, tx + block_w, ty + block_h)
+                direction *= -1
+                i += 1
+            # Clamp within image bounds
+            ty = max(8, min(ty, height - block_h - legend_h - 8))
+            rect = (tx, ty, tx + block_w, ty + block_h)
+            draw.text((tx, ty), name_txt, fill=(230, 230, 230), font=font_small)
+            draw.text((tx, ty + th1 + 2), pct_txt, fill=(210, 210, 210), font=font_small)
+            placed.append(rect)
+            start_angle += 360.0 * frac
+
+    _draw_outside_labels(home_center, home_vals, home_title_bbox)
+    _draw_outside_labels(away_center, away_vals, away_title_bbox)
+
+    # Totals under pies
+    home_total = sum(abs(float(v or 0)) for v in home_vals)
+    away_total = sum(abs(float(v or 0)) for v in away_vals)
+    totals_y = height - legend_h + 8
+    draw.text((home_center[0] - 170, totals_y), f"Total war cost: {_fmt_money(home_total)}", fill=WHITE, font=font_label)
+    draw.text((away_center[0] - 170, totals_y), f"Total war cost: {_fmt_money(away_total)}", fill=WHITE, font=font_label)
+
+    return _png(img)
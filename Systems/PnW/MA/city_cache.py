@@ -0,0 +1,228 @@
+"""Per-city derived values memoized by a fingerprint of the city's build.
+
+Improvement totals, MMR building counts, power state and commerce are pure
+functions of a city's improvement, infrastructure and land fields, and most
+cities do not change between turns. ``CityCache`` keys each city by a tuple
+of those raw fields (its fingerprint) and keeps the derived ``CityFacts`` in
+an LRU, so identical builds share one entry and a changed city is the only
+one recomputed. ``nation_totals`` sums the facts of a nation's cities and
+memoizes the sum per nation against the tuple of city fingerprints, so
+re-aggregating a bloc after a turn only re-sums nations whose cities moved.
+Snapshots replace their city lists on every refresh rather than editing them,
+so a nation whose city list is the very object last summed is a hit without
+fingerprinting at all.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+# Improvement counters in API field order; aliases seen from other sources are folded in
+CITY_IMPROVEMENTS: Tuple[str, ...] = (
+    'coal_power', 'oil_power', 'nuclear_power', 'wind_power',
+    'coal_mine', 'oil_well', 'uranium_mine', 'lead_mine', 'iron_mine', 'bauxite_mine', 'farm',
+    'gasrefinery', 'aluminum_refinery', 'steel_mill', 'munitions_factory',
+    'police_station', 'hospital', 'recycling_center', 'subway', 'supermarket', 'bank', 'shopping_mall', 'stadium',
+    'barracks', 'factory', 'airforcebase', 'drydock',
+)
+_ALIASES = {'gasrefinery': 'gasoline_refinery', 'airforcebase': 'hangar'}
+_FINGERPRINT_FIELDS: Tuple[str, ...] = CITY_IMPROVEMENTS + tuple(_ALIASES.values()) + ('infrastructure', 'land', 'powered')
+_POWER = ('coal_power', 'oil_power', 'nuclear_power', 'wind_power')
+MMR_FIELDS = ('barracks', 'factory', 'airforcebase', 'drydock')
+# Commerce percent per improvement, before the project-dependent cap
+_COMMERCE = {'supermarket': 3, 'bank': 5, 'shopping_mall': 9, 'stadium': 12, 'subway': 8}
+_INDEX = {name: i for i, name in enumerate(CITY_IMPROVEMENTS)}
+
+logger = logging.getLogger(__name__)
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _count(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except (ValueError, TypeError):
+        try:
+            return int(float(value))
+        except (ValueError, TypeError):
+            return 0
+
+
+def _powered(city: Dict[str, Any], power_plants: int) -> bool:
+    val = city.get('powered', None)
+    if val is None:
+        # Fallback: consider powered if the city has any power plant improvements
+        return power_plants > 0
+    if isinstance(val, bool):
+        return val
+    if isinstance(val, (int, float)):
+        return int(val) != 0
+    if isinstance(val, str):
+        return val.strip().lower() in {"1", "true", "yes", "y", "t"}
+    return False
+
+
+def city_fingerprint(city: Dict[str, Any]) -> Tuple[Any, ...]:
+    """Raw improvement, infrastructure and land values of ``city``; equal fingerprints derive equally."""
+    return tuple(map(city.get, _FINGERPRINT_FIELDS))
+
+
+class CityFacts:
+    """Values derived from one city build."""
+
+    __slots__ = ('counts', 'powered', 'infrastructure', 'land', 'commerce')
+
+    def __init__(self, city: Dict[str, Any]):
+        counts = []
+        for name in CITY_IMPROVEMENTS:
+            value = city.get(name)
+            if not value and name in _ALIASES:
+                value = city.get(_ALIASES[name])
+            counts.append(_count(value))
+        self.counts: Tuple[int, ...] = tuple(counts)
+        self.powered = _powered(city, sum(counts[_INDEX[p]] for p in _POWER))
+        try:
+            self.infrastructure = float(city.get('infrastructure', 0) or 0)
+        except (ValueError, TypeError):
+            self.infrastructure = 0.0
+        try:
+            self.land = float(city.get('land', 0) or 0)
+        except (ValueError, TypeError):
+            self.land = 0.0
+        self.commerce = sum(counts[_INDEX[k]] * pct for k, pct in _COMMERCE.items())
+
+    def count(self, name: str) -> int:
+        return self.counts[_INDEX[name]]
+
+    @property
+    def mmr(self) -> Tuple[int, int, int, int]:
+        return tuple(self.counts[_INDEX[k]] for k in MMR_FIELDS)
+
+
+class NationCityTotals:
+    """Sum of ``CityFacts`` over one nation's cities."""
+
+    __slots__ = ('counts', 'num_cities', 'powered_cities', 'infrastructure', 'land', 'commerce')
+
+    def __init__(self, facts: List[CityFacts]):
+        self.num_cities = len(facts)
+        self.counts: Tuple[int, ...] = tuple(map(sum, zip(*(f.counts for f in facts)))) if facts else (0,) * len(CITY_IMPROVEMENTS)
+        self.powered_cities = sum(1 for f in facts if f.powered)
+        self.infrastructure = sum(f.infrastructure for f in facts)
+        self.land = sum(f.land for f in facts)
+        self.commerce = sum(f.commerce for f in facts)
+
+    def count(self, name: str) -> int:
+        return self.counts[_INDEX[name]]
+
+    def as_dict(self) -> Dict[str, int]:
+        return dict(zip(CITY_IMPROVEMENTS, self.counts))
+
+    @property
+    def power_plants(self) -> int:
+        return sum(self.counts[_INDEX[p]] for p in _POWER)
+
+    @property
+    def mmr(self) -> Tuple[int, int, int, int]:
+        return tuple(self.counts[_INDEX[k]] for k in MMR_FIELDS)
+
+
+class CityCache:
+    """LRU of ``CityFacts`` by city fingerprint and of ``NationCityTotals`` by nation."""
+
+    def __init__(self, max_cities: Optional[int] = None, max_nations: Optional[int] = None):
+        self.max_cities = int(max_cities or _env_number('PNW_CITY_CACHE_SIZE', 100000))
+        self.max_nations = int(max_nations or _env_number('PNW_CITY_NATION_CACHE_SIZE', 20000))
+        self._cities: 'OrderedDict[Hashable, CityFacts]' = OrderedDict()
+        # nation key -> (city list summed, city fingerprints, totals)
+        self._nations: 'OrderedDict[Hashable, Tuple[Any, Tuple[Any, ...], NationCityTotals]]' = OrderedDict()
+        # Derivations run in executor threads as well as on the event loop
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {'city_hits': 0, 'city_misses': 0, 'nation_hits': 0, 'nation_misses': 0}
+
+    def _facts_for(self, key: Optional[Tuple[Any, ...]], city: Dict[str, Any]) -> CityFacts:
+        if key is None:
+            self.stats['city_misses'] += 1
+            return CityFacts(city)
+        with self._lock:
+            facts = self._cities.get(key)
+            if facts is not None:
+                self._cities.move_to_end(key)
+                self.stats['city_hits'] += 1
+                return facts
+        facts = CityFacts(city)
+        with self._lock:
+            self.stats['city_misses'] += 1
+            self._cities[key] = facts
+            while len(self._cities) > self.max_cities:
+                self._cities.popitem(last=False)
+        return facts
+
+    @staticmethod
+    def _key(city: Dict[str, Any]) -> Optional[Tuple[Any, ...]]:
+        key = city_fingerprint(city)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
+
+    def facts(self, city: Dict[str, Any]) -> CityFacts:
+        """Derived values for one city (cached by fingerprint)."""
+        return self._facts_for(self._key(city), city)
+
+    def nation_totals(self, nation: Dict[str, Any]) -> NationCityTotals:
+        """City totals for ``nation``; only cities with a new fingerprint are derived again."""
+        source = nation.get('cities')
+        nation_key = nation.get('id') or nation.get('nation_id')
+        with self._lock:
+            held = self._nations.get(nation_key) if nation_key is not None else None
+            if held is not None and held[0] is source:
+                self._nations.move_to_end(nation_key)
+                self.stats['nation_hits'] += 1
+                return held[2]
+        cities = [c for c in source if isinstance(c, dict)] if isinstance(source, list) else []
+        keys = tuple(self._key(c) for c in cities)
+        cacheable = nation_key is not None and None not in keys
+        if cacheable and held is not None and held[1] == keys:
+            with self._lock:
+                self._nations[nation_key] = (source, keys, held[2])
+                self.stats['nation_hits'] += 1
+            return held[2]
+        totals = NationCityTotals([self._facts_for(k, c) for k, c in zip(keys, cities)])
+        with self._lock:
+            self.stats['nation_misses'] += 1
+            if cacheable:
+                self._nations[nation_key] = (source, keys, totals)
+                while len(self._nations) > self.max_nations:
+                    self._nations.popitem(last=False)
+        return totals
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cities.clear()
+            self._nations.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        out = dict(self.stats)
+        out['cities'] = len(self._cities)
+        out['nations'] = len(self._nations)
+        return out
+
+
+_cache: Optional[CityCache] = None
+
+
+def get_city_cache() -> CityCache:
+    """Process-wide city fact cache."""
+    global _cache
+    if _cache is None:
+        _cache = CityCache()
+    return _cache
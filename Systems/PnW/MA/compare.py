@@ -45,15 +45,26 @@ except Exception:
     except Exception:
         AERO_ALLIANCES = {}
 
-# Optional image generation support
 try:
-    from PIL import Image, ImageDraw, ImageFont
-    PIL_AVAILABLE = True
+    from .name_index import ALLIANCE, get_name_index
 except Exception:
-    Image = None
-    ImageDraw = None
-    ImageFont = None
-    PIL_AVAILABLE = False
+    try:
+        from Systems.PnW.MA.name_index import ALLIANCE, get_name_index
+    except Exception:
+        ALLIANCE, get_name_index = 'alliance', None
+
+# Chart rendering runs in a worker process pool
+try:
+    from .freshness import CURRENT_TURN, FreshnessLike, freshness_command
+except ImportError:
+    from Systems.PnW.MA.freshness import CURRENT_TURN, FreshnessLike, freshness_command
+
+try:
+    from .charts import AWAY_ORANGE, AWAY_RED, HOME_BLUE, ChartSpec
+    from .render import get_render_service
+except ImportError:
+    from Systems.PnW.MA.charts import AWAY_ORANGE, AWAY_RED, HOME_BLUE, ChartSpec
+    from Systems.PnW.MA.render import get_render_service
 
 
 class CompareCog(commands.Cog):
@@ -230,11 +241,15 @@ class CompareCog(commands.Cog):
             results.append((aid, name))
         return results
 
-    async def _get_alliance_nations(self, alliance_id: int, force_refresh: bool = True) -> List[Dict[str, Any]]:
-        """Fetch nations for an alliance via query system; fallback to AllianceManager cog."""
+    async def _get_alliance_nations(
+        self, alliance_id: int, force_refresh: bool = False, freshness: FreshnessLike = CURRENT_TURN
+    ) -> List[Dict[str, Any]]:
+        """Fetch nations for an alliance via query system (any snapshot within ``freshness``); fallback to AllianceManager cog."""
         try:
             if self.query_instance:
-                nations = await self.query_instance.get_alliance_nations(str(alliance_id), bot=self.bot, force_refresh=force_refresh)
+                nations = await self.query_instance.get_alliance_nations(
+                    str(alliance_id), bot=self.bot, force_refresh=force_refresh, freshness=freshness
+                )
                 if nations:
                     return nations
             # Fallback to AllianceManager cog
@@ -549,348 +564,69 @@ class CompareCog(commands.Cog):
         return embed
 
     # ---------------------------
-    # Chart generation (PIL)
+    # Chart generation (rendered off-loop, see render.py)
     # ---------------------------
-    def _get_font(self, size: int = 16) -> Optional[Any]:
-        if not PIL_AVAILABLE:
+    async def _render_chart(self, spec: ChartSpec) -> Optional[Tuple[BytesIO, str]]:
+        data = await get_render_service().render(spec)
+        if not data:
             return None
-        # Try to load emoji-capable font on Windows
-        try:
-            return ImageFont.truetype("C:\\Windows\\Fonts\\seguiemj.ttf", size)
-        except Exception:
-            try:
-                return ImageFont.truetype("C:\\Windows\\Fonts\\segoeui.ttf", size)
-            except Exception:
-                try:
-                    return ImageFont.truetype("arial.ttf", size)
-                except Exception:
-                    return ImageFont.load_default()
+        return BytesIO(data), spec.filename
+
+    def _bar_chart_spec(self, title: str, labels: List[str], a_counts: List[int], b_counts: List[int], a_name: str, b_name: str) -> ChartSpec:
+        return ChartSpec(
+            kind="bars",
+            title=title,
+            labels=list(labels),
+            series=[list(a_counts), list(b_counts)],
+            names=[a_name, b_name],
+            palette=[HOME_BLUE, AWAY_ORANGE],
+            filename=f"chart_{re.sub(r'[^a-z0-9]+', '_', title.lower())}.png",
+        )
 
-    def _generate_bar_chart(self, title: str, labels: List[str], a_counts: List[int], b_counts: List[int], a_name: str, b_name: str) -> Optional[Tuple[BytesIO, str]]:
-        if not PIL_AVAILABLE or not labels:
-            return None
-        try:
-            # Dimensions - increased spacing to prevent overlapping
-            width = 900
-            bar_h = 16  # Slightly smaller bars
-            gap = 6     # Increased gap between bars
-            row_h = bar_h * 2 + gap + 20  # More space for each row
-            top_pad = 50
-            left_pad = 140
-            right_pad = 40
-            bottom_pad = 40
-            height = top_pad + bottom_pad + max(1, len(labels)) * row_h
-
-            img = Image.new("RGB", (width, height), (26, 26, 26))
-            draw = ImageDraw.Draw(img)
-            font_title = self._get_font(20)
-            font_label = self._get_font(16)
-            font_small = self._get_font(14)
-
-            # Title
-            draw.text((left_pad, 15), title, fill=(255, 255, 255), font=font_title)
-            # Legend
-            draw.rectangle([width - 320, 12, width - 310, 22], fill=(46, 134, 222))
-            draw.text((width - 305, 10), f"{a_name}", fill=(220, 220, 220), font=font_small)
-            draw.rectangle([width - 200, 12, width - 190, 22], fill=(230, 126, 34))
-            draw.text((width - 185, 10), f"{b_name}", fill=(220, 220, 220), font=font_small)
-
-            max_val = max([0] + a_counts + b_counts)
-            usable_w = width - left_pad - right_pad
-            scale = (usable_w - 60) / max_val if max_val > 0 else 1.0
-
-            # Draw bars with proper spacing
-            for idx, lbl in enumerate(labels):
-                y = top_pad + idx * row_h
-                a_val = int(a_counts[idx] or 0)
-                b_val = int(b_counts[idx] or 0)
-                # Label
-                draw.text((10, y + 2), lbl, fill=(220, 220, 220), font=font_label)
-                # Bars
-                a_w = int(a_val * scale)
-                b_w = int(b_val * scale)
-                # A bar (top)
-                draw.rectangle([left_pad, y, left_pad + a_w, y + bar_h], fill=(46, 134, 222))
-                # B bar (bottom with gap)
-                draw.rectangle([left_pad, y + bar_h + gap, left_pad + b_w, y + bar_h + gap + bar_h], fill=(230, 126, 34))
-                # Values
-                draw.text((left_pad + a_w + 6, y), f"{a_val}", fill=(200, 200, 200), font=font_small)
-                draw.text((left_pad + b_w + 6, y + bar_h + gap), f"{b_val}", fill=(200, 200, 200), font=font_small)
-
-            # Output
-            bio = BytesIO()
-            img.save(bio, format="PNG")
-            bio.seek(0)
-            return bio, f"chart_{re.sub(r'[^a-z0-9]+', '_', title.lower())}.png"
-        except Exception:
+    def _city_chart_spec(self, city_rows: List[Tuple[str, str, str]], a_name: str, b_name: str, include_title: bool = True, include_legend: bool = True) -> ChartSpec:
+        return ChartSpec(
+            kind="city_distribution",
+            title="City Distribution",
+            labels=[r[0] for r in city_rows],
+            series=[[int(r[1]) for r in city_rows], [int(r[2]) for r in city_rows]],
+            names=[a_name, b_name],
+            palette=[HOME_BLUE, AWAY_RED],
+            filename="chart_city_distribution.png",
+            options={"include_title": include_title, "include_legend": include_legend},
+        )
+
+    def _military_chart_spec(self, mill_a: Dict[str, Any], mill_b: Dict[str, Any], a_name: str, b_name: str, include_title: bool = True, include_legend: bool = True) -> ChartSpec:
+        # Six unit types with word labels (emojis not reliable in images)
+        labels = ["Soldiers", "Tanks", "Aircraft", "Ships", "Missiles", "Nukes"]
+
+        def _vals(mill: Dict[str, Any], prefix: str) -> List[int]:
+            return [int(mill.get(f"{prefix}_{lbl.lower()}", 0) or 0) for lbl in labels]
+
+        return ChartSpec(
+            kind="military_groups",
+            title="Units: Current & Daily",
+            labels=labels,
+            series=[_vals(mill_a, 'current'), _vals(mill_b, 'current'), _vals(mill_a, 'daily'), _vals(mill_b, 'daily')],
+            names=[a_name, b_name],
+            palette=[HOME_BLUE, AWAY_RED],
+            filename="chart_military_tug_of_war.png",
+            options={"include_title": include_title, "include_legend": include_legend},
+        )
+
+    async def _generate_bar_chart(self, title: str, labels: List[str], a_counts: List[int], b_counts: List[int], a_name: str, b_name: str) -> Optional[Tuple[BytesIO, str]]:
+        if not labels:
             return None
+        return await self._render_chart(self._bar_chart_spec(title, labels, a_counts, b_counts, a_name, b_name))
 
-    def _generate_city_chart(self, city_rows: List[Tuple[str, str, str]], a_name: str, b_name: str, include_title: bool = True, include_legend: bool = True) -> Optional[Tuple[BytesIO, str]]:
+    async def _generate_city_chart(self, city_rows: List[Tuple[str, str, str]], a_name: str, b_name: str, include_title: bool = True, include_legend: bool = True) -> Optional[Tuple[BytesIO, str]]:
         # Vertical bar chart: ranges along X-axis, counts as vertical bars
-        if not PIL_AVAILABLE or not city_rows:
-            return None
-        try:
-            labels = [r[0] for r in city_rows]
-            a_counts = [int(r[1]) for r in city_rows]
-            b_counts = [int(r[2]) for r in city_rows]
-
-            # Dimensions
-            width = 900
-            # Adjust top padding depending on whether title/legend are included
-            top_pad = 60 if (include_title or include_legend) else 24
-            left_pad = 70
-            right_pad = 40
-            bottom_pad = 90  # space for horizontal labels
-            height = 460
-
-            img = Image.new("RGB", (width, height), (26, 26, 26))
-            draw = ImageDraw.Draw(img)
-            font_title = self._get_font(20)
-            font_axis = self._get_font(14)
-            font_small = self._get_font(14)
-
-            # Title
-            if include_title:
-                draw.text((left_pad, 15), "City Distribution", fill=(255, 255, 255), font=font_title)
-            # Legend
-            if include_legend:
-                draw.rectangle([width - 320, 12, width - 310, 22], fill=(46, 134, 222))
-                draw.text((width - 305, 10), f"{a_name}", fill=(220, 220, 220), font=font_small)
-                draw.rectangle([width - 200, 12, width - 190, 22], fill=(231, 76, 60))
-                draw.text((width - 185, 10), f"{b_name}", fill=(220, 220, 220), font=font_small)
-
-            # Scaling
-            max_val = max([0] + a_counts + b_counts)
-            usable_h = height - top_pad - bottom_pad
-            scale = usable_h / max_val if max_val > 0 else 1.0
-
-            # X-axis layout
-            usable_w = width - left_pad - right_pad
-            n = max(1, len(labels))
-            step = int(usable_w / n)
-            bar_w = max(10, min(22, step // 3))
-            x0 = left_pad
-            y_base = height - bottom_pad
-
-            # Axis line
-            draw.line([left_pad, y_base, width - right_pad, y_base], fill=(200, 200, 200), width=1)
-
-            for i, lbl in enumerate(labels):
-                cx = x0 + i * step + step // 2
-                # A and B bar x positions (side-by-side)
-                ax = cx - bar_w - 2
-                bx = cx + 2
-                # Heights
-                a_h = int((a_counts[i] or 0) * scale)
-                b_h = int((b_counts[i] or 0) * scale)
-                # Bars
-                if a_h > 0:
-                    draw.rectangle([ax, y_base - a_h, ax + bar_w, y_base], fill=(46, 134, 222))
-                if b_h > 0:
-                    draw.rectangle([bx, y_base - b_h, bx + bar_w, y_base], fill=(231, 76, 60))
-                # Values above bars
-                if a_h > 0:
-                    a_txt = f"{a_counts[i]}"
-                    atw = int(draw.textlength(a_txt, font=font_small))
-                    draw.text((ax + (bar_w - atw) // 2, max(top_pad + 4, y_base - a_h - 16)), a_txt, fill=(220, 220, 220), font=font_small)
-                if b_h > 0:
-                    b_txt = f"{b_counts[i]}"
-                    btw = int(draw.textlength(b_txt, font=font_small))
-                    draw.text((bx + (bar_w - btw) // 2, max(top_pad + 4, y_base - b_h - 16)), b_txt, fill=(220, 220, 220), font=font_small)
-                # X-axis labels (city ranges), horizontally along the axis
-                l_tw = int(draw.textlength(lbl, font=font_axis))
-                draw.text((cx - l_tw // 2, y_base + 8), lbl, fill=(220, 220, 220), font=font_axis)
-
-            # Output
-            bio = BytesIO()
-            img.save(bio, format="PNG")
-            bio.seek(0)
-            return bio, "chart_city_distribution.png"
-        except Exception:
+        if not city_rows:
             return None
+        return await self._render_chart(self._city_chart_spec(city_rows, a_name, b_name, include_title, include_legend))
 
-    def _generate_military_chart(self, mill_a: Dict[str, Any], mill_b: Dict[str, Any], a_name: str, b_name: str, include_title: bool = True, include_legend: bool = True) -> Optional[Tuple[BytesIO, str]]:
-        # Render vertical grouped bars per unit (4 bars per unit):
-        # [Home Current, Away Current, Home Daily, Away Daily]
-        # Bars for a unit are tightly grouped; gap between units.
-        if not PIL_AVAILABLE:
-            return None
-        try:
-            # Show six unit types with word labels (emojis not reliable in images)
-            labels = ["Soldiers", "Tanks", "Aircraft", "Ships", "Missiles", "Nukes"]
-            a_daily = [
-                int(mill_a.get('daily_soldiers', 0) or 0),
-                int(mill_a.get('daily_tanks', 0) or 0),
-                int(mill_a.get('daily_aircraft', 0) or 0),
-                int(mill_a.get('daily_ships', 0) or 0),
-                int(mill_a.get('daily_missiles', 0) or 0),
-                int(mill_a.get('daily_nukes', 0) or 0),
-            ]
-            b_daily = [
-                int(mill_b.get('daily_soldiers', 0) or 0),
-                int(mill_b.get('daily_tanks', 0) or 0),
-                int(mill_b.get('daily_aircraft', 0) or 0),
-                int(mill_b.get('daily_ships', 0) or 0),
-                int(mill_b.get('daily_missiles', 0) or 0),
-                int(mill_b.get('daily_nukes', 0) or 0),
-            ]
-            a_current = [
-                int(mill_a.get('current_soldiers', 0) or 0),
-                int(mill_a.get('current_tanks', 0) or 0),
-                int(mill_a.get('current_aircraft', 0) or 0),
-                int(mill_a.get('current_ships', 0) or 0),
-                int(mill_a.get('current_missiles', 0) or 0),
-                int(mill_a.get('current_nukes', 0) or 0),
-            ]
-            b_current = [
-                int(mill_b.get('current_soldiers', 0) or 0),
-                int(mill_b.get('current_tanks', 0) or 0),
-                int(mill_b.get('current_aircraft', 0) or 0),
-                int(mill_b.get('current_ships', 0) or 0),
-                int(mill_b.get('current_missiles', 0) or 0),
-                int(mill_b.get('current_nukes', 0) or 0),
-            ]
-            a_max = [
-                int(mill_a.get('max_soldiers', 0) or 0),
-                int(mill_a.get('max_tanks', 0) or 0),
-                int(mill_a.get('max_aircraft', 0) or 0),
-                int(mill_a.get('max_ships', 0) or 0),
-                int(mill_a.get('max_missiles', 0) or 0),
-                int(mill_a.get('max_nukes', 0) or 0),
-            ]
-            b_max = [
-                int(mill_b.get('max_soldiers', 0) or 0),
-                int(mill_b.get('max_tanks', 0) or 0),
-                int(mill_b.get('max_aircraft', 0) or 0),
-                int(mill_b.get('max_ships', 0) or 0),
-                int(mill_b.get('max_missiles', 0) or 0),
-                int(mill_b.get('max_nukes', 0) or 0),
-            ]
-
-            # Dimensions (vertical layout similar to city chart)
-            width = 900
-            # Adjust top padding depending on whether title/legend are included
-            top_pad = 60 if (include_title or include_legend) else 24
-            left_pad = 70
-            right_pad = 40
-            bottom_pad = 120  # space for unit labels under grouped bars
-            height = 520
-
-            img = Image.new("RGB", (width, height), (26, 26, 26))
-            draw = ImageDraw.Draw(img)
-            font_title = self._get_font(20)
-            font_axis = self._get_font(14)
-            font_small = self._get_font(12)
-            font_bar = self._get_font(12)
-
-            # Colors: Blue for Home (A), Red for Away (B)
-            A_COLOR = (46, 134, 222)
-            B_COLOR = (231, 76, 60)
-            WHITE = (255, 255, 255)
-            GREY = (220, 220, 220)
-
-            # Title
-            if include_title:
-                draw.text((left_pad, 15), "Units: Current & Daily", fill=WHITE, font=font_title)
-            # Legend
-            if include_legend:
-                draw.rectangle([width - 320, 12, width - 310, 22], fill=A_COLOR)
-                draw.text((width - 305, 10), f"{a_name}", fill=GREY, font=font_small)
-                draw.rectangle([width - 200, 12, width - 190, 22], fill=B_COLOR)
-                draw.text((width - 185, 10), f"{b_name}", fill=GREY, font=font_small)
-
-            # Scaling height per cluster dynamically
-            usable_h = height - top_pad - bottom_pad
-
-            # X-axis layout: grouped bars per unit
-            usable_w = width - left_pad - right_pad
-            group_count = max(1, len(labels))
-            step = int(usable_w / group_count)
-            # Bars tight within group; small gap between bars, larger gap between groups
-            bar_w = 22
-            bar_gap = 4
-            group_gap = max(16, step - (bar_w * 4 + bar_gap * 3))
-            x0 = left_pad
-            y_base = height - bottom_pad
-
-            # Axis line
-            draw.line([left_pad, y_base, width - right_pad, y_base], fill=(200, 200, 200), width=1)
-
-            # Helper to paste vertical text onto bars
-            def paste_vertical_text(text: str, rect: Tuple[int, int, int, int], color: Tuple[int, int, int], font: ImageFont.FreeTypeFont):
-                bx1, by1, bx2, by2 = rect
-                bar_h = by2 - by1
-                # Create text image
-                tw = int(draw.textlength(text, font=font))
-                th = font.getbbox(text)[3] - font.getbbox(text)[1]
-                tx_img = Image.new("RGBA", (tw + 4, th + 4), (0, 0, 0, 0))
-                tx_draw = ImageDraw.Draw(tx_img)
-                tx_draw.text((2, 2), text, fill=color + (255,), font=font)
-                rot = tx_img.rotate(90, expand=True)
-                # Center on bar; if bar too short, place just above the bar
-                cx = (bx1 + bx2) // 2
-                cy = (by1 + by2) // 2
-                px = int(cx - rot.width / 2)
-                py = int(cy - rot.height / 2)
-                if bar_h < rot.height + 4:
-                    py = by1 - rot.height - 2
-                    py = max(py, top_pad + 2)
-                img.paste(rot, (px, py), rot)
-
-            for i, lbl in enumerate(labels):
-                # Values
-                a_c = int(mill_a.get('current_' + lbl.lower(), 0) or 0)
-                b_c = int(mill_b.get('current_' + lbl.lower(), 0) or 0)
-                a_d = int(mill_a.get('daily_' + lbl.lower(), 0) or 0)
-                b_d = int(mill_b.get('daily_' + lbl.lower(), 0) or 0)
-
-                # Scale all four bars to the unit group's maximum
-                g_max = max(a_c, b_c, a_d, b_d, 1)
-                scale = usable_h / g_max if g_max > 0 else 1.0
-
-                # Group center and left start
-                gx = x0 + i * step + step // 2
-                group_w = bar_w * 4 + bar_gap * 3
-                gl = gx - group_w // 2
-
-                # Bar x positions within the group (tight together)
-                ax_cur_l = gl
-                bx_cur_l = gl + bar_w + bar_gap
-                ax_day_l = gl + (bar_w + bar_gap) * 2
-                bx_day_l = gl + (bar_w + bar_gap) * 3
-
-                # Bar heights
-                a_ch = int(a_c * scale)
-                b_ch = int(b_c * scale)
-                a_dh = int(a_d * scale)
-                b_dh = int(b_d * scale)
-
-                # Draw bars
-                rects = []
-                # Home Current
-                rects.append((ax_cur_l, y_base - a_ch, ax_cur_l + bar_w, y_base, A_COLOR, f"Cur {a_c:,}"))
-                # Away Current
-                rects.append((bx_cur_l, y_base - b_ch, bx_cur_l + bar_w, y_base, B_COLOR, f"Cur {b_c:,}"))
-                # Home Daily
-                rects.append((ax_day_l, y_base - a_dh, ax_day_l + bar_w, y_base, A_COLOR, f"Day {a_d:,}"))
-                # Away Daily
-                rects.append((bx_day_l, y_base - b_dh, bx_day_l + bar_w, y_base, B_COLOR, f"Day {b_d:,}"))
-
-                for (x1, y1, x2, y2, color, text) in rects:
-                    if y2 - y1 > 0:
-                        draw.rectangle([x1, y1, x2, y2], fill=color)
-                        paste_vertical_text(text, (x1, y1, x2, y2), GREY, font_bar)
-
-                # Unit label shown once centered under the 4 bars
-                unit_tw = int(draw.textlength(lbl, font=font_axis))
-                draw.text((gx - unit_tw // 2, y_base + 10), lbl, fill=GREY, font=font_axis)
-
-            bio = BytesIO()
-            img.save(bio, format="PNG")
-            bio.seek(0)
-            return bio, f"chart_military_tug_of_war.png"
-        except Exception:
-            return None
+    async def _generate_military_chart(self, mill_a: Dict[str, Any], mill_b: Dict[str, Any], a_name: str, b_name: str, include_title: bool = True, include_legend: bool = True) -> Optional[Tuple[BytesIO, str]]:
+        # Vertical grouped bars per unit: [Home Current, Away Current, Home Daily, Away Daily]
+        return await self._render_chart(self._military_chart_spec(mill_a, mill_b, a_name, b_name, include_title, include_legend))
 
     # ---------------------------
     # Autocomplete for target alliance
@@ -908,6 +644,17 @@ class CompareCog(commands.Cog):
             if isinstance(aid, int):
                 choices.append(app_commands.Choice(name=f"Alliance ID {aid}", value=str(aid)))
 
+            # Local name index over cached alliance files (no API calls)
+            try:
+                if get_name_index:
+                    index = await get_name_index().ready()
+                    matches = index.search(cur, kinds=[ALLIANCE], limit=25 - len(choices))
+                    if matches:
+                        choices.extend(app_commands.Choice(name=m.display[:100], value=m.entity_id) for m in matches)
+                        return choices[:25]
+            except Exception:
+                pass
+
             # Known AERO alliances by name
             cur_lower = cur.lower()
             for key, cfg in (AERO_ALLIANCES or {}).items():
@@ -953,12 +700,13 @@ class CompareCog(commands.Cog):
             home_batched: Dict[int, List[Dict[str, Any]]] = {}
             if self.query_instance and hasattr(self.query_instance, 'get_alliances_nations_batched'):
                 try:
-                    home_batched = await self.query_instance.get_alliances_nations_batched(
-                        home_ids,
-                        side_label='home',
-                        bot=self.bot,
-                        force_refresh=True,
-                    )
+                    with freshness_command('compare'):
+                        home_batched = await self.query_instance.get_alliances_nations_batched(
+                            home_ids,
+                            side_label='home',
+                            bot=self.bot,
+                            freshness=CURRENT_TURN,
+                        )
                 except Exception as e:
                     await interaction.followup.send(f"❌ Failed to fetch Home party data: {e}")
                     return
@@ -988,12 +736,13 @@ class CompareCog(commands.Cog):
             away_batched: Dict[int, List[Dict[str, Any]]] = {}
             if self.query_instance and hasattr(self.query_instance, 'get_alliances_nations_batched'):
                 try:
-                    away_batched = await self.query_instance.get_alliances_nations_batched(
-                        away_ids,
-                        side_label='away',
-                        bot=self.bot,
-                        force_refresh=True,
-                    )
+                    with freshness_command('compare'):
+                        away_batched = await self.query_instance.get_alliances_nations_batched(
+                            away_ids,
+                            side_label='away',
+                            bot=self.bot,
+                            freshness=CURRENT_TURN,
+                        )
                 except Exception as e:
                     await interaction.followup.send(f"❌ Failed to fetch Away party data: {e}")
                     return
@@ -1056,57 +805,25 @@ class CompareCog(commands.Cog):
                     if (count_t or 0) > 0 or (count_a or 0) > 0:
                         city_rows.append((label_t, f"{count_t}", f"{count_a}"))
 
-                # Generate charts content-only (no titles/legends) when both are present
-                city_chart = self._generate_city_chart(city_rows, "Home", "Away", include_title=False, include_legend=False) if city_rows else None
-                mil_chart = self._generate_military_chart(home_mill, away_mill, "Home", "Away", include_title=False, include_legend=False)
-
-                # If both charts exist, combine them into one stacked image and attach to the single embed
-                if city_chart and mil_chart and PIL_AVAILABLE:
-                    bio_city, fname_city = city_chart
-                    bio_mil, fname_mil = mil_chart
-                    try:
-                        img_city = Image.open(bio_city).convert("RGB")
-                        img_mil = Image.open(bio_mil).convert("RGB")
-                        # Add a unified header area with single title & legend
-                        header_h = 48
-                        combined_w = max(img_city.width, img_mil.width)
-                        combined_h = header_h + img_city.height + img_mil.height + 16
-                        combined = Image.new("RGB", (combined_w, combined_h), (26, 26, 26))
-                        draw_c = ImageDraw.Draw(combined)
-                        font_title = self._get_font(20)
-                        font_small = self._get_font(14)
-
-                        # Unified title and legend (Home/Away colors)
-                        draw_c.text((16, 12), "City Distribution & Military Comparison", fill=(255, 255, 255), font=font_title)
-                        A_COLOR = (46, 134, 222)
-                        B_COLOR = (231, 76, 60)
-                        # Legend on the right
-                        draw_c.rectangle([combined_w - 300, 14, combined_w - 290, 24], fill=A_COLOR)
-                        draw_c.text((combined_w - 285, 12), "Home", fill=(220, 220, 220), font=font_small)
-                        draw_c.rectangle([combined_w - 200, 14, combined_w - 190, 24], fill=B_COLOR)
-                        draw_c.text((combined_w - 185, 12), "Away", fill=(220, 220, 220), font=font_small)
-
-                        # Paste city below header, then military below with spacing
-                        combined.paste(img_city, (0, header_h))
-                        combined.paste(img_mil, (0, header_h + img_city.height + 16))
-                        # Save combined
-                        bio_combined = BytesIO()
-                        combined.save(bio_combined, format="PNG")
-                        bio_combined.seek(0)
-                        fname_combined = "chart_compare_city_military.png"
+                # Content-only charts (no titles/legends); when both exist they are stacked under one
+                # title and legend inside the same worker job
+                mil_spec = self._military_chart_spec(home_mill, away_mill, "Home", "Away", include_title=False, include_legend=False)
+                if city_rows:
+                    city_spec = self._city_chart_spec(city_rows, "Home", "Away", include_title=False, include_legend=False)
+                    combined = await self._render_chart(ChartSpec(
+                        kind="stack",
+                        title="City Distribution & Military Comparison",
+                        names=["Home", "Away"],
+                        palette=[HOME_BLUE, AWAY_RED],
+                        filename="chart_compare_city_military.png",
+                        options={"parts": [city_spec, mil_spec]},
+                    ))
+                    if combined:
+                        bio_combined, fname_combined = combined
                         files.append(discord.File(bio_combined, filename=fname_combined))
                         embed.set_image(url=f"attachment://{fname_combined}")
-                    except Exception:
-                        # Fallback to attaching separately if combination fails
-                        files.append(discord.File(bio_city, filename=fname_city))
-                        embed.set_image(url=f"attachment://{fname_city}")
-                        files.append(discord.File(bio_mil, filename=fname_mil))
                 else:
-                    # Attach whichever chart(s) exist, preferring city first and then military
-                    if city_chart:
-                        bio_city, fname_city = city_chart
-                        files.append(discord.File(bio_city, filename=fname_city))
-                        embed.set_image(url=f"attachment://{fname_city}")
+                    mil_chart = await self._render_chart(mil_spec)
                     if mil_chart:
                         bio_mil, fname_mil = mil_chart
                         files.append(discord.File(bio_mil, filename=fname_mil))
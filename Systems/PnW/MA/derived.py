@@ -0,0 +1,201 @@
+"""Derived nation metrics computed once when a snapshot is ingested.
+
+Max units, daily buy caps, combat score, improvement totals, MMR ratios,
+infrastructure stats and strategic value are pure functions of a few raw
+nation fields. ``derive_nations`` computes every registered metric for a
+freshly fetched snapshot and stores the results on each nation under
+``_derived``, so they are saved with the snapshot and read back in O(1) by
+the ``AllianceCalculator`` methods through ``precomputed``.
+
+Each metric declares the raw fields it depends on. The stored entry records
+a checksum of those fields, so deriving a new snapshot against the previous
+one (or re-deriving a nation loaded from disk) recomputes only the metrics
+whose inputs changed. Fields that other code attaches after ingest (such as
+``military_analysis``) are declared ``volatile`` and re-checked on every read.
+"""
+
+import json
+import logging
+import zlib
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+DERIVED_KEY = '_derived'
+# Bump when a metric's formula changes so stored values are recomputed
+DERIVED_VERSION = 1
+
+logger = logging.getLogger(__name__)
+
+_CITY_FIELDS = ('cities', 'num_cities')
+_RESEARCH_FIELDS = (
+    'ground_research', 'air_research', 'naval_research',
+    'ground_capacity', 'air_capacity', 'naval_capacity', 'military_research',
+)
+_STRATEGIC_PROJECT_FIELDS = (
+    'missile_launch_pad', 'nuclear_research_facility', 'iron_dome', 'vital_defense_system',
+    'military_research_center', 'space_program', 'nuclear_launch_facility', 'propaganda_bureau',
+)
+_UNIT_FIELDS = ('soldiers', 'tanks', 'aircraft', 'ships', 'missiles', 'nukes')
+
+
+@dataclass(frozen=True)
+class DerivedMetric:
+    name: str
+    depends_on: Tuple[str, ...]
+    compute: Callable[[Any, Dict[str, Any]], Any]
+    volatile: Tuple[str, ...] = ()
+
+
+METRICS: Dict[str, DerivedMetric] = {}
+
+
+def metric(name: str, depends_on: Iterable[str], volatile: Iterable[str] = ()) -> Callable:
+    """Register ``fn(calculator, nation)`` as derived metric ``name``."""
+    def register(fn: Callable[[Any, Dict[str, Any]], Any]) -> Callable[[Any, Dict[str, Any]], Any]:
+        METRICS[name] = DerivedMetric(name, tuple(dict.fromkeys(depends_on)), fn, tuple(volatile))
+        return fn
+    return register
+
+
+@metric('purchase_limits', _CITY_FIELDS + _RESEARCH_FIELDS + _STRATEGIC_PROJECT_FIELDS)
+def _purchase_limits(calc: Any, nation: Dict[str, Any]) -> Dict[str, int]:
+    return calc._compute_military_purchase_limits(nation)
+
+
+@metric('combat_score', _CITY_FIELDS + ('score',) + _UNIT_FIELDS + _STRATEGIC_PROJECT_FIELDS)
+def _combat_score(calc: Any, nation: Dict[str, Any]) -> float:
+    return calc._compute_combat_score(nation)
+
+
+@metric('improvement_totals', ('cities',))
+def _improvement_totals(calc: Any, nation: Dict[str, Any]) -> Dict[str, int]:
+    return calc._compute_nation_improvement_totals(nation)
+
+
+@metric('building_ratios', _CITY_FIELDS)
+def _building_ratios(calc: Any, nation: Dict[str, Any]) -> Dict[str, Any]:
+    return calc._compute_building_ratios(nation)
+
+
+@metric('infrastructure_stats', _CITY_FIELDS + ('score',))
+def _infrastructure_stats(calc: Any, nation: Dict[str, Any]) -> Dict[str, Any]:
+    return calc._compute_infrastructure_stats(nation)
+
+
+@metric(
+    'strategic_value',
+    _CITY_FIELDS + ('score', 'nation_name') + _RESEARCH_FIELDS + _STRATEGIC_PROJECT_FIELDS,
+    volatile=('military_analysis',),
+)
+def _strategic_value(calc: Any, nation: Dict[str, Any]) -> float:
+    return calc._compute_strategic_value(nation)
+
+
+def _checksum(value: Any) -> int:
+    try:
+        encoded = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    except Exception:
+        encoded = repr(value)
+    return zlib.crc32(encoded.encode('utf-8'))
+
+
+def _signature(nation: Dict[str, Any], fields: Tuple[str, ...], cache: Dict[str, int]) -> int:
+    sig = 0
+    for field in fields:
+        if field not in cache:
+            cache[field] = _checksum(nation.get(field))
+        sig = zlib.crc32(cache[field].to_bytes(4, 'little'), sig)
+    return sig
+
+
+def _entry(nation: Any) -> Optional[Dict[str, Any]]:
+    if not isinstance(nation, dict):
+        return None
+    entry = nation.get(DERIVED_KEY)
+    if not isinstance(entry, dict) or entry.get('v') != DERIVED_VERSION:
+        return None
+    return entry
+
+
+def precomputed(nation: Any, name: str) -> Optional[Any]:
+    """Stored value of metric ``name`` for ``nation``, or None if it must be computed."""
+    entry = _entry(nation)
+    if entry is None:
+        return None
+    values = entry.get('values') or {}
+    if name not in values:
+        return None
+    spec = METRICS.get(name)
+    if spec is not None and spec.volatile:
+        volatile_sig = (entry.get('volatile') or {}).get(name)
+        if volatile_sig != _signature(nation, spec.volatile, {}):
+            return None
+    return values[name]
+
+
+def _calculator() -> Any:
+    try:
+        from .calc import calculator
+    except ImportError:
+        from Systems.PnW.MA.calc import calculator
+    return calculator
+
+
+def derive_nation(nation: Dict[str, Any], previous: Optional[Dict[str, Any]] = None, calc: Any = None) -> int:
+    """Compute and attach every metric for ``nation``; returns how many were recomputed.
+
+    Metrics whose dependency checksum matches ``previous`` (the same nation in the
+    last snapshot) or the nation's own stored entry are carried over unchanged.
+    """
+    if not isinstance(nation, dict):
+        return 0
+    calc = calc or _calculator()
+    prior = _entry(nation) or _entry(previous) or {}
+    prior_values = prior.get('values') or {}
+    prior_sigs = prior.get('sig') or {}
+    field_sums: Dict[str, int] = {}
+    values: Dict[str, Any] = {}
+    sigs: Dict[str, int] = {}
+    volatile: Dict[str, int] = {}
+    recomputed = 0
+    # Drop the stale entry first so the compute functions below do not read it back
+    nation.pop(DERIVED_KEY, None)
+    for name, spec in METRICS.items():
+        sig = _signature(nation, spec.depends_on + spec.volatile, field_sums)
+        if name in prior_values and prior_sigs.get(name) == sig:
+            values[name] = prior_values[name]
+        else:
+            try:
+                values[name] = spec.compute(calc, nation)
+            except Exception as e:
+                logger.debug(f"derive_nation: {name} failed for nation {nation.get('id')}: {e}")
+                continue
+            recomputed += 1
+        sigs[name] = sig
+        if spec.volatile:
+            volatile[name] = _signature(nation, spec.volatile, field_sums)
+    nation[DERIVED_KEY] = {'v': DERIVED_VERSION, 'values': values, 'sig': sigs, 'volatile': volatile}
+    return recomputed
+
+
+def derive_nations(nations: List[Dict[str, Any]], previous: Optional[List[Dict[str, Any]]] = None) -> Dict[str, int]:
+    """Derive metrics for a whole snapshot, reusing results from ``previous`` where inputs are unchanged."""
+    calc = _calculator()
+    by_id: Dict[str, Dict[str, Any]] = {}
+    for old in previous or []:
+        if isinstance(old, dict) and old.get('id') is not None:
+            by_id[str(old['id'])] = old
+    stats = {'nations': 0, 'recomputed': 0, 'reused': 0}
+    for nation in nations or []:
+        if not isinstance(nation, dict):
+            continue
+        recomputed = derive_nation(nation, by_id.get(str(nation.get('id'))), calc)
+        stats['nations'] += 1
+        stats['recomputed'] += recomputed
+        stats['reused'] += len(METRICS) - recomputed
+    return stats
+
+
+def metrics_depending_on(field: str) -> List[str]:
+    """Names of the metrics that must be recomputed when raw ``field`` changes."""
+    return [name for name, spec in METRICS.items() if field in spec.depends_on or field in spec.volatile]
@@ -6,6 +6,7 @@ import re
 from typing import List, Dict, Optional, Any, Tuple
 from datetime import datetime
 import sys
+import asyncio
 import logging
 import traceback
 
@@ -37,6 +38,22 @@ except ImportError:
     except ImportError:
         from Systems.PnW.MA.bloc import AERO_ALLIANCES
 
+try:
+    from .name_index import NATION, get_name_index
+except ImportError:
+    try:
+        from name_index import NATION, get_name_index
+    except ImportError:
+        from Systems.PnW.MA.name_index import NATION, get_name_index
+
+try:
+    from .assignment import AssignmentPlan, defensive_slots, plan_assignments
+except ImportError:
+    try:
+        from assignment import AssignmentPlan, defensive_slots, plan_assignments
+    except ImportError:
+        from Systems.PnW.MA.assignment import AssignmentPlan, defensive_slots, plan_assignments
+
 # Import AllianceManager to refresh bloc data prior to fetching attackers
 try:
     from .bloc import AllianceManager
@@ -94,18 +111,27 @@ class DestroyCog(commands.Cog):
             self.query_instance = None
             self.calculator = None 
                 
-    async def get_alliance_nations(self, alliance_id: str, force_refresh: bool = False) -> List[Dict[str, Any]]:
+    async def get_alliance_nations(self, alliance_id: str, force_refresh: bool = False, projection: Optional[str] = None) -> List[Dict[str, Any]]:
         """
         Get alliance nations data from individual alliance files or API.
         
         Args:
             alliance_id: The alliance ID to fetch data for
             force_refresh: Whether to force refresh from API
+            projection: Optional field set (e.g. 'war_range'); narrowed snapshots are
+                cached by the query layer under their own key
             
         Returns:
             List of nation dictionaries or empty list if not found
         """
         try:
+            # Narrowed projections are read/written by the query layer against alliance_<id>_<projection>
+            if projection and projection != 'full' and self.query_instance:
+                nations = await self.query_instance.get_alliance_nations(
+                    alliance_id, bot=self.bot, force_refresh=force_refresh, projection=projection
+                )
+                return nations or []
+            
             alliance_key = f"alliance_{alliance_id}"
             
             # Try to get from individual alliance file first
@@ -343,6 +369,9 @@ class DestroyCog(commands.Cog):
                     self.logger.info(f"No nation found for {input_type}: {target_data}")
                     return None
                 
+                # Annotate a copy: the record may be shared with the nation repository
+                target_nation = dict(target_nation)
+                
                 # Enhanced data utilization - extract and process war history data
                 try:
                     # Process war data for strategic insights
@@ -736,7 +765,9 @@ class DestroyCog(commands.Cog):
                 try:
                     alliance_id = str(alliance_config['id'])
                     self.logger.info(f"Fetching nations for alliance: {alliance_config['name']} (ID: {alliance_id})")
-                    alliance_nations = await self.get_alliance_nations(alliance_id, force_refresh=(alliance_filter == 'cybertron'))
+                    alliance_nations = await self.get_alliance_nations(
+                        alliance_id, force_refresh=(alliance_filter == 'cybertron'), projection='war_range'
+                    )
                     
                     if alliance_nations and isinstance(alliance_nations, list):
                         start_len = len(eligible_members)
@@ -765,6 +796,9 @@ class DestroyCog(commands.Cog):
                     member.get('ships') is not None and
                     member.get('score') is not None):
                     
+                    # Annotate a copy: the records are shared with the nation repository
+                    member = dict(member)
+                    
                     # Optional: Filter out nations inactive for 7+ days
                     secs = self._seconds_since_last_active(member)
                     member['last_active_seconds'] = secs if secs is not None else None
@@ -873,6 +907,48 @@ class DestroyCog(commands.Cog):
             self._log_error(f"Error finding optimal attackers: {str(e)}", e, "find_optimal_attackers")
             return {'error': f'Error finding optimal attackers: {str(e)}'}
     
+    async def plan_target_assignments(
+        self,
+        targets: List[Dict[str, Any]],
+        alliance_filter: str = 'cybertron',
+        exclude_inactive_7d_plus: bool = False,
+    ) -> Tuple[AssignmentPlan, Dict[int, Dict[str, Any]]]:
+        """
+        Assign alliance members across several targets at once.
+        
+        Members are fetched once and handed to the global optimizer in assignment.py,
+        which respects war range, open offensive/defensive slots and at most three
+        attackers per target. Returns the plan and the attackers by nation id.
+        """
+        if alliance_filter == 'cybertron':
+            alliances_to_fetch = [('cybertron', AERO_ALLIANCES['cybertron'])]
+        else:
+            alliances_to_fetch = list(AERO_ALLIANCES.items())
+        
+        attackers: Dict[int, Dict[str, Any]] = {}
+        for alliance_key, alliance_config in alliances_to_fetch:
+            try:
+                alliance_nations = await self.get_alliance_nations(
+                    str(alliance_config['id']), force_refresh=(alliance_filter == 'cybertron'), projection='war_range'
+                )
+            except Exception as e:
+                self.logger.warning(f"Error fetching alliance data for {alliance_config['name']}: {e}")
+                continue
+            for member in alliance_nations or []:
+                if not isinstance(member, dict) or member.get('score') is None or member.get('soldiers') is None:
+                    continue
+                secs = self._seconds_since_last_active(member)
+                if exclude_inactive_7d_plus and secs is not None and secs >= 7 * 24 * 3600:
+                    continue
+                try:
+                    attackers[int(member.get('nation_id') or member.get('id'))] = member
+                except (TypeError, ValueError):
+                    continue
+        
+        # The solver is CPU bound; keep the event loop responsive while it runs
+        plan = await asyncio.to_thread(plan_assignments, targets, list(attackers.values()), logger=self.logger)
+        return plan, attackers
+    
     def _check_war_range_compatibility(self, nation1: Dict[str, Any], nation2: Dict[str, Any]) -> bool:
         """Check if two nations can war each other based on score range (-25% to 150%)"""
         try:
@@ -1033,93 +1109,24 @@ class DestroyCog(commands.Cog):
             if not current or len(current.strip()) < 2:
                 return []
             
-            # Get nations from all AERO alliances
-            all_nations = []
-            for alliance_key, alliance_config in AERO_ALLIANCES.items():
-                try:
-                    alliance_id = str(alliance_config['id'])
-                    alliance_nations = await self.get_alliance_nations(alliance_id, force_refresh=False)
-                    if alliance_nations and isinstance(alliance_nations, list):
-                        all_nations.extend(alliance_nations)
-                except Exception as e:
-                    self.logger.warning(f"Error fetching alliance data for autocomplete: {e}")
-                    continue
-            
-            # Filter nations by current input
-            current_lower = current.lower().strip()
-            matches = []
-            
-            for nation in all_nations:
-                if isinstance(nation, dict):
-                    nation_name = nation.get('nation_name', '') or ''
-                    leader_name = nation.get('leader_name', '') or ''
-                    nation_id = str(nation.get('nation_id', '')) or ''
-                    
-                    # Check if nation matches search criteria
-                    if (current_lower in nation_name.lower() or 
-                        current_lower in leader_name.lower() or 
-                        current_lower in nation_id):
-                        
-                        # Create display name with nation name and leader name
-                        display_name = f"{nation_name} ({leader_name})"
-                        if len(display_name) > 100:  # Discord choice limit
-                            display_name = display_name[:97] + "..."
-                        
-                        # Use nation ID as the value for uniqueness
-                        value = nation_id
-                        
-                        matches.append({
-                            'display': display_name,
-                            'value': value,
-                            'nation_name': nation_name,
-                            'leader_name': leader_name,
-                            'nation_id': nation_id
-                        })
-            
-            # Sort matches by relevance (prefer exact matches, then nation name matches)
-            def sort_key(match):
-                score = 0
-                nation_name_lower = match['nation_name'].lower()
-                leader_name_lower = match['leader_name'].lower()
-                
-                # Exact nation name match gets highest score
-                if nation_name_lower == current_lower:
-                    score += 1000
-                # Starts with current input
-                elif nation_name_lower.startswith(current_lower):
-                    score += 500
-                # Contains current input
-                elif current_lower in nation_name_lower:
-                    score += 200
-                
-                # Leader name matches
-                if leader_name_lower == current_lower:
-                    score += 300
-                elif leader_name_lower.startswith(current_lower):
-                    score += 150
-                elif current_lower in leader_name_lower:
-                    score += 50
-                
-                # Nation ID exact match
-                if match['nation_id'] == current_lower:
-                    score += 400
-                
-                return -score  # Negative for descending sort
-            
-            matches.sort(key=sort_key)
-            
-            # Limit to 25 choices (Discord limit)
-            matches = matches[:25]
-            
-            # Convert to Discord choices
+            query = current.strip()
+            index = await get_name_index().ready()
             choices = []
-            for match in matches:
-                choices.append(app_commands.Choice(
-                    name=match['display'],
-                    value=match['value']
-                ))
+            # Nation ID typed directly
+            by_id = index.get(NATION, query) if query.isdigit() else None
+            if by_id is not None:
+                choices.append(app_commands.Choice(name=by_id.display[:100], value=by_id.entity_id))
+            
+            # Ranked nation/leader name matches from the local name index (no API calls)
+            for entry in index.search(query, kinds=[NATION], limit=25):
+                if by_id is not None and entry.entity_id == by_id.entity_id:
+                    continue
+                display_name = entry.display
+                if len(display_name) > 100:  # Discord choice limit
+                    display_name = display_name[:97] + "..."
+                choices.append(app_commands.Choice(name=display_name, value=entry.entity_id))
             
-            return choices
+            return choices[:25]
             
         except Exception as e:
             self._log_error(f"Error in destroy_target_autocomplete: {str(e)}", e, "destroy_target_autocomplete")
@@ -1229,7 +1236,7 @@ class DestroyCog(commands.Cog):
                     # Force refresh Cybertr0n data via centralized query instance; persists to alliance file
                     if self.query_instance:
                         await self.query_instance.get_alliance_nations(
-                            str(self.cybertron_alliance_id), bot=self.bot, force_refresh=True
+                            str(self.cybertron_alliance_id), bot=self.bot, force_refresh=True, projection='war_range'
                         )
                 except Exception as e:
                     self.logger.warning(f"Alliance refresh before target fetch failed: {e}")
@@ -1355,6 +1362,145 @@ class DestroyCog(commands.Cog):
                 except:
                     pass
 
+    @app_commands.command(name='assign_targets', description='Plan attackers for many targets at once without double-booking members')
+    @app_commands.describe(
+        target_type='Target Type: an enemy alliance (all members) or a list of nations.',
+        targets='Targets: alliance name/ID/acronym, or nation links/IDs separated by commas or spaces.',
+        alliance_filter='Alliance Filter: Include Cybertr0n only or all AERO alliances',
+        exclude_inactive_7d_plus='Exclude nations inactive for 7+ days (True/False).'
+    )
+    @app_commands.rename(
+        exclude_inactive_7d_plus='exclude_7d_plus'
+    )
+    @app_commands.choices(
+        target_type=[
+            app_commands.Choice(name='Enemy Alliance', value='alliance'),
+            app_commands.Choice(name='Nation Links/IDs', value='nations')
+        ],
+        alliance_filter=[
+            app_commands.Choice(name='🤖 Cybertr0n', value='cybertron'),
+            app_commands.Choice(name='📇 All of AERO', value='aero')
+        ]
+    )
+    async def assign_targets(
+        self,
+        interaction: discord.Interaction,
+        target_type: str,
+        targets: str,
+        alliance_filter: str,
+        exclude_inactive_7d_plus: bool = False,
+    ):
+        """
+        Build one non-conflicting attacker plan for a list of targets or a whole enemy alliance.
+        
+        Args:
+            interaction: Discord interaction
+            target_type: 'alliance' or 'nations'
+            targets: Alliance identifier, or nation links/IDs
+            alliance_filter: Filter attackers by alliance
+        """
+        try:
+            await interaction.response.defer()
+            
+            raw = (targets or '').strip()
+            if not raw or not self.query_instance:
+                await interaction.followup.send("❌ **Missing Targets**\nPlease provide an alliance or a list of nation links/IDs.")
+                return
+            
+            loading_message = await interaction.followup.send("🔍 **Loading Targets...**")
+            target_nations: List[Dict[str, Any]] = []
+            if target_type == 'alliance':
+                alliance = await self.query_instance.resolve_alliance(raw)
+                if not alliance:
+                    await loading_message.edit(content=f"❌ **Alliance Not Found**\nCould not resolve alliance: **{raw}**")
+                    return
+                target_nations = await self.get_alliance_nations(str(alliance['id']), force_refresh=True, projection='war_range')
+                target_label = alliance.get('name') or raw
+            else:
+                nation_ids = []
+                for token in re.split(r'[\s,]+', raw):
+                    nid = self._extract_nation_id_from_link(token) if token else None
+                    if not nid and token.isdigit():
+                        nid = token
+                    if nid and nid not in nation_ids:
+                        nation_ids.append(nid)
+                if not nation_ids:
+                    await loading_message.edit(content="❌ **Invalid Nation Links/IDs**\nPlease provide Politics & War nation links or numeric nation IDs.")
+                    return
+                fetched = await asyncio.gather(*(self.query_instance.get_nation_by_id(nid) for nid in nation_ids), return_exceptions=True)
+                target_nations = [n for n in fetched if isinstance(n, dict)]
+                target_label = f"{len(target_nations)} nations"
+            
+            open_targets = [n for n in target_nations or [] if defensive_slots(n) > 0]
+            if not open_targets:
+                await loading_message.edit(content="❌ **No Open Targets**\nEvery target is beige, in vacation mode, or has no free defensive slots.")
+                return
+            
+            await loading_message.edit(content=f"⚔️ **Planning Attacks...**\nTargets: **{target_label}** ({len(open_targets)} with open slots)")
+            plan, attackers = await self.plan_target_assignments(
+                open_targets, alliance_filter=alliance_filter, exclude_inactive_7d_plus=exclude_inactive_7d_plus
+            )
+            
+            def _link(nation: Dict[str, Any]) -> str:
+                nid = nation.get('nation_id') or nation.get('id')
+                return f"[{nation.get('nation_name', 'Unknown')}](https://politicsandwar.com/nation/id={nid})"
+            
+            blocks = [
+                f"📋 **Attack Plan: {target_label}**\n"
+                f"{plan.war_count} wars on {len(plan.assignments)}/{len(open_targets)} targets, "
+                f"{len(plan.by_attacker)} members used ({plan.elapsed:.1f}s"
+                + ("" if plan.complete else ", time budget reached") + ")"
+            ]
+            ordered = sorted(open_targets, key=lambda n: float(n.get('score') or 0), reverse=True)
+            for target in ordered:
+                tid = int(target.get('nation_id') or target.get('id'))
+                assigned = plan.assignments.get(tid, [])
+                if not assigned:
+                    continue
+                lines = [f"🎯 **{_link(target)}** ({float(target.get('score') or 0):,.0f})"]
+                for aid in assigned:
+                    attacker = attackers.get(aid, {'id': aid})
+                    lines.append(f"  ⚔️ {_link(attacker)} ({float(attacker.get('score') or 0):,.0f}) · matchup {plan.values[(aid, tid)]:.0%}")
+                blocks.append("\n".join(lines))
+            uncovered = [t for t in ordered if int(t.get('nation_id') or t.get('id')) not in plan.assignments]
+            # Members in range whose offensive slots all went to other targets still count as candidates
+            out_of_range = [t for t in uncovered if not plan.candidates.get(int(t.get('nation_id') or t.get('id')))]
+            slots_taken = [t for t in uncovered if plan.candidates.get(int(t.get('nation_id') or t.get('id')))]
+            if out_of_range:
+                blocks.append("⚠️ **No attacker in range:** " + ", ".join(_link(t) for t in out_of_range))
+            if slots_taken:
+                blocks.append("⚠️ **In range, but no free attacker left:** " + ", ".join(_link(t) for t in slots_taken))
+            
+            try:
+                await loading_message.delete()
+            except Exception:
+                pass
+            
+            # Pack blocks into Discord-sized messages
+            message = ""
+            for block in blocks:
+                if message and len(message) + len(block) + 2 > 1900:
+                    sent = await interaction.followup.send(message)
+                    try:
+                        await sent.suppress_embeds()
+                    except Exception:
+                        pass
+                    message = ""
+                message = f"{message}\n\n{block}" if message else block[:1900]
+            if message:
+                sent = await interaction.followup.send(message)
+                try:
+                    await sent.suppress_embeds()
+                except Exception:
+                    pass
+            
+        except Exception as e:
+            self._log_error(f"Error in assign_targets slash command: {str(e)}", e, "assign_targets")
+            try:
+                await interaction.followup.send(f"❌ **Command Error**\nAn unexpected error occurred while planning attacks.\n\n**Error:** {str(e)}")
+            except Exception:
+                pass
+
 class OptimalAttackersView:
     """Formatter for displaying target and attacker information as plain text messages."""
     
@@ -1709,6 +1855,13 @@ async def setup(bot):
                 logging.info("Destroy slash command added to tree")
             else:
                 logging.info("Destroy slash command already registered; skipping manual add")
+        if cog and hasattr(cog, 'assign_targets'):
+            try:
+                existing_cmd = bot.tree.get_command('assign_targets')
+            except Exception:
+                existing_cmd = None
+            if existing_cmd is None:
+                bot.tree.add_command(cog.assign_targets)
         
         logging.info("DestroyCog loaded successfully")
     except Exception as e:
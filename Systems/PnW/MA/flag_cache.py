@@ -0,0 +1,296 @@
+"""Persistent cache for alliance flag (and avatar) images.
+
+Original downloads are stored under ``Systems/Data/Cache/flags`` keyed by a
+hash of the URL, next to a small JSON sidecar holding the HTTP validators
+(ETag / Last-Modified). Once an original is older than ``revalidate_seconds``
+it is revalidated with a conditional GET; a 304 only refreshes the sidecar.
+
+Decoded and resized variants (24px, 48px, ...) are kept in an in-memory LRU,
+so a treaty web with dozens of partners needs no network and no resizing
+after the first draw. Misses are fetched concurrently through one pooled
+``aiohttp`` session under a concurrency cap; failures and timeouts return
+None so callers can draw their placeholder.
+"""
+
+import asyncio
+import hashlib
+import io
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+try:
+    from .inflight import InflightCalls
+except ImportError:
+    from Systems.PnW.MA.inflight import InflightCalls
+
+try:
+    import aiohttp  # type: ignore
+except Exception:
+    aiohttp = None
+
+try:
+    from PIL import Image, ImageOps  # type: ignore
+except Exception:
+    Image = None
+    ImageOps = None
+
+_CACHE_DIR = Path(__file__).parent.parent.parent / 'Data' / 'Cache' / 'flags'
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def resize_flag(img: Any, size: Tuple[int, int]) -> Optional[Any]:
+    """Fit ``img`` into ``size`` keeping aspect ratio, padded with transparency."""
+    if Image is None or ImageOps is None or img is None:
+        return None
+    try:
+        if img.mode not in ("RGBA", "LA"):
+            img = img.convert("RGBA")
+        resized = ImageOps.contain(img, size)
+        out = Image.new("RGBA", size, (0, 0, 0, 0))
+        ox = (size[0] - resized.width) // 2
+        oy = (size[1] - resized.height) // 2
+        # Use resized as mask to preserve transparency
+        out.paste(resized, (ox, oy), resized)
+        return out
+    except Exception:
+        return None
+
+
+class FlagCache:
+    """Disk-backed originals plus in-memory resized variants for flag URLs."""
+
+    def __init__(
+        self,
+        cache_dir: Optional[Path] = None,
+        concurrency: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+        revalidate_seconds: Optional[float] = None,
+        max_variants: Optional[int] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.logger = logger or logging.getLogger(__name__)
+        self.cache_dir = Path(cache_dir) if cache_dir else _CACHE_DIR
+        self.concurrency = int(concurrency or _env_number('PNW_FLAG_FETCH_CONCURRENCY', 8))
+        self.timeout_seconds = float(timeout_seconds or _env_number('PNW_FLAG_FETCH_TIMEOUT', 10.0))
+        self.revalidate_seconds = float(revalidate_seconds or _env_number('PNW_FLAG_REVALIDATE_SECONDS', 7 * 86400))
+        self.max_variants = int(max_variants or _env_number('PNW_FLAG_MAX_VARIANTS', 1024))
+        self._session: Optional[Any] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight = InflightCalls()
+        self._variants: 'OrderedDict[Tuple[str, int, int], Any]' = OrderedDict()
+        # URLs that just failed are not retried until this monotonic time
+        self._failed_until: Dict[str, float] = {}
+        self.stats: Dict[str, int] = {
+            'variant_hits': 0,
+            'disk_hits': 0,
+            'downloads': 0,
+            'revalidated': 0,
+            'failures': 0,
+            'timeouts': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Paths and sidecars (executor side)
+    # ------------------------------------------------------------------
+
+    def _paths(self, url: str) -> Tuple[Path, Path]:
+        digest = hashlib.sha256(url.encode('utf-8')).hexdigest()[:32]
+        return self.cache_dir / f"{digest}.img", self.cache_dir / f"{digest}.json"
+
+    def _read_disk(self, url: str) -> Tuple[Optional[bytes], Dict[str, Any]]:
+        data_path, meta_path = self._paths(url)
+        try:
+            data = data_path.read_bytes()
+        except Exception:
+            return None, {}
+        try:
+            meta = json.loads(meta_path.read_text(encoding='utf-8'))
+        except Exception:
+            meta = {}
+        return data, meta
+
+    def _write_disk(self, url: str, data: Optional[bytes], meta: Dict[str, Any]) -> None:
+        data_path, meta_path = self._paths(url)
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            if data is not None:
+                tmp = data_path.with_suffix('.tmp')
+                tmp.write_bytes(data)
+                os.replace(tmp, data_path)
+            meta_path.write_text(json.dumps(meta), encoding='utf-8')
+        except Exception as e:
+            self.logger.debug(f"FlagCache: failed to store {url}: {e}")
+
+    # ------------------------------------------------------------------
+    # Network
+    # ------------------------------------------------------------------
+
+    def _ensure_loop_state(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Sessions and semaphores are bound to the loop that created them
+            self._loop = loop
+            self._session = None
+            self._semaphore = asyncio.Semaphore(max(1, self.concurrency))
+            self._inflight.clear()
+
+    def _get_session(self) -> Any:
+        if self._session is None or getattr(self._session, 'closed', False):
+            timeout = aiohttp.ClientTimeout(total=self.timeout_seconds)
+            connector = aiohttp.TCPConnector(limit=max(1, self.concurrency))
+            self._session = aiohttp.ClientSession(timeout=timeout, connector=connector)
+        return self._session
+
+    async def _download(self, url: str, meta: Dict[str, Any]) -> Tuple[Optional[bytes], Optional[Dict[str, Any]], bool]:
+        """Conditional GET; returns (body or None, new meta or None, not_modified)."""
+        headers: Dict[str, str] = {}
+        if meta.get('etag'):
+            headers['If-None-Match'] = str(meta['etag'])
+        if meta.get('last_modified'):
+            headers['If-Modified-Since'] = str(meta['last_modified'])
+        async with self._semaphore:
+            async with self._get_session().get(url, headers=headers) as resp:
+                if resp.status == 304:
+                    return None, dict(meta, checked_at=time.time()), True
+                if resp.status != 200:
+                    return None, None, False
+                body = await resp.read()
+                new_meta = {
+                    'url': url,
+                    'etag': resp.headers.get('ETag'),
+                    'last_modified': resp.headers.get('Last-Modified'),
+                    'content_type': resp.headers.get('Content-Type'),
+                    'checked_at': time.time(),
+                }
+                return body, new_meta, False
+
+    async def _load_original(self, url: str) -> Optional[bytes]:
+        loop = asyncio.get_running_loop()
+        data, meta = await loop.run_in_executor(None, self._read_disk, url)
+        fresh = data is not None and time.time() - float(meta.get('checked_at') or 0) < self.revalidate_seconds
+        if fresh:
+            self.stats['disk_hits'] += 1
+            return data
+        if aiohttp is None or self._failed_until.get(url, 0.0) > time.monotonic():
+            return data
+        try:
+            body, new_meta, not_modified = await self._download(url, meta if data is not None else {})
+        except asyncio.TimeoutError:
+            self.stats['timeouts'] += 1
+            self._failed_until[url] = time.monotonic() + 300
+            return data
+        except Exception as e:
+            self.stats['failures'] += 1
+            self._failed_until[url] = time.monotonic() + 300
+            self.logger.debug(f"FlagCache: fetch failed for {url}: {e}")
+            return data
+        if not_modified and data is not None:
+            self.stats['revalidated'] += 1
+            await loop.run_in_executor(None, self._write_disk, url, None, new_meta or meta)
+            return data
+        if body is None:
+            self.stats['failures'] += 1
+            self._failed_until[url] = time.monotonic() + 300
+            return data
+        self.stats['downloads'] += 1
+        await loop.run_in_executor(None, self._write_disk, url, body, new_meta or {})
+        # Stale resized variants of a changed flag must not be served
+        for key in [k for k in self._variants if k[0] == url]:
+            self._variants.pop(key, None)
+        return body
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def get_original(self, url: str) -> Optional[bytes]:
+        """Original image bytes for ``url`` from disk or network; concurrent callers share one fetch."""
+        url = (url or '').strip()
+        if not url:
+            return None
+        self._ensure_loop_state()
+        try:
+            return await self._inflight.run(url, lambda: self._load_original(url))
+        except Exception:
+            return None
+
+    async def get_image(self, url: str) -> Optional[Any]:
+        """Decoded PIL image of the original, or None."""
+        data = await self.get_original(url)
+        if data is None or Image is None:
+            return None
+        try:
+            return Image.open(io.BytesIO(data))
+        except Exception:
+            return None
+
+    async def get_variant(self, url: str, size: Tuple[int, int]) -> Optional[Any]:
+        """Resized RGBA variant of ``url`` (shared; paste from it, do not draw on it)."""
+        url = (url or '').strip()
+        if not url or Image is None:
+            return None
+        key = (url, int(size[0]), int(size[1]))
+        cached = self._variants.get(key)
+        if cached is not None:
+            self._variants.move_to_end(key)
+            self.stats['variant_hits'] += 1
+            return cached
+        data = await self.get_original(url)
+        if data is None:
+            return None
+        loop = asyncio.get_running_loop()
+        variant = await loop.run_in_executor(None, self._decode_resize, data, (key[1], key[2]))
+        if variant is not None:
+            self._variants[key] = variant
+            while len(self._variants) > self.max_variants:
+                self._variants.popitem(last=False)
+        return variant
+
+    @staticmethod
+    def _decode_resize(data: bytes, size: Tuple[int, int]) -> Optional[Any]:
+        try:
+            return resize_flag(Image.open(io.BytesIO(data)), size)
+        except Exception:
+            return None
+
+    async def prefetch(self, urls: Iterable[str], sizes: Iterable[int] = ()) -> None:
+        """Fetch all ``urls`` concurrently (capped) and warm the given square variant sizes."""
+        unique = list(dict.fromkeys(u.strip() for u in urls if u and u.strip()))
+        size_list = list(dict.fromkeys(int(s) for s in sizes))
+        if size_list:
+            await asyncio.gather(*[self.get_variant(u, (s, s)) for u in unique for s in size_list])
+        else:
+            await asyncio.gather(*[self.get_original(u) for u in unique])
+
+    def get_stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self.stats)
+        out['variants'] = len(self._variants)
+        return out
+
+    async def close(self) -> None:
+        if self._session is not None and not getattr(self._session, 'closed', True):
+            await self._session.close()
+        self._session = None
+
+
+_flag_cache: Optional[FlagCache] = None
+
+
+def get_flag_cache() -> FlagCache:
+    """Process-wide flag cache."""
+    global _flag_cache
+    if _flag_cache is None:
+        _flag_cache = FlagCache()
+    return _flag_cache
@@ -0,0 +1,181 @@
+"""Freshness contracts for reads of cached PnW data.
+
+A caller states how old an answer may be instead of choosing between
+"use whatever is cached" and ``force_refresh``:
+
+- ``CURRENT_TURN``: anything fetched since the current game turn began
+- ``within(300)`` / ``"5m"``: anything at most five minutes old
+- ``FRESH``: always fetch
+- ``ANY``: any cached snapshot at all
+
+``PNWAPIQuery`` answers from the freshest stored snapshot that satisfies
+the contract and only goes to the API when none does. Every answer is
+recorded in ``FreshnessTelemetry`` under the command running at the time
+(set with ``freshness_command``), so cache satisfaction and latency can be
+compared per command.
+"""
+
+import contextvars
+import logging
+import math
+import os
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional, Union
+
+try:
+    from .turns import turn_start
+except ImportError:
+    from Systems.PnW.MA.turns import turn_start
+
+CACHED = 'cached'
+FETCHED = 'fetched'
+UNSCOPED = 'unscoped'
+
+_current_command: contextvars.ContextVar = contextvars.ContextVar('pnw_freshness_command', default=UNSCOPED)
+
+_DURATION = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*$')
+_UNIT_SECONDS = {'': 1, 's': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+
+@dataclass(frozen=True)
+class Freshness:
+    """Maximum acceptable age of an answer.
+
+    ``max_age_seconds`` of None means no age bound; ``same_turn`` additionally
+    requires the data to have been fetched during the current game turn.
+    """
+    max_age_seconds: Optional[float] = None
+    same_turn: bool = False
+    label: str = ''
+
+    def age_limit(self, now: Optional[datetime] = None) -> float:
+        """Largest age in seconds that satisfies the contract right now."""
+        limit = math.inf if self.max_age_seconds is None else max(0.0, float(self.max_age_seconds))
+        if self.same_turn:
+            current = datetime.now(timezone.utc) if now is None else now.astimezone(timezone.utc)
+            since_turn = (current - turn_start(current)).total_seconds()
+            limit = min(limit, max(0.0, since_turn))
+        return limit
+
+    def accepts(self, age_seconds: Optional[float], now: Optional[datetime] = None) -> bool:
+        return age_seconds is not None and age_seconds < self.age_limit(now)
+
+    @property
+    def always_fetch(self) -> bool:
+        return self.max_age_seconds is not None and self.max_age_seconds <= 0
+
+    def __str__(self) -> str:
+        if self.label:
+            return self.label
+        return f"<= {int(self.max_age_seconds)}s" if self.max_age_seconds is not None else 'any'
+
+
+FRESH = Freshness(max_age_seconds=0, label='fresh')
+CURRENT_TURN = Freshness(same_turn=True, label='turn')
+ANY = Freshness(label='any')
+
+
+def within(seconds: float) -> Freshness:
+    return Freshness(max_age_seconds=float(seconds))
+
+
+FreshnessLike = Union[Freshness, str, int, float, None]
+
+
+def parse_freshness(value: FreshnessLike, default: Optional[Freshness] = None) -> Optional[Freshness]:
+    """Contract for ``value``: a Freshness, seconds, 'turn'/'fresh'/'any' or a duration like '5m'."""
+    if value is None:
+        return default
+    if isinstance(value, Freshness):
+        return value
+    if isinstance(value, bool):
+        return FRESH if value else default
+    if isinstance(value, (int, float)):
+        return within(value)
+    text = str(value).strip().lower()
+    named = {'turn': CURRENT_TURN, 'current_turn': CURRENT_TURN, 'fresh': FRESH, 'any': ANY}
+    if text in named:
+        return named[text]
+    match = _DURATION.match(text)
+    if match:
+        return within(float(match.group(1)) * _UNIT_SECONDS[match.group(2)])
+    return default
+
+
+def _env_contract(name: str, default: Freshness) -> Freshness:
+    return parse_freshness(os.getenv(name), default) or default
+
+
+# Defaults for callers that do not state a contract
+DEFAULT_NATION_FRESHNESS = _env_contract('PNW_NATION_FRESHNESS', CURRENT_TURN)
+DEFAULT_WAR_FRESHNESS = _env_contract('PNW_WAR_FRESHNESS', within(300))
+
+
+def current_command() -> str:
+    return _current_command.get()
+
+
+@contextmanager
+def freshness_command(name: str) -> Iterator[str]:
+    """Attribute the data reads made inside the block to command ``name``."""
+    token = _current_command.set(name or UNSCOPED)
+    try:
+        yield name
+    finally:
+        _current_command.reset(token)
+
+
+class FreshnessTelemetry:
+    """Per-command counts of cache-satisfied vs fetched reads, with latency and served age."""
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self._commands: Dict[str, Dict[str, float]] = {}
+
+    def record(self, kind: str, contract: Freshness, outcome: str, elapsed_seconds: float, age_seconds: Optional[float] = None) -> None:
+        command = current_command()
+        stats = self._commands.setdefault(command, {
+            'reads': 0, CACHED: 0, FETCHED: 0, 'cached_ms': 0.0, 'fetched_ms': 0.0, 'served_age_s': 0.0,
+        })
+        stats['reads'] += 1
+        stats[outcome] = stats.get(outcome, 0) + 1
+        stats[f"{outcome}_ms"] = stats.get(f"{outcome}_ms", 0.0) + elapsed_seconds * 1000.0
+        if age_seconds is not None:
+            stats['served_age_s'] += age_seconds
+        self.logger.debug(
+            f"freshness: {command} {kind} contract={contract} -> {outcome} in {elapsed_seconds * 1000.0:.0f}ms"
+            + (f" (age {int(age_seconds)}s)" if age_seconds is not None else "")
+        )
+
+    def get_stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {}
+        for command, s in self._commands.items():
+            reads = int(s['reads']) or 1
+            cached, fetched = int(s.get(CACHED, 0)), int(s.get(FETCHED, 0))
+            out[command] = {
+                'reads': int(s['reads']),
+                'cached': cached,
+                'fetched': fetched,
+                'satisfaction': round(cached / reads, 3),
+                'avg_cached_ms': round(s['cached_ms'] / cached, 1) if cached else None,
+                'avg_fetched_ms': round(s['fetched_ms'] / fetched, 1) if fetched else None,
+                'avg_served_age_s': round(s['served_age_s'] / reads, 1),
+            }
+        return out
+
+    def clear(self) -> None:
+        self._commands.clear()
+
+
+_telemetry: Optional[FreshnessTelemetry] = None
+
+
+def get_freshness_telemetry() -> FreshnessTelemetry:
+    """Process-wide freshness telemetry shared by every query instance."""
+    global _telemetry
+    if _telemetry is None:
+        _telemetry = FreshnessTelemetry()
+    return _telemetry
@@ -0,0 +1,252 @@
+"""Content-addressed cache for rendered PNGs.
+
+A render's inputs are canonicalized (sorted-key JSON) and hashed; the hash
+names the finished PNG. Entries live in an in-memory LRU bounded by total
+bytes and in ``Systems/Data/Cache/rendered`` bounded the same way, so a
+repeat ``/treaties`` or ``/compare`` with unchanged data re-uploads the
+stored bytes instead of drawing again. Disk I/O runs in the default executor.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, is_dataclass
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    from .inflight import InflightCalls
+except ImportError:
+    from Systems.PnW.MA.inflight import InflightCalls
+
+_CACHE_DIR = Path(__file__).parent.parent.parent / 'Data' / 'Cache' / 'rendered'
+
+# Bump to invalidate every stored image after a renderer change
+RENDER_CACHE_VERSION = 1
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(float(os.getenv(name, str(default))))
+    except Exception:
+        return default
+
+
+def _plain(value: Any) -> Any:
+    if is_dataclass(value) and not isinstance(value, type):
+        return _plain(asdict(value))
+    if isinstance(value, dict):
+        return {str(k): _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    if isinstance(value, (set, frozenset)):
+        return sorted(_plain(v) for v in value)
+    if isinstance(value, float) and value.is_integer():
+        # 3 and 3.0 describe the same chart
+        return int(value)
+    return value
+
+
+def content_key(namespace: str, payload: Any) -> str:
+    """Stable hash of ``payload`` (dicts, lists, dataclasses, scalars) scoped to ``namespace``."""
+    canonical = json.dumps(_plain(payload), sort_keys=True, separators=(',', ':'), default=str)
+    digest = hashlib.sha256(f"{RENDER_CACHE_VERSION}:{namespace}:{canonical}".encode('utf-8')).hexdigest()
+    return f"{namespace}-{digest[:40]}"
+
+
+class RenderedImageCache:
+    """Two-level (memory, disk) LRU of PNG bytes keyed by ``content_key``."""
+
+    def __init__(
+        self,
+        memory_limit_bytes: Optional[int] = None,
+        disk_limit_bytes: Optional[int] = None,
+        cache_dir: Optional[Path] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.logger = logger or logging.getLogger(__name__)
+        self.memory_limit_bytes = memory_limit_bytes or _env_int('PNW_IMAGE_CACHE_MEMORY_BYTES', 32 * 1024 * 1024)
+        self.disk_limit_bytes = disk_limit_bytes or _env_int('PNW_IMAGE_CACHE_DISK_BYTES', 256 * 1024 * 1024)
+        self.cache_dir = Path(cache_dir) if cache_dir else _CACHE_DIR
+        self._memory: 'OrderedDict[str, bytes]' = OrderedDict()
+        self._memory_bytes = 0
+        self._disk_index: Optional['OrderedDict[str, int]'] = None
+        self._disk_bytes = 0
+        self._disk_lock = threading.Lock()
+        self._inflight = InflightCalls()
+        self.stats: Dict[str, int] = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'coalesced': 0,
+            'stores': 0,
+            'memory_evictions': 0,
+            'disk_evictions': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Memory tier
+    # ------------------------------------------------------------------
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.memory_limit_bytes:
+            return
+        old = self._memory.pop(key, None)
+        if old is not None:
+            self._memory_bytes -= len(old)
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.memory_limit_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+            self.stats['memory_evictions'] += 1
+
+    # ------------------------------------------------------------------
+    # Disk tier (executor side)
+    # ------------------------------------------------------------------
+
+    def _load_disk_index(self) -> None:
+        if self._disk_index is not None:
+            return
+        entries: List[Tuple[float, str, int]] = []
+        try:
+            if self.cache_dir.exists():
+                for path in self.cache_dir.glob('*.png'):
+                    st = path.stat()
+                    entries.append((st.st_mtime, path.stem, st.st_size))
+        except Exception as e:
+            self.logger.debug(f"RenderedImageCache: disk index scan failed: {e}")
+        self._disk_index = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self._disk_bytes = sum(self._disk_index.values())
+
+    def _disk_read(self, key: str) -> Optional[bytes]:
+        with self._disk_lock:
+            return self._disk_read_locked(key)
+
+    def _disk_write(self, key: str, data: bytes) -> None:
+        with self._disk_lock:
+            self._disk_write_locked(key, data)
+
+    def _disk_read_locked(self, key: str) -> Optional[bytes]:
+        self._load_disk_index()
+        if key not in self._disk_index:
+            return None
+        path = self.cache_dir / f"{key}.png"
+        try:
+            data = path.read_bytes()
+            os.utime(path, None)
+            self._disk_index.move_to_end(key)
+            return data
+        except Exception:
+            self._disk_bytes -= self._disk_index.pop(key, 0)
+            return None
+
+    def _disk_write_locked(self, key: str, data: bytes) -> None:
+        self._load_disk_index()
+        if len(data) > self.disk_limit_bytes:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            path = self.cache_dir / f"{key}.png"
+            tmp = path.with_suffix('.tmp')
+            tmp.write_bytes(data)
+            os.replace(tmp, path)
+        except Exception as e:
+            self.logger.debug(f"RenderedImageCache: failed to write {key}: {e}")
+            return
+        self._disk_bytes -= self._disk_index.pop(key, 0)
+        self._disk_index[key] = len(data)
+        self._disk_bytes += len(data)
+        while self._disk_bytes > self.disk_limit_bytes and len(self._disk_index) > 1:
+            old_key, size = self._disk_index.popitem(last=False)
+            self._disk_bytes -= size
+            self.stats['disk_evictions'] += 1
+            try:
+                (self.cache_dir / f"{old_key}.png").unlink()
+            except Exception:
+                pass
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def get(self, key: str) -> Optional[bytes]:
+        data = self._memory.get(key)
+        if data is not None:
+            self._memory.move_to_end(key)
+            self.stats['memory_hits'] += 1
+            return data
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(None, self._disk_read, key)
+        if data is not None:
+            self.stats['disk_hits'] += 1
+            self._remember(key, data)
+            return data
+        self.stats['misses'] += 1
+        return None
+
+    async def put(self, key: str, data: bytes) -> None:
+        if not data:
+            return
+        self.stats['stores'] += 1
+        self._remember(key, data)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._disk_write, key, data)
+
+    async def get_or_render(
+        self,
+        namespace: str,
+        payload: Any,
+        render: Callable[[], Awaitable[Optional[bytes]]],
+    ) -> Optional[bytes]:
+        """Cached bytes for ``payload`` or the result of ``render()`` (stored on success).
+
+        Concurrent callers with the same key share one render (see inflight.py).
+        """
+        key = content_key(namespace, payload)
+        if key in self._inflight:
+            self.stats['coalesced'] += 1
+
+        async def _render() -> Optional[bytes]:
+            data = await self.get(key)
+            if data is None:
+                data = await render()
+                if data:
+                    await self.put(key, data)
+            return data
+
+        return await self._inflight.run(key, _render)
+
+    def hit_rate(self) -> float:
+        """Share of lookups served without rendering (callers that joined an in-flight render count as hits)."""
+        hits = self.stats['memory_hits'] + self.stats['disk_hits'] + self.stats['coalesced']
+        total = hits + self.stats['misses']
+        return hits / float(total) if total else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self.stats)
+        out.update({
+            'hit_rate': round(self.hit_rate(), 4),
+            'memory_entries': len(self._memory),
+            'memory_bytes': self._memory_bytes,
+            'disk_entries': len(self._disk_index or {}),
+            'disk_bytes': self._disk_bytes,
+            'as_of': time.time(),
+        })
+        return out
+
+
+_cache: Optional[RenderedImageCache] = None
+
+
+def get_image_cache() -> RenderedImageCache:
+    """Process-wide rendered image cache."""
+    global _cache
+    if _cache is None:
+        _cache = RenderedImageCache()
+    return _cache
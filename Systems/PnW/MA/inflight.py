@@ -0,0 +1,63 @@
+"""Sharing one running call between concurrent callers with the same key.
+
+The image, flag and view caches all build an entry once even when several
+interactions ask for it at the same moment. ``InflightCalls.run`` is that
+shared step: the first caller for a key runs the call, later callers wait for
+its result.
+
+- A result or an exception of the call is handed to every waiter.
+- If the caller running the call is cancelled (its interaction timed out),
+  the call stops and a waiting caller runs it again itself, so a cancelled
+  caller never fails or empties the result of the others.
+- The key is freed when the call ends either way; the next caller after that
+  starts a fresh call.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class InflightCalls:
+    """Calls currently running, keyed by what they compute."""
+
+    def __init__(self):
+        self._pending: Dict[Hashable, asyncio.Future] = {}
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._pending
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def clear(self) -> None:
+        """Forget running calls, e.g. when their event loop is gone."""
+        self._pending = {}
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Result of ``call()``, or of the call already running under ``key``."""
+        while True:
+            pending = self._pending.get(key)
+            if pending is None:
+                break
+            try:
+                return await asyncio.shield(pending)
+            except asyncio.CancelledError:
+                # The running call's caller was cancelled, not this one: take the call over
+                if not pending.cancelled():
+                    raise
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            try:
+                result = await call()
+            except Exception as e:
+                future.set_exception(e)
+                # Nobody else may be waiting; mark the exception retrieved
+                future.exception()
+                raise
+            future.set_result(result)
+            return result
+        finally:
+            if not future.done():
+                future.cancel()
+            self._pending.pop(key, None)
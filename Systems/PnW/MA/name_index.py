@@ -0,0 +1,401 @@
+"""In-memory fuzzy name index for nation and alliance autocomplete.
+
+Alliance names/acronyms and nation/leader names are indexed in a prefix trie
+(whole names and each word) plus a trigram table for typo-tolerant matches.
+The index is built from the locally cached ``Systems/Data/Bloc`` files and the
+AERO configuration, then kept current incrementally: query code upserts every
+alliance or nation list it fetches, and ``refresh`` only re-reads cache files
+whose modification time changed. Lookups never touch the network.
+"""
+
+import asyncio
+import heapq
+import json
+import logging
+import time
+import unicodedata
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+ALLIANCE = 'alliance'
+NATION = 'nation'
+
+EntryKey = Tuple[str, str]
+
+# Search score of a name that starts with the query (an exact name scores higher)
+PREFIX_SCORE = 500.0
+
+_BLOC_DIR = Path(__file__).parent.parent.parent / 'Data' / 'Bloc'
+
+
+def normalize_name(text: Any) -> str:
+    """Lowercase, strip accents and a leading 'the', and collapse whitespace."""
+    s = unicodedata.normalize('NFKD', str(text or ''))
+    s = ''.join(ch for ch in s if not unicodedata.combining(ch)).lower().strip()
+    if s.startswith('the '):
+        s = s[4:]
+    return ' '.join(s.split())
+
+
+def _trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+@dataclass
+class NameEntry:
+    kind: str
+    entity_id: str
+    display: str
+    terms: Tuple[str, ...]
+    payload: Dict[str, Any] = field(default_factory=dict)
+    sources: Set[str] = field(default_factory=set)
+
+    @property
+    def key(self) -> EntryKey:
+        return (self.kind, self.entity_id)
+
+
+class NameIndex:
+    """Prefix trie + trigram index with ranked fuzzy search."""
+
+    def __init__(self, scan_interval_seconds: float = 60.0, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.scan_interval_seconds = scan_interval_seconds
+        self._entries: Dict[EntryKey, NameEntry] = {}
+        self._trie: Dict[str, Any] = {}
+        self._trigrams: Dict[str, Set[EntryKey]] = {}
+        self._source_keys: Dict[str, Set[EntryKey]] = {}
+        self._file_mtimes: Dict[str, float] = {}
+        self._last_scan = 0.0
+        self._scanned = False
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+
+    def _trie_walk(self, term: str, create: bool = False) -> Optional[Dict[str, Any]]:
+        node = self._trie
+        for ch in term:
+            nxt = node.get(ch)
+            if nxt is None:
+                if not create:
+                    return None
+                nxt = node[ch] = {'': set()}
+            node = nxt
+        return node
+
+    def _index_terms(self, key: EntryKey, terms: Iterable[str], add: bool) -> None:
+        for term in terms:
+            prefixes = [term] + [w for w in term.split(' ')[1:] if w]
+            for p in prefixes:
+                node = self._trie
+                for ch in p:
+                    nxt = node.get(ch)
+                    if nxt is None:
+                        if not add:
+                            break
+                        nxt = node[ch] = {'': set()}
+                    node = nxt
+                    if add:
+                        node[''].add(key)
+                    else:
+                        node[''].discard(key)
+            for tri in _trigrams(term):
+                bucket = self._trigrams.setdefault(tri, set()) if add else self._trigrams.get(tri)
+                if bucket is None:
+                    continue
+                if add:
+                    bucket.add(key)
+                else:
+                    bucket.discard(key)
+
+    def upsert(
+        self,
+        kind: str,
+        entity_id: Any,
+        names: Iterable[Any],
+        display: Optional[str] = None,
+        payload: Optional[Dict[str, Any]] = None,
+        source: str = 'live',
+    ) -> None:
+        """Add or update an entity; ``names`` are every string it should be found by."""
+        eid = str(entity_id or '').strip()
+        if not eid:
+            return
+        terms = tuple(dict.fromkeys(t for t in (normalize_name(n) for n in names) if t))
+        if not terms:
+            return
+        key = (kind, eid)
+        display = display or terms[0]
+        existing = self._entries.get(key)
+        if existing is not None and existing.terms == terms:
+            # Unchanged names: refresh the payload without touching the trie/trigrams
+            existing.display = display
+            if payload:
+                existing.payload = dict(payload)
+            existing.sources.add(source)
+        else:
+            if existing is not None:
+                self._index_terms(key, existing.terms, add=False)
+            self._index_terms(key, terms, add=True)
+            entry = NameEntry(kind, eid, display, terms, dict(payload or {}))
+            if existing is not None:
+                entry.sources = existing.sources
+            entry.sources.add(source)
+            self._entries[key] = entry
+        self._source_keys.setdefault(source, set()).add(key)
+
+    def remove(self, kind: str, entity_id: Any) -> None:
+        key = (kind, str(entity_id))
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._index_terms(key, entry.terms, add=False)
+            for src in entry.sources:
+                self._source_keys.get(src, set()).discard(key)
+
+    def replace_source(self, source: str, keys: Set[EntryKey]) -> None:
+        """Drop entities that ``source`` no longer lists (and that no other source holds)."""
+        for key in self._source_keys.get(source, set()) - keys:
+            entry = self._entries.get(key)
+            if entry is None:
+                continue
+            entry.sources.discard(source)
+            if not entry.sources:
+                self.remove(*key)
+        self._source_keys[source] = set(keys)
+
+    def add_alliance(self, alliance: Dict[str, Any], source: str = 'live') -> Optional[EntryKey]:
+        aid = alliance.get('id') or alliance.get('alliance_id')
+        name = (alliance.get('name') or alliance.get('alliance_name') or '').strip()
+        acr = (alliance.get('acronym') or alliance.get('alliance_acronym') or '').strip()
+        if not aid or not (name or acr):
+            return None
+        display = f"{name} ({acr})" if name and acr else (name or acr)
+        self.upsert(ALLIANCE, aid, [name, acr], display=display,
+                    payload={'id': str(aid), 'name': name, 'acronym': acr}, source=source)
+        return (ALLIANCE, str(aid))
+
+    def add_nations(self, nations: Iterable[Dict[str, Any]], source: str = 'live') -> Set[EntryKey]:
+        """Index nations (and the alliances they reference); returns the keys touched."""
+        keys: Set[EntryKey] = set()
+        seen_alliances: Set[str] = set()
+        for n in nations or []:
+            if not isinstance(n, dict):
+                continue
+            nid = n.get('id') or n.get('nation_id')
+            nation_name = (n.get('nation_name') or '').strip()
+            leader = (n.get('leader_name') or '').strip()
+            if not nid or not (nation_name or leader):
+                continue
+            display = f"{nation_name} ({leader})" if nation_name and leader else (nation_name or leader)
+            self.upsert(NATION, nid, [nation_name, leader], display=display, payload={
+                'id': str(nid),
+                'nation_name': nation_name,
+                'leader_name': leader,
+                'alliance_id': str(n.get('alliance_id') or ''),
+                'score': n.get('score'),
+            }, source=source)
+            keys.add((NATION, str(nid)))
+            alliance = n.get('alliance') if isinstance(n.get('alliance'), dict) else {}
+            aid = str(alliance.get('id') or n.get('alliance_id') or '')
+            if not aid or aid in seen_alliances:
+                continue
+            seen_alliances.add(aid)
+            akey = self.add_alliance({
+                'id': aid,
+                'name': alliance.get('name') or n.get('alliance_name'),
+                'acronym': alliance.get('acronym') or n.get('alliance_acronym'),
+            }, source=source)
+            if akey:
+                keys.add(akey)
+        return keys
+
+    def add_snapshot(self, cache_key: str, nations: Iterable[Dict[str, Any]]) -> None:
+        """Index a freshly fetched alliance snapshot under the source of its cache file.
+
+        Nations that left the alliance drop out, and the later file scan finds nothing new.
+        """
+        source = f"file:{cache_key}.json"
+        self.replace_source(source, self.add_nations(nations, source=source))
+
+    # ------------------------------------------------------------------
+    # Cache-file loading
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _read_changed_files(known: Dict[str, float]) -> List[Tuple[str, float, Any]]:
+        """Executor side: parse cache files whose mtime differs from ``known``."""
+        out: List[Tuple[str, float, Any]] = []
+        if not _BLOC_DIR.exists():
+            return out
+        for pattern in ('alliance_*.json', 'treaties_*.json'):
+            for path in _BLOC_DIR.glob(pattern):
+                try:
+                    mtime = path.stat().st_mtime
+                    if known.get(str(path)) == mtime:
+                        continue
+                    with open(path, 'r', encoding='utf-8-sig') as f:
+                        out.append((str(path), mtime, json.load(f)))
+                except Exception:
+                    continue
+        return out
+
+    def _apply_file(self, path: str, data: Any) -> None:
+        source = f"file:{Path(path).name}"
+        keys: Set[EntryKey] = set()
+        if Path(path).name.startswith('treaties_'):
+            treaties = data.get('treaties') if isinstance(data, dict) else data
+            for t in treaties or []:
+                if not isinstance(t, dict):
+                    continue
+                for side in ('alliance1', 'alliance2'):
+                    akey = self.add_alliance(t.get(side) or {}, source=source)
+                    if akey:
+                        keys.add(akey)
+        else:
+            nations = data.get('nations') if isinstance(data, dict) else data
+            keys |= self.add_nations(nations or [], source=source)
+        self.replace_source(source, keys)
+
+    def seed_aero(self, aero_alliances: Dict[str, Dict[str, Any]]) -> None:
+        for cfg in (aero_alliances or {}).values():
+            aid = cfg.get('id') or (cfg.get('ids') or [None])[0]
+            if aid:
+                self.add_alliance({'id': aid, 'name': cfg.get('name'), 'acronym': cfg.get('acronym')}, source='aero')
+
+    async def refresh(self, force: bool = False) -> None:
+        """Re-read changed cache files off the event loop (rate-limited to ``scan_interval_seconds``)."""
+        now = time.monotonic()
+        if not force and self._scanned and now - self._last_scan < self.scan_interval_seconds:
+            return
+        self._last_scan = now
+        self._scanned = True
+        loop = asyncio.get_running_loop()
+        changed = await loop.run_in_executor(None, self._read_changed_files, dict(self._file_mtimes))
+        for path, mtime, data in changed:
+            try:
+                self._apply_file(path, data)
+                self._file_mtimes[path] = mtime
+            except Exception as e:
+                self.logger.debug(f"NameIndex: failed to index {path}: {e}")
+            # Let autocomplete handlers run between files during the first build
+            await asyncio.sleep(0)
+        if changed:
+            self.logger.debug(f"NameIndex: indexed {len(changed)} changed cache file(s); {len(self._entries)} entries")
+
+    def schedule_refresh(self) -> None:
+        """Fire-and-forget refresh used from autocomplete handlers."""
+        if self._refresh_task is not None and not self._refresh_task.done():
+            return
+        if time.monotonic() - self._last_scan < self.scan_interval_seconds:
+            return
+        try:
+            self._refresh_task = asyncio.get_running_loop().create_task(self.refresh())
+        except RuntimeError:
+            pass
+
+    async def ready(self) -> 'NameIndex':
+        """Build on first use, otherwise refresh in the background and return immediately."""
+        if not self._scanned:
+            await self.refresh(force=True)
+        else:
+            self.schedule_refresh()
+        return self
+
+    # ------------------------------------------------------------------
+    # Search
+    # ------------------------------------------------------------------
+
+    def get(self, kind: str, entity_id: Any) -> Optional[NameEntry]:
+        return self._entries.get((kind, str(entity_id).strip()))
+
+    def exact(self, kind: str, text: Any) -> Optional[NameEntry]:
+        """Entity whose name/acronym normalizes to exactly ``text``."""
+        q = normalize_name(text)
+        if not q:
+            return None
+        node = self._trie_walk(q)
+        if node is None:
+            return None
+        for key in node['']:
+            entry = self._entries.get(key)
+            if entry is not None and entry.kind == kind and q in entry.terms:
+                return entry
+        return None
+
+    def search(
+        self, text: Any, kinds: Optional[Iterable[str]] = None, limit: int = 25, min_score: float = 0.0
+    ) -> List[NameEntry]:
+        """Ranked matches: exact > prefix > word prefix > substring > trigram similarity.
+
+        ``min_score`` drops weaker matches, e.g. ``PREFIX_SCORE`` keeps exact and prefix matches only.
+        """
+        q = normalize_name(text)
+        if not q:
+            return []
+        kinds_set = set(kinds) if kinds else None
+        candidates: Set[EntryKey] = set()
+        node = self._trie_walk(q)
+        if node is not None:
+            candidates |= node['']
+        if len(candidates) < limit and len(q) >= 3:
+            q_tris = _trigrams(q)
+            counts: Dict[EntryKey, int] = {}
+            for tri in q_tris:
+                for key in self._trigrams.get(tri, ()):
+                    counts[key] = counts.get(key, 0) + 1
+            need = max(1, int(len(q_tris) * 0.4))
+            fuzzy = [k for k, c in counts.items() if c >= need and k not in candidates]
+            # Only the closest trigram overlaps are worth a full score
+            candidates.update(heapq.nlargest(limit * 8, fuzzy, key=counts.__getitem__))
+
+        q_tris = _trigrams(q)
+
+        def score(key: EntryKey) -> Tuple[float, int, str]:
+            entry = self._entries[key]
+            best = 0.0
+            for term in entry.terms:
+                if term == q:
+                    s = 1000.0
+                elif term.startswith(q):
+                    s = PREFIX_SCORE
+                elif any(w.startswith(q) for w in term.split(' ')):
+                    s = 300.0
+                elif q in term:
+                    s = 200.0
+                else:
+                    tt = _trigrams(term)
+                    s = 150.0 * len(q_tris & tt) / float(len(q_tris | tt) or 1)
+                best = max(best, s)
+            return (-best, min(len(t) for t in entry.terms), entry.display.lower())
+
+        pool = [k for k in candidates if k in self._entries and (kinds_set is None or k[0] in kinds_set)]
+        ranked = heapq.nsmallest(limit, pool, key=score)
+        if min_score > 0:
+            ranked = [k for k in ranked if -score(k)[0] >= min_score]
+        return [self._entries[k] for k in ranked]
+
+
+_index: Optional[NameIndex] = None
+
+
+def get_name_index() -> NameIndex:
+    """Process-wide name index, seeded with the AERO alliances on first use."""
+    global _index
+    if _index is None:
+        _index = NameIndex()
+        try:
+            try:
+                from .bloc import AERO_ALLIANCES
+            except ImportError:
+                from Systems.PnW.MA.bloc import AERO_ALLIANCES
+            _index.seed_aero(AERO_ALLIANCES)
+        except Exception:
+            pass
+    return _index
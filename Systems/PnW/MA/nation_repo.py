@@ -0,0 +1,302 @@
+"""Process-wide nation repository keyed by nation id.
+
+Every alliance snapshot, batched party fetch, single-nation lookup and war
+page that passes through ``PNWAPIQuery`` is ingested here, so all MA cogs
+share one copy of each nation instead of keeping their own caches:
+
+* records are deduplicated by nation id; an older fetch never replaces a
+  newer one, and each record carries the time its data was fetched;
+* records remember which fields they hold (dotted paths, see
+  projections.py). A narrower fetch is merged into a wider record, and a
+  nested group (``cities``, ``alliance``, ...) is replaced as a whole so a
+  record never mixes two versions of the same list;
+* alliance membership is stored as a list of nation ids with its own fetch
+  time, so a whole alliance can be answered from the repository;
+* the repository is an LRU bounded by ``PNW_NATION_REPO_MAX`` nations.
+
+Records are shared: callers must copy a nation before mutating it.
+"""
+
+import logging
+import os
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+try:
+    from .projections import covers, nation_fields_for, normalize_projection
+except ImportError:
+    from Systems.PnW.MA.projections import covers, nation_fields_for, normalize_projection
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _nation_id(nation: Any) -> Optional[int]:
+    if not isinstance(nation, dict):
+        return None
+    try:
+        nid = int(nation.get('id') or nation.get('nation_id') or 0)
+    except Exception:
+        return None
+    return nid or None
+
+
+def _tops(fields: Iterable[str]) -> FrozenSet[str]:
+    return frozenset(f.split('.', 1)[0] for f in fields)
+
+
+@dataclass
+class NationRecord:
+    nation: Dict[str, Any]
+    fetched_at: float
+    # Dotted field paths held by ``nation``
+    fields: FrozenSet[str]
+
+    def age(self, now: Optional[float] = None) -> float:
+        return (time.time() if now is None else now) - self.fetched_at
+
+
+class NationRepository:
+    """Deduplicated, fetch-time versioned nation records shared by every cog."""
+
+    def __init__(self, max_nations: Optional[int] = None, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self.max_nations = int(max_nations or _env_number('PNW_NATION_REPO_MAX', 25000))
+        self._records: 'OrderedDict[int, NationRecord]' = OrderedDict()
+        # alliance id -> (fetched_at, projection, member nation ids)
+        self._alliances: Dict[int, Tuple[float, str, Tuple[int, ...]]] = {}
+        self._by_name: Dict[str, int] = {}
+        self._by_leader: Dict[str, int] = {}
+        self.stats: Dict[str, int] = {
+            'hits': 0, 'misses': 0, 'ingested': 0, 'replaced': 0, 'merged': 0,
+            'unchanged': 0, 'kept_newer': 0, 'evicted': 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Ingest
+    # ------------------------------------------------------------------
+
+    def ingest(
+        self,
+        nations: Iterable[Dict[str, Any]],
+        projection: Optional[str] = None,
+        fetched_at: Optional[float] = None,
+        alliance_id: Optional[Any] = None,
+    ) -> List[Dict[str, Any]]:
+        """Store ``nations`` (fetched with ``projection`` at epoch ``fetched_at``); returns the shared records.
+
+        With ``alliance_id`` the list is also recorded as that alliance's membership.
+        """
+        proj = normalize_projection(projection)
+        fields = frozenset(nation_fields_for(proj))
+        when = time.time() if fetched_at is None else float(fetched_at)
+        out: List[Dict[str, Any]] = []
+        member_ids: List[int] = []
+        for nation in nations or []:
+            nid = _nation_id(nation)
+            if nid is None:
+                out.append(nation)
+                continue
+            out.append(self._ingest_one(nid, nation, fields, when))
+            member_ids.append(nid)
+        if alliance_id is not None:
+            try:
+                aid = int(alliance_id)
+            except Exception:
+                aid = 0
+            previous = self._alliances.get(aid)
+            if aid and (previous is None or previous[0] <= when):
+                self._alliances[aid] = (when, proj, tuple(member_ids))
+        self._evict()
+        return out
+
+    def ingest_nation(self, nation: Dict[str, Any], projection: Optional[str] = None, fetched_at: Optional[float] = None) -> Dict[str, Any]:
+        records = self.ingest([nation], projection=projection, fetched_at=fetched_at)
+        return records[0] if records else nation
+
+    def _ingest_one(self, nid: int, nation: Dict[str, Any], fields: FrozenSet[str], when: float) -> Dict[str, Any]:
+        self.stats['ingested'] += 1
+        record = self._records.get(nid)
+        if record is None:
+            record = NationRecord(nation, when, fields)
+            self._records[nid] = record
+            self._index(nid, nation)
+            return nation
+        self._records.move_to_end(nid)
+        if record.nation is nation:
+            self.stats['unchanged'] += 1
+            return nation
+        if record.fetched_at > when and fields <= record.fields:
+            # A newer fetch already holds everything this one has
+            self.stats['kept_newer'] += 1
+            return record.nation
+        if fields >= record.fields and when >= record.fetched_at:
+            self.stats['replaced'] += 1
+            self._records[nid] = NationRecord(nation, when, fields)
+            self._index(nid, nation)
+            return nation
+        # Narrower fetch: merge field groups (a nested group is replaced whole, never mixed)
+        self.stats['merged'] += 1
+        merged = dict(record.nation)
+        if when >= record.fetched_at:
+            new_tops = _tops(fields)
+            merged.update(nation)
+            merged_fields = frozenset(f for f in record.fields if f.split('.', 1)[0] not in new_tops) | fields
+        else:
+            # Older data only fills groups the record lacks
+            old_tops = _tops(record.fields)
+            for key, value in nation.items():
+                if key not in old_tops and key not in merged:
+                    merged[key] = value
+            merged_fields = record.fields | frozenset(f for f in fields if f.split('.', 1)[0] not in old_tops)
+        # The record is only as fresh as its oldest part
+        self._records[nid] = NationRecord(merged, min(when, record.fetched_at), merged_fields)
+        self._index(nid, merged)
+        return merged
+
+    def _index(self, nid: int, nation: Dict[str, Any]) -> None:
+        name = str(nation.get('nation_name') or '').strip().lower()
+        leader = str(nation.get('leader_name') or '').strip().lower()
+        if name:
+            self._by_name[name] = nid
+        if leader:
+            self._by_leader[leader] = nid
+
+    def note_war_participants(self, wars: Iterable[Dict[str, Any]], fetched_at: Optional[float] = None) -> int:
+        """Update the alliance of known nations from war headers; returns how many changed.
+
+        War payloads only carry a nation's id and alliance, so they never create records.
+        """
+        when = time.time() if fetched_at is None else float(fetched_at)
+        changed = 0
+        for w in wars or []:
+            if not isinstance(w, dict):
+                continue
+            for side in ('attacker', 'defender'):
+                info = w.get(side) or {}
+                nid = _nation_id(info)
+                record = self._records.get(nid) if nid else None
+                if record is None or record.fetched_at >= when or info.get('alliance_id') is None:
+                    continue
+                if str(record.nation.get('alliance_id')) != str(info.get('alliance_id')):
+                    merged = dict(record.nation)
+                    merged['alliance_id'] = info.get('alliance_id')
+                    self._records[nid] = NationRecord(merged, record.fetched_at, record.fields)
+                    changed += 1
+        return changed
+
+    def _evict(self) -> None:
+        while len(self._records) > self.max_nations:
+            nid, record = self._records.popitem(last=False)
+            self.stats['evicted'] += 1
+            for index, key in ((self._by_name, 'nation_name'), (self._by_leader, 'leader_name')):
+                name = str(record.nation.get(key) or '').strip().lower()
+                if index.get(name) == nid:
+                    index.pop(name, None)
+
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+
+    def _usable(self, record: Optional[NationRecord], max_age: Optional[float], projection: Optional[str], now: float) -> bool:
+        if record is None:
+            return False
+        if max_age is not None and record.age(now) >= max_age:
+            return False
+        return covers(record.fields, nation_fields_for(projection))
+
+    def get(self, nation_id: Any, max_age: Optional[float] = None, projection: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Shared record for ``nation_id`` holding ``projection`` and younger than ``max_age`` seconds."""
+        try:
+            nid = int(nation_id)
+        except Exception:
+            return None
+        record = self._records.get(nid)
+        if not self._usable(record, max_age, projection, time.time()):
+            self.stats['misses'] += 1
+            return None
+        self._records.move_to_end(nid)
+        self.stats['hits'] += 1
+        return record.nation
+
+    def find(self, name: Optional[str] = None, leader: Optional[str] = None, max_age: Optional[float] = None, projection: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Record by exact (case-insensitive) nation or leader name."""
+        index, key = (self._by_name, name) if name else (self._by_leader, leader)
+        nid = index.get(str(key or '').strip().lower())
+        if nid is None:
+            self.stats['misses'] += 1
+            return None
+        return self.get(nid, max_age=max_age, projection=projection)
+
+    def get_many(self, nation_ids: Iterable[Any], max_age: Optional[float] = None, projection: Optional[str] = None) -> Dict[int, Dict[str, Any]]:
+        out: Dict[int, Dict[str, Any]] = {}
+        for nid in nation_ids or []:
+            nation = self.get(nid, max_age=max_age, projection=projection)
+            if nation is not None:
+                out[int(nid)] = nation
+        return out
+
+    def alliance_members(self, alliance_id: Any, max_age: Optional[float] = None, projection: Optional[str] = None) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+        """``(nations, age_seconds)`` for an alliance if its membership and every member qualify."""
+        try:
+            entry = self._alliances.get(int(alliance_id))
+        except Exception:
+            entry = None
+        now = time.time()
+        if entry is None or (max_age is not None and now - entry[0] >= max_age):
+            self.stats['misses'] += 1
+            return None
+        nations: List[Dict[str, Any]] = []
+        oldest = entry[0]
+        for nid in entry[2]:
+            record = self._records.get(nid)
+            if not self._usable(record, max_age, projection, now):
+                self.stats['misses'] += 1
+                return None
+            nations.append(record.nation)
+            oldest = min(oldest, record.fetched_at)
+        for nid in entry[2]:
+            self._records.move_to_end(nid)
+        self.stats['hits'] += 1
+        return nations, now - oldest
+
+    def age(self, nation_id: Any) -> Optional[float]:
+        try:
+            record = self._records.get(int(nation_id))
+        except Exception:
+            return None
+        return record.age() if record else None
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def clear(self) -> None:
+        self._records.clear()
+        self._alliances.clear()
+        self._by_name.clear()
+        self._by_leader.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self.stats)
+        out['nations'] = len(self._records)
+        out['alliances'] = len(self._alliances)
+        lookups = self.stats['hits'] + self.stats['misses']
+        out['hit_rate'] = round(self.stats['hits'] / lookups, 3) if lookups else None
+        return out
+
+
+_repository: Optional[NationRepository] = None
+
+
+def get_nation_repository() -> NationRepository:
+    """Process-wide repository shared by query.py and the MA cogs."""
+    global _repository
+    if _repository is None:
+        _repository = NationRepository()
+    return _repository
@@ -0,0 +1,494 @@
+"""Per-nation time series of score, cities, infrastructure and unit counts.
+
+Every nation fetched by ``PNWAPIQuery`` is recorded here, keyed by nation id
+and game turn (``epoch // TURN_SECONDS``), so questions like "who bought
+planes in the last 3 turns" or "where is this target's score heading" are
+answered locally instead of from the overwritten alliance snapshots.
+
+* Each nation is a ``NationSeries``: an ``array('i')`` of turn numbers plus
+  one ``array('f')`` per column, sorted by turn so range scans are a bisect.
+* Rows are change points: a value holds until the next row. A fetch in the
+  same turn as the last row is merged into it, an unchanged fetch adds
+  nothing, and a field the fetch did not carry (NaN) keeps its last value.
+* Rows older than ``PNW_SERIES_DOWNSAMPLE_DAYS`` (default 30) are reduced
+  to the last row of each game day.
+* The store is saved as ``Bloc/nation_series.bin`` (magic ``PNS1``, JSON
+  header, zlib body) at most every ``PNW_SERIES_SAVE_SECONDS`` (default 300).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from bisect import bisect_right
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    from .turns import TURN_SECONDS
+except ImportError:
+    from Systems.PnW.MA.turns import TURN_SECONDS
+
+MAGIC = b'PNS1'
+STORE_KEY = 'nation_series'
+COLUMNS: Tuple[str, ...] = (
+    'score', 'cities', 'infrastructure', 'soldiers', 'tanks', 'aircraft', 'ships', 'missiles', 'nukes', 'spies',
+)
+UNIT_COLUMNS: Tuple[str, ...] = ('soldiers', 'tanks', 'aircraft', 'ships', 'missiles', 'nukes', 'spies')
+TURNS_PER_DAY = 86400 // TURN_SECONDS
+_COL = {name: i for i, name in enumerate(COLUMNS)}
+_NAN = float('nan')
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def turn_number(ts: Optional[float] = None) -> int:
+    """Game turn containing epoch ``ts`` (default now)."""
+    return int((time.time() if ts is None else ts) // TURN_SECONDS)
+
+
+def turn_time(turn: int) -> float:
+    """Epoch seconds at which ``turn`` starts."""
+    return float(turn * TURN_SECONDS)
+
+
+def _number(value: Any) -> float:
+    if value is None:
+        return _NAN
+    try:
+        return float(value)
+    except Exception:
+        return _NAN
+
+
+def _extract(nation: Dict[str, Any]) -> List[float]:
+    values = [_NAN] * len(COLUMNS)
+    values[_COL['score']] = _number(nation.get('score'))
+    cities = nation.get('cities')
+    if isinstance(cities, list) and cities:
+        values[_COL['cities']] = float(len(cities))
+        if any(isinstance(c, dict) and 'infrastructure' in c for c in cities):
+            values[_COL['infrastructure']] = sum(float(c.get('infrastructure') or 0) for c in cities if isinstance(c, dict))
+    elif nation.get('num_cities') is not None:
+        values[_COL['cities']] = _number(nation.get('num_cities'))
+    for name in UNIT_COLUMNS:
+        values[_COL[name]] = _number(nation.get(name))
+    return values
+
+
+class NationSeries:
+    """Change-point rows for one nation: turn numbers plus one float32 column per metric."""
+
+    __slots__ = ('turns', 'cols')
+
+    def __init__(self):
+        self.turns = array('i')
+        self.cols: List[array] = [array('f') for _ in COLUMNS]
+
+    def __len__(self) -> int:
+        return len(self.turns)
+
+    def row(self, k: int) -> Tuple[float, ...]:
+        return tuple(col[k] for col in self.cols)
+
+    def index_at(self, turn: int) -> int:
+        """Index of the row in effect at ``turn`` (-1 if the series starts later)."""
+        return bisect_right(self.turns, turn) - 1
+
+    def record(self, turn: int, values: Sequence[float]) -> str:
+        """Add one observation; returns 'appended', 'merged', 'unchanged' or 'stale'."""
+        n = len(self.turns)
+        if n and turn < self.turns[-1]:
+            return 'stale'
+        if n:
+            last = self.row(n - 1)
+            values = [v if v == v else last[i] for i, v in enumerate(values)]
+        # Compare as stored float32 bytes so rounding and NaN (never seen) compare equal
+        packed = array('f', values)
+        if n and packed.tobytes() == array('f', last).tobytes():
+            return 'unchanged'
+        if n and turn == self.turns[-1]:
+            for i, col in enumerate(self.cols):
+                col[-1] = packed[i]
+            return 'merged'
+        self.turns.append(turn)
+        for i, col in enumerate(self.cols):
+            col.append(packed[i])
+        return 'appended'
+
+    def downsample(self, before_turn: int) -> int:
+        """Keep only the last row of each game day before ``before_turn``; returns rows removed."""
+        n = len(self.turns)
+        keep = [
+            k for k in range(n)
+            if self.turns[k] >= before_turn
+            or k == n - 1
+            or self.turns[k + 1] // TURNS_PER_DAY != self.turns[k] // TURNS_PER_DAY
+        ]
+        if len(keep) == n:
+            return 0
+        self.turns = array('i', (self.turns[k] for k in keep))
+        self.cols = [array('f', (col[k] for k in keep)) for col in self.cols]
+        return n - len(keep)
+
+
+class NationSeriesStore:
+    """All nation series, with change detection and score forecasting over them."""
+
+    def __init__(
+        self,
+        downsample_days: Optional[float] = None,
+        save_interval_seconds: Optional[float] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.logger = logger or logging.getLogger(__name__)
+        self.downsample_days = float(downsample_days or _env_number('PNW_SERIES_DOWNSAMPLE_DAYS', 30))
+        self.save_interval_seconds = float(save_interval_seconds if save_interval_seconds is not None else _env_number('PNW_SERIES_SAVE_SECONDS', 300))
+        self._series: Dict[int, NationSeries] = {}
+        # Last alliance each nation was seen in, for alliance-scoped scans
+        self._alliance: Dict[int, int] = {}
+        self.store: Any = None
+        self._loaded = False
+        self._dirty = False
+        self._last_save = 0.0
+        self._compacted_day = -1
+        self._lock: Optional[asyncio.Lock] = None
+        self.stats: Dict[str, int] = {'appended': 0, 'merged': 0, 'unchanged': 0, 'stale': 0, 'downsampled': 0, 'saves': 0}
+
+    def bind(self, store: Any) -> None:
+        """Set the ``save_binary_data``/``load_binary_data`` store if none is set yet."""
+        if self.store is None and store is not None:
+            self.store = store
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    def record(self, nations: Iterable[Dict[str, Any]], fetched_at: Optional[float] = None, alliance_id: Any = None) -> int:
+        """Record a fetch of ``nations`` made at epoch ``fetched_at``; returns rows appended."""
+        turn = turn_number(fetched_at)
+        appended = 0
+        for nation in nations or []:
+            if not isinstance(nation, dict):
+                continue
+            try:
+                nid = int(nation.get('id') or nation.get('nation_id') or 0)
+            except Exception:
+                continue
+            if not nid:
+                continue
+            values = _extract(nation)
+            if all(v != v for v in values):
+                continue
+            series = self._series.get(nid)
+            if series is None:
+                series = self._series[nid] = NationSeries()
+            outcome = series.record(turn, values)
+            self.stats[outcome] += 1
+            if outcome in ('appended', 'merged'):
+                self._dirty = True
+                appended += outcome == 'appended'
+            aid = nation.get('alliance_id', alliance_id)
+            if aid is not None:
+                try:
+                    self._alliance[nid] = int(aid or 0)
+                except Exception:
+                    pass
+        if turn // TURNS_PER_DAY != self._compacted_day:
+            self._compacted_day = turn // TURNS_PER_DAY
+            self.compact(turn)
+        return appended
+
+    def compact(self, now_turn: Optional[int] = None) -> int:
+        """Downsample rows older than ``downsample_days``; returns rows removed."""
+        cutoff = (turn_number() if now_turn is None else now_turn) - int(self.downsample_days * TURNS_PER_DAY)
+        removed = sum(s.downsample(cutoff) for s in self._series.values())
+        if removed:
+            self.stats['downsampled'] += removed
+            self._dirty = True
+        return removed
+
+    async def ingest(self, nations: Iterable[Dict[str, Any]], fetched_at: Optional[float] = None, alliance_id: Any = None) -> int:
+        """``record`` after loading the saved store, then save if the save interval has passed."""
+        await self.load()
+        appended = self.record(nations, fetched_at=fetched_at, alliance_id=alliance_id)
+        await self.save()
+        return appended
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def series(self, nation_id: Any, since_turn: Optional[int] = None, columns: Optional[Sequence[str]] = None) -> List[Dict[str, Any]]:
+        """Rows for ``nation_id`` from ``since_turn`` on (the row in effect then included), oldest first."""
+        s = self._series.get(int(nation_id)) if str(nation_id).isdigit() else None
+        if s is None:
+            return []
+        names = [c for c in (columns or COLUMNS) if c in _COL]
+        start = max(0, s.index_at(since_turn)) if since_turn is not None else 0
+        out = []
+        for k in range(start, len(s)):
+            row = {'turn': s.turns[k], 'ts': turn_time(s.turns[k])}
+            for name in names:
+                v = s.cols[_COL[name]][k]
+                row[name] = None if v != v else v
+            out.append(row)
+        return out
+
+    def value_at(self, nation_id: Any, column: str, turn: Optional[int] = None) -> Optional[float]:
+        s = self._series.get(int(nation_id)) if str(nation_id).isdigit() else None
+        if s is None or column not in _COL:
+            return None
+        k = s.index_at(turn_number() if turn is None else turn)
+        if k < 0:
+            return None
+        v = s.cols[_COL[column]][k]
+        return None if v != v else v
+
+    def changes(
+        self,
+        column: str,
+        turns: int = 3,
+        min_delta: float = 1.0,
+        alliance_ids: Optional[Iterable[Any]] = None,
+        nation_ids: Optional[Iterable[Any]] = None,
+        now_turn: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Nations whose ``column`` moved by at least ``min_delta`` over the last ``turns`` turns.
+
+        A positive ``min_delta`` finds increases (e.g. planes bought), a negative one decreases.
+        Returns ``{nation_id, before, after, delta, turn}`` sorted by the size of the move.
+        """
+        if column not in _COL:
+            return []
+        now = turn_number() if now_turn is None else now_turn
+        start = now - max(1, int(turns))
+        c = _COL[column]
+        if nation_ids is not None:
+            candidates = [int(n) for n in nation_ids if str(n).isdigit()]
+        elif alliance_ids is not None:
+            wanted = {int(a) for a in alliance_ids if str(a).isdigit()}
+            candidates = [nid for nid, aid in self._alliance.items() if aid in wanted]
+        else:
+            candidates = list(self._series)
+        out = []
+        for nid in candidates:
+            s = self._series.get(nid)
+            if s is None or not len(s) or s.turns[-1] <= start:
+                continue
+            k0 = s.index_at(start)
+            if k0 < 0:
+                continue
+            before, after = s.cols[c][k0], s.cols[c][-1]
+            if before != before or after != after:
+                continue
+            delta = after - before
+            if (min_delta >= 0 and delta >= min_delta) or (min_delta < 0 and delta <= min_delta):
+                out.append({'nation_id': nid, 'before': before, 'after': after, 'delta': delta, 'turn': s.turns[-1]})
+        out.sort(key=lambda r: abs(r['delta']), reverse=True)
+        return out
+
+    def unit_changes(self, nation_id: Any, turns: int = TURNS_PER_DAY, now_turn: Optional[int] = None) -> Dict[str, float]:
+        """Net change of each unit column over the last ``turns`` turns (non-zero only)."""
+        now = turn_number() if now_turn is None else now_turn
+        out: Dict[str, float] = {}
+        for name in UNIT_COLUMNS:
+            before = self.value_at(nation_id, name, now - turns)
+            after = self.value_at(nation_id, name, now)
+            if before is not None and after is not None and after != before:
+                out[name] = after - before
+        return out
+
+    def forecast(
+        self,
+        nation_id: Any,
+        column: str = 'score',
+        horizon_turns: int = TURNS_PER_DAY,
+        window_turns: int = 7 * TURNS_PER_DAY,
+        now_turn: Optional[int] = None,
+    ) -> Optional[Dict[str, float]]:
+        """Least-squares trend of ``column`` over the last ``window_turns`` projected ``horizon_turns`` ahead."""
+        now = turn_number() if now_turn is None else now_turn
+        rows = self.series(nation_id, since_turn=now - window_turns, columns=[column])
+        points = [(max(r['turn'], now - window_turns), r[column]) for r in rows if r.get(column) is not None]
+        if not points:
+            return None
+        # The latest value still holds now
+        points.append((now, points[-1][1]))
+        if len({t for t, _ in points}) < 2:
+            return None
+        n = len(points)
+        mean_t = sum(t for t, _ in points) / n
+        mean_v = sum(v for _, v in points) / n
+        var = sum((t - mean_t) ** 2 for t, _ in points)
+        slope = sum((t - mean_t) * (v - mean_v) for t, v in points) / var if var else 0.0
+        current = points[-1][1]
+        return {
+            'current': current,
+            'slope_per_turn': slope,
+            'slope_per_day': slope * TURNS_PER_DAY,
+            'predicted': current + slope * horizon_turns,
+            'horizon_turns': float(horizon_turns),
+            'samples': float(len(rows)),
+        }
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def _snapshot(self) -> Tuple[Dict[str, Any], List[bytes]]:
+        ids = list(self._series)
+        turns = array('i')
+        cols = [array('f') for _ in COLUMNS]
+        for nid in ids:
+            s = self._series[nid]
+            turns.extend(s.turns)
+            for i, col in enumerate(s.cols):
+                cols[i].extend(col)
+        header = {
+            'byteorder': sys.byteorder,
+            'columns': list(COLUMNS),
+            'nations': ids,
+            'rows': [len(self._series[nid]) for nid in ids],
+            'alliances': [self._alliance.get(nid, 0) for nid in ids],
+        }
+        return header, [turns.tobytes()] + [col.tobytes() for col in cols]
+
+    @staticmethod
+    def _encode(header: Dict[str, Any], parts: List[bytes], level: int = 6) -> bytes:
+        head = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        return MAGIC + struct.pack('<I', len(head)) + head + zlib.compress(b''.join(parts), level)
+
+    def dumps(self) -> bytes:
+        return self._encode(*self._snapshot())
+
+    def loads(self, data: bytes) -> None:
+        """Merge a ``dumps`` blob under the series held in memory (memory wins for overlapping turns)."""
+        self._merge(self._decode(data))
+
+    @staticmethod
+    def _decode(data: bytes) -> List[Tuple[int, NationSeries, int]]:
+        """``(nation id, series, alliance id)`` for each nation in a ``dumps`` blob."""
+        if data[:4] != MAGIC:
+            raise ValueError("not a nation series blob")
+        (head_len,) = struct.unpack('<I', data[4:8])
+        header = json.loads(data[8:8 + head_len].decode('utf-8'))
+        body = zlib.decompress(data[8 + head_len:])
+        ids = header.get('nations') or []
+        counts = header.get('rows') or []
+        names = header.get('columns') or []
+        total = sum(counts)
+        turns = array('i')
+        turns.frombytes(body[:4 * total])
+        cols = []
+        for j in range(len(names)):
+            col = array('f')
+            col.frombytes(body[4 * total * (j + 1):4 * total * (j + 2)])
+            cols.append(col)
+        if header.get('byteorder') != sys.byteorder:
+            turns.byteswap()
+            for col in cols:
+                col.byteswap()
+        index = {name: j for j, name in enumerate(names)}
+        out: List[Tuple[int, NationSeries, int]] = []
+        offset = 0
+        for nid, count, aid in zip(ids, counts, header.get('alliances') or [0] * len(ids)):
+            saved = NationSeries()
+            saved.turns = turns[offset:offset + count]
+            saved.cols = [
+                cols[index[name]][offset:offset + count] if name in index else array('f', [_NAN] * count)
+                for name in COLUMNS
+            ]
+            offset += count
+            out.append((nid, saved, aid))
+        return out
+
+    def _merge(self, decoded: List[Tuple[int, NationSeries, int]]) -> None:
+        for nid, saved, aid in decoded:
+            held = self._series.get(nid)
+            if held is not None:
+                for k in range(len(held)):
+                    saved.record(held.turns[k], held.row(k))
+            self._series[nid] = saved
+            self._alliance.setdefault(nid, aid)
+
+    async def load(self) -> None:
+        if self._loaded:
+            return
+        if self.store is None:
+            self._loaded = True
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._loaded:
+                return
+            try:
+                data = await self.store.load_binary_data(STORE_KEY)
+                if data:
+                    # Decode in the executor, merge on the loop: record() may add rows meanwhile
+                    loop = asyncio.get_running_loop()
+                    decoded = await loop.run_in_executor(None, self._decode, data)
+                    self._merge(decoded)
+                    self.logger.debug(f"NationSeriesStore: loaded series for {len(self._series)} nations")
+            except Exception as e:
+                self.logger.warning(f"NationSeriesStore: could not load saved series: {e}")
+            finally:
+                self._loaded = True
+
+    async def save(self, force: bool = False) -> bool:
+        """Save if there are new rows and the save interval has passed (or ``force``)."""
+        if self.store is None or not self._dirty:
+            return False
+        if not force and time.time() - self._last_save < self.save_interval_seconds:
+            return False
+        # Never write before the saved series are merged in, or the file would lose them
+        await self.load()
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Copy the columns on the loop; compress in the executor
+            header, parts = self._snapshot()
+            self._dirty = False
+            self._last_save = time.time()
+            try:
+                loop = asyncio.get_running_loop()
+                payload = await loop.run_in_executor(None, self._encode, header, parts)
+                if not await self.store.save_binary_data(STORE_KEY, payload):
+                    self._dirty = True
+                    return False
+                self.stats['saves'] += 1
+                return True
+            except Exception as e:
+                self._dirty = True
+                self.logger.warning(f"NationSeriesStore: failed to save series: {e}")
+                return False
+
+    def get_stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self.stats)
+        out['nations'] = len(self._series)
+        out['rows'] = sum(len(s) for s in self._series.values())
+        return out
+
+
+_store: Optional[NationSeriesStore] = None
+
+
+def get_nation_series() -> NationSeriesStore:
+    """Process-wide nation time-series store."""
+    global _store
+    if _store is None:
+        _store = NationSeriesStore()
+    return _store
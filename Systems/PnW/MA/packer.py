@@ -0,0 +1,287 @@
+"""Cost-aware packing of aliased GraphQL sub-queries for the PnW API.
+
+Multi-entity fetches (wars for N alliances, nations for N alliances, N name
+lookups) are expressed as ``SubQuery`` objects. ``AliasPacker`` estimates the
+response size of each one, bin-packs them into as few aliased requests as the
+cost and alias limits allow, follows ``page`` continuations per alias, and
+hands each caller its own blocks back keyed by ``SubQuery.key``.
+
+When the server rejects a request as too complex or too large, the batch is
+split in half and the packer lowers its cost ceiling so later batches stay
+under the limit the server actually enforces; each successful batch raises the
+ceiling back toward ``PNW_MAX_QUERY_COST``. Other failures (rate limits, server
+errors, timeouts) are retried with backoff without splitting.
+"""
+
+import asyncio
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, List, Optional, Tuple
+
+# Expected rows per nested list field when estimating response size
+LIST_FANOUT: Dict[str, int] = {
+    'nations': 60,
+    'cities': 25,
+    'attacks': 12,
+    'treaties': 10,
+    'bankrecs': 50,
+    'trades': 50,
+}
+
+_TOKEN_RE = re.compile(r'[{}]|[A-Za-z_][A-Za-z0-9_]*')
+
+# Error messages of requests the server rejected for their size rather than a transient fault
+_SIZE_ERROR_RE = re.compile(r'complexity|too (large|big|complex)|too many (aliases|fields|nodes)|max(imum)? \w+ (cost|depth|aliases)|payload', re.I)
+
+# Growth of a lowered cost ceiling after each successful batch
+CEILING_RECOVERY = 1.25
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def is_size_rejection(error: BaseException) -> bool:
+    """Whether ``error`` says the request was too complex or too large, so a smaller one can succeed."""
+    response = getattr(error, 'response', None)
+    if getattr(response, 'status_code', None) == 413:
+        return True
+    return bool(_SIZE_ERROR_RE.search(str(error)))
+
+
+def estimate_selection_cost(selection: str, fanout: Optional[Dict[str, int]] = None) -> float:
+    """Approximate number of scalar values a selection returns for one parent row.
+
+    Every leaf field counts 1, multiplied by the fan-out of each enclosing list field.
+    """
+    fanout = LIST_FANOUT if fanout is None else fanout
+    tokens = _TOKEN_RE.findall(selection or '')
+    stack: List[float] = [1.0]
+    cost = 0.0
+    for i, tok in enumerate(tokens):
+        if tok == '{':
+            continue
+        if tok == '}':
+            if len(stack) > 1:
+                stack.pop()
+            continue
+        opens = i + 1 < len(tokens) and tokens[i + 1] == '{'
+        if opens:
+            stack.append(stack[-1] * float(fanout.get(tok, 1)))
+        else:
+            cost += stack[-1]
+    return cost
+
+
+def render_args(args: Dict[str, Any]) -> str:
+    """Render a GraphQL argument list from Python values."""
+    def _value(v: Any) -> str:
+        if isinstance(v, bool):
+            return 'true' if v else 'false'
+        if isinstance(v, (int, float)):
+            return str(v)
+        if isinstance(v, (list, tuple, set)):
+            return '[' + ', '.join(_value(x) for x in v) + ']'
+        return '"' + str(v).replace('\\', '\\\\').replace('"', '\\"') + '"'
+    return ', '.join(f"{k}: {_value(v)}" for k, v in args.items() if v is not None)
+
+
+@dataclass
+class SubQuery:
+    """One logical root-field query, e.g. ``wars(alliance_id: 1, first: 500, page: 1) { ... }``.
+
+    Paginated sub-queries advance their ``page`` argument until the block reports the last
+    page, returns no rows, or ``AliasPacker.execute``'s ``should_continue`` says stop.
+    """
+
+    key: Hashable
+    root: str
+    args: Dict[str, Any]
+    selection: str
+    paginated: bool = False
+    rows: Optional[int] = None
+    cost: float = 0.0
+    page: int = field(default=1, init=False)
+
+    def __post_init__(self):
+        if self.paginated:
+            self.page = int(self.args.get('page') or 1)
+        if not self.cost:
+            rows = self.rows or int(self.args.get('first') or 1)
+            self.cost = max(1.0, estimate_selection_cost(self.selection) * rows)
+
+    def render(self, alias: str) -> str:
+        args = dict(self.args)
+        if self.paginated:
+            args['page'] = self.page
+        arg_str = render_args(args)
+        head = f"{alias}: {self.root}({arg_str})" if arg_str else f"{alias}: {self.root}"
+        return f"{head} {{ {self.selection} }}"
+
+
+class AliasPacker:
+    """Bin-packs sub-queries into aliased requests under cost and alias limits."""
+
+    def __init__(
+        self,
+        run: Callable[[str], Awaitable[Dict[str, Any]]],
+        max_cost: Optional[float] = None,
+        max_aliases: Optional[int] = None,
+        retries: int = 1,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.run = run
+        self.cost_limit = _env_float('PNW_MAX_QUERY_COST', 5000000.0)
+        self.max_cost = min(float(max_cost), self.cost_limit) if max_cost else self.cost_limit
+        self.alias_limit = int(max_aliases) if max_aliases else int(_env_float('PNW_MAX_ALIASES', 25))
+        self.max_aliases = self.alias_limit
+        self.retries = max(0, int(retries))
+        self.logger = logger or logging.getLogger(__name__)
+        self.requests_made = 0
+
+    def pack(self, subqueries: List[SubQuery]) -> List[List[SubQuery]]:
+        """First-fit decreasing by estimated cost; an oversized sub-query gets its own request."""
+        bins: List[Tuple[float, List[SubQuery]]] = []
+        for sq in sorted(subqueries, key=lambda s: s.cost, reverse=True):
+            for i, (cost, members) in enumerate(bins):
+                if len(members) < self.max_aliases and cost + sq.cost <= self.max_cost:
+                    members.append(sq)
+                    bins[i] = (cost + sq.cost, members)
+                    break
+            else:
+                bins.append((sq.cost, [sq]))
+        return [members for _, members in bins]
+
+    async def _send(self, batch: List[SubQuery]) -> Dict[int, Dict[str, Any]]:
+        """Send one batch; if it is rejected for its size, split it in half (lowering the ceiling) and merge."""
+        aliases = {f"q{idx}p{sq.page}": sq for idx, sq in enumerate(batch)}
+        query = "query { " + " ".join(sq.render(alias) for alias, sq in aliases.items()) + " }"
+        last_error: Optional[Exception] = None
+        for attempt in range(self.retries + 1):
+            try:
+                self.requests_made += 1
+                data = await self.run(query)
+                root = (data or {}).get('data') or {}
+                self._recover()
+                return {id(sq): root.get(alias) or {} for alias, sq in aliases.items()}
+            except Exception as e:
+                last_error = e
+                if is_size_rejection(e):
+                    break
+                if attempt < self.retries:
+                    await asyncio.sleep(0.5 * (2 ** attempt))
+        if len(batch) == 1 or not is_size_rejection(last_error):
+            raise last_error or Exception("GraphQL request failed")
+        batch_cost = sum(sq.cost for sq in batch)
+        self.max_cost = max(1.0, min(self.max_cost, batch_cost * 0.75))
+        self.max_aliases = max(1, min(self.max_aliases, len(batch) // 2 or 1))
+        self.logger.warning(
+            f"AliasPacker: batch of {len(batch)} aliases failed ({last_error}); "
+            f"splitting (max_cost={int(self.max_cost)}, max_aliases={self.max_aliases})"
+        )
+        mid = len(batch) // 2
+        out = await self._send(batch[:mid])
+        out.update(await self._send(batch[mid:]))
+        return out
+
+    def _recover(self) -> None:
+        """Raise lowered limits back toward the configured ones after a successful batch."""
+        self.max_cost = min(self.cost_limit, self.max_cost * CEILING_RECOVERY)
+        self.max_aliases = min(self.alias_limit, self.max_aliases + 1)
+
+    async def execute(
+        self,
+        subqueries: List[SubQuery],
+        should_continue: Optional[Callable[[SubQuery, Dict[str, Any]], bool]] = None,
+    ) -> Dict[Hashable, List[Dict[str, Any]]]:
+        """Run all sub-queries, following page continuations; returns key -> blocks in page order.
+
+        ``should_continue(sq, block)`` is called after each page of a paginated sub-query and
+        can stop it early (e.g. once rows fall outside a time window).
+        """
+        results: Dict[Hashable, List[Dict[str, Any]]] = {sq.key: [] for sq in subqueries}
+        pending = list(subqueries)
+        while pending:
+            next_round: List[SubQuery] = []
+            for batch in self.pack(pending):
+                blocks = await self._send(batch)
+                for sq in batch:
+                    block = blocks.get(id(sq)) or {}
+                    results[sq.key].append(block)
+                    if sq.paginated and self._has_more(sq, block):
+                        if should_continue is None or should_continue(sq, block):
+                            sq.page += 1
+                            next_round.append(sq)
+            pending = next_round
+        return results
+
+    async def stream(
+        self,
+        subqueries: List[SubQuery],
+        should_continue: Optional[Callable[[SubQuery, Dict[str, Any]], bool]] = None,
+        buffer_batches: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[SubQuery, Dict[str, Any]]]:
+        """Like ``execute`` but yields ``(sub_query, block)`` as each response arrives.
+
+        Requests run in a producer task, so the next batch is in flight while the
+        caller processes the current one. At most ``buffer_batches`` responses are
+        held before the producer waits for the caller to catch up.
+        """
+        depth = int(buffer_batches or _env_float('PNW_STREAM_BUFFER_BATCHES', 2))
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, depth))
+        done = object()
+
+        async def produce() -> None:
+            pending = list(subqueries)
+            try:
+                while pending:
+                    next_round: List[SubQuery] = []
+                    for batch in self.pack(pending):
+                        blocks = await self._send(batch)
+                        rows = [(sq, blocks.get(id(sq)) or {}) for sq in batch]
+                        await queue.put(rows)
+                        for sq, block in rows:
+                            if sq.paginated and self._has_more(sq, block):
+                                if should_continue is None or should_continue(sq, block):
+                                    sq.page += 1
+                                    next_round.append(sq)
+                    pending = next_round
+                await queue.put(done)
+            except Exception as e:
+                await queue.put(e)
+
+        producer = asyncio.get_running_loop().create_task(produce())
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                for sq, block in item:
+                    yield sq, block
+        finally:
+            if not producer.done():
+                producer.cancel()
+
+    @staticmethod
+    def _has_more(sq: SubQuery, block: Dict[str, Any]) -> bool:
+        rows = block.get('data') or []
+        if not rows:
+            return False
+        info = block.get('paginatorInfo') or {}
+        if 'hasMorePages' in info:
+            return bool(info.get('hasMorePages'))
+        try:
+            last_page = int(info.get('lastPage') or 0)
+        except Exception:
+            last_page = 0
+        if last_page > 0:
+            return sq.page < last_page
+        first = sq.args.get('first')
+        return not first or len(rows) >= int(first)
@@ -0,0 +1,244 @@
+"""Field-set registry and GraphQL selection builder for PnW queries.
+
+Each consumer declares the projection it needs (e.g. ``'war_range'`` for
+attacker range checks or ``'audit'`` for the Cybertron audit) instead of
+always requesting every nation field. Fields are stored as dotted paths
+(``'cities.barracks'``) so nested selections can be merged, compared and
+emitted without string juggling at the call sites.
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+def _flat(names: str) -> Tuple[str, ...]:
+    return tuple(names.split())
+
+
+def _nested(parent: str, names: str) -> Tuple[str, ...]:
+    return tuple(f"{parent}.{n}" for n in names.split())
+
+
+# ---------------------------------------------------------------------------
+# Nation field sets
+# ---------------------------------------------------------------------------
+
+NATION_FULL_FIELDS: Tuple[str, ...] = (
+    _flat(
+        "id alliance_position nation_name leader_name continent color flag discord discord_id "
+        "war_policy domestic_policy social_policy government_type economic_policy update_tz "
+        "vacation_mode_turns beige_turns tax_id num_cities score population "
+        "gross_national_income gross_domestic_product espionage_available date last_active "
+        "turns_since_last_city turns_since_last_project soldiers tanks aircraft ships missiles nukes spies "
+        "money coal oil uranium iron bauxite lead gasoline munitions steel aluminum food wars_won wars_lost "
+        "offensive_wars_count defensive_wars_count soldier_casualties tank_casualties aircraft_casualties "
+        "ship_casualties missile_casualties missile_kills nuke_casualties nuke_kills spy_casualties spy_kills "
+        "spy_attacks soldier_kills tank_kills aircraft_kills ship_kills money_looted total_infrastructure_destroyed "
+        "total_infrastructure_lost projects project_bits alliance_id alliance_seniority alliance_join_date credits "
+        "credits_redeemed_this_month vip commendations denouncements cities_discount activity_center advanced_engineering_corps "
+        "advanced_pirate_economy arable_land_agency arms_stockpile bauxite_works bureau_of_domestic_affairs center_for_civil_engineering "
+        "clinical_research_center emergency_gasoline_reserve fallout_shelter government_support_agency green_technologies guiding_satellite "
+        "central_intelligence_agency international_trade_center iron_dome iron_works moon_landing mars_landing mass_irrigation "
+        "military_doctrine military_research_center military_salvage missile_launch_pad nuclear_launch_facility nuclear_research_facility "
+        "pirate_economy propaganda_bureau recycling_initiative research_and_development_center space_program specialized_police_training_program "
+        "spy_satellite surveillance_network telecommunications_satellite uranium_enrichment_program vital_defense_system"
+    )
+    + _nested("military_research", "ground_capacity air_capacity naval_capacity ground_cost air_cost naval_cost")
+    + _nested("alliance", "id name acronym flag")
+    + _nested(
+        "cities",
+        "id name date infrastructure land powered nuke_date oil_power wind_power coal_power nuclear_power "
+        "coal_mine oil_well uranium_mine lead_mine iron_mine bauxite_mine gasrefinery aluminum_refinery steel_mill "
+        "munitions_factory factory farm police_station hospital recycling_center subway supermarket bank "
+        "shopping_mall stadium barracks airforcebase drydock",
+    )
+)
+
+# Identity fields every projection carries so snapshots stay joinable and displayable
+_NATION_IDENTITY: Tuple[str, ...] = (
+    _flat("id nation_name leader_name alliance_id alliance_position color vacation_mode_turns num_cities score last_active")
+    + _nested("alliance", "id name acronym")
+)
+
+# Military units plus everything the purchase-limit and strategic checks read
+_NATION_MILITARY: Tuple[str, ...] = (
+    _flat(
+        "beige_turns discord discord_id soldiers tanks aircraft ships missiles nukes spies gasoline munitions "
+        "offensive_wars_count defensive_wars_count projects pirate_economy advanced_pirate_economy propaganda_bureau missile_launch_pad space_program "
+        "nuclear_research_facility nuclear_launch_facility iron_dome vital_defense_system military_research_center"
+    )
+    + _nested("military_research", "ground_capacity air_capacity naval_capacity")
+    + _nested("cities", "id infrastructure barracks factory airforcebase drydock")
+)
+
+NATION_FIELD_SETS: Dict[str, Tuple[str, ...]] = {
+    'full': NATION_FULL_FIELDS,
+    # Score, cities and military: /destroy range checks and attacker blocks
+    'war_range': _NATION_IDENTITY + _NATION_MILITARY,
+    # Inactivity / colour / resources / MMR audit
+    'audit': _NATION_IDENTITY
+    + _flat("discord discord_id food uranium")
+    + _nested("cities", "id barracks factory airforcebase drydock"),
+    # Names only: autocomplete and lookups
+    'directory': _NATION_IDENTITY,
+    # Single-nation lookups (/show, nation cards): recent wars, casualties and projects
+    'detail': _flat(
+        "id nation_name leader_name color flag discord discord_id beige_turns num_cities score "
+        "espionage_available date last_active soldiers tanks aircraft ships missiles nukes spies "
+        "wars_won wars_lost offensive_wars_count defensive_wars_count"
+    )
+    + _nested("offensive_wars", "id date war_type groundcontrol airsuperiority navalblockade winner turns_left")
+    + _nested("defensive_wars", "id date war_type groundcontrol airsuperiority navalblockade winner turns_left")
+    + _flat(
+        "soldier_casualties tank_casualties aircraft_casualties ship_casualties missile_casualties missile_kills "
+        "nuke_casualties nuke_kills spy_casualties spy_kills spy_attacks soldier_kills tank_kills aircraft_kills "
+        "ship_kills money_looted total_infrastructure_destroyed total_infrastructure_lost missile_launch_pad "
+        "nuclear_research_facility nuclear_launch_facility iron_dome vital_defense_system propaganda_bureau "
+        "military_research_center space_program activity_center advanced_engineering_corps advanced_pirate_economy "
+        "arable_land_agency arms_stockpile bauxite_works bureau_of_domestic_affairs center_for_civil_engineering "
+        "clinical_research_center emergency_gasoline_reserve fallout_shelter green_technologies "
+        "government_support_agency guiding_satellite central_intelligence_agency international_trade_center "
+        "iron_works mass_irrigation military_doctrine military_salvage mars_landing pirate_economy "
+        "recycling_initiative research_and_development_center specialized_police_training_program spy_satellite "
+        "surveillance_network telecommunications_satellite uranium_enrichment_program"
+    )
+    + _nested("military_research", "ground_capacity air_capacity naval_capacity ground_cost air_cost naval_cost")
+    + _flat("projects alliance_id alliance_position")
+    + _nested("alliance", "id name acronym flag")
+    + _nested("cities", "id name infrastructure stadium barracks factory airforcebase drydock"),
+}
+
+
+# ---------------------------------------------------------------------------
+# War field sets
+# ---------------------------------------------------------------------------
+
+_WAR_CORE: Tuple[str, ...] = (
+    _flat(
+        "id date end_date winner_id att_id def_id att_alliance_id def_alliance_id reason war_type "
+        "ground_control air_superiority naval_blockade"
+    )
+    + _nested("attacker", "id alliance_id")
+    + _nested("defender", "id alliance_id")
+)
+
+WAR_FIELD_SETS: Dict[str, Tuple[str, ...]] = {
+    'full': _WAR_CORE
+    + _nested(
+        "attacks",
+        "id date att_id attid def_id defid type war_id warid victor success city_id cityid "
+        "infra_destroyed infradestroyed infra_destroyed_value resistance_lost resistance_eliminated "
+        "money_stolen moneystolen money_looted att_mun_used def_mun_used att_gas_used def_gas_used "
+        "att_soldiers_lost def_soldiers_lost att_tanks_lost def_tanks_lost att_aircraft_lost def_aircraft_lost "
+        "att_ships_lost def_ships_lost att_missiles_lost def_missiles_lost att_nukes_lost def_nukes_lost "
+        "gasoline_looted munitions_looted aluminum_looted steel_looted food_looted coal_looted oil_looted "
+        "uranium_looted iron_looted bauxite_looted lead_looted",
+    ),
+    # War headers plus attack dates only (window checks, war counts)
+    'summary': _WAR_CORE + _nested("attacks", "id date"),
+}
+
+
+# ---------------------------------------------------------------------------
+# Registry helpers
+# ---------------------------------------------------------------------------
+
+def register_nation_projection(name: str, fields: Iterable[str]) -> Tuple[str, ...]:
+    """Register (or replace) a named nation projection; identity fields are always included."""
+    merged = _dedupe(tuple(_NATION_IDENTITY) + tuple(fields))
+    NATION_FIELD_SETS[str(name)] = merged
+    return merged
+
+
+def register_war_projection(name: str, fields: Iterable[str]) -> Tuple[str, ...]:
+    """Register (or replace) a named war projection; core war fields are always included."""
+    merged = _dedupe(tuple(_WAR_CORE) + tuple(fields))
+    WAR_FIELD_SETS[str(name)] = merged
+    return merged
+
+
+def normalize_projection(name: Optional[str]) -> str:
+    """Map None/empty/unknown projection names to 'full'."""
+    key = (name or 'full').strip().lower()
+    return key if key in NATION_FIELD_SETS or key in WAR_FIELD_SETS else 'full'
+
+
+def nation_fields_for(projection: Optional[str] = None) -> Tuple[str, ...]:
+    return NATION_FIELD_SETS.get(normalize_projection(projection)) or NATION_FULL_FIELDS
+
+
+def war_fields_for(projection: Optional[str] = None) -> Tuple[str, ...]:
+    return WAR_FIELD_SETS.get(normalize_projection(projection)) or WAR_FIELD_SETS['full']
+
+
+def covers(available: Optional[Iterable[str]], requested: Iterable[str]) -> bool:
+    """True when a snapshot holding ``available`` fields can answer ``requested``.
+
+    ``available=None`` means a legacy/full snapshot and covers everything.
+    """
+    if available is None:
+        return True
+    have = set(available)
+    return all(f in have for f in requested)
+
+
+def covering_projections(projection: Optional[str]) -> List[str]:
+    """Names of registered nation projections that are supersets of ``projection``.
+
+    The requested projection comes first, then narrower-to-wider alternatives, 'full' last.
+    """
+    name = normalize_projection(projection)
+    wanted = nation_fields_for(name)
+    out = [name]
+    others = [
+        (len(fields), key) for key, fields in NATION_FIELD_SETS.items()
+        if key not in (name, 'full') and covers(fields, wanted)
+    ]
+    out.extend(key for _, key in sorted(others))
+    if 'full' not in out:
+        out.append('full')
+    return out
+
+
+def snapshot_key(alliance_id, projection: Optional[str] = None) -> str:
+    """UserDataManager key for an alliance snapshot of the given projection."""
+    name = normalize_projection(projection)
+    if name == 'full':
+        return f"alliance_{alliance_id}"
+    return f"alliance_{alliance_id}_{name}"
+
+
+def build_selection(fields: Iterable[str]) -> str:
+    """Emit a GraphQL selection set body from dotted field paths, preserving order."""
+    tree: Dict[str, Dict] = {}
+    for path in fields:
+        node = tree
+        for part in str(path).split('.'):
+            node = node.setdefault(part, {})
+    return _emit(tree)
+
+
+def _emit(tree: Dict[str, Dict]) -> str:
+    parts: List[str] = []
+    for key, children in tree.items():
+        if children:
+            parts.append(f"{key} {{ {_emit(children)} }}")
+        else:
+            parts.append(key)
+    return " ".join(parts)
+
+
+def _dedupe(fields: Tuple[str, ...]) -> Tuple[str, ...]:
+    seen = set()
+    out: List[str] = []
+    for f in fields:
+        if f not in seen:
+            seen.add(f)
+            out.append(f)
+    return tuple(out)
+
+
+# Identity/war-core overlap with the military block would duplicate paths otherwise
+for _key in list(NATION_FIELD_SETS):
+    NATION_FIELD_SETS[_key] = _dedupe(NATION_FIELD_SETS[_key])
+for _key in list(WAR_FIELD_SETS):
+    WAR_FIELD_SETS[_key] = _dedupe(WAR_FIELD_SETS[_key])
@@ -1,12 +1,12 @@
 import requests
 import logging
-from typing import List, Dict, Optional, Any, Union
+from typing import List, Dict, Optional, Any, AsyncIterator, Union, Tuple, Iterable
 import os
 import json
 import sys
 import time
 import asyncio
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -30,6 +30,87 @@ except ImportError:
     sys.path.append(os.path.dirname(os.path.dirname(__file__)))
     from config import PANDW_API_KEY
 
+# Field-set registry for projected queries
+try:
+    from .projections import (
+        build_selection,
+        covers,
+        covering_projections,
+        nation_fields_for,
+        normalize_projection,
+        snapshot_key,
+        war_fields_for,
+    )
+except ImportError:
+    from Systems.PnW.MA.projections import (
+        build_selection,
+        covers,
+        covering_projections,
+        nation_fields_for,
+        normalize_projection,
+        snapshot_key,
+        war_fields_for,
+    )
+
+# Cost-aware alias packing for multi-entity queries
+try:
+    from .packer import AliasPacker, SubQuery
+except ImportError:
+    from Systems.PnW.MA.packer import AliasPacker, SubQuery
+
+# Shared priority scheduler for all PnW API traffic
+try:
+    from .scheduler import BACKGROUND, api_priority, current_priority, get_scheduler, normalize_priority
+except ImportError:
+    from Systems.PnW.MA.scheduler import BACKGROUND, api_priority, current_priority, get_scheduler, normalize_priority
+
+try:
+    from .name_index import ALLIANCE, PREFIX_SCORE, get_name_index
+except ImportError:
+    from Systems.PnW.MA.name_index import ALLIANCE, PREFIX_SCORE, get_name_index
+
+try:
+    from .freshness import (
+        CACHED, DEFAULT_NATION_FRESHNESS, DEFAULT_WAR_FRESHNESS, FETCHED, FRESH,
+        Freshness, FreshnessLike, get_freshness_telemetry, parse_freshness, within,
+    )
+except ImportError:
+    from Systems.PnW.MA.freshness import (
+        CACHED, DEFAULT_NATION_FRESHNESS, DEFAULT_WAR_FRESHNESS, FETCHED, FRESH,
+        Freshness, FreshnessLike, get_freshness_telemetry, parse_freshness, within,
+    )
+
+try:
+    from .nation_repo import get_nation_repository
+except ImportError:
+    from Systems.PnW.MA.nation_repo import get_nation_repository
+
+try:
+    from .war_records import WarTable
+except ImportError:
+    from Systems.PnW.MA.war_records import WarTable
+
+try:
+    from .trade_prices import get_trade_price_service, prices_from_row
+except ImportError:
+    from Systems.PnW.MA.trade_prices import get_trade_price_service, prices_from_row
+
+try:
+    from .treaty_graph import GRAPH_KEY as TREATY_GRAPH_KEY, TreatyGraph, get_treaty_graph
+except ImportError:
+    from Systems.PnW.MA.treaty_graph import GRAPH_KEY as TREATY_GRAPH_KEY, TreatyGraph, get_treaty_graph
+
+try:
+    from .nation_series import get_nation_series
+except ImportError:
+    from Systems.PnW.MA.nation_series import get_nation_series
+
+# Derived nation metrics, computed once per fetched snapshot
+try:
+    from .derived import derive_nations
+except ImportError:
+    from Systems.PnW.MA.derived import derive_nations
+
 # Import UserDataManager for caching
 try:
     from Systems.user_data_manager import UserDataManager
@@ -41,16 +122,22 @@ except ImportError:
 class PNWAPIQuery:
     """Centralized class for handling all PNW API GraphQL queries with optimized caching."""
     
-    def __init__(self, api_key: str = None, logger: logging.Logger = None):
+    # Background snapshot refreshes keyed by snapshot key; shared across instances so each
+    # alliance snapshot has at most one revalidation in flight
+    _revalidate_tasks: Dict[str, asyncio.Task] = {}
+    
+    def __init__(self, api_key: str = None, logger: logging.Logger = None, base_url: str = None):
         """Initialize the PNW API Query handler.
         
         Args:
             api_key: P&W API key. If None, will use PANDW_API_KEY from config.
             logger: Logger instance. If None, will create a default logger.
+            base_url: GraphQL endpoint. If None, uses PNW_API_BASE_URL or the live API
+                (point it at tests/pnw_stub_server.py to run without the network).
         """
         self.api_key = api_key or PANDW_API_KEY
         self.logger = logger or logging.getLogger(__name__)
-        self.base_url = "https://api.politicsandwar.com/graphql"
+        self.base_url = base_url or os.getenv("PNW_API_BASE_URL") or "https://api.politicsandwar.com/graphql"
         self.cache_ttl_seconds = 3600  # 1 hour TTL for alliance cache (updated from 5 minutes)
         self.user_data_manager = UserDataManager()
         
@@ -67,8 +154,9 @@ class PNWAPIQuery:
             "Connection": "keep-alive",
             "User-Agent": "AllsparkPNW/1.0 (+https://discordbots/allspark)"
         }
-        # Gentle spacing to avoid spamming while staying fast
-        self._last_request_ts = 0.0
+        # Gentle spacing to avoid spamming while staying fast; enforced by the shared
+        # priority scheduler so interactive requests jump ahead of background crawls
+        self.scheduler = get_scheduler()
         try:
             self._min_interval_seconds = float(os.getenv("PNW_MIN_INTERVAL", "0.15"))
         except Exception:
@@ -95,9 +183,27 @@ class PNWAPIQuery:
         self._resolve_cache: Dict[str, Dict[str, Any]] = {}
         self._resolve_cache_expiry: Dict[str, float] = {}
         self._resolve_cache_ttl_seconds = 3600
-        self._trade_cache: Optional[Dict[str, Any]] = None
-        self._trade_cache_expiry: float = 0.0
-        self._trade_cache_ttl_seconds = 600
+        # Trade prices are refreshed in the background by the shared price service
+        self.trade_prices = get_trade_price_service()
+        self.trade_prices.bind(self._fetch_trade_prices, self.user_data_manager)
+        
+        # Stale-while-revalidate: once an alliance snapshot passes cache_ttl_seconds it is still
+        # served (and refreshed in the background) until it reaches the hard per-projection ceiling
+        self.max_stale_seconds: Dict[str, float] = {
+            'full': 6 * 3600,
+            'war_range': 2 * 3600,
+            'audit': 6 * 3600,
+            'directory': 24 * 3600,
+        }
+        self._snapshot_ages: Dict[str, float] = {}
+        self.freshness_telemetry = get_freshness_telemetry()
+        self.nation_repo = get_nation_repository()
+        self.treaty_graph = get_treaty_graph()
+        self.nation_series = get_nation_series()
+        self.nation_series.bind(self.user_data_manager)
+        
+        # Cost ceiling for aliased requests, lowered whenever the server rejects a packed batch
+        self._alias_max_cost: Optional[float] = None
         
         # Add processing flags to prevent infinite loops
         self._processing_alliances = set()
@@ -111,28 +217,15 @@ class PNWAPIQuery:
             self.logger.error(error_msg)
             raise ValueError(error_msg)
 
-    def _nation_fields(self) -> str:
+    def _nation_fields(self, projection: Optional[str] = None) -> str:
+        """GraphQL selection for nations; ``projection`` picks a registered field set (default 'full')."""
+        return build_selection(nation_fields_for(projection))
+
+    def _war_fields(self, projection: Optional[str] = None) -> str:
+        """GraphQL selection for a paginated ``wars`` block using a registered war field set."""
         return (
-            "id alliance_position nation_name leader_name continent color flag discord discord_id "
-            "war_policy domestic_policy social_policy government_type economic_policy update_tz "
-            "vacation_mode_turns beige_turns tax_id num_cities score population "
-            "gross_national_income gross_domestic_product espionage_available date last_active "
-            "turns_since_last_city turns_since_last_project soldiers tanks aircraft ships missiles nukes spies "
-            "money coal oil uranium iron bauxite lead gasoline munitions steel aluminum food wars_won wars_lost "
-            "offensive_wars_count defensive_wars_count soldier_casualties tank_casualties aircraft_casualties "
-            "ship_casualties missile_casualties missile_kills nuke_casualties nuke_kills spy_casualties spy_kills "
-            "spy_attacks soldier_kills tank_kills aircraft_kills ship_kills money_looted total_infrastructure_destroyed "
-            "total_infrastructure_lost projects project_bits alliance_id alliance_seniority alliance_join_date credits "
-            "credits_redeemed_this_month vip commendations denouncements cities_discount activity_center advanced_engineering_corps "
-            "advanced_pirate_economy arable_land_agency arms_stockpile bauxite_works bureau_of_domestic_affairs center_for_civil_engineering "
-            "clinical_research_center emergency_gasoline_reserve fallout_shelter government_support_agency green_technologies guiding_satellite "
-            "central_intelligence_agency international_trade_center iron_dome iron_works moon_landing mars_landing mass_irrigation "
-            "military_doctrine military_research_center military_salvage missile_launch_pad nuclear_launch_facility nuclear_research_facility "
-            "pirate_economy propaganda_bureau recycling_initiative research_and_development_center space_program specialized_police_training_program "
-            "spy_satellite surveillance_network telecommunications_satellite uranium_enrichment_program vital_defense_system "
-            "military_research { ground_capacity air_capacity naval_capacity ground_cost air_cost naval_cost } "
-            "alliance { id name acronym flag } "
-            "cities { id name date infrastructure land powered nuke_date oil_power wind_power coal_power nuclear_power coal_mine oil_well uranium_mine lead_mine iron_mine bauxite_mine gasrefinery aluminum_refinery steel_mill munitions_factory factory farm police_station hospital recycling_center subway supermarket bank shopping_mall stadium barracks airforcebase drydock }"
+            "paginatorInfo { currentPage lastPage hasMorePages } "
+            + "data { " + build_selection(war_fields_for(projection)) + " }"
         )
 
     def _normalize_nation(self, nation: Dict[str, Any]) -> Dict[str, Any]:
@@ -161,12 +254,20 @@ class PNWAPIQuery:
         return nation
 
     async def search_alliances(self, text: str, max_results: int = 25) -> Optional[List[Dict[str, Any]]]:
+        # Local name index first. Only exact or prefix hits skip the API: a fuzzy hit on a cached
+        # name (e.g. "Northern Concord" for "Concordia") says nothing about uncached alliances
+        try:
+            index = await get_name_index().ready()
+            local = index.search(text, kinds=[ALLIANCE], limit=max(1, int(max_results)), min_score=PREFIX_SCORE)
+            if local:
+                return [dict(e.payload) for e in local]
+        except Exception as e:
+            self.logger.debug(f"search_alliances: name index lookup failed: {e}")
         try:
             q = (
                 "query { alliances(search: \"" + str(text).replace("\"", "\\\"") + "\", first: " + str(max(1, int(max_results))) + ") { data { id name acronym flag } } }"
             )
-            loop = asyncio.get_running_loop()
-            data = await loop.run_in_executor(None, self._make_request, q)
+            data = await self._run_request(q)
             items = (((data or {}).get("data") or {}).get("alliances") or {}).get("data") or []
             out: List[Dict[str, Any]] = []
             for it in items[:max_results]:
@@ -176,6 +277,12 @@ class PNWAPIQuery:
                     "acronym": it.get("acronym"),
                     "flag": it.get("flag"),
                 })
+            try:
+                index = get_name_index()
+                for it in out:
+                    index.add_alliance(it, source='search')
+            except Exception:
+                pass
             return out
         except Exception:
             try:
@@ -232,10 +339,14 @@ class PNWAPIQuery:
             except Exception:
                 aid = None
 
-            loop = asyncio.get_running_loop()
-
             # Precise lookup by id
             if isinstance(aid, int) and aid > 0:
+                local = get_name_index().get(ALLIANCE, aid)
+                if local is not None and local.payload.get('name'):
+                    item = {k: local.payload.get(k) or '' for k in ('id', 'name', 'acronym')}
+                    self._resolve_cache[cache_key] = item
+                    self._resolve_cache_expiry[cache_key] = time.monotonic() + self._resolve_cache_ttl_seconds
+                    return item
                 q = f"""
                 query {{
                   alliances(id: {aid}) {{
@@ -315,14 +426,22 @@ class PNWAPIQuery:
                     return item
             except Exception:
                 pass
+            # Local name index built from cached alliance files (exact name/acronym only)
+            try:
+                local = (await get_name_index().ready()).exact(ALLIANCE, raw)
+                if local is not None:
+                    item = {k: local.payload.get(k) or '' for k in ('id', 'name', 'acronym')}
+                    self._resolve_cache[cache_key] = item
+                    self._resolve_cache_expiry[cache_key] = time.monotonic() + self._resolve_cache_ttl_seconds
+                    return item
+            except Exception:
+                pass
             # Helper: resilient request with retries/backoff to survive transient 500s
             async def _request_with_retries(query: str, timeout: int = 30, attempts: int = 3) -> Dict[str, Any]:
-                loop = asyncio.get_running_loop()
                 last_error: Optional[Exception] = None
                 for i in range(max(1, int(attempts))):
                     try:
-                        fn = partial(self._make_request, query, timeout=timeout, cache_ttl_seconds=self._resolve_cache_ttl_seconds)
-                        return await loop.run_in_executor(None, fn)
+                        return await self._run_request(query, timeout=timeout, cache_ttl_seconds=self._resolve_cache_ttl_seconds)
                     except Exception as e:
                         last_error = e
                         try:
@@ -484,38 +603,20 @@ class PNWAPIQuery:
             if not inputs:
                 return {}
 
-            # Build aliased query blocks
-            blocks: List[str] = []
-            for idx, nm in enumerate(inputs):
-                safe = nm.replace("\"", "\\\"")
-                alias = f"n{idx}"
-                blocks.append(
-                    f"{alias}: alliances(name: \"{safe}\") {{ data {{ id name acronym }} }}"
-                )
-            query = "query { " + " ".join(blocks) + " }"
-
-            # Make request with retries/backoff
-            async def _retry_request(q: str, attempts: int = 3, timeout: int = 30) -> Dict[str, Any]:
-                loop = asyncio.get_running_loop()
-                last: Optional[Exception] = None
-                for i in range(max(1, attempts)):
-                    try:
-                        fn = partial(self._make_request, q, timeout=timeout, cache_ttl_seconds=self._resolve_cache_ttl_seconds)
-                        return await loop.run_in_executor(None, fn)
-                    except Exception as e:
-                        last = e
-                        self.logger.warning(f"resolve_alliance_names_batched: attempt {i+1}/{attempts} failed: {e}")
-                        await asyncio.sleep(0.5 * (2 ** i))  # Exponential backoff
-                raise last or Exception("All retry attempts failed")
-
-            data = await _retry_request(query)
+            # One aliased sub-query per name, packed into as few requests as the limits allow
+            subqueries = [
+                SubQuery(key=idx, root='alliances', args={'name': nm}, selection='data { id name acronym }', rows=5)
+                for idx, nm in enumerate(inputs)
+            ]
+            blocks = await self._execute_packed(
+                subqueries, cache_ttl_seconds=self._resolve_cache_ttl_seconds, retries=2
+            )
 
             # Parse response
             result: Dict[str, Optional[Dict[str, Any]]] = {}
             now = time.monotonic()
             for idx, nm in enumerate(inputs):
-                alias = f"n{idx}"
-                block = ((data or {}).get('data') or {}).get(alias) or {}
+                block = (blocks.get(idx) or [{}])[0]
                 items = block.get('data') or []
                 if not items:
                     result[nm] = None
@@ -544,26 +645,22 @@ class PNWAPIQuery:
             self.logger.error(f"resolve_alliance_names_batched failed: {e}")
             return {nm: None for nm in (names or [])}
 
-    def _make_request(self, query: str, timeout: int = 30, cache_ttl_seconds: float = 0) -> Dict[str, Any]:
+    def _make_request(self, query: str, timeout: int = 30, cache_ttl_seconds: float = 0, priority: Optional[str] = None) -> Dict[str, Any]:
         # Dedupe cache check (short TTL for identical queries)
         cache_key = hash(query)
         now = time.monotonic()
         if cache_key in self._query_cache_expiry and self._query_cache_expiry[cache_key] > now:
             return self._query_cache[cache_key]
 
-        # Rate limit wait
-        elapsed = now - self._last_request_ts
-        if elapsed < self._min_interval_seconds:
-            time.sleep(self._min_interval_seconds - elapsed)
-        self._last_request_ts = time.monotonic()
-
         # Use query-param API key (known-good for PnW GraphQL)
         url = f"{self.base_url}?api_key={self.api_key}"
         payload = {"query": query}
         headers = dict(self._default_headers)
 
-        # Perform the request; rely on session-level retry adapter
-        resp = self._session.post(url, json=payload, headers=headers, timeout=timeout)
+        # Wait for a slot in this priority class, then perform the request; rely on session-level retry adapter
+        with self.scheduler.slot(priority, base_interval=self._min_interval_seconds):
+            resp = self._session.post(url, json=payload, headers=headers, timeout=timeout)
+            self.scheduler.record_response(resp.headers)
         resp.raise_for_status()
 
         # Parse JSON
@@ -589,6 +686,78 @@ class PNWAPIQuery:
 
         return data
 
+    async def _run_request(
+        self,
+        query: str,
+        timeout: int = 30,
+        cache_ttl_seconds: float = 0,
+        priority: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """Run ``_make_request`` in the default executor under the caller's API priority.
+
+        Context variables do not cross ``run_in_executor``, so the priority from
+        ``api_priority`` is resolved here and passed to the worker thread.
+        """
+        loop = asyncio.get_running_loop()
+        fn = partial(
+            self._make_request,
+            query,
+            timeout=timeout,
+            cache_ttl_seconds=cache_ttl_seconds,
+            priority=normalize_priority(priority) if priority else current_priority(),
+        )
+        return await loop.run_in_executor(None, fn)
+
+    async def _execute_packed(
+        self,
+        subqueries: List[SubQuery],
+        timeout: int = 30,
+        cache_ttl_seconds: float = 0,
+        max_aliases: Optional[int] = None,
+        retries: int = 1,
+        should_continue=None,
+    ) -> Dict[Any, List[Dict[str, Any]]]:
+        """Run sub-queries through the alias packer; returns key -> response blocks in page order.
+
+        The cost ceiling the packer learns from rejected batches is kept for later calls.
+        """
+        packer = AliasPacker(
+            lambda q: self._run_request(q, timeout=timeout, cache_ttl_seconds=cache_ttl_seconds),
+            max_cost=self._alias_max_cost,
+            max_aliases=max_aliases,
+            retries=retries,
+            logger=self.logger,
+        )
+        try:
+            return await packer.execute(subqueries, should_continue=should_continue)
+        finally:
+            self._alias_max_cost = packer.max_cost
+            self.logger.debug(f"_execute_packed: {len(subqueries)} sub-queries in {packer.requests_made} request(s)")
+
+    async def _stream_packed(
+        self,
+        subqueries: List[SubQuery],
+        timeout: int = 30,
+        max_aliases: Optional[int] = None,
+        retries: int = 1,
+        should_continue=None,
+        buffer_batches: Optional[int] = None,
+    ) -> AsyncIterator[Tuple[SubQuery, Dict[str, Any]]]:
+        """Streaming form of ``_execute_packed``: yields (sub-query, block) as responses arrive."""
+        packer = AliasPacker(
+            lambda q: self._run_request(q, timeout=timeout),
+            max_cost=self._alias_max_cost,
+            max_aliases=max_aliases,
+            retries=retries,
+            logger=self.logger,
+        )
+        try:
+            async for item in packer.stream(subqueries, should_continue=should_continue, buffer_batches=buffer_batches):
+                yield item
+        finally:
+            self._alias_max_cost = packer.max_cost
+            self.logger.debug(f"_stream_packed: {len(subqueries)} sub-queries in {packer.requests_made} request(s)")
+
     def _to_utc(self, dt: Optional[datetime]) -> Optional[datetime]:
         """Convert a datetime to naive UTC.
 
@@ -622,68 +791,98 @@ class PNWAPIQuery:
             except Exception:
                 return None
 
-    async def get_trade_resource_values(self, resources: Optional[List[str]] = None) -> Optional[List[Dict[str, Any]]]:
-        """Fetch latest trade prices using the Tradeprice paginator with caching.
+    def _war_in_window(self, w: Dict[str, Any], cutoff_utc: Optional[datetime]) -> bool:
+        """True if any attack, or the war's start/end, is at or after naive-UTC ``cutoff_utc``."""
+        if not cutoff_utc:
+            return True
+        stamps = [a.get('date') for a in (w.get('attacks') or []) if isinstance(a, dict)]
+        stamps += [w.get('date'), w.get('end_date')]
+        for raw in stamps:
+            try:
+                d = datetime.fromisoformat(raw.replace('Z', '+00:00')) if raw else None
+                if d is not None:
+                    try:
+                        d = d.astimezone(self.utc_tz).replace(tzinfo=None) if self.utc_tz is not None else d.replace(tzinfo=None)
+                    except Exception:
+                        d = d.replace(tzinfo=None)
+            except Exception:
+                d = None
+            if d and d >= cutoff_utc:
+                return True
+        return False
+
+    @staticmethod
+    def _war_between_parties(w: Dict[str, Any], home_ids, away_ids) -> bool:
+        """True if the war's attacker and defender alliances are on opposite parties (either direction)."""
+        att_ids = set()
+        def_ids = set()
+        for target, value in (
+            (att_ids, w.get('att_alliance_id')),
+            (def_ids, w.get('def_alliance_id')),
+            (att_ids, (w.get('attacker') or {}).get('alliance_id')),
+            (def_ids, (w.get('defender') or {}).get('alliance_id')),
+        ):
+            try:
+                v = int(value or 0)
+            except Exception:
+                continue
+            if v > 0:
+                target.add(v)
+        forward = any(i in home_ids for i in att_ids) and any(j in away_ids for j in def_ids)
+        reverse = any(i in away_ids for i in att_ids) and any(j in home_ids for j in def_ids)
+        return forward or reverse
+
+    async def _fetch_trade_prices(self) -> Optional[Dict[str, float]]:
+        """Latest row of the Tradeprice paginator as resource -> average price."""
+        query = """
+        query {
+          tradeprices(first: 1, page: 1) {
+            data {
+              id
+              date
+              coal
+              oil
+              uranium
+              iron
+              bauxite
+              lead
+              gasoline
+              munitions
+              steel
+              aluminum
+              food
+              credits
+            }
+          }
+        }
+        """
+        data = await self._run_request(query, timeout=30)
+        block = (data.get("data") or {}).get("tradeprices") or {}
+        entries = block.get("data") or []
+        if not entries:
+            self.logger.warning("_fetch_trade_prices: tradeprices returned no data")
+            return None
+        return prices_from_row(entries[0] or {})
+
+    async def get_trade_resource_values(
+        self,
+        resources: Optional[List[str]] = None,
+        at: Optional[datetime] = None,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Trade prices from the background-refreshed price service.
 
         Returns list of dicts: { "resource": <NAME>, "average_price": <Float> }.
         If ``resources`` is provided, filters to those resource names (case-insensitive).
+        With ``at``, returns the prices recorded at that moment (the oldest known
+        prices if it predates the stored history).
         """
         try:
-            loop = asyncio.get_running_loop()
-
-            # Use cache if fresh
-            now = time.monotonic()
-            if self._trade_cache and now < self._trade_cache_expiry:
-                latest = self._trade_cache
-            else:
-                query = """
-                query {
-                  tradeprices(first: 1, page: 1) {
-                    data {
-                      id
-                      date
-                      coal
-                      oil
-                      uranium
-                      iron
-                      bauxite
-                      lead
-                      gasoline
-                      munitions
-                      steel
-                      aluminum
-                      food
-                      credits
-                    }
-                  }
-                }
-                """
-                fn = partial(self._make_request, query, timeout=30, cache_ttl_seconds=self._trade_cache_ttl_seconds)
-                data = await loop.run_in_executor(None, fn)
-                block = (data.get("data") or {}).get("tradeprices") or {}
-                entries = block.get("data") or []
-                if not entries:
-                    self.logger.warning("get_trade_resource_values: tradeprices returned no data")
-                    return []
-                latest = entries[0] or {}
-                # Update cache
-                self._trade_cache = latest
-                self._trade_cache_expiry = time.monotonic() + self._trade_cache_ttl_seconds
-
-            price_map = {
-                "FOOD": latest.get("food"),
-                "COAL": latest.get("coal"),
-                "OIL": latest.get("oil"),
-                "URANIUM": latest.get("uranium"),
-                "LEAD": latest.get("lead"),
-                "IRON": latest.get("iron"),
-                "BAUXITE": latest.get("bauxite"),
-                "GASOLINE": latest.get("gasoline"),
-                "MUNITIONS": latest.get("munitions"),
-                "STEEL": latest.get("steel"),
-                "ALUMINUM": latest.get("aluminum"),
-                "CREDIT": latest.get("credits"),
-            }
+            at_epoch = None
+            if at is not None:
+                at_epoch = at.timestamp() if at.tzinfo is not None else at.replace(tzinfo=timezone.utc).timestamp()
+            price_map = await self.trade_prices.prices(at=at_epoch)
+            if not price_map:
+                return []
 
             if resources:
                 requested = {str(r).upper() for r in resources}
@@ -691,93 +890,90 @@ class PNWAPIQuery:
             else:
                 keys = list(price_map.keys())
 
-            result: List[Dict[str, Any]] = []
-            for k in keys:
-                v = price_map.get(k)
-                try:
-                    price = float(v) if v is not None else 0.0
-                except Exception:
-                    price = 0.0
-                result.append({"resource": k, "average_price": price})
-
-            return result
+            return [{"resource": k, "average_price": float(price_map.get(k) or 0.0)} for k in keys]
         except Exception as e:
-            self.logger.error(f"get_trade_resource_values: failed to fetch trade prices via paginator: {e}")
+            self.logger.error(f"get_trade_resource_values: failed to read trade prices: {e}")
             return None
     
-    async def get_alliance_nations(self, alliance_id: str, bot=None, force_refresh: bool = False) -> Optional[List[Dict[str, Any]]]:
+    async def get_alliance_nations(
+        self,
+        alliance_id: str,
+        bot=None,
+        force_refresh: bool = False,
+        projection: Optional[str] = None,
+        max_stale_seconds: Optional[float] = None,
+        freshness: FreshnessLike = None,
+    ) -> Optional[List[Dict[str, Any]]]:
         """Get all nations from a specific alliance with caching via UserDataManager.
         
         Args:
             alliance_id: The alliance ID to query
             bot: Discord bot instance for fetching Discord usernames (optional)
             force_refresh: If True, bypass cache and fetch fresh data
+            projection: Registered nation field set to request (see projections.py).
+                Defaults to 'full'. Any cached snapshot whose fields are a superset
+                of the projection can answer the call.
+            max_stale_seconds: Hard ceiling on the age of a snapshot served past its TTL.
+                Defaults to ``max_stale_seconds[projection]``; pass 0 to always wait for
+                a refresh once the TTL expires. Stale snapshots trigger one background
+                refresh and their age is available via ``get_snapshot_age``.
+            freshness: Freshness contract (see freshness.py), e.g. ``CURRENT_TURN`` or ``"5m"``.
+                The freshest stored snapshot within the contract is served and the API is only
+                queried when none qualifies. Overrides the TTL/stale-ceiling behaviour above;
+                ``force_refresh`` is the same as ``FRESH``.
             
         Returns:
             List of nation dictionaries or None if failed
         """
+        proj = normalize_projection(projection)
+        cache_key = snapshot_key(alliance_id, proj)
         try:
             # Prevent infinite recursion
-            cache_key = f"alliance_{alliance_id}"
             if cache_key in self._processing_alliances:
                 self.logger.warning(f"Detected recursive call to get_alliance_nations for alliance {alliance_id}, returning cached data")
                 return self._processing_cache.get(cache_key, [])
             
             # Mark as processing
             self._processing_alliances.add(cache_key)
-            now = time.time()
 
-            if not force_refresh:
-                try:
-                    alliance_data = await self.user_data_manager.get_json_data(f'alliance_{alliance_id}', {})
-                    if alliance_data and isinstance(alliance_data, dict):
-                        nations = alliance_data.get('nations', [])
-                        last_updated = alliance_data.get('last_updated')
-                        if nations and last_updated:
-                            # Check if cache is still valid
-                            cache_time = datetime.fromisoformat(last_updated)
-                            age_seconds = (datetime.now() - cache_time).total_seconds()
-                            if age_seconds < self.cache_ttl_seconds:
-                                self.logger.debug(f"get_alliance_nations: cache hit for alliance {alliance_id} ({len(nations)} nations) from alliance_{alliance_id}.json")
-                                # Optionally enrich with discord usernames
-                                if bot:
-                                    await self._fetch_discord_usernames(nations, bot)
-                                # Store in processing cache to prevent infinite loops
-                                self._processing_cache[cache_key] = nations
-                                return nations
-                except Exception as cache_err:
-                    self.logger.warning(f"get_alliance_nations: cache read failed for alliance_{alliance_id}.json, falling back to API: {cache_err}")
+            contract = FRESH if force_refresh else parse_freshness(freshness)
+            started = time.monotonic()
+            if contract is not None and not contract.always_fetch:
+                nations, age_seconds = await self._cached_alliance_nations(alliance_id, proj, max_age=contract.age_limit())
+                if nations:
+                    self._snapshot_ages[cache_key] = age_seconds
+                    # Keep the stored snapshot warm for the next caller with a tighter contract
+                    if age_seconds >= self.cache_ttl_seconds:
+                        self.revalidate_alliance_nations(alliance_id, bot=bot, projection=proj)
+                    if bot:
+                        await self._fetch_discord_usernames(nations, bot)
+                    self._processing_cache[cache_key] = nations
+                    self._processing_alliances.discard(cache_key)
+                    self.freshness_telemetry.record('nations', contract, CACHED, time.monotonic() - started, age_seconds)
+                    return nations
+            elif not force_refresh:
+                nations, age_seconds = await self._cached_alliance_nations(
+                    alliance_id, proj, max_age=self.stale_ceiling_seconds(proj, max_stale_seconds)
+                )
+                if nations:
+                    self._snapshot_ages[cache_key] = age_seconds
+                    if age_seconds >= self.cache_ttl_seconds:
+                        self.logger.info(
+                            f"get_alliance_nations: serving stale snapshot for alliance {alliance_id} "
+                            f"({int(age_seconds)}s old, projection={proj}); revalidating in background"
+                        )
+                        self.revalidate_alliance_nations(alliance_id, bot=bot, projection=proj)
+                    # Optionally enrich with discord usernames
+                    if bot:
+                        await self._fetch_discord_usernames(nations, bot)
+                    # Store in processing cache to prevent infinite loops
+                    self._processing_cache[cache_key] = nations
+                    self._processing_alliances.discard(cache_key)
+                    return nations
 
             # Fetch via nations paginator with full pagination
-            try:
-                def nation_fields() -> str:
-                    return (
-                        "id alliance_position nation_name leader_name continent color flag discord discord_id "
-                        "war_policy domestic_policy social_policy government_type economic_policy update_tz "
-                        "vacation_mode_turns beige_turns tax_id num_cities score population "
-                        "gross_national_income gross_domestic_product espionage_available date last_active "
-                        "turns_since_last_city turns_since_last_project soldiers tanks aircraft ships missiles nukes spies "
-                        "money coal oil uranium iron bauxite lead gasoline munitions steel aluminum food wars_won wars_lost "
-                        "offensive_wars_count defensive_wars_count soldier_casualties tank_casualties aircraft_casualties "
-                        "ship_casualties missile_casualties missile_kills nuke_casualties nuke_kills spy_casualties spy_kills "
-                        "spy_attacks soldier_kills tank_kills aircraft_kills ship_kills money_looted total_infrastructure_destroyed "
-                        "total_infrastructure_lost projects project_bits alliance_id alliance_seniority alliance_join_date credits "
-                        "credits_redeemed_this_month vip commendations denouncements cities_discount activity_center advanced_engineering_corps "
-                        "advanced_pirate_economy arable_land_agency arms_stockpile bauxite_works bureau_of_domestic_affairs center_for_civil_engineering "
-                        "clinical_research_center emergency_gasoline_reserve fallout_shelter government_support_agency green_technologies guiding_satellite "
-                        "central_intelligence_agency international_trade_center iron_dome iron_works moon_landing mars_landing mass_irrigation "
-                        "military_doctrine military_research_center military_salvage missile_launch_pad nuclear_launch_facility nuclear_research_facility "
-                        "pirate_economy propaganda_bureau recycling_initiative research_and_development_center space_program specialized_police_training_program "
-                        "spy_satellite surveillance_network telecommunications_satellite uranium_enrichment_program vital_defense_system "
-                        "military_research { ground_capacity air_capacity naval_capacity ground_cost air_cost naval_cost } "
-                        "cities { id name date infrastructure land powered nuke_date oil_power wind_power coal_power nuclear_power coal_mine oil_well uranium_mine lead_mine iron_mine bauxite_mine gasrefinery aluminum_refinery steel_mill munitions_factory factory farm police_station hospital recycling_center subway supermarket bank shopping_mall stadium barracks airforcebase drydock }"
-                    )
-            except Exception:
-                def nation_fields() -> str:
-                    return "id nation_name leader_name alliance_id score num_cities last_active"
-
+            fields = self._nation_fields(proj)
             nations: List[Dict[str, Any]] = []
-            loop = asyncio.get_running_loop()
             first = 500
             page_num = 1
             last_page: Optional[int] = None
@@ -786,11 +982,11 @@ class PNWAPIQuery:
                     "query {\n"
                     + f"  nations(alliance_id: {alliance_id}, first: {first}, page: {page_num}) {{\n"
                     + "    paginatorInfo { currentPage lastPage hasMorePages }\n"
-                    + f"    data {{ {self._nation_fields()} }}\n"
+                    + f"    data {{ {fields} }}\n"
                     + "  }\n"
                     + "}"
                 )
-                data = await loop.run_in_executor(None, self._make_request, query)
+                data = await self._run_request(query)
                 block = (data.get('data') or {}).get('nations') or {}
                 items = block.get('data') or []
                 if not items:
@@ -805,30 +1001,23 @@ class PNWAPIQuery:
                 if isinstance(last_page, int) and last_page > 0 and page_num >= last_page:
                     break
                 page_num += 1
-            self.logger.info(f"get_alliance_nations: Retrieved {len(nations)} nations for alliance {alliance_id}")
+            self.logger.info(f"get_alliance_nations: Retrieved {len(nations)} nations for alliance {alliance_id} (projection={proj})")
 
-            # Save alliance data to the appropriate alliance_*.json file through user_data_manager
-            try:
-                alliance_data = {
-                    'nations': nations,
-                    'alliance_id': alliance_id,
-                    'last_updated': datetime.now().isoformat(),
-                    'total_nations': len(nations)
-                }
-                await self.user_data_manager.save_json_data(f'alliance_{alliance_id}', alliance_data)
-                self.logger.debug(f"get_alliance_nations: saved alliance {alliance_id} data to alliance_{alliance_id}.json")
-            except Exception as save_err:
-                self.logger.warning(f"get_alliance_nations: failed to save alliance data to alliance_{alliance_id}.json: {save_err}")
+            await self._store_alliance_snapshot(alliance_id, proj, nations)
+            nations = self.nation_repo.ingest(nations, projection=proj, alliance_id=alliance_id)
 
             # Fetch Discord usernames for nations that have Discord IDs
             if bot:
                 await self._fetch_discord_usernames(nations, bot)
 
-            # Store in processing cache to prevent infinite loops
+            # Store in processing cache to prevent infinite loops; the snapshot is swapped in whole
             self._processing_cache[cache_key] = nations
+            self._snapshot_ages[cache_key] = 0.0
             
             # Remove from processing set
             self._processing_alliances.discard(cache_key)
+            if contract is not None:
+                self.freshness_telemetry.record('nations', contract, FETCHED, time.monotonic() - started, 0.0)
             
             return nations
 
@@ -839,23 +1028,205 @@ class PNWAPIQuery:
                 self._processing_alliances.discard(cache_key)
             return None
 
+    async def _cached_alliance_nations(
+        self, alliance_id: Union[str, int], proj: str, max_age: float
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Optional[float]]:
+        """``(nations, age_seconds)`` from the nation repository, else from the stored snapshot files."""
+        held = self.nation_repo.alliance_members(alliance_id, max_age=max_age, projection=proj)
+        if held is not None:
+            return held
+        nations, age_seconds = await self._read_alliance_snapshot(alliance_id, proj, max_age=max_age)
+        if nations:
+            nations = self.nation_repo.ingest(
+                nations, projection=proj, fetched_at=time.time() - (age_seconds or 0.0), alliance_id=alliance_id
+            )
+        return nations, age_seconds
+
+    async def _store_alliance_snapshot(self, alliance_id: Union[str, int], proj: str, nations: List[Dict[str, Any]]) -> None:
+        """Derive metrics for a freshly fetched snapshot and save it as the projection's alliance file."""
+        cache_key = snapshot_key(alliance_id, proj)
+        # Derive max units, buy caps, combat score, etc. once so they are saved with the snapshot.
+        # Partial projections lack the inputs, so only full snapshots carry derived metrics.
+        if proj == 'full' and nations:
+            try:
+                previous = self._processing_cache.get(cache_key)
+                derive_stats = await asyncio.get_running_loop().run_in_executor(None, derive_nations, nations, previous)
+                self.logger.debug(
+                    f"_store_alliance_snapshot: derived metrics for {derive_stats['nations']} nations "
+                    f"({derive_stats['recomputed']} recomputed, {derive_stats['reused']} reused)"
+                )
+            except Exception as derive_err:
+                self.logger.warning(f"_store_alliance_snapshot: deriving metrics failed for alliance {alliance_id}: {derive_err}")
+
+        # Save alliance data to the projection's alliance_*.json file through user_data_manager
+        try:
+            alliance_data = {
+                'nations': nations,
+                'alliance_id': alliance_id,
+                'last_updated': datetime.now().isoformat(),
+                'total_nations': len(nations),
+                'projection': proj,
+            }
+            if proj != 'full':
+                alliance_data['fields'] = list(nation_fields_for(proj))
+            await self.user_data_manager.save_json_data(cache_key, alliance_data)
+            self.logger.debug(f"_store_alliance_snapshot: saved alliance {alliance_id} data to {cache_key}.json")
+        except Exception as save_err:
+            self.logger.warning(f"_store_alliance_snapshot: failed to save alliance data to {cache_key}.json: {save_err}")
+
+        # Keep the autocomplete name index current without waiting for the next file scan
+        try:
+            get_name_index().add_snapshot(cache_key, nations)
+        except Exception as index_err:
+            self.logger.debug(f"_store_alliance_snapshot: name index update failed: {index_err}")
+
+        # Append score/military rows to the per-nation time series
+        try:
+            await self.nation_series.ingest(nations, alliance_id=alliance_id)
+        except Exception as series_err:
+            self.logger.debug(f"_store_alliance_snapshot: nation series update failed: {series_err}")
+
+    async def _read_alliance_snapshot(
+        self,
+        alliance_id: Union[str, int],
+        projection: Optional[str] = None,
+        max_age: Optional[float] = None,
+    ) -> Tuple[Optional[List[Dict[str, Any]]], Optional[float]]:
+        """Return ``(nations, age_seconds)`` for the freshest cached snapshot satisfying ``projection``.
+
+        Snapshots are stored per projection (``alliance_<id>`` for full, ``alliance_<id>_<name>``
+        otherwise); any snapshot whose recorded fields are a superset of the request qualifies.
+        Snapshots older than ``max_age`` (default: the TTL) are ignored.
+        """
+        limit = self.cache_ttl_seconds if max_age is None else max_age
+        wanted = nation_fields_for(projection)
+        best: Optional[List[Dict[str, Any]]] = None
+        best_age: Optional[float] = None
+        best_key = None
+        for name in covering_projections(projection):
+            key = snapshot_key(alliance_id, name)
+            try:
+                # Most covering projections were never saved; reading one would create an empty file
+                if not self.user_data_manager.json_data_exists(key):
+                    continue
+                # Reject empty, stale or non-covering snapshots from the binary header alone;
+                # get_json_data then decodes an accepted one from the same sidecar
+                snapshot = self.user_data_manager.open_snapshot(key)
+                if snapshot is not None:
+                    with snapshot:
+                        meta = snapshot.meta
+                        if not len(snapshot) or not meta.get('last_updated') or not covers(meta.get('fields'), wanted):
+                            continue
+                        header_age = (datetime.now() - datetime.fromisoformat(meta['last_updated'])).total_seconds()
+                        if header_age >= limit or (best_age is not None and header_age >= best_age):
+                            continue
+                alliance_data = await self.user_data_manager.get_json_data(key, {})
+                if not alliance_data or not isinstance(alliance_data, dict):
+                    continue
+                nations = alliance_data.get('nations', [])
+                last_updated = alliance_data.get('last_updated')
+                if not nations or not last_updated:
+                    continue
+                # Legacy snapshots carry no field list and were always full
+                if not covers(alliance_data.get('fields'), wanted):
+                    continue
+                cache_time = datetime.fromisoformat(last_updated)
+                age_seconds = (datetime.now() - cache_time).total_seconds()
+                if age_seconds >= limit:
+                    continue
+                if best_age is None or age_seconds < best_age:
+                    best, best_age, best_key = nations, age_seconds, key
+            except Exception as cache_err:
+                self.logger.warning(f"get_alliance_nations: cache read failed for {key}.json, falling back to API: {cache_err}")
+        if best is not None:
+            self.logger.debug(f"get_alliance_nations: cache hit for alliance {alliance_id} ({len(best)} nations) from {best_key}.json")
+        return best, best_age
+
+    def stale_ceiling_seconds(self, projection: Optional[str] = None, override: Optional[float] = None) -> float:
+        """Maximum snapshot age that may still be served for ``projection`` (never below the TTL)."""
+        limit = override if override is not None else self.max_stale_seconds.get(
+            normalize_projection(projection), self.cache_ttl_seconds
+        )
+        try:
+            return max(float(self.cache_ttl_seconds), float(limit))
+        except Exception:
+            return float(self.cache_ttl_seconds)
+
+    def revalidate_alliance_nations(self, alliance_id: Union[str, int], bot=None, projection: Optional[str] = None) -> bool:
+        """Schedule a background refresh of an alliance snapshot.
+
+        Returns False when a refresh for the same snapshot is already running or no event
+        loop is available. The refreshed snapshot replaces the old one in a single atomic save.
+        """
+        key = snapshot_key(alliance_id, projection)
+        running = self._revalidate_tasks.get(key)
+        if running is not None and not running.done():
+            return False
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+
+        async def _revalidate():
+            try:
+                with api_priority(BACKGROUND):
+                    await self.get_alliance_nations(str(alliance_id), bot=bot, force_refresh=True, projection=projection)
+            except Exception as e:
+                self.logger.warning(f"revalidate_alliance_nations: refresh failed for {key}: {e}")
+            finally:
+                if self._revalidate_tasks.get(key) is task:
+                    self._revalidate_tasks.pop(key, None)
+
+        task = loop.create_task(_revalidate())
+        self._revalidate_tasks[key] = task
+        return True
+
+    def is_revalidating(self, alliance_id: Union[str, int], projection: Optional[str] = None) -> bool:
+        task = self._revalidate_tasks.get(snapshot_key(alliance_id, projection))
+        return task is not None and not task.done()
+
+    def record_snapshot_age(self, alliance_id: Union[str, int], age_seconds: float, projection: Optional[str] = None) -> None:
+        """Record the age of a snapshot a caller read directly from its alliance file."""
+        self._snapshot_ages[snapshot_key(alliance_id, projection)] = float(age_seconds)
+
+    def get_snapshot_age(self, alliance_id: Union[str, int], projection: Optional[str] = None) -> Optional[float]:
+        """Age in seconds of the snapshot last served for this alliance/projection, if known."""
+        return self._snapshot_ages.get(snapshot_key(alliance_id, projection))
+
+    def snapshot_age_note(self, alliance_id: Union[str, int], projection: Optional[str] = None) -> str:
+        """Short footer marker such as ``"Data 74m old (refreshing)"`` for stale snapshots, else ``""``."""
+        age = self.get_snapshot_age(alliance_id, projection)
+        if age is None or age < self.cache_ttl_seconds:
+            return ""
+        note = f"Data {int(age // 60)}m old"
+        if self.is_revalidating(alliance_id, projection):
+            note += " (refreshing)"
+        return note
+
     async def get_alliances_nations_batched(
         self,
         alliance_ids: List[Union[int, str]],
         side_label: Optional[str] = None,
         bot=None,
-        force_refresh: bool = True,
+        force_refresh: bool = False,
+        projection: Optional[str] = None,
+        freshness: FreshnessLike = None,
     ) -> Dict[int, List[Dict[str, Any]]]:
-        """Fetch nations for multiple alliances in a single GraphQL request.
+        """Fetch nations for multiple alliances in as few GraphQL requests as possible.
 
-        - Builds one query using field aliases per `alliances(id: ...)`.
+        - Packs one aliased `alliances(id: ...)` sub-query per alliance via the alias packer.
         - Optionally persists aggregated Home/Away results to `war_party_<side>` for quick reuse.
 
         Args:
             alliance_ids: List of alliance IDs to fetch.
             side_label: Optional label 'home' or 'away' to persist the aggregate.
             bot: Optional Discord bot for enriching with usernames.
-            force_refresh: If False, attempts to use per-alliance cache; otherwise fetch fresh.
+            force_refresh: Fetch every alliance from the API (same as ``freshness=FRESH``).
+            projection: Registered nation field set to request (default 'full').
+            freshness: Freshness contract for the per-alliance snapshots (default
+                ``DEFAULT_NATION_FRESHNESS``). Alliances with a qualifying snapshot are
+                served from it; only the rest are packed into the batched request and
+                their snapshots are saved for later callers.
 
         Returns:
             Dict mapping alliance_id -> list of nation dicts.
@@ -873,35 +1244,46 @@ class PNWAPIQuery:
             if not ids:
                 return {}
 
-            # Always fetch fresh in batched mode to avoid per-alliance cache reads
-
-            # Build single GraphQL query using field aliases
-            def nation_fields() -> str:
-                return self._nation_fields()
-
-            alias_blocks = []
-            for aid in ids:
-                alias = f"alli_{aid}"
-                block = (
-                    f"{alias}: alliances(id: {aid}) {{ data {{ nations {{ {nation_fields()} }} }} }}"
-                )
-                alias_blocks.append(block)
-            query = "query { " + " ".join(alias_blocks) + " }"
+            proj = normalize_projection(projection)
+            contract = FRESH if force_refresh else parse_freshness(freshness, DEFAULT_NATION_FRESHNESS)
+            started = time.monotonic()
+            cached: Dict[int, List[Dict[str, Any]]] = {}
+            if not contract.always_fetch:
+                age_limit = contract.age_limit()
+                for aid in ids:
+                    snapshot, age_seconds = await self._cached_alliance_nations(aid, proj, max_age=age_limit)
+                    if snapshot:
+                        cached[aid] = snapshot
+                        self._snapshot_ages[snapshot_key(aid, proj)] = age_seconds
+                        self.freshness_telemetry.record('nations', contract, CACHED, time.monotonic() - started, age_seconds)
+            missing = [aid for aid in ids if aid not in cached]
+
+            fields = self._nation_fields(proj)
+            subqueries = [
+                SubQuery(key=aid, root='alliances', args={'id': aid}, selection=f"data {{ nations {{ {fields} }} }}", rows=1)
+                for aid in missing
+            ]
+            blocks = await self._execute_packed(subqueries) if subqueries else {}
+            fetched_at = time.monotonic()
 
-            loop = asyncio.get_running_loop()
-            data = await loop.run_in_executor(None, self._make_request, query)
-
-            root = data.get('data') or {}
             result: Dict[int, List[Dict[str, Any]]] = {}
             nations_all: List[Dict[str, Any]] = []
             for aid in ids:
-                alias = f"alli_{aid}"
-                alli_block = root.get(alias) or {}
-                alli_list = alli_block.get('data') or []
-                nations = []
-                if alli_list:
-                    raw = alli_list[0].get('nations') or []
-                    nations = [self._normalize_nation(n) for n in raw]
+                if aid in cached:
+                    nations = cached[aid]
+                else:
+                    alli_block = (blocks.get(aid) or [{}])[0]
+                    alli_list = alli_block.get('data') or []
+                    nations = []
+                    if alli_list:
+                        raw = alli_list[0].get('nations') or []
+                        nations = [self._normalize_nation(n) for n in raw]
+                    if nations:
+                        await self._store_alliance_snapshot(aid, proj, nations)
+                        nations = self.nation_repo.ingest(nations, projection=proj, alliance_id=aid)
+                        self._processing_cache[snapshot_key(aid, proj)] = nations
+                        self._snapshot_ages[snapshot_key(aid, proj)] = 0.0
+                    self.freshness_telemetry.record('nations', contract, FETCHED, fetched_at - started, 0.0)
                 result[aid] = nations
                 if bot and nations:
                     try:
@@ -911,7 +1293,7 @@ class PNWAPIQuery:
                 for n in nations or []:
                     nations_all.append(n)
 
-            # Persist aggregate (Home/Away) only if requested; skip per-alliance caches
+            # Persist aggregate (Home/Away) only if requested
             save_tasks = []
             if side_label:
                 try:
@@ -940,6 +1322,86 @@ class PNWAPIQuery:
                 pass
             return {}
 
+    async def _load_treaty_graph(self) -> TreatyGraph:
+        """Shared treaty graph, merged with the saved copy on first use."""
+        graph = self.treaty_graph
+        if not graph.loaded:
+            try:
+                # First run: nothing saved yet, start empty without creating the file
+                saved = {}
+                if self.user_data_manager.json_data_exists(TREATY_GRAPH_KEY):
+                    saved = await self.user_data_manager.get_json_data(TREATY_GRAPH_KEY, {})
+                graph.load_dict(saved)
+            except Exception as e:
+                graph.loaded = True
+                self.logger.warning(f"_load_treaty_graph: could not read {TREATY_GRAPH_KEY}.json: {e}")
+        return graph
+
+    async def _record_treaties(
+        self,
+        treaties_by_alliance: Dict[int, List[Dict[str, Any]]],
+        complete: bool = True,
+        fetched_at: Optional[float] = None,
+    ) -> None:
+        """Fold fetched treaty lists into the treaty graph and save it when it changed."""
+        try:
+            graph = await self._load_treaty_graph()
+            for aid, treaties in treaties_by_alliance.items():
+                graph.update_alliance(aid, treaties, fetched_at=fetched_at, complete=complete)
+            if graph.dirty:
+                graph.dirty = False
+                await self.user_data_manager.save_json_data(TREATY_GRAPH_KEY, graph.to_dict())
+        except Exception as e:
+            self.logger.warning(f"_record_treaties: failed to update treaty graph: {e}")
+
+    async def get_treaty_graph(
+        self,
+        alliance_ids: Optional[List[int]] = None,
+        hops: int = 0,
+        types: Optional[Iterable[str]] = None,
+        freshness: FreshnessLike = None,
+    ) -> TreatyGraph:
+        """Treaty graph with the treaties of ``alliance_ids`` and their ``hops``-hop neighbourhood current.
+
+        Alliances whose saved treaty list is older than ``freshness`` (default: the
+        alliance cache TTL) are refetched in one batched request per hop; everything
+        else is answered from the graph. ``types`` limits which treaties are followed
+        when expanding the neighbourhood.
+        """
+        contract = parse_freshness(freshness, within(self.cache_ttl_seconds))
+        started = time.monotonic()
+        graph = await self._load_treaty_graph()
+        frontier: List[int] = []
+        for aid in alliance_ids or []:
+            try:
+                if int(aid) > 0:
+                    frontier.append(int(aid))
+            except Exception:
+                continue
+        seen = set(frontier)
+        fetched = 0
+        for depth in range(max(0, int(hops)) + 1):
+            stale = list(frontier) if contract.always_fetch else graph.stale(frontier, contract.age_limit())
+            if stale:
+                await self.get_treaties_for_alliances(stale)
+                fetched += len(stale)
+            if depth >= hops:
+                break
+            nxt: List[int] = []
+            for aid in frontier:
+                for other in graph.neighbors(aid, types):
+                    if other not in seen:
+                        seen.add(other)
+                        nxt.append(other)
+            if not nxt:
+                break
+            frontier = nxt
+        if alliance_ids:
+            self.freshness_telemetry.record('treaties', contract, FETCHED if fetched else CACHED, time.monotonic() - started)
+        if fetched:
+            self.logger.debug(f"get_treaty_graph: refreshed treaties for {fetched} alliances")
+        return graph
+
     async def get_alliance_treaties(
         self,
         alliance_id: str,
@@ -972,6 +1434,11 @@ class PNWAPIQuery:
                             age_seconds = (datetime.now() - cache_time).total_seconds()
                             if age_seconds < self.cache_ttl_seconds:
                                 self.logger.debug(f"get_alliance_treaties: cache hit for alliance {alliance_id} ({len(items)} treaties)")
+                                await self._record_treaties(
+                                    {alliance_id: items},
+                                    complete=not treaties_data.get('cutoff'),
+                                    fetched_at=cache_time.timestamp(),
+                                )
                                 return items
                 except Exception as cache_err:
                     self.logger.warning(f"get_alliance_treaties: cache read failed for {cache_key}.json, falling back to API: {cache_err}")
@@ -1003,8 +1470,7 @@ class PNWAPIQuery:
             """
 
             # Execute request off the event loop
-            loop = asyncio.get_running_loop()
-            data = await loop.run_in_executor(None, self._make_request, query)
+            data = await self._run_request(query)
 
             alliances_block = data.get('data', {}).get('alliances', {})
             alliance_list = alliances_block.get('data') or []
@@ -1042,6 +1508,7 @@ class PNWAPIQuery:
                 treaties = treaties[:limit]
 
             self.logger.info(f"get_alliance_treaties: Retrieved {len(treaties)} treaties for alliance {alliance_id}")
+            await self._record_treaties({alliance_id: treaties}, complete=not cutoff_utc and not limit)
 
             # Save to cache file
             try:
@@ -1131,7 +1598,7 @@ class PNWAPIQuery:
     ) -> Dict[int, List[Dict[str, Any]]]:
         """Batch-fetch treaties for multiple alliances using GraphQL aliases.
 
-        - Consolidates multiple `alliances(id: ...) { treaties }` lookups into one request via aliases.
+        - Packs the `alliances(id: ...) { treaties }` lookups into as few aliased requests as possible.
         - Applies optional cutoff filter (`date >= cutoff_dt`) per alliance.
         - Respects optional per-alliance `limit` client-side.
         - Saves per-alliance cache files, same format as `get_alliance_treaties`.
@@ -1147,40 +1614,19 @@ class PNWAPIQuery:
             # Allow optional limit argument in GraphQL, if provided
             limit_arg = f"(limit: {int(limit)})" if isinstance(limit, int) and limit > 0 else ""
 
-            # Build aliased blocks for all alliances
-            blocks = []
-            for aid in ids:
-                alias = f"alli_{aid}"
-                blocks.append(
-                    f"{alias}: alliances(id: {aid}) {{\n"
-                    f"  data {{\n"
-                    f"    id\n"
-                    f"    name\n"
-                    f"    acronym\n"
-                    f"    treaties{limit_arg} {{\n"
-                    f"      id\n"
-                    f"      date\n"
-                    f"      treaty_type\n"
-                    f"      treaty_url\n"
-                    f"      turns_left\n"
-                    f"      alliance1_id\n"
-                    f"      alliance2_id\n"
-                    f"      approved\n"
-                    f"      alliance1 {{ id name acronym flag }}\n"
-                    f"      alliance2 {{ id name acronym flag }}\n"
-                    f"    }}\n"
-                    f"  }}\n"
-                    f"}}\n"
-                )
-
-            query = "query {\n" + "".join(blocks) + "}"
-
-            loop = asyncio.get_running_loop()
-            data = await loop.run_in_executor(
-                None,
-                self._make_request,
-                query,
-                int(request_timeout_seconds) if isinstance(request_timeout_seconds, int) and request_timeout_seconds > 0 else 30,
+            # One aliased sub-query per alliance, packed by estimated response size
+            selection = (
+                f"data {{ id name acronym treaties{limit_arg} {{ "
+                "id date treaty_type treaty_url turns_left alliance1_id alliance2_id approved "
+                "alliance1 { id name acronym flag } alliance2 { id name acronym flag } } }"
+            )
+            subqueries = [
+                SubQuery(key=aid, root='alliances', args={'id': aid}, selection=selection, rows=1)
+                for aid in ids
+            ]
+            blocks = await self._execute_packed(
+                subqueries,
+                timeout=int(request_timeout_seconds) if isinstance(request_timeout_seconds, int) and request_timeout_seconds > 0 else 30,
             )
 
             # Helper: parse ISO date
@@ -1198,11 +1644,9 @@ class PNWAPIQuery:
             # Normalize cutoff to UTC (naive)
             cutoff_utc = self._to_utc(cutoff_dt) if cutoff_dt else None
             result: Dict[int, List[Dict[str, Any]]] = {}
-            root = data.get('data') or {}
             save_tasks = []
             for aid in ids:
-                alias = f"alli_{aid}"
-                block = root.get(alias) or {}
+                block = (blocks.get(aid) or [{}])[0]
                 alli_list = block.get('data') or []
                 treaties = []
                 if alli_list:
@@ -1231,6 +1675,8 @@ class PNWAPIQuery:
                 except Exception as save_err:
                     self.logger.warning(f"get_treaties_for_alliances: failed to enqueue save for treaties_{aid}.json: {save_err}")
 
+            await self._record_treaties(result, complete=not cutoff_utc and not limit)
+
             # Summary log
             total = sum(len(v) for v in result.values())
             # Perform saves concurrently
@@ -1265,6 +1711,7 @@ class PNWAPIQuery:
         request_retries: Optional[int] = 3,
         retry_backoff_seconds: Optional[float] = 1.0,
         concurrency_limit: Optional[int] = 4,
+        projection: Optional[str] = None,
     ) -> Dict[int, List[Dict[str, Any]]]:
         """Fetch wars for multiple alliances using aliased fields, with full pagination and optional cutoff.
 
@@ -1304,120 +1751,12 @@ class PNWAPIQuery:
             first_arg_tpl = ", first: {first}"
             page_arg_tpl = ", page: {page}"  # We always paginate; default to provided page
 
-            # Common field selection (mirrors get_alliance_wars); include paginatorInfo to short-circuit at lastPage
-            wars_fields = """
-              paginatorInfo {
-                currentPage
-                lastPage
-                hasMorePages
-              }
-              data {
-                id
-                date
-                end_date
-                winner_id
-                att_id
-                def_id
-                att_alliance_id
-                def_alliance_id
-                attacker { id alliance_id }
-                defender { id alliance_id }
-                reason
-                war_type
-                ground_control
-                air_superiority
-                naval_blockade
-                attacks {
-                  id
-                  date
-                  att_id
-                  attid
-                  def_id
-                  defid
-                  type
-                  war_id
-                  warid
-                  victor
-                  success
-                  city_id
-                  cityid
-                  infra_destroyed
-                  infradestroyed
-                  infra_destroyed_value
-                  resistance_lost
-                  resistance_eliminated
-                  money_stolen
-                  moneystolen
-                  money_looted
-                  att_mun_used
-                  def_mun_used
-                  att_gas_used
-                  def_gas_used
-                  att_soldiers_lost
-                  def_soldiers_lost
-                  att_tanks_lost
-                  def_tanks_lost
-                  att_aircraft_lost
-                  def_aircraft_lost
-                  att_ships_lost
-                  def_ships_lost
-                  att_missiles_lost
-                  def_missiles_lost
-                  att_nukes_lost
-                  def_nukes_lost
-                  gasoline_looted
-                  munitions_looted
-                  aluminum_looted
-                  steel_looted
-                  food_looted
-                  coal_looted
-                  oil_looted
-                  uranium_looted
-                  iron_looted
-                  bauxite_looted
-                  lead_looted
-                }
-              }
-            """
-
-            def _war_in_window(w: Dict[str, Any]) -> bool:
-                if not cutoff_utc:
-                    return True
-                attacks = w.get('attacks') or []
-                for a in attacks or []:
-                    try:
-                        ad_raw = a.get('date')
-                        ad = datetime.fromisoformat(ad_raw.replace('Z', '+00:00')) if ad_raw else None
-                        # Normalize parsed attack date to naive UTC for comparison
-                        if ad is not None:
-                            try:
-                                ad = ad.astimezone(self.utc_tz).replace(tzinfo=None) if self.utc_tz is not None else ad.replace(tzinfo=None)
-                            except Exception:
-                                ad = ad.replace(tzinfo=None)
-                    except Exception:
-                        ad = None
-                    if ad and ad >= cutoff_utc:
-                        return True
-                for k in ('date', 'end_date'):
-                    try:
-                        d_raw = w.get(k)
-                        d = datetime.fromisoformat(d_raw.replace('Z', '+00:00')) if d_raw else None
-                        # Normalize parsed war date to naive UTC for comparison
-                        if d is not None:
-                            try:
-                                d = d.astimezone(self.utc_tz).replace(tzinfo=None) if self.utc_tz is not None else d.replace(tzinfo=None)
-                            except Exception:
-                                d = d.replace(tzinfo=None)
-                    except Exception:
-                        d = None
-                    if d and d >= cutoff_utc:
-                        return True
-                return False
+            # Field selection from the projection registry; includes paginatorInfo to short-circuit at lastPage
+            wars_fields = self._war_fields(projection)
 
             # Concurrent per-alliance fetching with bounded concurrency
             result: Dict[int, List[Dict[str, Any]]] = {aid: [] for aid in ids}
             seen_ids_per_aid: Dict[int, set] = {aid: set() for aid in ids}
-            loop = asyncio.get_running_loop()
             sem = asyncio.Semaphore(int(concurrency_limit) if isinstance(concurrency_limit, int) and concurrency_limit and concurrency_limit > 0 else 4)
 
             mode_val = (active_mode or 'both').lower()
@@ -1440,9 +1779,7 @@ class PNWAPIQuery:
                             "}"
                         )
 
-                        data: Dict[str, Any] = await loop.run_in_executor(
-                            None,
-                            self._make_request,
+                        data: Dict[str, Any] = await self._run_request(
                             query,
                             int(request_timeout_seconds) if isinstance(request_timeout_seconds, int) and request_timeout_seconds > 0 else 20,
                         )
@@ -1458,7 +1795,7 @@ class PNWAPIQuery:
 
                         page_all_older_than_cutoff = True if cutoff_utc else False
                         for w in wars:
-                            if not cutoff_dt or _war_in_window(w):
+                            if not cutoff_dt or self._war_in_window(w, cutoff_utc):
                                 try:
                                     wid = int(w.get('id') or 0)
                                 except Exception:
@@ -1587,6 +1924,7 @@ class PNWAPIQuery:
         request_retries: Optional[int] = 2,
         retry_backoff_seconds: Optional[float] = 0.5,
         alias_batch_size: Optional[int] = 8,
+        projection: Optional[str] = None,
     ) -> Dict[int, List[Dict[str, Any]]]:
         try:
             ids = [int(x) for x in (alliance_ids or []) if str(x).strip()]
@@ -1604,218 +1942,140 @@ class PNWAPIQuery:
             if first <= 0:
                 first = 1000
 
-            wars_fields = """
-              paginatorInfo {
-                currentPage
-                lastPage
-                hasMorePages
-              }
-              data {
-                id
-                date
-                end_date
-                winner_id
-                att_id
-                def_id
-                att_alliance_id
-                def_alliance_id
-                attacker { id alliance_id }
-                defender { id alliance_id }
-                reason
-                war_type
-                ground_control
-                air_superiority
-                naval_blockade
-                attacks {
-                  id
-                  date
-                  att_id
-                  attid
-                  def_id
-                  defid
-                  type
-                  war_id
-                  warid
-                  victor
-                  success
-                  city_id
-                  cityid
-                  infra_destroyed
-                  infradestroyed
-                  infra_destroyed_value
-                  resistance_lost
-                  resistance_eliminated
-                  money_stolen
-                  moneystolen
-                  money_looted
-                  att_mun_used
-                  def_mun_used
-                  att_gas_used
-                  def_gas_used
-                  att_soldiers_lost
-                  def_soldiers_lost
-                  att_tanks_lost
-                  def_tanks_lost
-                  att_aircraft_lost
-                  def_aircraft_lost
-                  att_ships_lost
-                  def_ships_lost
-                  att_missiles_lost
-                  def_missiles_lost
-                  att_nukes_lost
-                  def_nukes_lost
-                  gasoline_looted
-                  munitions_looted
-                  aluminum_looted
-                  steel_looted
-                  food_looted
-                  coal_looted
-                  oil_looted
-                  uranium_looted
-                  iron_looted
-                  bauxite_looted
-                  lead_looted
-                }
-              }
-            """
-
-            def _war_in_window(w: Dict[str, Any]) -> bool:
-                if not cutoff_utc:
-                    return True
-                attacks = w.get('attacks') or []
-                for a in attacks or []:
-                    try:
-                        ad_raw = a.get('date')
-                        ad = datetime.fromisoformat(ad_raw.replace('Z', '+00:00')) if ad_raw else None
-                        if ad is not None:
-                            try:
-                                ad = ad.astimezone(self.utc_tz).replace(tzinfo=None) if self.utc_tz is not None else ad.replace(tzinfo=None)
-                            except Exception:
-                                ad = ad.replace(tzinfo=None)
-                    except Exception:
-                        ad = None
-                    if ad and ad >= cutoff_utc:
-                        return True
-                for k in ('date', 'end_date'):
-                    try:
-                        d_raw = w.get(k)
-                        d = datetime.fromisoformat(d_raw.replace('Z', '+00:00')) if d_raw else None
-                        if d is not None:
-                            try:
-                                d = d.astimezone(self.utc_tz).replace(tzinfo=None) if self.utc_tz is not None else d.replace(tzinfo=None)
-                            except Exception:
-                                d = d.replace(tzinfo=None)
-                    except Exception:
-                        d = None
-                    if d and d >= cutoff_utc:
-                        return True
-                return False
-
-            result: Dict[int, List[Dict[str, Any]]] = {aid: [] for aid in ids}
-            seen_ids_per_aid: Dict[int, set] = {aid: set() for aid in ids}
+            # Field selection from the projection registry; includes paginatorInfo to short-circuit at lastPage
+            wars_fields = self._war_fields(projection)
 
             mode_val = (active_mode or 'both').lower()
             modes = ['active', 'inactive'] if mode_val not in ('active', 'inactive') else [mode_val]
 
-            loop = asyncio.get_running_loop()
+            # One paginated sub-query per (alliance, mode); the packer advances pages per alias
+            subqueries = [
+                SubQuery(
+                    key=(aid, mode),
+                    root='wars',
+                    args={'alliance_id': aid, 'first': first, 'page': 1, 'active': mode == 'active'},
+                    selection=wars_fields,
+                    paginated=True,
+                )
+                for mode in modes
+                for aid in ids
+            ]
 
-            for mode in modes:
-                pages: Dict[int, int] = {aid: 1 for aid in ids}
-                finished: set = set()
-
-                while len(finished) < len(ids):
-                    batch_ids = [aid for aid in ids if aid not in finished][:int(alias_batch_size) if isinstance(alias_batch_size, int) and alias_batch_size and alias_batch_size > 0 else len(ids)]
-                    if not batch_ids:
-                        break
-                    blocks: List[str] = []
-                    aliases: List[str] = []
-                    for aid in batch_ids:
-                        alias = f"a{aid}p{pages[aid]}"
-                        aliases.append(alias)
-                        blocks.append(
-                            f"{alias}: wars(alliance_id: {aid}, first: {first}, page: {pages[aid]}, active: {'true' if mode=='active' else 'false'}) {{\n{wars_fields}\n}}"
-                        )
-                    query = "query {\n" + "\n".join(blocks) + "\n}"
+            def _continue(sq: SubQuery, block: Dict[str, Any]) -> bool:
+                # Stop paging once a whole page falls before the cutoff
+                if not cutoff_utc:
+                    return True
+                return any(self._war_in_window(w, cutoff_utc) for w in (block.get('data') or []))
 
-                    try:
-                        data: Dict[str, Any] = await loop.run_in_executor(
-                            None,
-                            self._make_request,
-                            query,
-                            int(request_timeout_seconds) if isinstance(request_timeout_seconds, int) and request_timeout_seconds > 0 else 20,
-                        )
-                    except Exception:
-                        if isinstance(alias_batch_size, int) and alias_batch_size and alias_batch_size > 1:
-                            return await self.get_wars_for_alliances_aliased(
-                                alliance_ids,
-                                page_size=first,
-                                active_mode=active_mode,
-                                cutoff_dt=cutoff_dt,
-                                request_timeout_seconds=request_timeout_seconds,
-                                request_retries=1,
-                                retry_backoff_seconds=0,
-                                alias_batch_size=max(1, int(alias_batch_size) // 2),
-                            )
-                        seq_map = await self.get_wars_for_alliances(
-                            alliance_ids,
-                            limit=None,
-                            page=1,
-                            force_refresh=True,
-                            cutoff_dt=cutoff_dt,
-                            page_size=first,
-                            active_mode=active_mode,
-                            request_timeout_seconds=max(60, int(request_timeout_seconds or 20)),
-                            request_retries=1,
-                            retry_backoff_seconds=0,
-                            concurrency_limit=6,
-                        )
-                        return seq_map
+            try:
+                blocks = await self._execute_packed(
+                    subqueries,
+                    timeout=int(request_timeout_seconds) if isinstance(request_timeout_seconds, int) and request_timeout_seconds > 0 else 20,
+                    max_aliases=int(alias_batch_size) if isinstance(alias_batch_size, int) and alias_batch_size and alias_batch_size > 0 else None,
+                    retries=int(request_retries) if isinstance(request_retries, int) and request_retries > 0 else 0,
+                    should_continue=_continue,
+                )
+            except Exception as e:
+                self.logger.warning(f"get_wars_for_alliances_aliased: packed fetch failed ({e}); falling back to per-alliance requests")
+                return await self.get_wars_for_alliances(
+                    alliance_ids,
+                    limit=None,
+                    page=1,
+                    force_refresh=True,
+                    cutoff_dt=cutoff_dt,
+                    page_size=first,
+                    active_mode=active_mode,
+                    request_timeout_seconds=max(60, int(request_timeout_seconds or 20)),
+                    request_retries=1,
+                    retry_backoff_seconds=0,
+                    concurrency_limit=6,
+                    projection=projection,
+                )
 
-                    root = data.get('data') or {}
-                    for aid in batch_ids:
-                        alias = f"a{aid}p{pages[aid]}"
-                        block = root.get(alias) or {}
-                        wars = block.get('data') or []
-                        try:
-                            pi = block.get('paginatorInfo') or {}
-                            last_page = int(pi.get('lastPage') or 0)
-                        except Exception:
-                            last_page = 0
-                        page_all_older_than_cutoff = True if cutoff_utc else False
-                        for w in wars:
-                            if not cutoff_dt or _war_in_window(w):
-                                try:
-                                    wid = int(w.get('id') or 0)
-                                except Exception:
-                                    wid = 0
-                                if wid and wid not in seen_ids_per_aid[aid]:
-                                    result[aid].append(w)
-                                    seen_ids_per_aid[aid].add(wid)
-                                    page_all_older_than_cutoff = False
-                        # Advance or finish
-                        if not wars or (isinstance(last_page, int) and last_page > 0 and pages[aid] >= last_page) or (cutoff_utc and page_all_older_than_cutoff):
-                            finished.add(aid)
-                        else:
-                            pages[aid] += 1
+            result: Dict[int, List[Dict[str, Any]]] = {aid: [] for aid in ids}
+            seen_ids_per_aid: Dict[int, set] = {aid: set() for aid in ids}
+            for mode in modes:
+                for aid in ids:
+                    for block in blocks.get((aid, mode)) or []:
+                        for w in block.get('data') or []:
+                            if cutoff_dt and not self._war_in_window(w, cutoff_utc):
+                                continue
+                            try:
+                                wid = int(w.get('id') or 0)
+                            except Exception:
+                                wid = 0
+                            if wid and wid not in seen_ids_per_aid[aid]:
+                                result[aid].append(w)
+                                seen_ids_per_aid[aid].add(wid)
 
             return result
         except Exception as e:
             self.logger.error(f"get_wars_for_alliances_aliased: failed for alliances {alliance_ids}: {e}")
             return {}
     
+    async def _save_war_table(self, key: str, wars: Union[List[Dict[str, Any]], WarTable], meta: Dict[str, Any]) -> int:
+        """Pack ``wars`` into a WarTable off the event loop and save it under ``key``; returns the blob size."""
+        def _pack() -> bytes:
+            table = wars if isinstance(wars, WarTable) else WarTable.from_wars(wars)
+            return table.dumps(meta)
+
+        blob = await asyncio.get_running_loop().run_in_executor(None, _pack)
+        if not await self.user_data_manager.save_binary_data(key, blob):
+            raise IOError(f"could not write {key}.pwt")
+        return len(blob)
+
+    async def load_war_table(self, key: str) -> Optional[Tuple[WarTable, Dict[str, Any]]]:
+        """Load a war table saved by the party war fetchers as (table, meta), or None."""
+        blob = await self.user_data_manager.load_binary_data(key)
+        if not blob:
+            return None
+        try:
+            return await asyncio.get_running_loop().run_in_executor(None, WarTable.loads, blob)
+        except Exception as e:
+            self.logger.warning(f"load_war_table: unreadable war table {key}: {e}")
+            return None
+
+    async def _saved_party_wars(
+        self, key: str, contract: Freshness, cutoff_utc: Optional[datetime]
+    ) -> Optional[Tuple[List[Dict[str, Any]], float]]:
+        """Wars from a saved war table that satisfies ``contract`` and covers ``cutoff_utc``, with its age."""
+        if contract.always_fetch:
+            return None
+        loaded = await self.load_war_table(key)
+        if loaded is None:
+            return None
+        table, meta = loaded
+        try:
+            age_seconds = (datetime.now() - datetime.fromisoformat(meta['created_at'])).total_seconds()
+            saved_cutoff = datetime.fromisoformat(meta['cutoff']) if meta.get('cutoff') else None
+        except Exception:
+            return None
+        if not contract.accepts(age_seconds):
+            return None
+        # A file cut off later than requested is missing older wars
+        if saved_cutoff is not None and (cutoff_utc is None or saved_cutoff > cutoff_utc):
+            return None
+        wars = table.to_dicts()
+        if cutoff_utc is not None and cutoff_utc != saved_cutoff:
+            wars = [w for w in wars if self._war_in_window(w, cutoff_utc)]
+        return wars, age_seconds
+
     async def get_wars_between_parties(
         self,
         home_alliance_ids: List[int],
         away_alliance_ids: List[int],
         cutoff_dt: Optional[datetime] = None,
         limit: Optional[int] = None,
-        force_refresh: bool = True,
+        force_refresh: bool = False,
+        freshness: FreshnessLike = None,
     ) -> List[Dict[str, Any]]:
         """Fetch all wars (offensive and defensive) for the given Home vs Away parties,
         combine and deduplicate by war id, filter to wars between the two parties (both directions),
         apply optional time cutoff, save to a unified parties file, and return the wars list.
 
         This centralizes war collection so downstream consumers calculate exclusively from one saved file.
+        A saved parties file within ``freshness`` (default ``DEFAULT_WAR_FRESHNESS``) that covers the
+        cutoff answers the call without a fetch; ``force_refresh`` always fetches.
         """
         try:
             # Normalize and sort party identifiers for deterministic cache key
@@ -1828,38 +2088,13 @@ class PNWAPIQuery:
             # Normalize cutoff to UTC (naive treated as local server TZ)
             cutoff_utc = self._to_utc(cutoff_dt) if cutoff_dt else None
 
-            # Helper to check time window
-            def _war_in_window(w: Dict[str, Any]) -> bool:
-                if not cutoff_utc:
-                    return True
-                attacks = w.get('attacks') or []
-                for a in attacks or []:
-                    try:
-                        ad_raw = a.get('date')
-                        ad = datetime.fromisoformat(ad_raw.replace('Z', '+00:00')) if ad_raw else None
-                        if ad is not None:
-                            try:
-                                ad = ad.astimezone(self.utc_tz).replace(tzinfo=None) if self.utc_tz is not None else ad.replace(tzinfo=None)
-                            except Exception:
-                                ad = ad.replace(tzinfo=None)
-                    except Exception:
-                        ad = None
-                    if ad and ad >= cutoff_utc:
-                        return True
-                for k in ('date', 'end_date'):
-                    try:
-                        d_raw = w.get(k)
-                        d = datetime.fromisoformat(d_raw.replace('Z', '+00:00')) if d_raw else None
-                        if d is not None:
-                            try:
-                                d = d.astimezone(self.utc_tz).replace(tzinfo=None) if self.utc_tz is not None else d.replace(tzinfo=None)
-                            except Exception:
-                                d = d.replace(tzinfo=None)
-                    except Exception:
-                        d = None
-                    if d and d >= cutoff_utc:
-                        return True
-                return False
+            contract = FRESH if force_refresh else parse_freshness(freshness, DEFAULT_WAR_FRESHNESS)
+            started = time.monotonic()
+            saved = await self._saved_party_wars(parties_key, contract, cutoff_utc)
+            if saved is not None:
+                wars_saved, age_seconds = saved
+                self.freshness_telemetry.record('wars', contract, CACHED, time.monotonic() - started, age_seconds)
+                return wars_saved
 
             # Collect wars with two distinct calls: ACTIVE then INACTIVE; deduplicate by id
             combined_map: Dict[int, Dict[str, Any]] = {}
@@ -1871,7 +2106,7 @@ class PNWAPIQuery:
                 all_ids,
                 page_size=500,
                 active_mode='both',
-                cutoff_dt=cutoff_utc,
+                cutoff_dt=cutoff_dt,
                 request_timeout_seconds=30,
                 request_retries=1,
                 retry_backoff_seconds=0,
@@ -1883,8 +2118,8 @@ class PNWAPIQuery:
                         wid = int(w.get('id') or 0)
                     except Exception:
                         wid = 0
-                if wid and wid not in combined_map:
-                    combined_map[wid] = w
+                    if wid and wid not in combined_map:
+                        combined_map[wid] = w
 
             if not combined_map:
                 seq_active = await self.get_wars_for_alliances(
@@ -1892,7 +2127,7 @@ class PNWAPIQuery:
                     limit=limit,
                     page=1,
                     force_refresh=force_refresh,
-                    cutoff_dt=cutoff_utc,
+                    cutoff_dt=cutoff_dt,
                     page_size=500,
                     active_mode='active',
                     request_timeout_seconds=60,
@@ -1905,7 +2140,7 @@ class PNWAPIQuery:
                     limit=limit,
                     page=1,
                     force_refresh=force_refresh,
-                    cutoff_dt=cutoff_utc,
+                    cutoff_dt=cutoff_dt,
                     page_size=500,
                     active_mode='inactive',
                     request_timeout_seconds=60,
@@ -1930,67 +2165,160 @@ class PNWAPIQuery:
                         if wid and wid not in combined_map:
                             combined_map[wid] = w
 
-            wars_between_map: Dict[int, Dict[str, Any]] = {}
-            for w in combined_map.values():
-                # Collect candidate alliance IDs for attacker/defender from both top-level and nested fields
-                att_ids_candidates: List[int] = []
-                def_ids_candidates: List[int] = []
-                try:
-                    att_ids_candidates.append(int(w.get('att_alliance_id') or 0))
-                except Exception:
-                    pass
-                try:
-                    def_ids_candidates.append(int(w.get('def_alliance_id') or 0))
-                except Exception:
-                    pass
-                att_nested = (w.get('attacker') or {})
-                def_nested = (w.get('defender') or {})
-                try:
-                    att_ids_candidates.append(int(att_nested.get('alliance_id') or 0))
-                except Exception:
-                    pass
+            home_set, away_set = set(home_ids), set(away_ids)
+            wars_between = [
+                w for w in combined_map.values()
+                if self._war_between_parties(w, home_set, away_set) and self._war_in_window(w, cutoff_utc)
+            ]
+            self.nation_repo.note_war_participants(wars_between)
+
+            # Save unified parties file as a packed war table. An empty selection from a
+            # non-empty fetch is not saved, so a bad filter cannot be served for the freshness window
+            if not wars_between and combined_map:
+                self.logger.debug(f"get_wars_between_parties: {len(combined_map)} wars fetched but none between the parties; not saving {parties_key}.pwt")
+            else:
                 try:
-                    def_ids_candidates.append(int(def_nested.get('alliance_id') or 0))
-                except Exception:
-                    pass
-                # Remove zeros and duplicates
-                att_ids_candidates = [i for i in {i for i in att_ids_candidates if isinstance(i, int) and i > 0}]
-                def_ids_candidates = [i for i in {i for i in def_ids_candidates if isinstance(i, int) and i > 0}]
+                    meta = {
+                        'role': 'parties',
+                        'home_alliances': home_ids,
+                        'away_alliances': away_ids,
+                        'created_at': datetime.now().isoformat(),
+                        'total_wars': len(wars_between),
+                        'cutoff': cutoff_utc.isoformat() if cutoff_utc else None,
+                    }
+                    size = await self._save_war_table(parties_key, wars_between, meta)
+                    self.logger.debug(f"get_wars_between_parties: saved {len(wars_between)} wars to {parties_key}.pwt ({size} bytes)")
+                except Exception as e:
+                    self.logger.warning(f"get_wars_between_parties: failed to save unified parties file: {e}")
+            self.freshness_telemetry.record('wars', contract, FETCHED, time.monotonic() - started, 0.0)
 
-                # Check any candidate pairing matches Home vs Away (both directions)
-                match_forward = any(i in home_ids for i in att_ids_candidates) and any(j in away_ids for j in def_ids_candidates)
-                match_reverse = any(i in away_ids for i in att_ids_candidates) and any(j in home_ids for j in def_ids_candidates)
+            return wars_between
+        except Exception as e:
+            self.logger.error(f"get_wars_between_parties: Error retrieving combined wars: {str(e)}")
+            return []
 
-                if (match_forward or match_reverse) and _war_in_window(w):
+    async def stream_wars_between_parties(
+        self,
+        home_alliance_ids: List[int],
+        away_alliance_ids: List[int],
+        cutoff_dt: Optional[datetime] = None,
+        page_size: int = 500,
+        alias_batch_size: int = 4,
+        request_timeout_seconds: int = 30,
+        buffer_batches: Optional[int] = None,
+        projection: Optional[str] = None,
+        force_refresh: bool = False,
+        freshness: FreshnessLike = None,
+    ) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield wars between the Home and Away parties one response page at a time.
+
+        Selects the same wars as `get_wars_between_parties` (both directions, optional
+        cutoff, deduplicated by war id) without collecting them as dicts: the next page is
+        fetched while the caller processes the current one, so a consumer that aggregates
+        as it goes holds only a page or two of wars. Streamed wars are packed into a
+        compact war table that is saved as the parties file once the stream completes, and
+        a parties file within ``freshness`` (default ``DEFAULT_WAR_FRESHNESS``) is replayed
+        instead of fetching.
+        """
+        home_ids = sorted({int(x) for x in (home_alliance_ids or []) if int(x) > 0})
+        away_ids = sorted({int(x) for x in (away_alliance_ids or []) if int(x) > 0})
+        all_ids = sorted(set(home_ids) | set(away_ids))
+        if not home_ids or not away_ids:
+            return
+        cutoff_utc = self._to_utc(cutoff_dt) if cutoff_dt else None
+        try:
+            first = max(1, min(int(page_size or 500), 1000))
+        except Exception:
+            first = 500
+
+        parties_key = f"war_parties_{'-'.join(map(str, home_ids))}_vs_{'-'.join(map(str, away_ids))}"
+        contract = FRESH if force_refresh else parse_freshness(freshness, DEFAULT_WAR_FRESHNESS)
+        started = time.monotonic()
+        # Partial projections would leave gaps in a saved table
+        full_table = normalize_projection(projection) == 'full'
+        saved = await self._saved_party_wars(parties_key, contract, cutoff_utc) if full_table else None
+        if saved is not None:
+            wars_saved, age_seconds = saved
+            self.freshness_telemetry.record('wars', contract, CACHED, time.monotonic() - started, age_seconds)
+            for i in range(0, len(wars_saved), first):
+                yield wars_saved[i:i + first]
+            return
+
+        wars_fields = self._war_fields(projection)
+        subqueries = [
+            SubQuery(
+                key=(aid, mode),
+                root='wars',
+                args={'alliance_id': aid, 'first': first, 'page': 1, 'active': mode == 'active'},
+                selection=wars_fields,
+                paginated=True,
+            )
+            for mode in ('active', 'inactive')
+            for aid in all_ids
+        ]
+
+        def _continue(sq: SubQuery, block: Dict[str, Any]) -> bool:
+            # Stop paging once a whole page falls before the cutoff
+            return not cutoff_utc or any(self._war_in_window(w, cutoff_utc) for w in (block.get('data') or []))
+
+        home_set, away_set = set(home_ids), set(away_ids)
+        seen: set = set()
+        fetched = 0
+        yielded = False
+        table = WarTable()
+        loop = asyncio.get_running_loop()
+        try:
+            async for _, block in self._stream_packed(
+                subqueries,
+                timeout=int(request_timeout_seconds or 30),
+                max_aliases=int(alias_batch_size) if alias_batch_size else None,
+                retries=1,
+                should_continue=_continue,
+                buffer_batches=buffer_batches,
+            ):
+                page: List[Dict[str, Any]] = []
+                fetched += len(block.get('data') or [])
+                for w in block.get('data') or []:
                     try:
                         wid = int(w.get('id') or 0)
                     except Exception:
                         wid = 0
-                    if wid and wid not in wars_between_map:
-                        wars_between_map[wid] = w
-
-            wars_between = list(wars_between_map.values())
-
-            # Save unified parties file
+                    if not wid or wid in seen:
+                        continue
+                    if not self._war_between_parties(w, home_set, away_set) or not self._war_in_window(w, cutoff_utc):
+                        continue
+                    seen.add(wid)
+                    page.append(w)
+                if page:
+                    yielded = True
+                    self.nation_repo.note_war_participants(page)
+                    if full_table:
+                        await loop.run_in_executor(None, table.extend, page)
+                    yield page
+        except Exception as e:
+            if yielded:
+                raise
+            self.logger.warning(f"stream_wars_between_parties: streamed fetch failed ({e}); falling back to get_wars_between_parties")
+            wars = await self.get_wars_between_parties(home_ids, away_ids, cutoff_dt=cutoff_dt, force_refresh=True)
+            for i in range(0, len(wars or []), first):
+                yield wars[i:i + first]
+            return
+
+        self.freshness_telemetry.record('wars', contract, FETCHED, time.monotonic() - started, 0.0)
+        # As in get_wars_between_parties, an empty table from a non-empty fetch is not saved
+        if full_table and (len(table) or not fetched):
             try:
-                payload = {
+                meta = {
                     'role': 'parties',
-                    'home_alliances': [{'id': a} for a in home_ids],
-                    'away_alliances': [{'id': b} for b in away_ids],
-                    'wars': wars_between,
+                    'home_alliances': home_ids,
+                    'away_alliances': away_ids,
                     'created_at': datetime.now().isoformat(),
-                    'total_wars': len(wars_between),
+                    'total_wars': len(table),
                     'cutoff': cutoff_utc.isoformat() if cutoff_utc else None,
                 }
-                await self.user_data_manager.save_json_data(parties_key, payload)
-                self.logger.debug(f"get_wars_between_parties: saved {len(wars_between)} wars to {parties_key}.json")
+                await self._save_war_table(parties_key, table, meta)
             except Exception as e:
-                self.logger.warning(f"get_wars_between_parties: failed to save unified parties file: {e}")
-
-            return wars_between
-        except Exception as e:
-            self.logger.error(f"get_wars_between_parties: Error retrieving combined wars: {str(e)}")
-            return []
+                self.logger.warning(f"stream_wars_between_parties: failed to save {parties_key}.pwt: {e}")
 
     async def get_party_wars_batched(
         self,
@@ -1998,10 +2326,11 @@ class PNWAPIQuery:
         side_label: Optional[str] = None,
         cutoff_dt: Optional[datetime] = None,
         limit: Optional[int] = None,
-        force_refresh: bool = True,
+        force_refresh: bool = False,
         page_size: Optional[int] = 1000,
         request_timeout_seconds: Optional[int] = 20,
         request_retries: Optional[int] = 1,
+        freshness: FreshnessLike = None,
     ) -> List[Dict[str, Any]]:
         """Fetch all wars and actions for a single party (Home or Away) in batched queries.
 
@@ -2009,6 +2338,8 @@ class PNWAPIQuery:
         - Deduplicates by war id across alliances and modes.
         - Applies optional cutoff using attack dates first, then war start/end.
         - Persists to a deterministic `war_party_<side>_<id_join>_wars` file via UserDataManager.
+        - Serves that file instead of fetching while it satisfies `freshness` (default `DEFAULT_WAR_FRESHNESS`)
+          and covers the cutoff; `force_refresh` always fetches.
         """
         try:
             # Normalize and sort party identifiers and label
@@ -2024,38 +2355,13 @@ class PNWAPIQuery:
             # Normalize cutoff to UTC (naive treated as local server TZ)
             cutoff_utc = self._to_utc(cutoff_dt) if cutoff_dt else None
 
-            # Helper to check time window
-            def _war_in_window(w: Dict[str, Any]) -> bool:
-                if not cutoff_utc:
-                    return True
-                attacks = w.get('attacks') or []
-                for a in attacks or []:
-                    try:
-                        ad_raw = a.get('date')
-                        ad = datetime.fromisoformat(ad_raw.replace('Z', '+00:00')) if ad_raw else None
-                        if ad is not None:
-                            try:
-                                ad = ad.astimezone(self.utc_tz).replace(tzinfo=None) if self.utc_tz is not None else ad.replace(tzinfo=None)
-                            except Exception:
-                                ad = ad.replace(tzinfo=None)
-                    except Exception:
-                        ad = None
-                    if ad and ad >= cutoff_utc:
-                        return True
-                for k in ('date', 'end_date'):
-                    try:
-                        d_raw = w.get(k)
-                        d = datetime.fromisoformat(d_raw.replace('Z', '+00:00')) if d_raw else None
-                        if d is not None:
-                            try:
-                                d = d.astimezone(self.utc_tz).replace(tzinfo=None) if self.utc_tz is not None else d.replace(tzinfo=None)
-                            except Exception:
-                                d = d.replace(tzinfo=None)
-                    except Exception:
-                        d = None
-                    if d and d >= cutoff_utc:
-                        return True
-                return False
+            contract = FRESH if force_refresh else parse_freshness(freshness, DEFAULT_WAR_FRESHNESS)
+            started = time.monotonic()
+            saved = await self._saved_party_wars(party_key, contract, cutoff_utc)
+            if saved is not None:
+                wars_saved, age_seconds = saved
+                self.freshness_telemetry.record('wars', contract, CACHED, time.monotonic() - started, age_seconds)
+                return wars_saved
 
             combined_map: Dict[int, Dict[str, Any]] = {}
 
@@ -2089,23 +2395,23 @@ class PNWAPIQuery:
                 )
 
             # Apply cutoff and emit list
-            wars_party = [w for w in combined_map.values() if _war_in_window(w)] if cutoff_dt else list(combined_map.values())
+            wars_party = [w for w in combined_map.values() if self._war_in_window(w, cutoff_utc)] if cutoff_dt else list(combined_map.values())
 
-            # Persist deterministic party file
+            # Persist deterministic party file as a packed war table
             try:
-                payload = {
+                meta = {
                     'role': 'party',
                     'side': side,
-                    'alliances': [{'id': a} for a in ids],
-                    'wars': wars_party,
+                    'alliances': ids,
                     'created_at': datetime.now().isoformat(),
                     'total_wars': len(wars_party),
                     'cutoff': cutoff_utc.isoformat() if cutoff_utc else None,
                 }
-                await self.user_data_manager.save_json_data(party_key, payload)
-                self.logger.debug(f"get_party_wars_batched: saved {len(wars_party)} wars to {party_key}.json")
+                size = await self._save_war_table(party_key, wars_party, meta)
+                self.logger.debug(f"get_party_wars_batched: saved {len(wars_party)} wars to {party_key}.pwt ({size} bytes)")
             except Exception as e:
                 self.logger.warning(f"get_party_wars_batched: failed to save party file {party_key}: {e}")
+            self.freshness_telemetry.record('wars', contract, FETCHED, time.monotonic() - started, 0.0)
 
             return wars_party
         except Exception as e:
@@ -2118,7 +2424,8 @@ class PNWAPIQuery:
         away_alliance_ids: List[int],
         cutoff_dt: Optional[datetime] = None,
         limit: Optional[int] = None,
-        force_refresh: bool = True,
+        force_refresh: bool = False,
+        freshness: FreshnessLike = None,
     ) -> Dict[str, List[Dict[str, Any]]]:
         """Convenience wrapper to fetch Home and Away party wars concurrently in batched mode.
 
@@ -2132,6 +2439,7 @@ class PNWAPIQuery:
                 cutoff_dt=cutoff_dt,
                 limit=limit,
                 force_refresh=force_refresh,
+                freshness=freshness,
             )
             away_task = self.get_party_wars_batched(
                 away_alliance_ids,
@@ -2139,6 +2447,7 @@ class PNWAPIQuery:
                 cutoff_dt=cutoff_dt,
                 limit=limit,
                 force_refresh=force_refresh,
+                freshness=freshness,
             )
             home_wars, away_wars = await asyncio.gather(home_task, away_task)
             return {'home': home_wars or [], 'away': away_wars or []}
@@ -2178,480 +2487,144 @@ class PNWAPIQuery:
         if discord_fetch_count > 0:
             self.logger.info(f"Fetched Discord info for {discord_fetch_count} nations")
     
-    async def get_nation_by_id(self, nation_id: str) -> Optional[Dict[str, Any]]:
+    def _held_nation(
+        self,
+        contract: Optional[Freshness],
+        started: float,
+        nation_id: Optional[Union[str, int]] = None,
+        name: Optional[str] = None,
+        leader: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Repository record for a single-nation lookup that satisfies ``contract``, if any."""
+        if contract is None or contract.always_fetch:
+            return None
+        if nation_id is not None:
+            held = self.nation_repo.get(nation_id, max_age=contract.age_limit(), projection='detail')
+        else:
+            held = self.nation_repo.find(name=name, leader=leader, max_age=contract.age_limit(), projection='detail')
+        if held is not None:
+            self.freshness_telemetry.record('nation', contract, CACHED, time.monotonic() - started, self.nation_repo.age(held.get('id')))
+        return held
+
+    def _fetched_nation(self, raw: Dict[str, Any], contract: Optional[Freshness], started: float) -> Dict[str, Any]:
+        nation = self.nation_repo.ingest_nation(self._normalize_nation(raw), projection='detail')
+        try:
+            # Saved with the next alliance snapshot; loading later merges under these rows
+            self.nation_series.record([nation])
+        except Exception as series_err:
+            self.logger.debug(f"_fetched_nation: nation series update failed: {series_err}")
+        if contract is not None:
+            self.freshness_telemetry.record('nation', contract, FETCHED, time.monotonic() - started, 0.0)
+        return nation
+
+    async def get_nation_by_id(self, nation_id: str, freshness: FreshnessLike = None) -> Optional[Dict[str, Any]]:
         """Get a single nation by ID with comprehensive fields.
         
         Args:
             nation_id: The nation ID to query
+            freshness: Optional contract; a shared repository record within it is returned without a fetch
             
         Returns:
             Nation dictionary or None if not found
         """
         try:
+            contract = parse_freshness(freshness)
+            started = time.monotonic()
+            held = self._held_nation(contract, started, nation_id=nation_id)
+            if held is not None:
+                return held
             query = f"""
                 query {{
                   nations(id: {nation_id}) {{
-                    data {{
-                      id
-                      nation_name
-                      leader_name
-                      color
-                      flag
-                      discord
-                      discord_id
-                      beige_turns
-                      num_cities
-                      score
-                      espionage_available
-                      date
-                      last_active
-                      soldiers
-                      tanks
-                      aircraft
-                      ships
-                      missiles
-                      nukes
-                      spies
-                      wars_won
-                      wars_lost
-                      offensive_wars_count
-                      defensive_wars_count
-                      offensive_wars {{
-                        id
-                        date
-                        war_type
-                        groundcontrol
-                        airsuperiority
-                        navalblockade
-                        winner
-                        turns_left
-                      }}
-                      defensive_wars {{
-                        id
-                        date
-                        war_type
-                        groundcontrol
-                        airsuperiority
-                        navalblockade
-                        winner
-                        turns_left
-                      }}
-                      soldier_casualties
-                      tank_casualties
-                      aircraft_casualties
-                      ship_casualties
-                      missile_casualties
-                      missile_kills
-                      nuke_casualties
-                      nuke_kills
-                      spy_casualties
-                      spy_kills
-                      spy_attacks
-                      soldier_kills
-                      tank_kills
-                      aircraft_kills
-                      ship_kills
-                      money_looted
-                      total_infrastructure_destroyed
-                      total_infrastructure_lost
-                      missile_launch_pad
-                      nuclear_research_facility
-                      nuclear_launch_facility
-                      iron_dome
-                      vital_defense_system
-                      propaganda_bureau
-                      military_research_center
-                      space_program
-                      activity_center
-                      advanced_engineering_corps
-                      advanced_pirate_economy
-                      arable_land_agency
-                      arms_stockpile
-                      bauxite_works
-                      bureau_of_domestic_affairs
-                      center_for_civil_engineering
-                      clinical_research_center
-                      emergency_gasoline_reserve
-                      fallout_shelter
-                      green_technologies
-                      government_support_agency
-                      guiding_satellite
-                      central_intelligence_agency
-                      international_trade_center
-                      iron_works
-                      mass_irrigation
-                      military_doctrine
-                      military_salvage
-                      mars_landing
-                      pirate_economy
-                      recycling_initiative
-                      research_and_development_center
-                      specialized_police_training_program
-                      spy_satellite
-                      surveillance_network
-                      telecommunications_satellite
-                      uranium_enrichment_program
-                      military_research {{
-                        ground_capacity
-                        air_capacity
-                        naval_capacity
-                        ground_cost
-                        air_cost
-                        naval_cost
-                      }}
-                      projects
-                      alliance_id
-                      alliance_position
-                      alliance {{
-                        id
-                        name
-                        acronym
-                        flag
-                      }}
-                      cities {{
-                        id
-                        name
-                        infrastructure
-                        stadium
-                        barracks
-                        factory
-                        airforcebase
-                        drydock
-                      }}
-                    }}
+                    data {{ {self._nation_fields('detail')} }}
                   }}
                 }}
             """
             
             # Run blocking HTTP in a thread to avoid blocking event loop
-            loop = asyncio.get_running_loop()
-            data = await loop.run_in_executor(None, self._make_request, query)
+            data = await self._run_request(query)
             
             nations = data.get('data', {}).get('nations', {}).get('data', [])
             if not nations:
                 self.logger.warning(f"get_nation_by_id: No nation found with ID {nation_id}")
                 return None
             
-            return self._normalize_nation(nations[0])
+            return self._fetched_nation(nations[0], contract, started)
             
         except Exception as e:
             self.logger.error(f"get_nation_by_id: Error retrieving nation {nation_id}: {str(e)}")
             return None
     
-    async def get_nation_by_name(self, nation_name: str) -> Optional[Dict[str, Any]]:
+    async def get_nation_by_name(self, nation_name: str, freshness: FreshnessLike = None) -> Optional[Dict[str, Any]]:
         """Get a single nation by name with comprehensive fields.
         
         Args:
             nation_name: The nation name to query
+            freshness: Optional contract; a shared repository record within it is returned without a fetch
             
         Returns:
             Nation dictionary or None if not found
         """
         try:
+            contract = parse_freshness(freshness)
+            started = time.monotonic()
+            held = self._held_nation(contract, started, name=nation_name)
+            if held is not None:
+                return held
             query = f"""
                 query {{
                   nations(first: 1, nation_name: "{nation_name}") {{
-                    data {{
-                      id
-                      nation_name
-                      leader_name
-                      color
-                      flag
-                      discord
-                      discord_id
-                      beige_turns
-                      num_cities
-                      score
-                      espionage_available
-                      date
-                      last_active
-                      soldiers
-                      tanks
-                      aircraft
-                      ships
-                      missiles
-                      nukes
-                      spies
-                      wars_won
-                      wars_lost
-                      offensive_wars_count
-                      defensive_wars_count
-                      offensive_wars {{
-                        id
-                        date
-                        war_type
-                        groundcontrol
-                        airsuperiority
-                        navalblockade
-                        winner
-                        turns_left
-                      }}
-                      defensive_wars {{
-                        id
-                        date
-                        war_type
-                        groundcontrol
-                        airsuperiority
-                        navalblockade
-                        winner
-                        turns_left
-                      }}
-                      soldier_casualties
-                      tank_casualties
-                      aircraft_casualties
-                      ship_casualties
-                      missile_casualties
-                      missile_kills
-                      nuke_casualties
-                      nuke_kills
-                      spy_casualties
-                      spy_kills
-                      spy_attacks
-                      soldier_kills
-                      tank_kills
-                      aircraft_kills
-                      ship_kills
-                      money_looted
-                      total_infrastructure_destroyed
-                      total_infrastructure_lost
-                      missile_launch_pad
-                      nuclear_research_facility
-                      nuclear_launch_facility
-                      iron_dome
-                      vital_defense_system
-                      propaganda_bureau
-                      military_research_center
-                      space_program
-                      activity_center
-                      advanced_engineering_corps
-                      advanced_pirate_economy
-                      arable_land_agency
-                      arms_stockpile
-                      bauxite_works
-                      bureau_of_domestic_affairs
-                      center_for_civil_engineering
-                      clinical_research_center
-                      emergency_gasoline_reserve
-                      fallout_shelter
-                      green_technologies
-                      government_support_agency
-                      guiding_satellite
-                      central_intelligence_agency
-                      international_trade_center
-                      iron_works
-                      mass_irrigation
-                      military_doctrine
-                      military_salvage
-                      mars_landing
-                      pirate_economy
-                      recycling_initiative
-                      research_and_development_center
-                      specialized_police_training_program
-                      spy_satellite
-                      surveillance_network
-                      telecommunications_satellite
-                      uranium_enrichment_program
-                      military_research {{
-                        ground_capacity
-                        air_capacity
-                        naval_capacity
-                        ground_cost
-                        air_cost
-                        naval_cost
-                      }}
-                      projects
-                      alliance_id
-                      alliance_position
-                      alliance {{
-                        id
-                        name
-                        acronym
-                        flag
-                      }}
-                      cities {{
-                        id
-                        name
-                        infrastructure
-                        stadium
-                        barracks
-                        factory
-                        airforcebase
-                        drydock
-                      }}
-                    }}
+                    data {{ {self._nation_fields('detail')} }}
                   }}
                 }}
             """
             
             
-            loop = asyncio.get_running_loop()
-            data = await loop.run_in_executor(None, self._make_request, query)
+            data = await self._run_request(query)
             
             nations = data.get('data', {}).get('nations', {}).get('data', [])
             if not nations:
                 self.logger.warning(f"get_nation_by_name: No nation found with name '{nation_name}'")
                 return None
             
-            return self._normalize_nation(nations[0])
+            return self._fetched_nation(nations[0], contract, started)
             
         except Exception as e:
             self.logger.error(f"get_nation_by_name: Error retrieving nation '{nation_name}': {str(e)}")
             return None
     
-    async def get_nation_by_leader(self, leader_name: str) -> Optional[Dict[str, Any]]:
+    async def get_nation_by_leader(self, leader_name: str, freshness: FreshnessLike = None) -> Optional[Dict[str, Any]]:
         """Get a single nation by leader name with comprehensive fields.
         
         Args:
             leader_name: The leader name to query
+            freshness: Optional contract; a shared repository record within it is returned without a fetch
             
         Returns:
             Nation dictionary or None if not found
         """
         try:
+            contract = parse_freshness(freshness)
+            started = time.monotonic()
+            held = self._held_nation(contract, started, leader=leader_name)
+            if held is not None:
+                return held
             query = f"""
                 query {{
                   nations(first: 1, leader_name: "{leader_name}") {{
-                    data {{
-                      id
-                      nation_name
-                      leader_name
-                      color
-                      flag
-                      discord
-                      discord_id
-                      beige_turns
-                      num_cities
-                      score
-                      espionage_available
-                      date
-                      last_active
-                      soldiers
-                      tanks
-                      aircraft
-                      ships
-                      missiles
-                      nukes
-                      spies
-                      wars_won
-                      wars_lost
-                      offensive_wars_count
-                      defensive_wars_count
-                      offensive_wars {{
-                        id
-                        date
-                        war_type
-                        groundcontrol
-                        airsuperiority
-                        navalblockade
-                        winner
-                        turns_left
-                      }}
-                      defensive_wars {{
-                        id
-                        date
-                        war_type
-                        groundcontrol
-                        airsuperiority
-                        navalblockade
-                        winner
-                        turns_left
-                      }}
-                      soldier_casualties
-                      tank_casualties
-                      aircraft_casualties
-                      ship_casualties
-                      missile_casualties
-                      missile_kills
-                      nuke_casualties
-                      nuke_kills
-                      spy_casualties
-                      spy_kills
-                      spy_attacks
-                      soldier_kills
-                      tank_kills
-                      aircraft_kills
-                      ship_kills
-                      money_looted
-                      total_infrastructure_destroyed
-                      total_infrastructure_lost
-                      missile_launch_pad
-                      nuclear_research_facility
-                      nuclear_launch_facility
-                      iron_dome
-                      vital_defense_system
-                      propaganda_bureau
-                      military_research_center
-                      space_program
-                      activity_center
-                      advanced_engineering_corps
-                      advanced_pirate_economy
-                      arable_land_agency
-                      arms_stockpile
-                      bauxite_works
-                      bureau_of_domestic_affairs
-                      center_for_civil_engineering
-                      clinical_research_center
-                      emergency_gasoline_reserve
-                      fallout_shelter
-                      green_technologies
-                      government_support_agency
-                      guiding_satellite
-                      central_intelligence_agency
-                      international_trade_center
-                      iron_works
-                      mass_irrigation
-                      military_doctrine
-                      military_salvage
-                      mars_landing
-                      pirate_economy
-                      recycling_initiative
-                      research_and_development_center
-                      specialized_police_training_program
-                      spy_satellite
-                      surveillance_network
-                      telecommunications_satellite
-                      uranium_enrichment_program
-                      military_research {{
-                        ground_capacity
-                        air_capacity
-                        naval_capacity
-                        ground_cost
-                        air_cost
-                        naval_cost
-                      }}
-                      projects
-                      alliance_id
-                      alliance_position
-                      alliance {{
-                        id
-                        name
-                        acronym
-                        flag
-                      }}
-                      cities {{
-                        id
-                        name
-                        infrastructure
-                        stadium
-                        barracks
-                        factory
-                        airforcebase
-                        drydock
-                      }}
-                    }}
+                    data {{ {self._nation_fields('detail')} }}
                   }}
                 }}
             """
             
-            loop = asyncio.get_running_loop()
-            data = await loop.run_in_executor(None, self._make_request, query)
+            data = await self._run_request(query)
             
             nations = data.get('data', {}).get('nations', {}).get('data', [])
             if not nations:
                 self.logger.warning(f"get_nation_by_leader: No nation found with leader '{leader_name}'")
                 return None
             
-            return self._normalize_nation(nations[0])
+            return self._fetched_nation(nations[0], contract, started)
             
         except Exception as e:
             self.logger.error(f"get_nation_by_leader: Error retrieving nation with leader '{leader_name}': {str(e)}")
@@ -2754,8 +2727,18 @@ class PNWAPIQuery:
             if bloc_dir.exists():
                 for alliance_file in bloc_dir.glob("alliance_*.json"):
                     try:
-                        alliance_id = alliance_file.stem.replace('alliance_', '')
-                        nations_data = await self.user_data_manager.get_json_data(alliance_file.stem, [])
+                        # Projection snapshots are stored as alliance_<id>_<projection>
+                        alliance_id, _, projection = alliance_file.stem.replace('alliance_', '', 1).partition('_')
+                        snapshot = self.user_data_manager.open_snapshot(alliance_file.stem)
+                        if snapshot is not None:
+                            # Count from the binary header without decoding any nation
+                            with snapshot:
+                                count = len(snapshot)
+                        else:
+                            nations_data = await self.user_data_manager.get_json_data(alliance_file.stem, [])
+                            if isinstance(nations_data, dict):
+                                nations_data = nations_data.get('nations', [])
+                            count = len(nations_data) if isinstance(nations_data, list) else 0
                         
                         # Calculate file age
                         file_age = max(0, int(now - alliance_file.stat().st_mtime))
@@ -2763,8 +2746,9 @@ class PNWAPIQuery:
                         info.append({
                             'key': alliance_file.stem,
                             'alliance_id': alliance_id,
+                            'projection': projection or 'full',
                             'cache_file': str(alliance_file),
-                            'count': len(nations_data) if isinstance(nations_data, list) else 0,
+                            'count': count,
                             'age_seconds': file_age
                         })
                     except Exception as e:
@@ -2785,14 +2769,15 @@ class PNWAPIQuery:
             }
 
 # Convenience function for creating a query instance
-def create_query_instance(api_key: str = None, logger: logging.Logger = None) -> PNWAPIQuery:
+def create_query_instance(api_key: str = None, logger: logging.Logger = None, base_url: str = None) -> PNWAPIQuery:
     """Create a new PNWAPIQuery instance.
     
     Args:
         api_key: P&W API key. If None, will use PANDW_API_KEY from config.
         logger: Logger instance. If None, will create a default logger.
+        base_url: GraphQL endpoint override (defaults to PNW_API_BASE_URL or the live API).
         
     Returns:
         PNWAPIQuery instance
     """
-    return PNWAPIQuery(api_key=api_key, logger=logger)
+    return PNWAPIQuery(api_key=api_key, logger=logger, base_url=base_url)
@@ -0,0 +1,195 @@
+"""Off-loop chart rendering for the MA cogs.
+
+Cogs build a ``ChartSpec`` and ``await get_render_service().render(spec)``.
+The spec is pickled to a small process pool where ``charts.render_spec``
+draws and PNG-encodes it, so Pillow work never blocks the event loop.
+
+The service bounds the number of outstanding jobs (callers beyond the bound
+wait for a free slot), applies a per-job timeout, and records render-time
+metrics per chart kind. If a process pool cannot be started it falls back to
+the default thread executor.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from .charts import PIL_AVAILABLE, ChartSpec, render_spec
+    from .image_cache import get_image_cache
+except ImportError:
+    from Systems.PnW.MA.charts import PIL_AVAILABLE, ChartSpec, render_spec
+    from Systems.PnW.MA.image_cache import get_image_cache
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _timed_render(spec: ChartSpec) -> Tuple[bytes, float]:
+    """Worker side: render and report pure render time (excludes queueing and IPC)."""
+    started = time.perf_counter()
+    data = render_spec(spec)
+    return data, time.perf_counter() - started
+
+
+class RenderService:
+    """Process-pool renderer with a bounded job queue, per-job timeouts and metrics."""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        timeout_seconds: Optional[float] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.logger = logger or logging.getLogger(__name__)
+        cpus = os.cpu_count() or 1
+        self.max_workers = int(max_workers or _env_number('PNW_RENDER_WORKERS', max(1, min(2, cpus - 1))))
+        self.max_pending = int(max_pending or _env_number('PNW_RENDER_QUEUE', 16))
+        self.timeout_seconds = float(timeout_seconds or _env_number('PNW_RENDER_TIMEOUT', 20.0))
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._use_threads = False
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending = 0
+        self.metrics: Dict[str, Any] = {
+            'jobs': 0,
+            'failures': 0,
+            'timeouts': 0,
+            'rejected': 0,
+            'queue_wait_seconds': 0.0,
+            'max_queue_wait_seconds': 0.0,
+            'by_kind': {},
+        }
+
+    @property
+    def available(self) -> bool:
+        return PIL_AVAILABLE
+
+    @property
+    def pending(self) -> int:
+        return self._pending
+
+    def _get_pool(self) -> Optional[ProcessPoolExecutor]:
+        if self._use_threads:
+            return None
+        if self._pool is None:
+            try:
+                # spawn: never fork the bot's event loop, sockets and threads into workers. Spawned
+                # workers re-import the entry script as __mp_main__, so allspark.py keeps its
+                # process setup and the bot behind __name__ == "__main__" guards
+                ctx = multiprocessing.get_context('spawn')
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers, mp_context=ctx)
+            except Exception as e:
+                self.logger.warning(f"RenderService: process pool unavailable, rendering in threads: {e}")
+                self._use_threads = True
+        return self._pool
+
+    def _get_slots(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(max(1, self.max_pending))
+            self._slots_loop = loop
+        return self._slots
+
+    def _record(self, kind: str, render_seconds: float, total_seconds: float, ok: bool) -> None:
+        stat = self.metrics['by_kind'].setdefault(kind, {
+            'jobs': 0, 'failures': 0, 'render_seconds': 0.0, 'max_render_seconds': 0.0, 'total_seconds': 0.0,
+        })
+        stat['jobs'] += 1
+        if not ok:
+            stat['failures'] += 1
+            self.metrics['failures'] += 1
+            return
+        stat['render_seconds'] += render_seconds
+        stat['max_render_seconds'] = max(stat['max_render_seconds'], render_seconds)
+        stat['total_seconds'] += total_seconds
+
+    async def render(self, spec: ChartSpec, timeout: Optional[float] = None, cache: bool = True) -> Optional[bytes]:
+        """PNG bytes for ``spec``, or None if Pillow is missing, the queue stays full, or rendering fails.
+
+        Identical specs are served from the content-addressed image cache unless ``cache`` is False.
+        """
+        if not PIL_AVAILABLE:
+            return None
+        if cache:
+            return await get_image_cache().get_or_render('chart', spec, lambda: self._render_job(spec, timeout))
+        return await self._render_job(spec, timeout)
+
+    async def _render_job(self, spec: ChartSpec, timeout: Optional[float] = None) -> Optional[bytes]:
+        timeout = float(timeout or self.timeout_seconds)
+        slots = self._get_slots()
+        queued = time.perf_counter()
+        try:
+            await asyncio.wait_for(slots.acquire(), timeout=timeout)
+        except asyncio.TimeoutError:
+            self.metrics['rejected'] += 1
+            self.logger.warning(f"RenderService: queue full ({self.max_pending} pending), dropping {spec.kind}")
+            return None
+        self._pending += 1
+        waited = time.perf_counter() - queued
+        self.metrics['jobs'] += 1
+        self.metrics['queue_wait_seconds'] += waited
+        self.metrics['max_queue_wait_seconds'] = max(self.metrics['max_queue_wait_seconds'], waited)
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            try:
+                future = loop.run_in_executor(self._get_pool(), _timed_render, spec)
+                data, render_seconds = await asyncio.wait_for(future, timeout=timeout)
+            except BrokenProcessPool:
+                # A worker died (OOM, killed); start a fresh pool for the next job
+                self.logger.warning("RenderService: worker pool broke, restarting")
+                self._pool = None
+                raise
+            self._record(spec.kind, render_seconds, time.perf_counter() - started, ok=True)
+            return data
+        except asyncio.TimeoutError:
+            self.metrics['timeouts'] += 1
+            self._record(spec.kind, 0.0, 0.0, ok=False)
+            self.logger.warning(f"RenderService: {spec.kind} render timed out after {timeout:.1f}s")
+            return None
+        except Exception as e:
+            self._record(spec.kind, 0.0, 0.0, ok=False)
+            self.logger.warning(f"RenderService: {spec.kind} render failed: {e}")
+            return None
+        finally:
+            self._pending -= 1
+            slots.release()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Counters plus average render/turnaround time per chart kind."""
+        out = dict(self.metrics)
+        out['pending'] = self._pending
+        out['workers'] = 0 if self._use_threads else self.max_workers
+        by_kind: Dict[str, Dict[str, float]] = {}
+        for kind, stat in self.metrics['by_kind'].items():
+            ok = max(1, stat['jobs'] - stat['failures'])
+            by_kind[kind] = dict(stat, avg_render_seconds=stat['render_seconds'] / ok, avg_total_seconds=stat['total_seconds'] / ok)
+        out['by_kind'] = by_kind
+        return out
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_service: Optional[RenderService] = None
+
+
+def get_render_service() -> RenderService:
+    """Process-wide render service shared by every cog."""
+    global _service
+    if _service is None:
+        _service = RenderService()
+    return _service
@@ -0,0 +1,265 @@
+"""Priority-aware scheduling and quota accounting for PnW API traffic.
+
+Every GraphQL request made by ``PNWAPIQuery`` acquires a slot from one
+process-wide ``APIScheduler`` before it hits the network. Requests carry a
+priority class:
+
+- ``interactive``: a user is waiting on a command (/destroy, /audit, ...)
+- ``near_real_time``: refreshes a user will look at soon (bloc refresh)
+- ``background``: revalidation, archiving and crawls
+
+Each class has its own concurrency cap, waiting higher-priority requests are
+always granted first, and the spacing between requests for the lower classes
+widens as the API budget (from response headers or the local daily count)
+runs low. Interactive requests keep the base spacing at all times.
+
+Request code runs in executor threads, so the scheduler is thread-based.
+The priority for a request is taken from the ``api_priority`` context in the
+calling coroutine and handed to the worker thread explicitly.
+"""
+
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+INTERACTIVE = 'interactive'
+NEAR_REAL_TIME = 'near_real_time'
+BACKGROUND = 'background'
+PRIORITIES: Tuple[str, ...] = (INTERACTIVE, NEAR_REAL_TIME, BACKGROUND)
+
+_current_priority: contextvars.ContextVar = contextvars.ContextVar('pnw_api_priority', default=INTERACTIVE)
+
+
+def normalize_priority(priority: Optional[str]) -> str:
+    """Map None/unknown names to 'interactive' so untagged callers never get starved."""
+    key = (priority or INTERACTIVE).strip().lower().replace('-', '_')
+    return key if key in PRIORITIES else INTERACTIVE
+
+
+def current_priority() -> str:
+    """Priority class of the running task (set with ``api_priority``)."""
+    return _current_priority.get()
+
+
+@contextmanager
+def api_priority(priority: str) -> Iterator[str]:
+    """Tag every PnW request issued inside the block with ``priority``.
+
+    Tasks created inside the block inherit the priority, so wrapping a background
+    job once covers all of its nested queries.
+    """
+    token = _current_priority.set(normalize_priority(priority))
+    try:
+        yield _current_priority.get()
+    finally:
+        _current_priority.reset(token)
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+class APIScheduler:
+    """Grants request slots by priority class under per-class caps and an adaptive budget."""
+
+    # Spacing multipliers per class as the remaining budget fraction drops below each threshold
+    BACKOFF_STEPS: Dict[str, Tuple[Tuple[float, float], ...]] = {
+        INTERACTIVE: (),
+        NEAR_REAL_TIME: ((0.25, 2.0), (0.10, 4.0)),
+        BACKGROUND: ((0.50, 2.0), (0.25, 6.0), (0.10, 20.0)),
+    }
+
+    def __init__(
+        self,
+        concurrency: Optional[Mapping[str, int]] = None,
+        daily_quota: Optional[int] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.logger = logger or logging.getLogger(__name__)
+        self.concurrency: Dict[str, int] = {
+            INTERACTIVE: _env_int('PNW_CONCURRENCY_INTERACTIVE', 4),
+            NEAR_REAL_TIME: _env_int('PNW_CONCURRENCY_NEAR_REAL_TIME', 2),
+            BACKGROUND: _env_int('PNW_CONCURRENCY_BACKGROUND', 1),
+        }
+        if concurrency:
+            for key, value in concurrency.items():
+                self.concurrency[normalize_priority(key)] = max(1, int(value))
+        # 0 means unknown: budget then comes from rate-limit headers only
+        self.daily_quota = int(daily_quota) if daily_quota is not None else _env_int('PNW_DAILY_QUOTA', 0)
+
+        self._cond = threading.Condition()
+        self._seq = itertools.count()
+        self._waiting: List[Tuple[int, int, str]] = []
+        self._in_flight: Dict[str, int] = {p: 0 for p in PRIORITIES}
+        self._last_start = 0.0
+
+        # Quota accounting
+        self._day = self._utc_day()
+        self._requests_today = 0
+        self._header_limit: Optional[int] = None
+        self._header_remaining: Optional[int] = None
+        self._header_reset_ts: Optional[float] = None
+
+        self.stats: Dict[str, Dict[str, float]] = {
+            p: {'requests': 0, 'wait_seconds': 0.0, 'max_wait_seconds': 0.0} for p in PRIORITIES
+        }
+
+    # ------------------------------------------------------------------
+    # Budget
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _utc_day() -> str:
+        return datetime.now(timezone.utc).strftime('%Y-%m-%d')
+
+    def _roll_day(self) -> None:
+        day = self._utc_day()
+        if day != self._day:
+            self._day = day
+            self._requests_today = 0
+
+    def budget_fraction(self) -> Optional[float]:
+        """Lowest remaining fraction across header and daily-count budgets, or None if unknown."""
+        fractions: List[float] = []
+        if self._header_limit and self._header_remaining is not None:
+            if self._header_reset_ts is None or time.time() < self._header_reset_ts:
+                fractions.append(max(0.0, self._header_remaining / float(self._header_limit)))
+        if self.daily_quota > 0:
+            fractions.append(max(0.0, 1.0 - self._requests_today / float(self.daily_quota)))
+        return min(fractions) if fractions else None
+
+    def interval_for(self, priority: str, base_interval: float) -> float:
+        """Minimum gap after the previous request start before a ``priority`` request may start."""
+        interval = max(0.0, float(base_interval))
+        fraction = self.budget_fraction()
+        if fraction is None:
+            return interval
+        multiplier = 1.0
+        for threshold, factor in self.BACKOFF_STEPS.get(priority, ()):
+            if fraction < threshold:
+                multiplier = factor
+        # Throttled classes still get some spacing when the caller asked for none
+        if multiplier > 1.0:
+            interval = max(interval, 0.15) * multiplier
+        return interval
+
+    def record_response(self, headers: Optional[Mapping[str, Any]] = None) -> None:
+        """Count one request against the daily budget and absorb any rate-limit headers."""
+        with self._cond:
+            self._roll_day()
+            self._requests_today += 1
+            if headers:
+                limit = self._header_int(headers, 'X-RateLimit-Limit')
+                remaining = self._header_int(headers, 'X-RateLimit-Remaining')
+                reset = self._header_int(headers, 'X-RateLimit-Reset')
+                if limit and remaining is not None:
+                    self._header_limit = limit
+                    self._header_remaining = remaining
+                    self._header_reset_ts = float(reset) if reset else None
+            self._cond.notify_all()
+
+    @staticmethod
+    def _header_int(headers: Mapping[str, Any], name: str) -> Optional[int]:
+        try:
+            value = headers.get(name)
+            if value is None:
+                value = headers.get(name.lower())
+            return int(float(value)) if value is not None else None
+        except Exception:
+            return None
+
+    # ------------------------------------------------------------------
+    # Slots
+    # ------------------------------------------------------------------
+
+    def _outranked(self, entry: Tuple[int, int, str]) -> bool:
+        """True if an earlier/higher-priority waiter whose class has capacity should go first."""
+        for other in self._waiting:
+            if other < entry and self._in_flight[other[2]] < self.concurrency[other[2]]:
+                return True
+        return False
+
+    def acquire(self, priority: Optional[str] = None, base_interval: float = 0.15) -> float:
+        """Block until a slot for ``priority`` is granted; returns seconds spent waiting."""
+        prio = normalize_priority(priority)
+        entry = (PRIORITIES.index(prio), next(self._seq), prio)
+        started = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiting, entry)
+            try:
+                while True:
+                    now = time.monotonic()
+                    if self._in_flight[prio] < self.concurrency[prio] and not self._outranked(entry):
+                        due = self._last_start + self.interval_for(prio, base_interval)
+                        if now >= due:
+                            break
+                        self._cond.wait(due - now)
+                    else:
+                        self._cond.wait(0.5)
+            finally:
+                self._waiting.remove(entry)
+                heapq.heapify(self._waiting)
+            self._in_flight[prio] += 1
+            self._last_start = time.monotonic()
+            waited = self._last_start - started
+            stat = self.stats[prio]
+            stat['requests'] += 1
+            stat['wait_seconds'] += waited
+            stat['max_wait_seconds'] = max(stat['max_wait_seconds'], waited)
+            self._cond.notify_all()
+        return waited
+
+    def release(self, priority: Optional[str] = None) -> None:
+        prio = normalize_priority(priority)
+        with self._cond:
+            self._in_flight[prio] = max(0, self._in_flight[prio] - 1)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, priority: Optional[str] = None, base_interval: float = 0.15) -> Iterator[float]:
+        """Hold a request slot for the duration of the block."""
+        waited = self.acquire(priority, base_interval)
+        try:
+            yield waited
+        finally:
+            self.release(priority)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current load, budget and per-class wait statistics for diagnostics."""
+        with self._cond:
+            self._roll_day()
+            return {
+                'in_flight': dict(self._in_flight),
+                'waiting': {p: sum(1 for e in self._waiting if e[2] == p) for p in PRIORITIES},
+                'concurrency': dict(self.concurrency),
+                'requests_today': self._requests_today,
+                'daily_quota': self.daily_quota,
+                'header_limit': self._header_limit,
+                'header_remaining': self._header_remaining,
+                'budget_fraction': self.budget_fraction(),
+                'stats': {p: dict(s) for p, s in self.stats.items()},
+            }
+
+
+_scheduler: Optional[APIScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> APIScheduler:
+    """Process-wide scheduler shared by every PNWAPIQuery instance."""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = APIScheduler()
+    return _scheduler
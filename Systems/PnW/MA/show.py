@@ -8,7 +8,6 @@ from datetime import datetime
 import sys
 import logging
 import traceback
-import time
 
 # Add project paths
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
@@ -41,6 +40,30 @@ except ImportError:
     except ImportError:
         from Systems.PnW.MA.bloc import AERO_ALLIANCES
 
+try:
+    from .freshness import within
+except ImportError:
+    try:
+        from freshness import within
+    except ImportError:
+        from Systems.PnW.MA.freshness import within
+
+try:
+    from .nation_series import TURNS_PER_DAY, get_nation_series
+except ImportError:
+    try:
+        from nation_series import TURNS_PER_DAY, get_nation_series
+    except ImportError:
+        from Systems.PnW.MA.nation_series import TURNS_PER_DAY, get_nation_series
+
+try:
+    from .city_cache import get_city_cache
+except ImportError:
+    try:
+        from city_cache import get_city_cache
+    except ImportError:
+        from Systems.PnW.MA.city_cache import get_city_cache
+
 
 # Top-level autocomplete wrapper to bind correctly without relying on Cog method binding
 async def autocomplete_show_target(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
@@ -73,9 +96,8 @@ class ShowCog(commands.Cog):
                 self.logger.setLevel(logging.INFO)
             self.error_count = 0
             self.max_errors = 100
-            # Simple in-memory cache for searched nations (15 minutes TTL)
+            # Searched nations are served from the shared nation repository for 15 minutes
             self.SEARCH_CACHE_TTL_SECONDS = 900
-            self.search_cache: Dict[str, Dict[str, Any]] = {}
             
             # Initialize query instance
             try:
@@ -106,51 +128,7 @@ class ShowCog(commands.Cog):
             self.max_errors = 100
             self.query_instance = None
             self.calculator = None
-            # Fallback cache init
             self.SEARCH_CACHE_TTL_SECONDS = 900
-            self.search_cache = {}
-
-    def _cache_key_for_target(self, target_data: str, input_type: str) -> str:
-        """Create a stable cache key for target lookups."""
-        try:
-            norm = (target_data or '').strip().lower()
-            return f"{input_type}:{norm}"
-        except Exception:
-            return f"{input_type}:{target_data}"
-
-    def _prune_search_cache(self) -> None:
-        """Remove expired items from the search cache."""
-        try:
-            now = time.time()
-            expired_keys = [k for k, v in (self.search_cache or {}).items() if v.get('expires_at', 0) <= now]
-            for k in expired_keys:
-                self.search_cache.pop(k, None)
-        except Exception as e:
-            self._log_error("Error pruning search cache", e, "_prune_search_cache")
-
-    def _get_cached_nation(self, cache_key: str) -> Optional[Dict[str, Any]]:
-        """Get cached nation data if not expired."""
-        try:
-            self._prune_search_cache()
-            entry = self.search_cache.get(cache_key)
-            if not entry:
-                return None
-            if entry.get('expires_at', 0) <= time.time():
-                # Expired
-                self.search_cache.pop(cache_key, None)
-                return None
-            return entry.get('data')
-        except Exception as e:
-            self._log_error("Error accessing search cache", e, "_get_cached_nation")
-            return None
-
-    def _set_cached_nation(self, cache_key: str, nation_data: Dict[str, Any]) -> None:
-        """Store nation data in cache with TTL."""
-        try:
-            expires_at = time.time() + float(self.SEARCH_CACHE_TTL_SECONDS or 900)
-            self.search_cache[cache_key] = {'data': nation_data, 'expires_at': expires_at}
-        except Exception as e:
-            self._log_error("Error setting search cache", e, "_set_cached_nation")
 
     def _log_error(self, error_msg: str, exception: Exception = None, context: str = ""):
         """Centralized error logging with tracking."""
@@ -287,14 +265,8 @@ class ShowCog(commands.Cog):
             
             self.logger.info(f"Fetching target nation data for {input_type}: {target_data}")
 
-            # Cache lookup
-            cache_key = self._cache_key_for_target(target_data, input_type)
-            cached = self._get_cached_nation(cache_key)
-            if cached:
-                self.logger.info("Returning nation data from search cache")
-                return cached
-            
-            # Use appropriate method from query instance based on input type
+            # Recently fetched nations (by any cog) come from the shared nation repository
+            freshness = within(self.SEARCH_CACHE_TTL_SECONDS)
             target_nation = None
             try:
                 if input_type == 'nation_id' or input_type == 'nation_link':
@@ -303,26 +275,17 @@ class ShowCog(commands.Cog):
                         nation_id = target_data  # This is already extracted from the link
                     else:
                         nation_id = target_data
-                    target_nation = await self.query_instance.get_nation_by_id(nation_id)
+                    target_nation = await self.query_instance.get_nation_by_id(nation_id, freshness=freshness)
                 elif input_type == 'nation_name':
-                    target_nation = await self.query_instance.get_nation_by_name(target_data)
+                    target_nation = await self.query_instance.get_nation_by_name(target_data, freshness=freshness)
                 elif input_type == 'leader_name':
-                    target_nation = await self.query_instance.get_nation_by_leader(target_data)
+                    target_nation = await self.query_instance.get_nation_by_leader(target_data, freshness=freshness)
                 
                 if not target_nation:
                     self.logger.info(f"No nation found for {input_type}: {target_data}")
                     return None
                 
                 self.logger.info(f"Successfully fetched nation: {target_nation.get('nation_name', 'Unknown')}")
-                # Set cache under both the original key and nation_id key (if available)
-                try:
-                    self._set_cached_nation(cache_key, target_nation)
-                    nid = str(target_nation.get('id') or target_nation.get('nation_id') or '').strip()
-                    if nid:
-                        id_key = self._cache_key_for_target(nid, 'nation_id')
-                        self._set_cached_nation(id_key, target_nation)
-                except Exception as e_set:
-                    self._log_error("Error caching fetched nation", e_set, "fetch_target_nation.cache")
                 return target_nation
                 
             except Exception as e:
@@ -393,45 +356,36 @@ class ShowCog(commands.Cog):
             'stadiums': 0,
         }
 
-        cities = nation.get('cities', [])
-        for city in cities:
-            if not isinstance(city, dict):
-                continue
-
-            # Power plants (each provides 500 MW)
-            coal_power = int(city.get('coal_power', 0) or 0)
-            oil_power = int(city.get('oil_power', 0) or 0)
-            nuclear_power = int(city.get('nuclear_power', 0) or 0)
-            wind_power = int(city.get('wind_power', 0) or 0)
-            improvements['power_plants'] += coal_power + oil_power + nuclear_power + wind_power
-
-            # Resource extraction
-            improvements['bauxite_mines'] += int(city.get('bauxite_mine', 0) or 0)
-            improvements['coal_mines'] += int(city.get('coal_mine', 0) or 0)
-            improvements['iron_mines'] += int(city.get('iron_mine', 0) or 0)
-            improvements['lead_mines'] += int(city.get('lead_mine', 0) or 0)
-            improvements['oil_wells'] += int(city.get('oil_well', 0) or 0)
-            improvements['uranium_mines'] += int(city.get('uranium_mine', 0) or 0)
-            improvements['farms'] += int(city.get('farm', 0) or 0)
-
-            # Manufacturing
-            improvements['aluminum_refineries'] += int(city.get('aluminum_refinery', 0) or 0)
-            improvements['steel_mills'] += int(city.get('steel_mill', 0) or 0)
-            improvements['gasoline_refineries'] += int(city.get('gasoline_refinery', 0) or 0)
-            improvements['munitions_factories'] += int(city.get('munitions_factory', 0) or 0)
-
-            # Military
-            improvements['barracks'] += int(city.get('barracks', 0) or 0)
-            improvements['factories'] += int(city.get('factory', 0) or 0)
-            improvements['hangars'] += int(city.get('airforcebase', 0) or 0)
-            improvements['drydocks'] += int(city.get('drydock', 0) or 0)
-
-            # Civil
-            improvements['subway_stations'] += int(city.get('subway', 0) or 0)
-            improvements['supermarkets'] += int(city.get('supermarket', 0) or 0)
-            improvements['banks'] += int(city.get('bank', 0) or 0)
-            improvements['shopping_malls'] += int(city.get('shopping_mall', 0) or 0)
-            improvements['stadiums'] += int(city.get('stadium', 0) or 0)
+        totals = get_city_cache().nation_totals(nation)
+        improvements['power_plants'] = totals.power_plants
+
+        # Resource extraction
+        improvements['bauxite_mines'] = totals.count('bauxite_mine')
+        improvements['coal_mines'] = totals.count('coal_mine')
+        improvements['iron_mines'] = totals.count('iron_mine')
+        improvements['lead_mines'] = totals.count('lead_mine')
+        improvements['oil_wells'] = totals.count('oil_well')
+        improvements['uranium_mines'] = totals.count('uranium_mine')
+        improvements['farms'] = totals.count('farm')
+
+        # Manufacturing
+        improvements['aluminum_refineries'] = totals.count('aluminum_refinery')
+        improvements['steel_mills'] = totals.count('steel_mill')
+        improvements['gasoline_refineries'] = totals.count('gasrefinery')
+        improvements['munitions_factories'] = totals.count('munitions_factory')
+
+        # Military
+        improvements['barracks'] = totals.count('barracks')
+        improvements['factories'] = totals.count('factory')
+        improvements['hangars'] = totals.count('airforcebase')
+        improvements['drydocks'] = totals.count('drydock')
+
+        # Civil
+        improvements['subway_stations'] = totals.count('subway')
+        improvements['supermarkets'] = totals.count('supermarket')
+        improvements['banks'] = totals.count('bank')
+        improvements['shopping_malls'] = totals.count('shopping_mall')
+        improvements['stadiums'] = totals.count('stadium')
 
         improvements['total'] = sum(v for k, v in improvements.items() if k != 'total')
         return improvements
@@ -441,33 +395,12 @@ class ShowCog(commands.Cog):
 
         Handles boolean, numeric, and string representations of the 'powered' field.
         Falls back to checking for presence of any power plant improvements when the field is missing.
+        The result is memoized per city build by the city cache.
         """
         try:
-            val = city.get('powered', None)
-            if val is None:
-                # Fallback: consider powered if the city has any power plant improvements
-                coal = int(city.get('coal_power', 0) or 0)
-                oil = int(city.get('oil_power', 0) or 0)
-                nuclear = int(city.get('nuclear_power', 0) or 0)
-                wind = int(city.get('wind_power', 0) or 0)
-                return (coal + oil + nuclear + wind) > 0
-            if isinstance(val, bool):
-                return val
-            if isinstance(val, (int, float)):
-                return int(val) != 0
-            if isinstance(val, str):
-                s = val.strip().lower()
-                return s in {"1", "true", "yes", "y", "t"}
-            return False
+            return get_city_cache().facts(city).powered
         except Exception:
-            try:
-                coal = int(city.get('coal_power', 0) or 0)
-                oil = int(city.get('oil_power', 0) or 0)
-                nuclear = int(city.get('nuclear_power', 0) or 0)
-                wind = int(city.get('wind_power', 0) or 0)
-                return (coal + oil + nuclear + wind) > 0
-            except Exception:
-                return False
+            return False
 
     def create_comprehensive_nation_embed(self, nation: Dict[str, Any]) -> discord.Embed:
         """Create a comprehensive nation embed similar to blitz.py's nation list view."""
@@ -521,9 +454,10 @@ class ShowCog(commands.Cog):
         powered_cities = 0
         infra_tier = 'Unknown'
         if cities:
-            total_infra = sum((city.get('infrastructure', 0) or 0) for city in cities if isinstance(city, dict))
+            city_totals = get_city_cache().nation_totals(nation)
+            total_infra = city_totals.infrastructure
             avg_city_infra = total_infra / len(cities) if cities else 0
-            powered_cities = sum(1 for city in cities if isinstance(city, dict) and self._is_city_powered(city))
+            powered_cities = city_totals.powered_cities
             if self.calculator:
                 try:
                     infra_tier = self.calculator._get_infrastructure_tier(avg_city_infra)
@@ -969,6 +903,21 @@ class SearchNationMilitaryView(discord.ui.View):
             if adv_text_parts:
                 embed.add_field(name="🎯 Military Advantage", value="\n".join(adv_text_parts), inline=False)
 
+            # Unit moves and score trend from the locally recorded time series
+            series = get_nation_series()
+            nation_id = self.nation.get('id') or self.nation.get('nation_id')
+            trend_parts = []
+            if nation_id:
+                for unit, delta in series.unit_changes(nation_id, turns=TURNS_PER_DAY).items():
+                    trend_parts.append(f"**{unit.title()}:** {delta:+,.0f}")
+                forecast = series.forecast(nation_id, 'score', horizon_turns=TURNS_PER_DAY)
+                if forecast and forecast['slope_per_day']:
+                    trend_parts.append(
+                        f"**Score:** {forecast['slope_per_day']:+,.2f}/day → ~{forecast['predicted']:,.0f} in 24h"
+                    )
+            if trend_parts:
+                embed.add_field(name="📈 Last 24h", value="\n".join(trend_parts), inline=False)
+
             nation_name = self.nation.get('nation_name', 'Unknown Nation')
             cities_list = self.nation.get('cities', [])
             cities = len(cities_list) if isinstance(cities_list, list) else 0
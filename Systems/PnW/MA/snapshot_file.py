@@ -0,0 +1,396 @@
+"""Binary alliance and war-party snapshots, opened through mmap and decoded lazily.
+
+Alliance snapshots (``alliance_<id>[_<projection>].json``) and war-party files
+are one list of records (nations or wars) plus a few top-level fields. Parsing
+the JSON to learn a snapshot's age, its nation count or an alliance's score
+total decodes every city of every nation. The ``.pnb`` sidecar written next to
+each JSON file keeps the same data in a layout that can be read piecemeal:
+
+    b'PNBS' | u16 schema | u16 flags | u32 header length | header JSON
+    | u32 record count | u64 offsets[count + 1] | record bytes
+
+The header holds the top-level fields (``meta``) and index columns of small
+per-record values (id, alliance, score, city count, unit counts...), so
+``SnapshotFile.meta``, ``len()``, ``column()`` and ``totals()`` never touch a
+record. Records are compact JSON (optionally zlib-compressed one by one) and
+are decoded only when indexed. Decoding every record of an uncompressed
+sidecar is also quicker than ``json.load`` of the JSON file, so full loads
+read the sidecar too (``read_snapshot``, and UserDataManager for Bloc keys).
+
+The header records the size and mtime of the JSON file it was built from. A
+sidecar is used only while its JSON file still matches, so a sidecar written
+late or left behind by code that rewrites the JSON directly is never served.
+Older sidecars without that stamp are used while they are at least as new as
+their JSON file.
+
+Run ``python -m Systems.PnW.MA.snapshot_file convert [dir]`` to write
+sidecars for existing JSON caches, or ``info <file>`` to inspect one.
+"""
+
+import argparse
+import json
+import logging
+import mmap
+import os
+import struct
+import sys
+import zlib
+from collections.abc import Sequence
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+MAGIC = b'PNBS'
+SCHEMA_VERSION = 1
+SUFFIX = '.pnb'
+FLAG_ZLIB = 1
+
+_PREFIX = struct.Struct('<4sHHI')
+_COUNT = struct.Struct('<I')
+_OFFSET = struct.Struct('<Q')
+
+# Top-level keys that hold the record list, in order of preference
+LIST_KEYS = ('nations', 'wars')
+NATION_COLUMNS: Tuple[str, ...] = (
+    'id', 'nation_name', 'leader_name', 'alliance_id', 'alliance_position', 'score', 'num_cities',
+    'soldiers', 'tanks', 'aircraft', 'ships', 'missiles', 'nukes', 'spies',
+    'vacation_mode_turns', 'beige_turns', 'color', 'last_active',
+)
+WAR_COLUMNS: Tuple[str, ...] = (
+    'id', 'date', 'end_date', 'war_type', 'turns_left',
+    'att_id', 'def_id', 'att_alliance_id', 'def_alliance_id',
+)
+_COLUMNS = {'nations': NATION_COLUMNS, 'wars': WAR_COLUMNS}
+
+logger = logging.getLogger(__name__)
+
+PathLike = Union[str, os.PathLike]
+
+
+def sidecar_path(json_path: PathLike) -> Path:
+    """``.pnb`` path stored next to ``json_path``."""
+    return Path(json_path).with_suffix(SUFFIX)
+
+
+def _list_key(data: Any) -> Optional[str]:
+    if not isinstance(data, dict):
+        return None
+    for key in LIST_KEYS:
+        value = data.get(key)
+        if isinstance(value, list) and all(isinstance(r, dict) for r in value):
+            return key
+    return None
+
+
+def _column_value(record: Dict[str, Any], name: str) -> Any:
+    value = record.get(name)
+    if value is None and name == 'num_cities' and isinstance(record.get('cities'), list):
+        return len(record['cities'])
+    if isinstance(value, (dict, list)):
+        return None
+    return value
+
+
+def source_stamp(json_path: PathLike) -> Optional[Dict[str, int]]:
+    """Size and mtime of ``json_path``, which a sidecar built from it must match; None if missing."""
+    try:
+        st = os.stat(json_path)
+    except OSError:
+        return None
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+
+def encode_snapshot(data: Any, compress: bool = False, source: Optional[Dict[str, int]] = None) -> Optional[bytes]:
+    """Binary form of a snapshot dict, or None if ``data`` has no record list.
+
+    ``source`` is the ``source_stamp`` of the JSON file holding the same data.
+    """
+    list_key = _list_key(data)
+    if list_key is None:
+        return None
+    records: List[Dict[str, Any]] = data[list_key]
+    names = [n for n in _COLUMNS[list_key] if any(_column_value(r, n) is not None for r in records)]
+    header = {
+        'list_key': list_key,
+        'order': list(data.keys()),
+        'meta': {k: v for k, v in data.items() if k != list_key},
+        'columns': {n: [_column_value(r, n) for r in records] for n in names},
+    }
+    if source is not None:
+        header['source'] = source
+    head = json.dumps(header, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+    flags = FLAG_ZLIB if compress else 0
+    blobs = []
+    for record in records:
+        blob = json.dumps(record, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8')
+        blobs.append(zlib.compress(blob, 1) if compress else blob)
+    offsets = [0]
+    for blob in blobs:
+        offsets.append(offsets[-1] + len(blob))
+    return b''.join([
+        _PREFIX.pack(MAGIC, SCHEMA_VERSION, flags, len(head)),
+        head,
+        _COUNT.pack(len(blobs)),
+        struct.pack(f'<{len(offsets)}Q', *offsets),
+    ] + blobs)
+
+
+def write_snapshot(
+    path: PathLike, data: Any, compress: bool = False, source: Optional[Dict[str, int]] = None
+) -> bool:
+    """Atomically write ``data`` to ``path`` in binary form; False if it has no record list."""
+    payload = encode_snapshot(data, compress=compress, source=source)
+    if payload is None:
+        return False
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = path.with_name(path.name + '.tmp')
+    temp_path.write_bytes(payload)
+    temp_path.replace(path)
+    return True
+
+
+class LazyRecords(Sequence):
+    """Read-only list view over a snapshot's records; each is decoded on first access."""
+
+    def __init__(self, snapshot: 'SnapshotFile'):
+        self._snapshot = snapshot
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self._snapshot.record(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        return self._snapshot.record(index)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for i in range(len(self)):
+            yield self._snapshot.record(i)
+
+
+class SnapshotFile:
+    """An mmap-backed ``.pnb`` snapshot. Keep instances short-lived (or use ``with``)."""
+
+    def __init__(self, path: PathLike):
+        self.path = Path(path)
+        self._file = open(self.path, 'rb')
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, schema, flags, head_len = _PREFIX.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                raise ValueError(f"{self.path} is not a binary snapshot")
+            if schema > SCHEMA_VERSION:
+                raise ValueError(f"{self.path} has schema {schema}, newer than supported {SCHEMA_VERSION}")
+            self.schema = schema
+            self.compressed = bool(flags & FLAG_ZLIB)
+            pos = _PREFIX.size
+            header = json.loads(bytes(self._map[pos:pos + head_len]).decode('utf-8'))
+            pos += head_len
+            (self._count,) = _COUNT.unpack_from(self._map, pos)
+            self._offsets_at = pos + _COUNT.size
+            self._records_at = self._offsets_at + _OFFSET.size * (self._count + 1)
+        except Exception:
+            self.close()
+            raise
+        self.list_key: str = header.get('list_key') or 'nations'
+        self.meta: Dict[str, Any] = header.get('meta') or {}
+        self._order: List[str] = header.get('order') or list(self.meta) + [self.list_key]
+        self._columns: Dict[str, List[Any]] = header.get('columns') or {}
+        self.source: Optional[Dict[str, int]] = header.get('source')
+        self._decoded: Dict[int, Dict[str, Any]] = {}
+        self._by_id: Optional[Dict[str, int]] = None
+
+    def close(self) -> None:
+        mapped = getattr(self, '_map', None)
+        if mapped is not None:
+            mapped.close()
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> 'SnapshotFile':
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def column_names(self) -> List[str]:
+        return list(self._columns)
+
+    def column(self, name: str) -> List[Any]:
+        """Index column ``name`` (one value per record, None where absent); [] if not indexed."""
+        return self._columns.get(name) or []
+
+    def rows(self, names: Optional[Iterable[str]] = None) -> Iterator[Dict[str, Any]]:
+        """Index columns as one dict per record, without decoding any record."""
+        names = [n for n in (names or self._columns) if n in self._columns]
+        cols = [self._columns[n] for n in names]
+        for values in zip(*cols):
+            yield dict(zip(names, values))
+
+    def totals(
+        self,
+        names: Optional[Iterable[str]] = None,
+        where: Optional[Callable[[Dict[str, Any]], bool]] = None,
+    ) -> Dict[str, float]:
+        """Sums of numeric index columns over the records ``where`` accepts (all by default)."""
+        names = [n for n in (names or self._columns) if n in self._columns]
+        out = dict.fromkeys(names, 0.0)
+        for row in self.rows(self._columns if where else names):
+            if where is not None and not where(row):
+                continue
+            for name in names:
+                value = row.get(name)
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    out[name] += value
+        return out
+
+    def record(self, index: int) -> Dict[str, Any]:
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        cached = self._decoded.get(index)
+        if cached is not None:
+            return cached
+        if self._map is None:
+            raise ValueError(f"{self.path} is closed")
+        start, end = struct.unpack_from('<2Q', self._map, self._offsets_at + _OFFSET.size * index)
+        blob = self._map[self._records_at + start:self._records_at + end]
+        if self.compressed:
+            blob = zlib.decompress(blob)
+        record = json.loads(blob.decode('utf-8'))
+        self._decoded[index] = record
+        return record
+
+    def find(self, record_id: Any) -> Optional[Dict[str, Any]]:
+        """Record whose ``id`` is ``record_id`` (via the id column), or None."""
+        if self._by_id is None:
+            self._by_id = {str(v): i for i, v in enumerate(self.column('id')) if v is not None}
+        index = self._by_id.get(str(record_id))
+        return self.record(index) if index is not None else None
+
+    def records(self) -> LazyRecords:
+        return LazyRecords(self)
+
+    def load(self) -> Dict[str, Any]:
+        """The snapshot as the dict its JSON file holds, with every record decoded."""
+        records = [self.record(i) for i in range(self._count)]
+        return {key: (records if key == self.list_key else self.meta.get(key)) for key in self._order}
+
+
+def open_snapshot(json_path: PathLike) -> Optional[SnapshotFile]:
+    """Open the sidecar of ``json_path`` if it was built from the JSON file as it is now."""
+    json_path = Path(json_path)
+    binary = sidecar_path(json_path)
+    try:
+        binary_mtime = binary.stat().st_mtime
+    except OSError:
+        return None
+    try:
+        snapshot = SnapshotFile(binary)
+    except Exception as e:
+        logger.warning(f"open_snapshot: ignoring unreadable {binary}: {e}")
+        return None
+    current = source_stamp(json_path)
+    if snapshot.source is not None:
+        stale = current is not None and snapshot.source != current
+    else:
+        stale = current is not None and json_path.stat().st_mtime > binary_mtime
+    if stale:
+        snapshot.close()
+        return None
+    return snapshot
+
+
+def read_snapshot(json_path: PathLike) -> Any:
+    """Contents of ``json_path``, decoded from its sidecar when one is current."""
+    snapshot = open_snapshot(json_path)
+    if snapshot is not None:
+        with snapshot:
+            return snapshot.load()
+    with open(json_path, 'r', encoding='utf-8-sig') as f:
+        return json.load(f)
+
+
+def convert_path(json_path: PathLike, force: bool = False) -> bool:
+    """Write the sidecar for one JSON snapshot; False if it is current or has no record list."""
+    json_path = Path(json_path)
+    if not force:
+        current = open_snapshot(json_path)
+        if current is not None:
+            current.close()
+            return False
+    source = source_stamp(json_path)
+    with open(json_path, 'r', encoding='utf-8-sig') as f:
+        data = json.load(f)
+    return write_snapshot(sidecar_path(json_path), data, source=source)
+
+
+def is_snapshot_file(path: PathLike) -> bool:
+    """Whether ``path`` is an alliance or war-party JSON file that gets a sidecar."""
+    path = Path(path)
+    return path.suffix == '.json' and path.stem.startswith(('alliance_', 'war_party_', 'war_parties_'))
+
+
+def convert_directory(directory: PathLike, force: bool = False) -> Tuple[int, int]:
+    """Convert every snapshot JSON in ``directory``; returns ``(converted, skipped)``."""
+    converted = skipped = 0
+    for path in sorted(Path(directory).glob('*.json')):
+        if not is_snapshot_file(path):
+            continue
+        try:
+            if convert_path(path, force=force):
+                converted += 1
+            else:
+                skipped += 1
+        except Exception as e:
+            skipped += 1
+            logger.warning(f"convert_directory: failed to convert {path}: {e}")
+    return converted, skipped
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    default_dir = Path(__file__).resolve().parent.parent.parent / 'Data' / 'Bloc'
+    parser = argparse.ArgumentParser(description="Convert and inspect binary alliance/war-party snapshots.")
+    sub = parser.add_subparsers(dest='command', required=True)
+    conv = sub.add_parser('convert', help="write .pnb sidecars for JSON snapshots")
+    conv.add_argument('paths', nargs='*', default=[str(default_dir)], help="JSON files or directories (default: Data/Bloc)")
+    conv.add_argument('--force', action='store_true', help="rewrite sidecars that are already current")
+    info = sub.add_parser('info', help="print a sidecar's header without decoding records")
+    info.add_argument('path')
+    args = parser.parse_args(argv)
+
+    if args.command == 'info':
+        path = Path(args.path)
+        with SnapshotFile(path if path.suffix == SUFFIX else sidecar_path(path)) as snap:
+            print(json.dumps({
+                'schema': snap.schema,
+                'records': len(snap),
+                'list_key': snap.list_key,
+                'meta': snap.meta,
+                'columns': snap.column_names,
+                'totals': snap.totals(['score', 'num_cities', 'soldiers', 'tanks', 'aircraft', 'ships']),
+            }, indent=2, default=str))
+        return 0
+
+    converted = skipped = 0
+    for raw in args.paths:
+        path = Path(raw)
+        if path.is_dir():
+            c, s = convert_directory(path, force=args.force)
+        else:
+            c, s = (1, 0) if convert_path(path, force=args.force) else (0, 1)
+        converted += c
+        skipped += s
+    print(f"converted {converted} snapshot(s), skipped {skipped}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
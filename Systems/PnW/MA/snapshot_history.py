@@ -0,0 +1,347 @@
+"""Versioned history of bloc snapshots.
+
+Every bloc refresh is appended as a version. Most versions are stored as a
+field-level delta against the previous one (nations added, removed, and the
+fields that changed), zlib-compressed; every ``keyframe_interval`` versions a
+full keyframe is written so reconstructing any version replays at most that
+many deltas. ``index.jsonl`` under ``Systems/Data/Bloc/history`` lists the
+versions with their turn id and size. Writes and reconstruction run in the
+default executor.
+
+A snapshot is ``{alliance_key: [nation dict, ...]}`` as held by
+``AllianceManager.bloc_data``; nations are matched across versions by ``id``
+(or ``nation_id``).
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+_HISTORY_DIR = Path(__file__).parent.parent.parent / 'Data' / 'Bloc' / 'history'
+
+_MAGIC = b'BLH1'
+KEYFRAME = 'k'
+DELTA = 'd'
+
+# Internal state: {alliance_key: (order, rows)} with rows keyed by nation id string
+State = Dict[str, Tuple[List[str], Dict[str, Dict[str, Any]]]]
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(float(os.getenv(name, str(default))))
+    except Exception:
+        return default
+
+
+def _to_state(snapshot: Dict[str, Any]) -> State:
+    state: State = {}
+    for alliance_key, nations in (snapshot or {}).items():
+        if isinstance(nations, dict):
+            nations = nations.get('nations', [])
+        order: List[str] = []
+        rows: Dict[str, Dict[str, Any]] = {}
+        for pos, nation in enumerate(nations or []):
+            if not isinstance(nation, dict):
+                continue
+            nid = nation.get('id') or nation.get('nation_id')
+            key = str(nid) if nid is not None else f"#{pos}"
+            if key in rows:
+                continue
+            order.append(key)
+            rows[key] = nation
+        state[str(alliance_key)] = (order, rows)
+    return state
+
+
+def _from_state(state: State) -> Dict[str, List[Dict[str, Any]]]:
+    # Fresh top-level dicts per call; nested values are shared with the store's cache
+    return {key: [dict(rows[nid]) for nid in order] for key, (order, rows) in state.items()}
+
+
+def _diff(prev: State, cur: State) -> Dict[str, Any]:
+    delta: Dict[str, Any] = {}
+    dropped = [key for key in prev if key not in cur]
+    if dropped:
+        delta['drop'] = dropped
+    alliances: Dict[str, Any] = {}
+    for key, (cur_order, cur_rows) in cur.items():
+        prev_order, prev_rows = prev.get(key, ([], {}))
+        part: Dict[str, Any] = {}
+        added = {nid: cur_rows[nid] for nid in cur_order if nid not in prev_rows}
+        removed = [nid for nid in prev_order if nid not in cur_rows]
+        changed: Dict[str, Dict[str, Any]] = {}
+        unset: Dict[str, List[str]] = {}
+        for nid in cur_order:
+            old = prev_rows.get(nid)
+            if old is None:
+                continue
+            new = cur_rows[nid]
+            fields = {f: v for f, v in new.items() if f not in old or old[f] != v}
+            if fields:
+                changed[nid] = fields
+            gone = [f for f in old if f not in new]
+            if gone:
+                unset[nid] = gone
+        expected = [nid for nid in prev_order if nid in cur_rows] + [nid for nid in cur_order if nid not in prev_rows]
+        if added:
+            part['add'] = added
+        if removed:
+            part['del'] = removed
+        if changed:
+            part['set'] = changed
+        if unset:
+            part['unset'] = unset
+        if expected != cur_order:
+            part['order'] = cur_order
+        if part or key not in prev:
+            alliances[key] = part
+    if alliances:
+        delta['a'] = alliances
+    return delta
+
+
+def _apply(prev: State, delta: Dict[str, Any]) -> State:
+    state: State = {key: value for key, value in prev.items() if key not in set(delta.get('drop', ()))}
+    for key, part in delta.get('a', {}).items():
+        prev_order, prev_rows = state.get(key, ([], {}))
+        rows = dict(prev_rows)
+        removed = set(part.get('del', ()))
+        for nid in removed:
+            rows.pop(nid, None)
+        for nid, fields in part.get('set', {}).items():
+            rows[nid] = {**rows.get(nid, {}), **fields}
+        for nid, fields in part.get('unset', {}).items():
+            record = dict(rows.get(nid, {}))
+            for f in fields:
+                record.pop(f, None)
+            rows[nid] = record
+        added = part.get('add', {})
+        rows.update(added)
+        if 'order' in part:
+            order = list(part['order'])
+        else:
+            order = [nid for nid in prev_order if nid not in removed] + [nid for nid in added if nid not in prev_rows]
+        state[key] = (order, rows)
+    return state
+
+
+def _encode(kind: str, doc: Any) -> bytes:
+    payload = json.dumps(doc, separators=(',', ':'), default=str).encode('utf-8')
+    return _MAGIC + kind.encode('ascii') + zlib.compress(payload, 6)
+
+
+def _decode(blob: bytes) -> Tuple[str, Any]:
+    if blob[:4] != _MAGIC:
+        raise ValueError("not a bloc history record")
+    return blob[4:5].decode('ascii'), json.loads(zlib.decompress(blob[5:]).decode('utf-8'))
+
+
+class BlocHistoryStore:
+    """Append-only, delta-compressed version history of bloc snapshots."""
+
+    def __init__(
+        self,
+        root: Optional[Path] = None,
+        keyframe_interval: Optional[int] = None,
+        cache_size: int = 4,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.logger = logger or logging.getLogger(__name__)
+        self.root = Path(root) if root else _HISTORY_DIR
+        self.keyframe_interval = max(1, int(keyframe_interval or _env_int('PNW_BLOC_KEYFRAME_INTERVAL', 12)))
+        self.cache_size = max(1, cache_size)
+        self._index: Optional[List[Dict[str, Any]]] = None
+        self._states: 'OrderedDict[int, State]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._append_lock: Optional[asyncio.Lock] = None
+
+    # ------------------------------------------------------------------
+    # Executor side
+    # ------------------------------------------------------------------
+
+    def _path(self, version: int, kind: str) -> Path:
+        return self.root / f"v{version:08d}.{kind}.bin"
+
+    def _load_index(self) -> List[Dict[str, Any]]:
+        if self._index is not None:
+            return self._index
+        entries: List[Dict[str, Any]] = []
+        index_path = self.root / 'index.jsonl'
+        try:
+            if index_path.exists():
+                with open(index_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        line = line.strip()
+                        if not line:
+                            continue
+                        try:
+                            entry = json.loads(line)
+                        except ValueError:
+                            # A torn final line from an interrupted write
+                            continue
+                        if self._path(entry['v'], entry['kind']).exists():
+                            entries.append(entry)
+        except Exception as e:
+            self.logger.warning(f"BlocHistoryStore: failed to read index: {e}")
+        entries.sort(key=lambda e: e['v'])
+        self._index = entries
+        return entries
+
+    def _remember(self, version: int, state: State) -> None:
+        self._states[version] = state
+        self._states.move_to_end(version)
+        while len(self._states) > self.cache_size:
+            self._states.popitem(last=False)
+
+    def _materialize_locked(self, version: int) -> Optional[State]:
+        cached = self._states.get(version)
+        if cached is not None:
+            self._states.move_to_end(version)
+            return cached
+        index = self._load_index()
+        by_version = {e['v']: e for e in index}
+        if version not in by_version:
+            return None
+        # Walk back to the nearest keyframe or cached state, then replay forward
+        chain: List[Dict[str, Any]] = []
+        base: Optional[State] = None
+        v = version
+        while v in by_version:
+            if v in self._states:
+                base = self._states[v]
+                break
+            entry = by_version[v]
+            chain.append(entry)
+            if entry['kind'] == KEYFRAME:
+                break
+            v = entry.get('base', v - 1)
+        state: State = base or {}
+        for entry in reversed(chain):
+            kind, doc = _decode(self._path(entry['v'], entry['kind']).read_bytes())
+            state = _to_state(doc) if kind == KEYFRAME else _apply(state, doc)
+        self._remember(version, state)
+        return state
+
+    def _materialize(self, version: int) -> Optional[State]:
+        with self._lock:
+            return self._materialize_locked(version)
+
+    def _append_sync(self, snapshot: Dict[str, Any], turn: Optional[str], meta: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            index = self._load_index()
+            cur = _to_state(snapshot)
+            head = index[-1] if index else None
+            version = (head['v'] + 1) if head else 1
+            prev = self._materialize_locked(head['v']) if head else None
+            since_key = 0
+            for entry in reversed(index):
+                if entry['kind'] == KEYFRAME:
+                    break
+                since_key += 1
+            if prev is None or since_key + 1 >= self.keyframe_interval:
+                kind, blob = KEYFRAME, _encode(KEYFRAME, _from_state(cur))
+            else:
+                kind, blob = DELTA, _encode(DELTA, _diff(prev, cur))
+            entry = {
+                'v': version,
+                'kind': kind,
+                'turn': turn,
+                'ts': time.time(),
+                'bytes': len(blob),
+                'nations': sum(len(order) for order, _ in cur.values()),
+            }
+            if kind == DELTA:
+                entry['base'] = head['v']
+            if meta:
+                entry['meta'] = meta
+            try:
+                self.root.mkdir(parents=True, exist_ok=True)
+                path = self._path(version, kind)
+                tmp = path.with_suffix('.tmp')
+                tmp.write_bytes(blob)
+                os.replace(tmp, path)
+                with open(self.root / 'index.jsonl', 'a', encoding='utf-8') as f:
+                    f.write(json.dumps(entry, separators=(',', ':')) + '\n')
+            except Exception as e:
+                self.logger.error(f"BlocHistoryStore: failed to write version {version}: {e}")
+                return None
+            index.append(entry)
+            self._remember(version, cur)
+            return entry
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    async def append(self, snapshot: Dict[str, Any], turn: Optional[str] = None, meta: Optional[Dict[str, Any]] = None) -> Optional[int]:
+        """Store ``snapshot`` as the next version; returns its version number or None on failure."""
+        if self._append_lock is None:
+            self._append_lock = asyncio.Lock()
+        async with self._append_lock:
+            loop = asyncio.get_running_loop()
+            entry = await loop.run_in_executor(None, self._append_sync, snapshot, turn, meta)
+        if entry is None:
+            return None
+        self.logger.debug(f"BlocHistoryStore: stored v{entry['v']} ({entry['kind']}, {entry['bytes']} bytes)")
+        return entry['v']
+
+    async def versions(self) -> List[Dict[str, Any]]:
+        """Index entries (oldest first): ``v``, ``kind``, ``turn``, ``ts``, ``bytes``, ``nations``."""
+        loop = asyncio.get_running_loop()
+        index = await loop.run_in_executor(None, self._load_index)
+        return [dict(e) for e in index]
+
+    async def get(self, version: int) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        """Reconstruct the snapshot stored as ``version``."""
+        loop = asyncio.get_running_loop()
+        try:
+            state = await loop.run_in_executor(None, self._materialize, int(version))
+        except Exception as e:
+            self.logger.error(f"BlocHistoryStore: failed to reconstruct v{version}: {e}")
+            return None
+        return _from_state(state) if state is not None else None
+
+    async def latest(self) -> Optional[Dict[str, List[Dict[str, Any]]]]:
+        index = await self.versions()
+        return await self.get(index[-1]['v']) if index else None
+
+    async def version_for_turn(self, turn: str) -> Optional[int]:
+        """Last version recorded in or before ``turn``."""
+        match = None
+        for entry in await self.versions():
+            if entry.get('turn') and entry['turn'] <= turn:
+                match = entry['v']
+        return match
+
+    async def per_turn(self, last_n: int) -> List[Tuple[str, Dict[str, List[Dict[str, Any]]]]]:
+        """The last version of each of the most recent ``last_n`` turns, oldest first."""
+        latest_by_turn: 'OrderedDict[str, int]' = OrderedDict()
+        for entry in await self.versions():
+            if entry.get('turn'):
+                latest_by_turn[entry['turn']] = entry['v']
+        result: List[Tuple[str, Dict[str, List[Dict[str, Any]]]]] = []
+        # Ascending order keeps each reconstruction a short replay from the previous one
+        for turn, version in list(latest_by_turn.items())[-max(0, last_n):]:
+            snapshot = await self.get(version)
+            if snapshot is not None:
+                result.append((turn, snapshot))
+        return result
+
+
+_store: Optional[BlocHistoryStore] = None
+
+
+def get_bloc_history() -> BlocHistoryStore:
+    """Process-wide bloc snapshot history."""
+    global _store
+    if _store is None:
+        _store = BlocHistoryStore()
+    return _store
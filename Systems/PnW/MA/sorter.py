@@ -162,7 +162,8 @@ class BlitzPartySorter:
             if not active_nations:
                 return []
             
-            # Calculate infrastructure averages and add metadata
+            # Calculate infrastructure averages and add metadata, on copies of the shared repository records
+            active_nations = [dict(nation) for nation in active_nations]
             for nation in active_nations:
                 infra_avg = self._calculate_infrastructure_average(nation)
                 nation['infra_average'] = infra_avg
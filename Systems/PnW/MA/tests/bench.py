@@ -0,0 +1,338 @@
+"""Benchmarks for the MA analytics and party-planning paths.
+
+Runs the CPU-bound code behind /bloc, /blitz, /destroy and /wars against
+deterministic synthetic alliances (50 to 1,000 nations by default) and war
+sets, and reports per-benchmark wall time (min and median over repeats) and
+peak allocation (tracemalloc, measured in a separate untimed run).
+
+Repeats run on the same nation and city objects, so after the first one the
+city fact cache (city_cache.py) answers by identity. Each benchmark is
+therefore timed twice: warm (cache kept between repeats, as for repeated
+clicks on one snapshot) and cold (cache cleared before each repeat, as for
+the first view of a fresh snapshot):
+
+    python Systems/PnW/MA/tests/bench.py                      # run and print
+    python Systems/PnW/MA/tests/bench.py --save-baseline      # store results as the baseline
+    python Systems/PnW/MA/tests/bench.py --compare --threshold 0.2
+
+``--compare`` checks every benchmark against the stored baseline (warm and cold
+min time, peak allocation) and exits with status 1 when any is more than ``threshold``
+slower or larger. Baselines are machine specific; record one per box. A
+benchmark whose module cannot be imported (e.g. discord missing) is reported
+as skipped rather than failing the run.
+
+Nation and war data come from ``pnw_stub_server.synthetic_fixtures``, so the
+same seed always produces the same inputs.
+"""
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from pnw_stub_server import synthetic_fixtures
+
+DEFAULT_SIZES = (50, 200, 1000)
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bench_baseline.json')
+
+
+# ---------------------------------------------------------------------------
+# Synthetic inputs
+# ---------------------------------------------------------------------------
+
+_cache: Dict[Tuple[str, int, int], Any] = {}
+
+
+def alliance_nations(size: int, seed: int = 1, alliance_id: int = 1) -> List[Dict[str, Any]]:
+    """``size`` members of one alliance, shaped like a full-projection snapshot."""
+    key = ('alliance', size, seed)
+    if key not in _cache:
+        nations = synthetic_fixtures(nations=size, alliances=1, wars=0, treaties=0, trade_days=1, seed=seed)['nations']
+        for n in nations:
+            n['alliance_id'] = alliance_id
+            n['alliance_position'] = 'MEMBER' if n['alliance_position'] != 'APPLICANT' else 'APPLICANT'
+            n['alliance'] = {'id': alliance_id, 'name': f"Alliance {alliance_id}", 'acronym': f"A{alliance_id}"}
+            n.setdefault('offensive_wars_count', 0)
+            n.setdefault('defensive_wars_count', 0)
+        _cache[key] = nations
+    # Benchmarked code may annotate nations in place; hand out fresh copies
+    return copy.deepcopy(_cache[key])
+
+
+def war_set(wars: int, seed: int = 1, alliances: int = 10) -> List[Dict[str, Any]]:
+    """``wars`` wars with their attacks nested, as the query layer returns them."""
+    key = ('wars', wars, seed)
+    if key not in _cache:
+        fx = synthetic_fixtures(nations=max(100, wars // 2), alliances=alliances, wars=wars, treaties=0, trade_days=1, seed=seed)
+        attacks: Dict[int, List[Dict[str, Any]]] = {}
+        for a in fx['warattacks']:
+            attacks.setdefault(a['war_id'], []).append(a)
+        out = []
+        for w in fx['wars']:
+            w = dict(w, attacks=attacks.get(w['id'], []))
+            w['attacker'] = {'id': w['att_id'], 'alliance_id': w['att_alliance_id']}
+            w['defender'] = {'id': w['def_id'], 'alliance_id': w['def_alliance_id']}
+            out.append(w)
+        _cache[key] = out
+    return _cache[key]
+
+
+# ---------------------------------------------------------------------------
+# Benchmarks
+# ---------------------------------------------------------------------------
+
+@dataclass
+class Benchmark:
+    name: str
+    # size -> callable running one iteration (setup happens before timing)
+    prepare: Callable[[int], Callable[[], Any]]
+
+
+def _cold_start() -> None:
+    """Drop the process-wide city fact cache so the next run derives every city again."""
+    try:
+        from Systems.PnW.MA.city_cache import get_city_cache
+    except ImportError:
+        return
+    get_city_cache().clear()
+
+
+def _run(coro_fn: Callable[[], Any]) -> Callable[[], Any]:
+    return lambda: asyncio.run(coro_fn())
+
+
+def _calc():
+    from Systems.PnW.MA.calc import AllianceCalculator
+    return AllianceCalculator()
+
+
+def _bench_alliance_statistics(size: int):
+    calc = _calc()
+    nations = alliance_nations(size)
+    active = calc.get_active_nations(nations)
+    return lambda: calc.calculate_alliance_statistics(active)
+
+
+def _bench_nation_statistics(size: int):
+    calc = _calc()
+    nations = alliance_nations(size)
+    return lambda: calc.calculate_nation_statistics(nations)
+
+
+def _bench_full_mill(size: int):
+    calc = _calc()
+    nations = alliance_nations(size)
+    return lambda: calc.calculate_full_mill_data(nations)
+
+
+def _bench_purchase_limits(size: int):
+    calc = _calc()
+    nations = alliance_nations(size)
+    return lambda: [calc._compute_military_purchase_limits(n) for n in nations]
+
+
+def _bench_bloc_improvements(size: int):
+    calc = _calc()
+    # A bloc of four alliances sharing ``size`` nations between them
+    per = max(1, size // 4)
+    bloc = {f"a{i}": alliance_nations(per, seed=i + 1, alliance_id=i + 1) for i in range(4)}
+    return _run(lambda: calc.calculate_improvements_data_multi_alliance(bloc, list(bloc)))
+
+
+def _bench_bloc_statistics(size: int):
+    calc = _calc()
+    per = max(1, size // 4)
+    bloc = {f"a{i}": alliance_nations(per, seed=i + 1, alliance_id=i + 1) for i in range(4)}
+    return lambda: calc.calculate_alliance_statistics_multi_alliance(bloc, list(bloc))
+
+
+def _bench_blitz_parties(size: int):
+    from Systems.PnW.MA.sorter import BlitzPartySorter
+    sorter = BlitzPartySorter(calculator=_calc())
+    nations = alliance_nations(size)
+    return lambda: sorter.create_balanced_parties(copy.copy(nations))
+
+
+def _bench_find_optimal_attackers(size: int):
+    from Systems.PnW.MA.destroy import DestroyCog
+    cog = DestroyCog(None)
+    members = alliance_nations(size)
+    target = dict(members[len(members) // 2], id=10 ** 7, nation_id=10 ** 7)
+
+    async def _members(alliance_id, force_refresh=False, projection=None):
+        return copy.copy(members)
+
+    # Serve the alliance from memory so only the selection logic is timed
+    cog.get_alliance_nations = _members
+    return _run(lambda: cog.find_optimal_attackers(target, max_groups=10, alliance_filter='cybertron'))
+
+
+def _bench_war_costs(size: int):
+    from Systems.PnW.MA.war_stream import WarCostAggregator
+    wars = war_set(size * 3)
+
+    def _aggregate():
+        # Same path as WarsCostCog._aggregate_war_costs_by_party
+        aggregator = WarCostAggregator(range(1, 6), range(6, 11))
+        aggregator.add_page(wars)
+        return aggregator.totals()
+    return _aggregate
+
+
+def _bench_assignment(size: int):
+    from Systems.PnW.MA.assignment import plan_assignments
+    members = alliance_nations(size)
+    # Counter plans cover up to ~50 targets; time_budget=0 solves to optimality
+    targets = alliance_nations(min(50, max(10, size // 4)), seed=99, alliance_id=2)
+    return lambda: plan_assignments(targets, members, time_budget=0)
+
+
+BENCHMARKS: List[Benchmark] = [
+    Benchmark('calc.alliance_statistics', _bench_alliance_statistics),
+    Benchmark('calc.nation_statistics', _bench_nation_statistics),
+    Benchmark('calc.full_mill_data', _bench_full_mill),
+    Benchmark('calc.military_purchase_limits', _bench_purchase_limits),
+    Benchmark('bloc.alliance_statistics_multi', _bench_bloc_statistics),
+    Benchmark('bloc.improvements_multi', _bench_bloc_improvements),
+    Benchmark('sorter.create_balanced_parties', _bench_blitz_parties),
+    Benchmark('destroy.find_optimal_attackers', _bench_find_optimal_attackers),
+    Benchmark('war_cost.aggregate_by_party', _bench_war_costs),
+    Benchmark('assignment.plan_assignments', _bench_assignment),
+]
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, repeat: int = 5, only: Optional[List[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """``{"name[size]": {min_s, median_s, cold_min_s, cold_median_s, peak_kib} or {skipped}}`` per benchmark."""
+    results: Dict[str, Dict[str, Any]] = {}
+    for bench in BENCHMARKS:
+        if only and not any(pattern in bench.name for pattern in only):
+            continue
+        for size in sizes:
+            key = f"{bench.name}[{size}]"
+            try:
+                fn = bench.prepare(size)
+            except ImportError as e:
+                results[key] = {'skipped': f"missing dependency: {e.name or e}"}
+                continue
+            fn()  # warm-up (imports, lazy caches)
+            timings = []
+            for _ in range(max(1, repeat)):
+                started = time.perf_counter()
+                fn()
+                timings.append(time.perf_counter() - started)
+            cold_timings = []
+            for _ in range(max(1, repeat)):
+                _cold_start()
+                started = time.perf_counter()
+                fn()
+                cold_timings.append(time.perf_counter() - started)
+            tracemalloc.start()
+            try:
+                fn()
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            results[key] = {
+                'min_s': min(timings),
+                'median_s': statistics.median(timings),
+                'cold_min_s': min(cold_timings),
+                'cold_median_s': statistics.median(cold_timings),
+                'peak_kib': round(peak / 1024, 1),
+            }
+    return results
+
+
+def compare(current: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """Names of benchmarks whose warm or cold min time or peak allocation grew by more than ``threshold``."""
+    regressions = []
+    for key, now in current.items():
+        base = baseline.get(key)
+        if not base or 'skipped' in now or 'skipped' in base:
+            continue
+        for metric in ('min_s', 'cold_min_s', 'peak_kib'):
+            if base.get(metric) and now.get(metric, 0) > base[metric] * (1 + threshold):
+                regressions.append(f"{key} {metric}")
+    return regressions
+
+
+def _format(results: Dict[str, Dict[str, Any]], baseline: Optional[Dict[str, Dict[str, Any]]] = None) -> str:
+    lines = [
+        f"{'benchmark':<46} {'min ms':>10} {'median ms':>10} {'cold min ms':>12} {'cold med ms':>12} {'peak KiB':>10}"
+        + ('  vs baseline' if baseline else '')
+    ]
+    for key, r in results.items():
+        if 'skipped' in r:
+            lines.append(f"{key:<46} skipped ({r['skipped']})")
+            continue
+        line = (
+            f"{key:<46} {r['min_s'] * 1e3:>10.2f} {r['median_s'] * 1e3:>10.2f}"
+            f" {r['cold_min_s'] * 1e3:>12.2f} {r['cold_median_s'] * 1e3:>12.2f} {r['peak_kib']:>10.1f}"
+        )
+        base = (baseline or {}).get(key)
+        if base and 'min_s' in base:
+            line += f"  {r['min_s'] / base['min_s']:>5.2f}x time {r['peak_kib'] / max(base['peak_kib'], 0.1):>5.2f}x mem"
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help='Alliance sizes to generate')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--only', nargs='+', help='Run benchmarks whose name contains any of these')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true')
+    parser.add_argument('--compare', action='store_true')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed growth before flagging (0.2 = 20%%)')
+    parser.add_argument('--json', help='Also write results to this path')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.sizes, repeat=args.repeat, only=args.only)
+    baseline = None
+    if args.compare:
+        try:
+            with open(args.baseline, 'r', encoding='utf-8') as f:
+                baseline = json.load(f).get('results') or {}
+        except FileNotFoundError:
+            print(f"No baseline at {args.baseline}; run with --save-baseline first")
+            return 2
+    print(_format(results, baseline))
+
+    payload = {
+        'recorded_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'results': results,
+    }
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(payload, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) past {args.threshold:.0%}:")
+            for r in regressions:
+                print(f"  {r}")
+            return 1
+        print(f"\nNo regressions past {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,805 @@
+"""Local stand-in for the PnW GraphQL API, for load and regression tests.
+
+Serves ``nations``, ``alliances``, ``wars``, ``warattacks``, ``tradeprices`` and
+``treaties`` from recorded or synthetic fixtures, so ``PNWAPIQuery`` and the MA
+cogs can be exercised on any box without the network or the API quota:
+
+* a small GraphQL subset: aliases, arguments (scalars, enums, lists, objects),
+  nested selections and ``paginatorInfo``; the relations the bot reads are
+  resolved (``nation.alliance``, ``alliance.nations``, ``alliance.treaties``,
+  ``war.attacker``/``defender``/``attacks``, ``treaty.alliance1``/``alliance2``);
+* ``first``/``page`` pagination capped at ``max_page_size``;
+* configurable latency (base plus uniform jitter), a fixed-window rate limit
+  reported through the ``X-RateLimit-*`` headers (429 when exhausted), a
+  per-request cost ceiling (leaf values returned) and random error injection
+  (HTTP 500/502 or a GraphQL ``errors`` payload).
+
+Point the query layer at it with ``PNWAPIQuery(base_url=server.base_url)`` or
+``PNW_API_BASE_URL``::
+
+    python Systems/PnW/MA/tests/pnw_stub_server.py --synthetic --port 8765 --latency 0.05
+    PNW_API_BASE_URL=http://127.0.0.1:8765/graphql python -m ...
+
+Fixtures are a JSON object with one list per root (``.json`` or ``.json.gz``);
+``--record`` captures one from the live API for the given alliances.
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))))
+
+ROOTS = ('nations', 'alliances', 'wars', 'warattacks', 'tradeprices', 'treaties')
+_ROOT_TYPES = {
+    'nations': 'Nation', 'alliances': 'Alliance', 'wars': 'War',
+    'warattacks': 'WarAttack', 'tradeprices': 'Tradeprice', 'treaties': 'Treaty',
+}
+_PAGE_ARGS = {'first', 'page', 'orderBy', 'limit'}
+
+
+class GraphQLError(Exception):
+    """Reported to the client in the ``errors`` list with HTTP 200, like the real API."""
+
+
+# ---------------------------------------------------------------------------
+# GraphQL subset parser
+# ---------------------------------------------------------------------------
+
+_TOKEN_RE = re.compile(
+    r'\s+|#[^\n]*|,'
+    r'|(?P<str>"(?:\\.|[^"\\])*")'
+    r'|(?P<num>-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?)'
+    r'|(?P<name>[A-Za-z_][A-Za-z0-9_]*)'
+    r'|(?P<punct>[{}():\[\]!$=@])'
+)
+
+
+@dataclass
+class Field:
+    name: str
+    alias: str
+    args: Dict[str, Any]
+    selections: Optional[List['Field']]
+
+
+def _tokenize(text: str) -> List[Tuple[str, str]]:
+    tokens: List[Tuple[str, str]] = []
+    pos = 0
+    while pos < len(text):
+        m = _TOKEN_RE.match(text, pos)
+        if not m:
+            raise GraphQLError(f"Syntax Error: Unexpected character {text[pos]!r} at {pos}")
+        pos = m.end()
+        kind = m.lastgroup
+        if kind:
+            tokens.append((kind, m.group(kind)))
+    return tokens
+
+
+class _Parser:
+    def __init__(self, text: str):
+        self.tokens = _tokenize(text)
+        self.i = 0
+
+    def _peek(self) -> Tuple[Optional[str], Optional[str]]:
+        return self.tokens[self.i] if self.i < len(self.tokens) else (None, None)
+
+    def _take(self, value: Optional[str] = None) -> str:
+        kind, tok = self._peek()
+        if tok is None or (value is not None and tok != value):
+            raise GraphQLError(f"Syntax Error: Expected {value or 'token'}, found {tok or '<EOF>'}")
+        self.i += 1
+        return tok
+
+    def document(self) -> List[Field]:
+        kind, tok = self._peek()
+        if tok == 'query':
+            self._take()
+            if self._peek()[0] == 'name':
+                self._take()
+        selections = self.selection_set()
+        if self._peek()[1] is not None:
+            raise GraphQLError("Syntax Error: only a single query operation is supported")
+        return selections
+
+    def selection_set(self) -> List[Field]:
+        self._take('{')
+        fields: List[Field] = []
+        while self._peek()[1] != '}':
+            fields.append(self.field())
+        self._take('}')
+        return fields
+
+    def field(self) -> Field:
+        kind, name = self._peek()
+        if kind != 'name':
+            raise GraphQLError(f"Syntax Error: Expected field name, found {name}")
+        self._take()
+        alias = name
+        if self._peek()[1] == ':':
+            self._take(':')
+            name = self._take()
+        args: Dict[str, Any] = {}
+        if self._peek()[1] == '(':
+            self._take('(')
+            while self._peek()[1] != ')':
+                key = self._take()
+                self._take(':')
+                args[key] = self.value()
+            self._take(')')
+        selections = self.selection_set() if self._peek()[1] == '{' else None
+        return Field(name, alias, args, selections)
+
+    def value(self) -> Any:
+        kind, tok = self._peek()
+        if tok == '[':
+            self._take('[')
+            items = []
+            while self._peek()[1] != ']':
+                items.append(self.value())
+            self._take(']')
+            return items
+        if tok == '{':
+            self._take('{')
+            obj = {}
+            while self._peek()[1] != '}':
+                key = self._take()
+                self._take(':')
+                obj[key] = self.value()
+            self._take('}')
+            return obj
+        self._take()
+        if kind == 'str':
+            return json.loads(tok)
+        if kind == 'num':
+            return float(tok) if any(c in tok for c in '.eE') else int(tok)
+        if tok in ('true', 'false'):
+            return tok == 'true'
+        if tok == 'null':
+            return None
+        if kind == 'name':
+            return tok  # enum value
+        raise GraphQLError(f"Syntax Error: Unexpected {tok}")
+
+
+def parse_query(text: str) -> List[Field]:
+    return _Parser(text or '').document()
+
+
+# ---------------------------------------------------------------------------
+# Fixture store and resolvers
+# ---------------------------------------------------------------------------
+
+def _as_list(value: Any) -> List[Any]:
+    return value if isinstance(value, list) else [value]
+
+
+def _key(value: Any) -> str:
+    return str(value).strip().lower()
+
+
+def _parse_date(raw: Any) -> Optional[datetime]:
+    try:
+        d = datetime.fromisoformat(str(raw).replace('Z', '+00:00'))
+        return d if d.tzinfo else d.replace(tzinfo=timezone.utc)
+    except Exception:
+        return None
+
+
+class FixtureStore:
+    """Root lists plus the indexes the nested resolvers need."""
+
+    def __init__(self, fixtures: Dict[str, List[Dict[str, Any]]]):
+        self.rows: Dict[str, List[Dict[str, Any]]] = {root: list(fixtures.get(root) or []) for root in ROOTS}
+        self.rows['tradeprices'].sort(key=lambda r: str(r.get('date') or ''), reverse=True)
+        self.nations = {int(n['id']): n for n in self.rows['nations']}
+        self.alliances = {int(a['id']): a for a in self.rows['alliances']}
+        self.members: Dict[int, List[Dict[str, Any]]] = {}
+        for n in self.rows['nations']:
+            self.members.setdefault(int(n.get('alliance_id') or 0), []).append(n)
+        self.wars_by_nation: Dict[Tuple[str, int], List[Dict[str, Any]]] = {}
+        for w in self.rows['wars']:
+            self.wars_by_nation.setdefault(('att', int(w.get('att_id') or 0)), []).append(w)
+            self.wars_by_nation.setdefault(('def', int(w.get('def_id') or 0)), []).append(w)
+        self.attacks: Dict[int, List[Dict[str, Any]]] = {}
+        for a in self.rows['warattacks']:
+            self.attacks.setdefault(int(a.get('war_id') or 0), []).append(a)
+        self.treaties: Dict[int, List[Dict[str, Any]]] = {}
+        for t in self.rows['treaties']:
+            for side in ('alliance1_id', 'alliance2_id'):
+                self.treaties.setdefault(int(t.get(side) or 0), []).append(t)
+
+    @classmethod
+    def load(cls, path: str) -> 'FixtureStore':
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'rt', encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def dump(self, path: str) -> None:
+        opener = gzip.open if path.endswith('.gz') else open
+        with opener(path, 'wt', encoding='utf-8') as f:
+            json.dump(self.rows, f)
+
+    # -- root filtering -------------------------------------------------
+
+    def _matches(self, root: str, row: Dict[str, Any], name: str, value: Any) -> bool:
+        if value is None:
+            return True
+        if name == 'search':
+            needle = _key(value)
+            return needle in _key(row.get('name') or '') or needle in _key(row.get('acronym') or '')
+        if name == 'min_id':
+            return int(row.get('id') or 0) >= int(value)
+        if name == 'max_id':
+            return int(row.get('id') or 0) <= int(value)
+        if name in ('min_score', 'max_score'):
+            score = float(row.get('score') or 0)
+            return score >= float(value) if name == 'min_score' else score <= float(value)
+        if name == 'vmode':
+            return (int(row.get('vacation_mode_turns') or 0) > 0) == bool(value)
+        if name in ('after', 'before'):
+            d, bound = _parse_date(row.get('date')), _parse_date(value)
+            if d is None or bound is None:
+                return True
+            return d >= bound if name == 'after' else d <= bound
+        if root == 'wars' and name == 'active':
+            return (int(row.get('turns_left') or 0) > 0) == bool(value)
+        wanted = {_key(v) for v in _as_list(value)}
+        if root in ('wars', 'warattacks') and name in ('nation_id', 'alliance_id'):
+            fields = ('att_id', 'def_id') if name == 'nation_id' else ('att_alliance_id', 'def_alliance_id')
+            return any(_key(row.get(f)) in wanted for f in fields)
+        return _key(row.get(name)) in wanted
+
+    def query_root(self, root: str, args: Dict[str, Any]) -> List[Dict[str, Any]]:
+        filters = [(k, v) for k, v in args.items() if k not in _PAGE_ARGS]
+        ids = args.get('id')
+        if root in ('nations', 'alliances') and ids is not None:
+            index = self.nations if root == 'nations' else self.alliances
+            candidates = [index[int(i)] for i in _as_list(ids) if str(i).lstrip('-').isdigit() and int(i) in index]
+            filters = [(k, v) for k, v in filters if k != 'id']
+        else:
+            candidates = self.rows[root]
+        rows = [r for r in candidates if all(self._matches(root, r, k, v) for k, v in filters)]
+        order = args.get('orderBy')
+        for spec in reversed(_as_list(order) if order else []):
+            if isinstance(spec, dict) and spec.get('column'):
+                column = str(spec['column']).lower()
+                rows.sort(key=lambda r: (r.get(column) is None, r.get(column) or 0), reverse=str(spec.get('order', 'ASC')).upper() == 'DESC')
+        return rows
+
+    # -- nested relations -----------------------------------------------
+
+    def relation(self, typename: str, row: Dict[str, Any], field: Field) -> Tuple[bool, Any, str]:
+        """(handled, value, child typename) for a relation field; ``handled`` False reads the row."""
+        name = field.name
+        if typename == 'Nation':
+            if name == 'alliance':
+                return True, self.alliances.get(int(row.get('alliance_id') or 0)), 'Alliance'
+            if name in ('offensive_wars', 'defensive_wars', 'wars'):
+                nid = int(row.get('id') or 0)
+                sides = {'offensive_wars': ('att',), 'defensive_wars': ('def',), 'wars': ('att', 'def')}[name]
+                return True, [w for s in sides for w in self.wars_by_nation.get((s, nid), [])], 'War'
+            if name == 'cities':
+                return True, row.get('cities') or [], 'City'
+        if typename == 'Alliance':
+            if name == 'nations':
+                return True, self.members.get(int(row.get('id') or 0), []), 'Nation'
+            if name == 'treaties':
+                treaties = self.treaties.get(int(row.get('id') or 0), [])
+                limit = field.args.get('limit')
+                return True, treaties[:int(limit)] if limit else treaties, 'Treaty'
+        if typename == 'War':
+            if name in ('attacker', 'defender'):
+                nid = row.get('att_id' if name == 'attacker' else 'def_id')
+                return True, self.nations.get(int(nid or 0)) or {'id': nid, 'alliance_id': row.get(f"{name[:3]}_alliance_id")}, 'Nation'
+            if name == 'attacks':
+                return True, self.attacks.get(int(row.get('id') or 0), []), 'WarAttack'
+        if typename == 'Treaty' and name in ('alliance1', 'alliance2'):
+            return True, self.alliances.get(int(row.get(f"{name}_id") or 0)), 'Alliance'
+        return False, None, typename
+
+    def computed(self, typename: str, row: Dict[str, Any], name: str) -> Tuple[bool, Any]:
+        """Scalars derived from relations when a fixture row does not carry them."""
+        if typename == 'Nation' and name in ('offensive_wars_count', 'defensive_wars_count'):
+            side = 'att' if name.startswith('offensive') else 'def'
+            wars = self.wars_by_nation.get((side, int(row.get('id') or 0)), [])
+            return True, sum(1 for w in wars if int(w.get('turns_left') or 0) > 0)
+        if typename == 'Nation' and name == 'num_cities' and isinstance(row.get('cities'), list):
+            return True, len(row['cities'])
+        return False, None
+
+
+class _Budget:
+    """Counts leaf values returned for one request against the cost ceiling."""
+
+    def __init__(self, limit: float):
+        self.limit = limit
+        self.used = 0
+
+    def spend(self, n: int = 1) -> None:
+        self.used += n
+        if self.limit and self.used > self.limit:
+            raise GraphQLError(f"Max query complexity exceeded ({int(self.limit)})")
+
+
+def _shape(store: FixtureStore, typename: str, row: Optional[Dict[str, Any]], selections: List[Field], budget: _Budget) -> Optional[Dict[str, Any]]:
+    if row is None:
+        return None
+    out: Dict[str, Any] = {}
+    for f in selections:
+        if f.name == '__typename':
+            out[f.alias] = typename
+            budget.spend()
+            continue
+        if f.selections is None:
+            handled, value = (False, None) if f.name in row else store.computed(typename, row, f.name)
+            out[f.alias] = value if handled else row.get(f.name)
+            budget.spend()
+            continue
+        handled, value, child_type = store.relation(typename, row, f)
+        if not handled:
+            value, child_type = row.get(f.name), f.name.rstrip('s').capitalize()
+        if isinstance(value, list):
+            out[f.alias] = [_shape(store, child_type, v, f.selections, budget) for v in value]
+        else:
+            out[f.alias] = _shape(store, child_type, value, f.selections, budget)
+    return out
+
+
+def _paginate(store: FixtureStore, field: Field, max_page_size: int, budget: _Budget) -> Dict[str, Any]:
+    rows = store.query_root(field.name, field.args)
+    per_page = max(1, min(int(field.args.get('first') or 50), max_page_size))
+    page = max(1, int(field.args.get('page') or 1))
+    last_page = max(1, -(-len(rows) // per_page))
+    start = (page - 1) * per_page
+    chunk = rows[start:start + per_page]
+    info = {
+        'count': len(chunk),
+        'currentPage': page,
+        'firstItem': start + 1 if chunk else None,
+        'hasMorePages': page < last_page,
+        'lastItem': start + len(chunk) if chunk else None,
+        'lastPage': last_page,
+        'perPage': per_page,
+        'total': len(rows),
+    }
+    typename = _ROOT_TYPES[field.name]
+    out: Dict[str, Any] = {}
+    for f in field.selections or []:
+        if f.name == 'data':
+            out[f.alias] = [_shape(store, typename, r, f.selections or [], budget) for r in chunk]
+        elif f.name == 'paginatorInfo':
+            out[f.alias] = {s.alias: info.get(s.name) for s in f.selections or []}
+            budget.spend(len(out[f.alias]))
+        else:
+            raise GraphQLError(f'Cannot query field "{f.name}" on type "{typename}Paginator".')
+    return out
+
+
+def execute(store: FixtureStore, query: str, max_page_size: int = 500, max_cost: float = 0) -> Tuple[Dict[str, Any], Dict[str, int]]:
+    """Run ``query`` against ``store``; returns (GraphQL response, rows served per root)."""
+    budget = _Budget(max_cost)
+    served: Dict[str, int] = {}
+    try:
+        data: Dict[str, Any] = {}
+        for field in parse_query(query):
+            if field.name not in ROOTS:
+                raise GraphQLError(f'Cannot query field "{field.name}" on type "Query".')
+            block = _paginate(store, field, max_page_size, budget)
+            data[field.alias] = block
+            rows = next((len(v) for v in block.values() if isinstance(v, list)), 0)
+            served[field.name] = served.get(field.name, 0) + rows
+        return {'data': data}, served
+    except GraphQLError as e:
+        return {'errors': [{'message': str(e)}], 'data': None}, served
+
+
+# ---------------------------------------------------------------------------
+# HTTP server
+# ---------------------------------------------------------------------------
+
+@dataclass
+class StubConfig:
+    latency: float = 0.0          # seconds added to every response
+    jitter: float = 0.0           # extra uniform 0..jitter seconds
+    error_rate: float = 0.0       # fraction of requests answered with an injected failure
+    rate_limit: int = 0           # requests per window (0 = unlimited)
+    rate_window: float = 60.0
+    max_page_size: int = 500
+    max_cost: float = 0.0         # leaf values per request (0 = unlimited)
+    api_key: Optional[str] = None  # when set, requests must carry this api_key
+    seed: Optional[int] = None
+
+
+class PnwStubServer:
+    """Threaded HTTP server answering GraphQL POSTs (and ``?query=`` GETs) from a ``FixtureStore``."""
+
+    def __init__(self, store: FixtureStore, config: Optional[StubConfig] = None, host: str = '127.0.0.1', port: int = 0):
+        self.store = store
+        self.config = config or StubConfig()
+        self._random = random.Random(self.config.seed)
+        self._lock = threading.Lock()
+        self._window_start = time.time()
+        self._window_count = 0
+        self.stats: Dict[str, Any] = {'requests': 0, 'rate_limited': 0, 'injected_errors': 0, 'graphql_errors': 0, 'rows': {}}
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/graphql"
+
+    def start(self) -> 'PnwStubServer':
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name='pnw-stub', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._thread:
+            self._httpd.shutdown()
+            self._thread.join(timeout=5)
+            self._thread = None
+        self._httpd.server_close()
+
+    def __enter__(self) -> 'PnwStubServer':
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def serve_forever(self) -> None:
+        self._httpd.serve_forever()
+
+    def _rate_headers(self) -> Tuple[bool, Dict[str, str]]:
+        cfg = self.config
+        with self._lock:
+            now = time.time()
+            if now - self._window_start >= cfg.rate_window:
+                self._window_start, self._window_count = now, 0
+            self._window_count += 1
+            reset = int(self._window_start + cfg.rate_window)
+            if not cfg.rate_limit:
+                return True, {}
+            remaining = max(0, cfg.rate_limit - self._window_count)
+            allowed = self._window_count <= cfg.rate_limit
+        headers = {
+            'X-RateLimit-Limit': str(cfg.rate_limit),
+            'X-RateLimit-Remaining': str(remaining),
+            'X-RateLimit-Reset': str(reset),
+        }
+        if not allowed:
+            headers['Retry-After'] = str(max(1, reset - int(time.time())))
+        return allowed, headers
+
+    def handle(self, query: Optional[str], api_key: Optional[str]) -> Tuple[int, Dict[str, str], Dict[str, Any]]:
+        """(status, headers, body) for one request; usable without sockets."""
+        cfg = self.config
+        with self._lock:
+            self.stats['requests'] += 1
+            roll = self._random.random()
+            delay = cfg.latency + (self._random.uniform(0, cfg.jitter) if cfg.jitter else 0.0)
+        if delay > 0:
+            time.sleep(delay)
+        allowed, headers = self._rate_headers()
+        if not allowed:
+            with self._lock:
+                self.stats['rate_limited'] += 1
+            return 429, headers, {'errors': [{'message': 'Too Many Attempts.'}]}
+        if cfg.api_key and api_key != cfg.api_key:
+            return 401, headers, {'errors': [{'message': 'Unauthenticated.'}]}
+        if roll < cfg.error_rate:
+            with self._lock:
+                self.stats['injected_errors'] += 1
+            kind = self._random.choice((500, 502, 200))
+            if kind == 200:
+                return 200, headers, {'errors': [{'message': 'Internal server error'}], 'data': None}
+            return kind, headers, {'message': 'Server Error'}
+        if not query:
+            return 400, headers, {'errors': [{'message': 'Syntax Error: missing query'}]}
+        body, served = execute(self.store, query, max_page_size=cfg.max_page_size, max_cost=cfg.max_cost)
+        with self._lock:
+            if body.get('errors'):
+                self.stats['graphql_errors'] += 1
+            for root, n in served.items():
+                self.stats['rows'][root] = self.stats['rows'].get(root, 0) + n
+        return 200, headers, body
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def _reply(self, status: int, headers: Dict[str, str], body: Dict[str, Any]) -> None:
+                payload = json.dumps(body).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for k, v in headers.items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_POST(self):
+                params = parse_qs(urlparse(self.path).query)
+                length = int(self.headers.get('Content-Length') or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b'{}')
+                except Exception:
+                    body = {}
+                query = body.get('query') if isinstance(body, dict) else None
+                api_key = (params.get('api_key') or [self.headers.get('X-Api-Key')])[0]
+                self._reply(*server.handle(query, api_key))
+
+            def do_GET(self):
+                params = parse_qs(urlparse(self.path).query)
+                self._reply(*server.handle((params.get('query') or [None])[0], (params.get('api_key') or [None])[0]))
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+# ---------------------------------------------------------------------------
+# Fixtures: synthetic and recorded
+# ---------------------------------------------------------------------------
+
+def _full_nation_fields() -> Tuple[str, ...]:
+    try:
+        from Systems.PnW.MA.projections import NATION_FULL_FIELDS
+        return NATION_FULL_FIELDS
+    except Exception:
+        return ()
+
+
+_PROJECTS = (
+    'activity_center advanced_engineering_corps advanced_pirate_economy arable_land_agency arms_stockpile bauxite_works '
+    'bureau_of_domestic_affairs center_for_civil_engineering clinical_research_center emergency_gasoline_reserve '
+    'fallout_shelter government_support_agency green_technologies guiding_satellite central_intelligence_agency '
+    'international_trade_center iron_dome iron_works moon_landing mars_landing mass_irrigation military_doctrine '
+    'military_research_center military_salvage missile_launch_pad nuclear_launch_facility nuclear_research_facility '
+    'pirate_economy propaganda_bureau recycling_initiative research_and_development_center space_program '
+    'specialized_police_training_program spy_satellite surveillance_network telecommunications_satellite '
+    'uranium_enrichment_program vital_defense_system'
+).split()
+_RESOURCES = ('coal', 'oil', 'uranium', 'iron', 'bauxite', 'lead', 'gasoline', 'munitions', 'steel', 'aluminum', 'food')
+_COLORS = ('aqua', 'black', 'blue', 'brown', 'green', 'lime', 'maroon', 'olive', 'orange', 'pink', 'purple', 'red', 'white', 'yellow', 'beige', 'gray')
+_TREATY_TYPES = ('MDP', 'MDoAP', 'ODP', 'ODoAP', 'PIAT', 'NAP', 'Protectorate', 'Extension')
+
+
+def _iso(dt: datetime) -> str:
+    return dt.replace(microsecond=0).isoformat()
+
+
+def synthetic_fixtures(
+    nations: int = 2000,
+    alliances: int = 40,
+    wars: int = 3000,
+    attacks_per_war: int = 6,
+    treaties: int = 80,
+    trade_days: int = 14,
+    seed: int = 1,
+) -> Dict[str, List[Dict[str, Any]]]:
+    """Deterministic game-shaped fixtures carrying every field the full projections ask for."""
+    rng = random.Random(seed)
+    now = datetime.now(timezone.utc)
+    full_fields = [f for f in _full_nation_fields() if '.' not in f]
+
+    out: Dict[str, List[Dict[str, Any]]] = {root: [] for root in ROOTS}
+    for aid in range(1, alliances + 1):
+        out['alliances'].append({
+            'id': aid, 'name': f"Alliance {aid}", 'acronym': f"A{aid}", 'color': rng.choice(_COLORS),
+            'flag': f"https://example.invalid/flags/{aid}.png", 'score': 0.0, 'date': _iso(now - timedelta(days=rng.randint(100, 3000))),
+            'discord_link': '', 'forum_link': '',
+        })
+
+    for nid in range(1, nations + 1):
+        num_cities = max(1, int(rng.lognormvariate(2.6, 0.5)))
+        aid = rng.randint(1, alliances) if rng.random() < 0.8 else 0
+        cities = []
+        for c in range(num_cities):
+            cities.append({
+                'id': nid * 100 + c, 'name': f"City {c + 1}", 'date': _iso(now - timedelta(days=rng.randint(1, 2000))),
+                'infrastructure': round(rng.uniform(500, 3000), 2), 'land': round(rng.uniform(500, 4000), 2), 'powered': True,
+                'nuke_date': None, 'oil_power': 0, 'wind_power': 0, 'coal_power': 0, 'nuclear_power': rng.randint(1, 2),
+                'coal_mine': 0, 'oil_well': 0, 'uranium_mine': rng.randint(0, 3), 'lead_mine': 0, 'iron_mine': 0, 'bauxite_mine': 0,
+                'gasrefinery': 0, 'aluminum_refinery': 0, 'steel_mill': 0, 'munitions_factory': rng.randint(0, 5),
+                'factory': rng.randint(0, 5), 'farm': rng.randint(0, 5), 'police_station': 1, 'hospital': rng.randint(0, 5),
+                'recycling_center': rng.randint(0, 3), 'subway': 1, 'supermarket': rng.randint(0, 4), 'bank': rng.randint(0, 5),
+                'shopping_mall': rng.randint(0, 4), 'stadium': rng.randint(0, 3), 'barracks': rng.randint(0, 5),
+                'airforcebase': rng.randint(0, 5), 'drydock': rng.randint(0, 3),
+            })
+        nation: Dict[str, Any] = {f: 0 for f in full_fields}
+        nation.update({p: rng.random() < 0.3 for p in _PROJECTS})
+        nation.update({r: round(rng.uniform(0, 50000), 2) for r in _RESOURCES})
+        soldiers = int(sum(c['barracks'] for c in cities) * 3000 * rng.random())
+        tanks = int(sum(c['factory'] for c in cities) * 250 * rng.random())
+        aircraft = int(sum(c['airforcebase'] for c in cities) * 15 * rng.random())
+        ships = int(sum(c['drydock'] for c in cities) * 5 * rng.random())
+        infra = sum(c['infrastructure'] for c in cities)
+        nation.update({
+            'id': nid, 'nation_name': f"Nation {nid}", 'leader_name': f"Leader {nid}", 'continent': 'na',
+            'color': rng.choice(_COLORS), 'flag': f"https://example.invalid/nation/{nid}.png",
+            'discord': f"player{nid}" if rng.random() < 0.5 else '', 'discord_id': str(10 ** 17 + nid) if rng.random() < 0.5 else None,
+            'war_policy': 'TURTLE', 'domestic_policy': 'MANIFEST_DESTINY', 'social_policy': 'LIBERTARIANISM',
+            'government_type': 'REPUBLIC', 'economic_policy': 'EXTREME_LEFT', 'update_tz': None,
+            'alliance_id': aid, 'alliance_position': ('MEMBER' if rng.random() < 0.9 else 'APPLICANT') if aid else 'NOALLIANCE',
+            'alliance_seniority': rng.randint(0, 1000), 'alliance_join_date': _iso(now - timedelta(days=rng.randint(1, 1000))),
+            'vacation_mode_turns': 0 if rng.random() < 0.95 else rng.randint(1, 500),
+            'beige_turns': 0 if rng.random() < 0.9 else rng.randint(1, 24),
+            'num_cities': num_cities, 'soldiers': soldiers, 'tanks': tanks, 'aircraft': aircraft, 'ships': ships,
+            'missiles': rng.randint(0, 10), 'nukes': rng.randint(0, 3), 'spies': rng.randint(0, 60),
+            'score': round(num_cities * 75 + infra / 40 + soldiers * 0.0004 + tanks * 0.025 + aircraft * 0.3 + ships + 10, 2),
+            'population': int(infra * 100), 'money': round(rng.uniform(0, 5e7), 2),
+            'date': _iso(now - timedelta(days=rng.randint(30, 3000))),
+            'last_active': _iso(now - timedelta(minutes=int(rng.expovariate(1 / 2880)))),
+            'espionage_available': rng.random() < 0.7, 'projects': 0,
+            'military_research': {'ground_capacity': 0, 'air_capacity': 0, 'naval_capacity': 0, 'ground_cost': 0, 'air_cost': 0, 'naval_cost': 0},
+            'cities': cities,
+        })
+        nation['projects'] = sum(1 for p in _PROJECTS if nation[p] is True)
+        # Counts are derived from the war fixtures below
+        nation.pop('offensive_wars_count', None)
+        nation.pop('defensive_wars_count', None)
+        out['nations'].append(nation)
+
+    attack_id = 1
+    nation_rows = out['nations']
+    for wid in range(1, wars + 1):
+        att, dfn = rng.sample(nation_rows, 2)
+        start = now - timedelta(hours=rng.uniform(0, 24 * 10))
+        active = (now - start) < timedelta(days=5) and rng.random() < 0.7
+        war = {
+            'id': wid, 'date': _iso(start), 'end_date': None if active else _iso(start + timedelta(days=rng.uniform(0.5, 5))),
+            'reason': 'synthetic', 'war_type': rng.choice(('ORDINARY', 'ATTRITION', 'RAID')),
+            'turns_left': rng.randint(1, 60) if active else 0,
+            'att_id': att['id'], 'def_id': dfn['id'], 'att_alliance_id': att['alliance_id'], 'def_alliance_id': dfn['alliance_id'],
+            'winner_id': 0 if active else rng.choice((0, att['id'], dfn['id'])),
+            'ground_control': 0, 'air_superiority': 0, 'naval_blockade': 0,
+            'att_resistance': 100, 'def_resistance': 100, 'att_points': 0, 'def_points': 0,
+        }
+        out['wars'].append(war)
+        for k in range(rng.randint(0, 2 * attacks_per_war)):
+            when = start + timedelta(hours=rng.uniform(0, 48))
+            if when > now:
+                break
+            side_att, side_def = (att, dfn) if rng.random() < 0.6 else (dfn, att)
+            infra = round(rng.uniform(0, 300), 2)
+            attack = {
+                'id': attack_id, 'date': _iso(when), 'war_id': wid, 'warid': wid,
+                'att_id': side_att['id'], 'attid': side_att['id'], 'def_id': side_def['id'], 'defid': side_def['id'],
+                'type': rng.choice(('GROUND', 'AIRVINFRA', 'AIRVSOLDIERS', 'AIRVTANKS', 'AIRVAIR', 'NAVAL', 'MISSILE')),
+                'victor': side_att['id'], 'success': rng.randint(0, 3), 'city_id': 0, 'cityid': 0,
+                'infra_destroyed': infra, 'infradestroyed': infra, 'infra_destroyed_value': round(infra * 300, 2),
+                'resistance_lost': 0, 'resistance_eliminated': rng.randint(0, 14),
+                'money_stolen': 0, 'moneystolen': 0, 'money_looted': round(rng.uniform(0, 1e5), 2),
+                'att_mun_used': round(rng.uniform(0, 500), 2), 'def_mun_used': round(rng.uniform(0, 500), 2),
+                'att_gas_used': round(rng.uniform(0, 500), 2), 'def_gas_used': round(rng.uniform(0, 500), 2),
+            }
+            for unit in ('soldiers', 'tanks', 'aircraft', 'ships', 'missiles', 'nukes'):
+                attack[f"att_{unit}_lost"] = rng.randint(0, 50)
+                attack[f"def_{unit}_lost"] = rng.randint(0, 50)
+            for res in ('gasoline', 'munitions', 'aluminum', 'steel', 'food', 'coal', 'oil', 'uranium', 'iron', 'bauxite', 'lead'):
+                attack[f"{res}_looted"] = 0
+            out['warattacks'].append(attack)
+            attack_id += 1
+
+    for tid in range(1, treaties + 1):
+        a1, a2 = rng.sample(range(1, alliances + 1), 2)
+        out['treaties'].append({
+            'id': tid, 'date': _iso(now - timedelta(days=rng.randint(1, 400))), 'treaty_type': rng.choice(_TREATY_TYPES),
+            'treaty_url': '', 'turns_left': rng.randint(-1, 720), 'alliance1_id': a1, 'alliance2_id': a2, 'approved': True,
+        })
+
+    prices = {r: rng.uniform(1000, 4000) for r in _RESOURCES}
+    prices['credits'] = 30_000_000.0
+    for i in range(trade_days):
+        when = now - timedelta(days=trade_days - i)
+        for r in prices:
+            prices[r] = max(1.0, prices[r] * rng.uniform(0.98, 1.02))
+        out['tradeprices'].append({'id': i + 1, 'date': when.date().isoformat(), **{r: round(v, 2) for r, v in prices.items()}})
+    return out
+
+
+async def record_fixtures(alliance_ids: List[int], path: str, days: int = 7) -> Dict[str, int]:
+    """Capture fixtures from the live API through ``PNWAPIQuery`` for ``alliance_ids`` and save to ``path``."""
+    from Systems.PnW.MA.query import PNWAPIQuery
+
+    q = PNWAPIQuery()
+    out: Dict[str, List[Dict[str, Any]]] = {root: [] for root in ROOTS}
+    seen_attacks = set()
+    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+    for aid in alliance_ids:
+        nations = await q.get_alliance_nations(str(aid), force_refresh=True) or []
+        out['nations'].extend(dict(n) for n in nations)
+        treaties = await q.get_alliance_treaties(aid, force_refresh=True) or []
+        for t in treaties:
+            t = dict(t)
+            for side in ('alliance1', 'alliance2'):
+                info = t.pop(side, None)
+                if isinstance(info, dict) and info.get('id') and all(str(a['id']) != str(info['id']) for a in out['alliances']):
+                    out['alliances'].append(dict(info))
+            out['treaties'].append(t)
+    wars_by_aid = await q.get_wars_for_alliances(alliance_ids, cutoff_dt=cutoff) or {}
+    for wars in wars_by_aid.values():
+        for w in wars:
+            w = dict(w)
+            for a in w.pop('attacks', None) or []:
+                if a.get('id') not in seen_attacks:
+                    seen_attacks.add(a.get('id'))
+                    out['warattacks'].append(dict(a, war_id=a.get('war_id') or w.get('id')))
+            w.pop('attacker', None)
+            w.pop('defender', None)
+            out['wars'].append(w)
+    trade = await q._run_request("query { tradeprices(first: 50, page: 1) { data { id date coal oil uranium iron bauxite lead gasoline munitions steel aluminum food credits } } }")
+    out['tradeprices'] = ((trade.get('data') or {}).get('tradeprices') or {}).get('data') or []
+    # Deduplicate by id, last write wins
+    for root in ROOTS:
+        out[root] = list({str(r.get('id')): r for r in out[root]}.values())
+    FixtureStore(out).dump(path)
+    return {root: len(rows) for root, rows in out.items()}
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--fixtures', help='Fixture file (.json or .json.gz) to serve')
+    parser.add_argument('--synthetic', action='store_true', help='Serve generated fixtures')
+    parser.add_argument('--nations', type=int, default=2000)
+    parser.add_argument('--alliances', type=int, default=40)
+    parser.add_argument('--wars', type=int, default=3000)
+    parser.add_argument('--save', help='Write the served fixtures to this path')
+    parser.add_argument('--record', type=int, nargs='+', metavar='ALLIANCE_ID', help='Record fixtures from the live API to --save and exit')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=int, default=0, help='Requests per --rate-window (0 = unlimited)')
+    parser.add_argument('--rate-window', type=float, default=60.0)
+    parser.add_argument('--max-cost', type=float, default=0.0, help='Leaf values per request (0 = unlimited)')
+    parser.add_argument('--max-page-size', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args(argv)
+
+    if args.record:
+        if not args.save:
+            parser.error('--record needs --save')
+        counts = asyncio.run(record_fixtures(args.record, args.save))
+        print(f"Recorded {counts} to {args.save}")
+        return
+    if args.fixtures:
+        store = FixtureStore.load(args.fixtures)
+    else:
+        store = FixtureStore(synthetic_fixtures(nations=args.nations, alliances=args.alliances, wars=args.wars, seed=args.seed))
+    if args.save:
+        store.dump(args.save)
+    config = StubConfig(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate, rate_limit=args.rate_limit,
+        rate_window=args.rate_window, max_page_size=args.max_page_size, max_cost=args.max_cost, seed=args.seed,
+    )
+    server = PnwStubServer(store, config, host=args.host, port=args.port)
+    print(f"Serving {', '.join(f'{len(v)} {k}' for k, v in store.rows.items())} at {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
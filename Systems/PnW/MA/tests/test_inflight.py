@@ -0,0 +1,63 @@
+"""Shared in-flight calls used by the image, flag and view caches.
+
+Run with ``python -m pytest Systems/PnW/MA/tests`` from the repository root.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+
+import pytest
+
+from Systems.PnW.MA.inflight import InflightCalls
+
+
+def test_concurrent_callers_share_one_call():
+    """Callers with the same key get one call's result, and its exception."""
+    async def run():
+        inflight = InflightCalls()
+        calls = []
+
+        async def call():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return len(calls)
+
+        assert await asyncio.gather(*(inflight.run('k', call) for _ in range(3))) == [1, 1, 1]
+
+        async def fail():
+            await asyncio.sleep(0.01)
+            raise ValueError('boom')
+
+        results = await asyncio.gather(inflight.run('k', fail), inflight.run('k', fail), return_exceptions=True)
+        assert [type(r) for r in results] == [ValueError, ValueError]
+        assert not inflight
+    asyncio.run(run())
+
+
+def test_cancelled_owner_hands_the_call_to_a_waiter():
+    """Cancelling the caller running the call makes a waiter run it; the key is then freed."""
+    async def run():
+        inflight = InflightCalls()
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(60)
+            return 'never'
+
+        async def quick():
+            return 'built'
+
+        owner = asyncio.create_task(inflight.run('k', slow))
+        await started.wait()
+        waiter = asyncio.create_task(inflight.run('k', quick))
+        await asyncio.sleep(0)
+        owner.cancel()
+        assert await asyncio.wait_for(waiter, timeout=5) == 'built'
+        with pytest.raises(asyncio.CancelledError):
+            await owner
+        assert not inflight
+    asyncio.run(run())
@@ -0,0 +1,47 @@
+"""Alliance name search: local index hits versus API lookups.
+
+Run with ``python -m pytest Systems/PnW/MA/tests`` from the repository root.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from pnw_stub_server import FixtureStore, PnwStubServer, StubConfig, synthetic_fixtures
+from Systems.PnW.MA import name_index
+from Systems.PnW.MA.name_index import ALLIANCE, PREFIX_SCORE, NameIndex
+from Systems.PnW.MA.query import PNWAPIQuery
+
+
+def _index() -> NameIndex:
+    index = NameIndex()
+    index._scanned = True
+    index.add_alliance({'id': 11, 'name': 'Northern Concord', 'acronym': 'NC'})
+    return index
+
+
+def test_min_score_keeps_exact_and_prefix_matches():
+    index = _index()
+    assert [e.entity_id for e in index.search('Concordia', kinds=[ALLIANCE])] == ['11']
+    assert index.search('Concordia', kinds=[ALLIANCE], min_score=PREFIX_SCORE) == []
+    assert [e.entity_id for e in index.search('north', kinds=[ALLIANCE], min_score=PREFIX_SCORE)] == ['11']
+
+
+def test_fuzzy_local_hit_still_queries_api(monkeypatch):
+    """A cached near-miss does not hide an uncached alliance that the API finds."""
+    fixtures = synthetic_fixtures(nations=20, alliances=2, wars=0, treaties=0, trade_days=1)
+    fixtures['alliances'].append(dict(fixtures['alliances'][0], id=99, name='Concordia', acronym='CCD'))
+    monkeypatch.setattr(name_index, '_index', _index())
+    with PnwStubServer(FixtureStore(fixtures), StubConfig()) as srv:
+        query = PNWAPIQuery(api_key='test', base_url=srv.base_url)
+        found = asyncio.run(query.search_alliances('Concordia'))
+        assert [a['name'] for a in found] == ['Concordia']
+        requests_after_search = srv.stats['requests']
+
+        # A prefix hit on the now-cached name is answered locally
+        again = asyncio.run(query.search_alliances('Concord'))
+        assert [a['name'] for a in again] == ['Concordia']
+        assert srv.stats['requests'] == requests_after_search
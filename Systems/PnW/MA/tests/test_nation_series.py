@@ -0,0 +1,54 @@
+"""Nation series store: loading the saved series while new fetches are recorded.
+
+Run with ``python -m pytest Systems/PnW/MA/tests`` from the repository root.
+"""
+
+import asyncio
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+
+from Systems.PnW.MA.nation_series import NationSeriesStore, turn_time
+
+
+class _Store:
+    """Binary store whose load waits until ``release`` is set."""
+
+    def __init__(self, blob: bytes):
+        self.blob = blob
+        self.release = asyncio.Event()
+        self.saved = []
+
+    async def load_binary_data(self, key):
+        await self.release.wait()
+        return self.blob
+
+    async def save_binary_data(self, key, data):
+        self.saved.append(data)
+        return True
+
+
+def test_rows_recorded_during_load_are_kept():
+    """Rows recorded and saves requested while the saved series loads are merged, not lost."""
+    old = NationSeriesStore()
+    old.record([{'id': 1, 'score': 100.0}], fetched_at=turn_time(1000))
+
+    async def run():
+        store = NationSeriesStore(save_interval_seconds=0)
+        store.bind(_Store(old.dumps()))
+        loading = asyncio.create_task(store.load())
+        await asyncio.sleep(0)
+        store.record([{'id': 1, 'score': 150.0}, {'id': 2, 'score': 80.0}], fetched_at=turn_time(1010))
+        saving = asyncio.create_task(store.save())
+        await asyncio.sleep(0)
+        assert not store.store.saved
+        store.store.release.set()
+        await asyncio.wait_for(asyncio.gather(loading, saving), timeout=5)
+
+        assert [row['score'] for row in store.series(1)] == [100.0, 150.0]
+        assert store.value_at(2, 'score') == 80.0
+        reloaded = NationSeriesStore()
+        reloaded.loads(store.store.saved[-1])
+        assert [row['score'] for row in reloaded.series(1)] == [100.0, 150.0]
+    asyncio.run(run())
@@ -0,0 +1,59 @@
+"""Alias packer: which failures lower the cost ceiling, and its recovery.
+
+Run with ``python -m pytest Systems/PnW/MA/tests`` from the repository root.
+"""
+
+import asyncio
+import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+
+from Systems.PnW.MA.packer import AliasPacker, SubQuery
+
+
+def _subqueries(n: int):
+    return [SubQuery(key=i, root='nations', args={'id': i}, selection='id', cost=100.0) for i in range(n)]
+
+
+def _aliases(query: str):
+    return re.findall(r'(q\d+p\d+):', query)
+
+
+def _runner(fail):
+    """Request runner answering every alias, after raising ``fail(query)`` when it returns an error."""
+    queries = []
+
+    async def run(query):
+        queries.append(query)
+        error = fail(query)
+        if error is not None:
+            raise error
+        return {'data': {alias: {'data': [{'id': alias}]} for alias in _aliases(query)}}
+    return run, queries
+
+
+def test_transient_failure_keeps_ceiling():
+    """A rate-limited multi-alias batch is retried whole and leaves the ceiling alone."""
+    run, queries = _runner(lambda q: Exception('429 Client Error: Too Many Requests') if len(queries) == 1 else None)
+    packer = AliasPacker(run, max_cost=1000.0, max_aliases=10, retries=1)
+    results = asyncio.run(packer.execute(_subqueries(4)))
+    assert len(queries) == 2 and queries[0] == queries[1]
+    assert all(len(blocks) == 1 for blocks in results.values())
+    assert packer.max_cost >= 1000.0 and packer.max_aliases == 10
+
+
+def test_complexity_rejection_splits_and_recovers(monkeypatch):
+    """A complexity rejection splits the batch and lowers the ceiling; successes raise it again."""
+    monkeypatch.setenv('PNW_MAX_QUERY_COST', '1000')
+    run, queries = _runner(lambda q: Exception('Max query complexity exceeded (250)') if len(_aliases(q)) > 2 else None)
+    packer = AliasPacker(run, max_aliases=10)
+    asyncio.run(packer.execute(_subqueries(4)))
+    assert [len(_aliases(q)) for q in queries] == [4, 2, 2]
+    lowered = packer.max_cost
+    assert lowered < 1000.0
+
+    for _ in range(10):
+        asyncio.run(packer.execute(_subqueries(1)))
+    assert packer.max_cost == 1000.0
@@ -0,0 +1,117 @@
+"""Cached alliance snapshots and first-run reads through UserDataManager.
+
+Run with ``python -m pytest Systems/PnW/MA/tests`` from the repository root.
+"""
+
+import asyncio
+import json
+import sys
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+
+from Systems.PnW.MA.query import PNWAPIQuery
+from Systems.PnW.MA.snapshot_file import SnapshotFile, open_snapshot, source_stamp
+from Systems.PnW.MA.treaty_graph import GRAPH_KEY as TREATY_GRAPH_KEY, TreatyGraph
+from Systems.user_data_manager import UserDataManager
+
+
+def _nation(nid: int, alliance_id: int = 1) -> dict:
+    return {
+        'id': str(nid), 'nation_name': f"Nation {nid}", 'leader_name': f"Leader {nid}",
+        'alliance_id': str(alliance_id), 'alliance_position': 'MEMBER', 'score': 1000.0 + nid,
+        'num_cities': 10, 'soldiers': 1000, 'tanks': 100, 'aircraft': 50, 'ships': 10,
+        'vacation_mode_turns': 0, 'color': 'black', 'last_active': datetime.now().isoformat(),
+        'cities': [{'id': str(nid * 100 + c), 'infrastructure': 1500.0, 'barracks': 5} for c in range(10)],
+    }
+
+
+def _query(tmp_path: Path) -> PNWAPIQuery:
+    udm = UserDataManager()
+    udm.json_path = tmp_path
+    query = PNWAPIQuery(api_key='test')
+    query.user_data_manager = udm
+    return query
+
+
+def test_narrowed_projection_reads_full_snapshot(tmp_path):
+    """Only alliance_1.json is on disk: a narrowed read is served from it and creates no files."""
+    async def run():
+        query = _query(tmp_path)
+        nations = [_nation(i) for i in range(1, 4)]
+        await query.user_data_manager.save_json_data('alliance_1', {
+            'nations': nations, 'alliance_id': '1', 'last_updated': datetime.now().isoformat(),
+            'total_nations': len(nations), 'projection': 'full',
+        })
+        for projection in ('audit', 'war_range'):
+            held, _age = await asyncio.wait_for(query._read_alliance_snapshot('1', projection), timeout=10)
+            assert held is not None and len(held) == len(nations)
+        got = await asyncio.wait_for(query.get_alliance_nations('1', projection='audit'), timeout=10)
+        assert len(got) == len(nations)
+        assert sorted(p.name for p in (tmp_path / 'Bloc').glob('alliance_*.json')) == ['alliance_1.json']
+    asyncio.run(run())
+
+
+def test_missing_json_file_returns_default(tmp_path):
+    """Loading a key whose file does not exist yet returns the default and creates the file."""
+    async def run():
+        udm = UserDataManager()
+        udm.json_path = tmp_path
+        data = await asyncio.wait_for(udm.get_json_data('treaties_99', {'treaties': []}), timeout=10)
+        assert data == {'treaties': []}
+        assert (tmp_path / 'Bloc' / 'treaties_99.json').exists()
+    asyncio.run(run())
+
+
+def test_treaty_graph_first_run(tmp_path):
+    """With no treaties_graph.json yet, recording treaties completes and saves the graph."""
+    async def run():
+        query = _query(tmp_path)
+        query.treaty_graph = TreatyGraph()
+        treaty = {
+            'id': '7', 'alliance1_id': '1', 'alliance2_id': '2', 'treaty_type': 'MDP', 'turns_left': -1,
+            'alliance1': {'id': '1', 'name': 'Alpha'}, 'alliance2': {'id': '2', 'name': 'Beta'},
+        }
+        await asyncio.wait_for(query._record_treaties({1: [treaty]}), timeout=10)
+        assert query.treaty_graph.neighbors(1) == [2]
+        saved = tmp_path / 'Bloc' / f'{TREATY_GRAPH_KEY}.json'
+        assert saved.exists()
+
+        reloaded = _query(tmp_path)
+        reloaded.treaty_graph = TreatyGraph()
+        graph = await asyncio.wait_for(reloaded._load_treaty_graph(), timeout=10)
+        assert graph.neighbors(2) == [1]
+    asyncio.run(run())
+
+
+def test_alliance_snapshot_reads_current_sidecar(tmp_path, monkeypatch):
+    """A saved alliance snapshot reloads from its .pnb sidecar until the JSON file is replaced."""
+    decoded = []
+    load = SnapshotFile.load
+    monkeypatch.setattr(SnapshotFile, 'load', lambda self: decoded.append(self.path) or load(self))
+
+    async def run():
+        udm = UserDataManager()
+        udm.json_path = tmp_path
+        nations = [_nation(i, 7) for i in range(1, 4)]
+        await udm.save_json_data('alliance_7', {'nations': nations, 'alliance_id': '7'})
+        json_file = tmp_path / 'Bloc' / 'alliance_7.json'
+        snapshot = open_snapshot(json_file)
+        assert snapshot is not None
+        with snapshot:
+            assert snapshot.source == source_stamp(json_file)
+            assert snapshot.load()['nations'] == nations
+
+        udm._cache.clear()
+        decoded.clear()
+        data = await asyncio.wait_for(udm.get_json_data('alliance_7', {}), timeout=10)
+        assert data['nations'] == nations and len(decoded) == 1
+
+        udm._cache.clear()
+        decoded.clear()
+        json_file.write_text(json.dumps({'nations': nations[:1], 'alliance_id': '7'}), encoding='utf-8')
+        assert open_snapshot(json_file) is None
+        data = await asyncio.wait_for(udm.get_json_data('alliance_7', {}), timeout=10)
+        assert data['nations'] == nations[:1] and not decoded
+    asyncio.run(run())
@@ -0,0 +1,65 @@
+"""Trade price history: exact prices through the ring buffer and its saved blob.
+
+Run with ``python -m pytest Systems/PnW/MA/tests`` from the repository root.
+"""
+
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+
+from Systems.PnW.MA.trade_prices import RESOURCES, PriceHistory, TradePriceService
+
+
+def _prices(offset: float) -> dict:
+    prices = {name: 3741.69 + i * 0.01 + offset for i, name in enumerate(RESOURCES)}
+    prices['CREDIT'] = 31234567.89 + offset
+    return prices
+
+
+def test_prices_round_trip(tmp_path):
+    """Prices read back from memory and from a saved blob equal the prices recorded."""
+    history = PriceHistory(4)
+    samples = [(1_700_000_000.0 + 600 * k, _prices(k)) for k in range(6)]
+    for ts, prices in samples:
+        assert history.append(ts, prices)
+
+    kept = samples[-4:]
+    assert history.latest() == kept[-1]
+    assert history.at(kept[0][0] + 1) == kept[0][1]
+    assert history.series('CREDIT') == [(ts, prices['CREDIT']) for ts, prices in kept]
+
+    blob = history.dumps()
+    (tmp_path / 'trade_prices.bin').write_bytes(blob)
+    loaded = PriceHistory.loads((tmp_path / 'trade_prices.bin').read_bytes(), 4)
+    assert [loaded.at(ts) for ts, _ in kept] == [prices for _, prices in kept]
+
+
+def test_concurrent_callers_wait_for_saved_history():
+    """A second caller during the load of the saved history is served from it, not from a fetch."""
+    saved = PriceHistory(4)
+    saved.append(time.time() - 60, _prices(0))
+
+    class Store:
+        async def load_binary_data(self, key):
+            await asyncio.sleep(0.05)
+            return saved.dumps()
+
+    async def run():
+        fetches = []
+
+        async def fetch():
+            fetches.append(1)
+            return _prices(1)
+
+        service = TradePriceService(interval_seconds=3600, capacity=4)
+        service.bind(fetch, Store())
+        try:
+            first, second = await asyncio.gather(service.prices(), service.prices())
+        finally:
+            service.stop()
+        assert first == second == _prices(0)
+        assert not fetches
+    asyncio.run(run())
@@ -0,0 +1,74 @@
+"""Home vs Away war collection against the local GraphQL stub.
+
+Run with ``python -m pytest Systems/PnW/MA/tests`` from the repository root.
+"""
+
+import asyncio
+import sys
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from pnw_stub_server import FixtureStore, PnwStubServer, StubConfig, synthetic_fixtures
+from Systems.PnW.MA.query import PNWAPIQuery
+from Systems.user_data_manager import UserDataManager
+
+HOME = [1, 2, 3]
+AWAY = [4, 5, 6]
+
+
+def _query(tmp_path: Path, base_url: str) -> PNWAPIQuery:
+    udm = UserDataManager()
+    udm.json_path = tmp_path
+    query = PNWAPIQuery(api_key='test', base_url=base_url)
+    query.user_data_manager = udm
+    return query
+
+
+def _ids(wars) -> set:
+    return {int(w['id']) for w in wars}
+
+
+def test_collected_and_streamed_wars_match(tmp_path):
+    """get_wars_between_parties keeps every war per alliance and selects what the stream yields."""
+    store = FixtureStore(synthetic_fixtures(nations=300, alliances=8, wars=600, treaties=0, trade_days=1))
+    with PnwStubServer(store, StubConfig()) as srv:
+        async def run():
+            cutoff = datetime.now() - timedelta(days=5)
+            collected = await _query(tmp_path / 'collected', srv.base_url).get_wars_between_parties(
+                HOME, AWAY, cutoff_dt=cutoff, force_refresh=True)
+            streamed = []
+            async for page in _query(tmp_path / 'streamed', srv.base_url).stream_wars_between_parties(
+                    HOME, AWAY, cutoff_dt=cutoff, force_refresh=True):
+                streamed.extend(page)
+            return collected, streamed
+
+        collected, streamed = asyncio.run(run())
+    assert streamed
+    assert len(_ids(collected)) == len(collected)
+    assert _ids(collected) == _ids(streamed)
+
+
+def test_empty_selection_is_not_saved(tmp_path):
+    """Wars fetched but none between the parties: nothing is saved to be served for the freshness window."""
+    fixtures = synthetic_fixtures(nations=100, alliances=4, wars=200, treaties=0, trade_days=1)
+    # Only 1 vs 2 and 3 vs 4 fight, so parties [1] and [3] each have wars but none with each other
+    fixtures['wars'] = [
+        w for w in fixtures['wars']
+        if {int(w['att_alliance_id']), int(w['def_alliance_id'])} in ({1, 2}, {3, 4})
+    ]
+    store = FixtureStore(fixtures)
+    with PnwStubServer(store, StubConfig()) as srv:
+        query = _query(tmp_path, srv.base_url)
+
+        async def run():
+            wars = await query.get_wars_between_parties([1], [3], force_refresh=True)
+            streamed = [w async for page in query.stream_wars_between_parties([1], [3], force_refresh=True) for w in page]
+            return wars, streamed, await query.load_war_table('war_parties_1_vs_3')
+
+        wars, streamed, saved = asyncio.run(run())
+    assert fixtures['wars']
+    assert wars == [] and streamed == []
+    assert saved is None
@@ -0,0 +1,374 @@
+"""Background-refreshed trade prices with a rolling price history.
+
+``TradePriceService`` fetches the latest ``tradeprices`` row on a fixed
+interval (``PNW_TRADE_REFRESH_SECONDS``, default 600) at background API
+priority, so reads are served from memory and never wait on the API
+except for the very first fetch of a cold process.
+
+Every sample is appended to ``PriceHistory``, a ring buffer of
+``PNW_TRADE_HISTORY_SIZE`` samples (default 4032, four weeks at the
+default interval) kept as two flat float64 ``array`` columns: epoch
+seconds and one price per resource (float64 so prices round-trip exactly;
+float32 turned 3741.69 into 3741.68994 and rounded large CREDIT prices to
+whole units). It is saved after each refresh as
+``Bloc/trade_prices.bin`` (magic ``PTP1``, JSON header, zlib body).
+``at(ts)`` returns the prices in effect at a moment, and
+``weighted_prices`` values activity spread over time (e.g. war attacks per
+hour) at the prices of each hour.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from bisect import bisect_right
+from typing import Any, Awaitable, Callable, Dict, List, Mapping, Optional, Tuple
+
+try:
+    from .scheduler import BACKGROUND, api_priority
+except ImportError:
+    from Systems.PnW.MA.scheduler import BACKGROUND, api_priority
+
+MAGIC = b'PTP1'
+STORE_KEY = 'trade_prices'
+
+# Resource name used by callers -> tradeprices field
+RESOURCE_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ('FOOD', 'food'),
+    ('COAL', 'coal'),
+    ('OIL', 'oil'),
+    ('URANIUM', 'uranium'),
+    ('LEAD', 'lead'),
+    ('IRON', 'iron'),
+    ('BAUXITE', 'bauxite'),
+    ('GASOLINE', 'gasoline'),
+    ('MUNITIONS', 'munitions'),
+    ('STEEL', 'steel'),
+    ('ALUMINUM', 'aluminum'),
+    ('CREDIT', 'credits'),
+)
+RESOURCES: Tuple[str, ...] = tuple(name for name, _ in RESOURCE_FIELDS)
+
+PriceMap = Dict[str, float]
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def prices_from_row(row: Mapping[str, Any]) -> PriceMap:
+    """Resource -> price for a raw ``tradeprices`` row (missing or bad values become 0)."""
+    out: PriceMap = {}
+    for name, field in RESOURCE_FIELDS:
+        try:
+            out[name] = float(row.get(field) or 0)
+        except Exception:
+            out[name] = 0.0
+    return out
+
+
+class PriceHistory:
+    """Fixed-capacity ring buffer of timestamped price samples."""
+
+    def __init__(self, capacity: int):
+        self.capacity = max(1, int(capacity))
+        self._width = len(RESOURCES)
+        self._ts = array('d', bytes(8 * self.capacity))
+        self._values = array('d', bytes(8 * self.capacity * self._width))
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _slot(self, k: int) -> int:
+        return (self._start + k) % self.capacity
+
+    def _row(self, slot: int) -> PriceMap:
+        base = slot * self._width
+        return {name: float(self._values[base + i]) for i, name in enumerate(RESOURCES)}
+
+    def timestamp(self, k: int) -> float:
+        """Epoch of the ``k``-th oldest sample."""
+        return self._ts[self._slot(k)]
+
+    def append(self, ts: float, prices: Mapping[str, float]) -> bool:
+        """Add a sample; samples must arrive in time order (older ones are dropped)."""
+        if self._size and ts <= self.timestamp(self._size - 1):
+            return False
+        if self._size < self.capacity:
+            slot = self._slot(self._size)
+            self._size += 1
+        else:
+            slot = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._ts[slot] = float(ts)
+        base = slot * self._width
+        for i, name in enumerate(RESOURCES):
+            self._values[base + i] = float(prices.get(name) or 0.0)
+        return True
+
+    def latest(self) -> Optional[Tuple[float, PriceMap]]:
+        if not self._size:
+            return None
+        slot = self._slot(self._size - 1)
+        return self._ts[slot], self._row(slot)
+
+    def _index_at(self, ts: float) -> int:
+        """Logical index of the last sample at or before ``ts`` (-1 if none)."""
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.timestamp(mid) <= ts:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo - 1
+
+    def at(self, ts: float) -> Optional[PriceMap]:
+        """Prices in effect at epoch ``ts``, or None if it predates the history."""
+        k = self._index_at(ts)
+        return self._row(self._slot(k)) if k >= 0 else None
+
+    def series(self, resource: str, since: Optional[float] = None) -> List[Tuple[float, float]]:
+        """``(epoch, price)`` samples of one resource, oldest first."""
+        col = RESOURCES.index(str(resource).upper())
+        first = 0 if since is None else self._index_at(since) + 1
+        out: List[Tuple[float, float]] = []
+        for k in range(max(0, first), self._size):
+            slot = self._slot(k)
+            out.append((self._ts[slot], float(self._values[slot * self._width + col])))
+        return out
+
+    def weighted(self, weights: Mapping[float, float], fallback: Optional[PriceMap] = None) -> Optional[PriceMap]:
+        """Average prices with each epoch in ``weights`` valued at the prices then in effect.
+
+        Epochs that predate the history are valued at ``fallback`` (or skipped without one).
+        """
+        if not self._size or not weights:
+            return None
+        times = [self.timestamp(k) for k in range(self._size)]
+        sums = dict.fromkeys(RESOURCES, 0.0)
+        total = 0.0
+        for ts, weight in weights.items():
+            if weight <= 0:
+                continue
+            k = bisect_right(times, ts) - 1
+            row = self._row(self._slot(k)) if k >= 0 else fallback
+            if row is None:
+                continue
+            for name in RESOURCES:
+                sums[name] += row.get(name, 0.0) * weight
+            total += weight
+        if total <= 0:
+            return None
+        return {name: value / total for name, value in sums.items()}
+
+    def dumps(self, level: int = 6) -> bytes:
+        order = [self._slot(k) for k in range(self._size)]
+        ts = array('d', (self._ts[s] for s in order))
+        values = array('d')
+        for s in order:
+            values.extend(self._values[s * self._width:(s + 1) * self._width])
+        header = {
+            'byteorder': sys.byteorder,
+            'resources': list(RESOURCES),
+            'samples': self._size,
+            'typecode': values.typecode,
+        }
+        head = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        body = zlib.compress(ts.tobytes() + values.tobytes(), level)
+        return MAGIC + struct.pack('<I', len(head)) + head + body
+
+    @classmethod
+    def loads(cls, data: bytes, capacity: int) -> 'PriceHistory':
+        """Parse a ``dumps`` blob into a history of ``capacity`` (keeping the newest samples)."""
+        if data[:4] != MAGIC:
+            raise ValueError("not a trade price history blob")
+        (head_len,) = struct.unpack('<I', data[4:8])
+        header = json.loads(data[8:8 + head_len].decode('utf-8'))
+        body = zlib.decompress(data[8 + head_len:])
+        samples = int(header.get('samples') or 0)
+        names = list(header.get('resources') or [])
+        ts = array('d')
+        ts.frombytes(body[:8 * samples])
+        # Blobs written before the float64 switch carry no typecode and hold float32 prices
+        values = array(header.get('typecode') or 'f')
+        values.frombytes(body[8 * samples:8 * samples + values.itemsize * samples * len(names)])
+        if header.get('byteorder') != sys.byteorder:
+            ts.byteswap()
+            values.byteswap()
+        legacy = values.typecode == 'f'
+        history = cls(capacity)
+        for k in range(samples):
+            row = values[k * len(names):(k + 1) * len(names)]
+            if legacy:
+                # Undo float32 noise: the game quotes prices to the cent
+                row = [round(v, 2) for v in row]
+            history.append(ts[k], dict(zip(names, row)))
+        return history
+
+
+class TradePriceService:
+    """Keeps trade prices current on a schedule and serves them (and their history) from memory."""
+
+    def __init__(
+        self,
+        interval_seconds: Optional[float] = None,
+        capacity: Optional[int] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.logger = logger or logging.getLogger(__name__)
+        self.interval_seconds = max(30.0, float(interval_seconds or _env_number('PNW_TRADE_REFRESH_SECONDS', 600)))
+        self.history = PriceHistory(int(capacity or _env_number('PNW_TRADE_HISTORY_SIZE', 4032)))
+        self.fetch: Optional[Callable[[], Awaitable[Optional[PriceMap]]]] = None
+        self.store: Any = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._loaded = False
+        self._load_task: Optional[asyncio.Task] = None
+        self.refreshes = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def bind(self, fetch: Callable[[], Awaitable[Optional[PriceMap]]], store: Any = None) -> None:
+        """Set the fetcher (and ``save_binary_data``/``load_binary_data`` store) if none is set yet."""
+        if self.fetch is None:
+            self.fetch = fetch
+        if self.store is None and store is not None:
+            self.store = store
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running or self.fetch is None:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._loop(), name="trade-prices")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def age(self) -> Optional[float]:
+        latest = self.history.latest()
+        return None if latest is None else time.time() - latest[0]
+
+    async def _load(self) -> None:
+        """Read the saved history once; concurrent callers wait for the same read."""
+        if self._loaded:
+            return
+        if self._load_task is None:
+            self._load_task = asyncio.get_running_loop().create_task(self._read_saved())
+        await asyncio.shield(self._load_task)
+
+    async def _read_saved(self) -> None:
+        try:
+            if self.store is None:
+                return
+            data = await self.store.load_binary_data(STORE_KEY)
+            if data:
+                saved = PriceHistory.loads(data, self.history.capacity)
+                for k in range(len(self.history)):
+                    saved.append(self.history.timestamp(k), self.history.at(self.history.timestamp(k)) or {})
+                self.history = saved
+                self.logger.debug(f"TradePriceService: loaded {len(saved)} saved price samples")
+        except Exception as e:
+            self.logger.warning(f"TradePriceService: could not load saved price history: {e}")
+        finally:
+            self._loaded = True
+
+    async def refresh(self) -> bool:
+        """Fetch and record one sample now; returns False if the fetch failed."""
+        if self.fetch is None:
+            return False
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            await self._load()
+            try:
+                prices = await self.fetch()
+            except Exception as e:
+                prices = None
+                self.last_error = str(e)
+            if not prices:
+                self.failures += 1
+                self.logger.warning(f"TradePriceService: refresh failed ({self.last_error or 'no data'})")
+                return False
+            self.history.append(time.time(), prices)
+            self.refreshes += 1
+            if self.store is not None:
+                try:
+                    loop = asyncio.get_running_loop()
+                    payload = await loop.run_in_executor(None, self.history.dumps)
+                    await self.store.save_binary_data(STORE_KEY, payload)
+                except Exception as e:
+                    self.logger.warning(f"TradePriceService: failed to save price history: {e}")
+            return True
+
+    async def _loop(self) -> None:
+        await self._load()
+        while True:
+            age = self.age()
+            if age is None or age >= self.interval_seconds:
+                with api_priority(BACKGROUND):
+                    await self.refresh()
+                age = self.age()
+            wait = self.interval_seconds - (age if age is not None else 0.0)
+            await asyncio.sleep(max(30.0, wait))
+
+    def _oldest(self) -> Optional[PriceMap]:
+        return self.history.at(self.history.timestamp(0)) if len(self.history) else None
+
+    async def prices(self, at: Optional[float] = None) -> Optional[PriceMap]:
+        """Latest prices, or those in effect at epoch ``at`` (the oldest sample if ``at`` predates the history).
+
+        Only a cold process with no stored history waits for a fetch.
+        """
+        self.start()
+        await self._load()
+        if not len(self.history):
+            await self.refresh()
+        if at is not None and len(self.history):
+            return self.history.at(at) or self._oldest()
+        latest = self.history.latest()
+        return latest[1] if latest else None
+
+    async def weighted_prices(self, weights: Mapping[float, float]) -> Optional[PriceMap]:
+        """Prices averaged over ``weights`` (epoch -> weight); epochs before the history use the oldest sample."""
+        if await self.prices() is None:
+            return None
+        return self.history.weighted(weights, fallback=self._oldest())
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'samples': len(self.history),
+            'capacity': self.history.capacity,
+            'age_seconds': self.age(),
+            'interval_seconds': self.interval_seconds,
+            'refreshes': self.refreshes,
+            'failures': self.failures,
+            'last_error': self.last_error,
+        }
+
+
+_service: Optional[TradePriceService] = None
+
+
+def get_trade_price_service() -> TradePriceService:
+    """Process-wide trade price service shared by every query instance."""
+    global _service
+    if _service is None:
+        _service = TradePriceService()
+    return _service
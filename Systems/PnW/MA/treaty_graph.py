@@ -0,0 +1,391 @@
+"""In-memory treaty graph: alliances are nodes, treaties are typed edges.
+
+Every treaty list fetched by ``PNWAPIQuery`` is folded into one process-wide
+graph, which is persisted as ``Bloc/treaties_graph.json`` so it survives
+restarts. A fetch for an alliance returns all of its treaties, so it replaces
+that alliance's edges (treaties missing from it were cancelled); each alliance
+remembers when its treaty list was last fetched, so callers can refresh only
+the stale parts of a neighbourhood.
+
+Questions such as "who is two hops from us via MDP" or "who would be pulled
+into a war against X" are answered by breadth-first traversal without any API
+calls. Treaties are treated as symmetric; unapproved and expired treaties are
+ignored by every traversal.
+"""
+
+import logging
+import time
+from collections import deque
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+try:
+    from .turns import TURN_SECONDS
+except ImportError:
+    from Systems.PnW.MA.turns import TURN_SECONDS
+
+GRAPH_KEY = 'treaties_graph'
+
+# Treaties that oblige the partner to defend
+DEFENSE_TYPES = frozenset({'MDP', 'MDoAP', 'Protectorate', 'Extension'})
+# Treaties that allow (but do not oblige) the partner to defend
+OPTIONAL_DEFENSE_TYPES = frozenset({'ODP', 'ODoAP'})
+
+
+def normalize_treaty_type(ttype: str) -> str:
+    """Normalize various treaty type labels/abbreviations to canonical keys.
+    Returns one of: 'MDP', 'MDoAP', 'ODP', 'ODoAP', 'Protectorate', 'NAP', 'PIAT', 'Extension'.
+    """
+    s = (ttype or '').strip().lower()
+    s_compact = s.replace(' ', '').replace('-', '')
+    # Direct abbreviation hits
+    if s_compact in {"mdp"} or s.startswith("mutual defense"):
+        return "MDP"
+    if s_compact in {"mdoap"} or s.startswith("mutual defense/optional aggression") or s_compact in {"mutualdefenseoptionalaggression"}:
+        return "MDoAP"
+    if s_compact in {"odp"} or s.startswith("optional defense"):
+        return "ODP"
+    if s_compact in {"odoap"} or s.startswith("optional defense/optional aggression") or s_compact in {"optionaldefenseoptionalaggression"}:
+        return "ODoAP"
+    if s_compact in {"protectorate", "prot"}:
+        return "Protectorate"
+    if s_compact in {"nap"} or s.startswith("non-aggression") or s.startswith("no aggression"):
+        return "NAP"
+    if s_compact in {"piat"} or s.startswith("peace, intelligence and aid"):
+        return "PIAT"
+    if s_compact in {"extension", "ext"} or s.startswith("extension"):
+        return "Extension"
+    # Fallback to original for unknown types
+    return (ttype or '').strip()
+
+
+def _int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except Exception:
+        return 0
+
+
+@dataclass(frozen=True)
+class TreatyEdge:
+    treaty_id: int
+    alliance1_id: int
+    alliance2_id: int
+    treaty_type: str
+    date: str = ''
+    treaty_url: str = ''
+    approved: bool = True
+    # Epoch after which the treaty has run out; None when the API gave no countdown
+    expires_at: Optional[float] = None
+
+    def other(self, alliance_id: int) -> int:
+        return self.alliance2_id if alliance_id == self.alliance1_id else self.alliance1_id
+
+    def active(self, now: Optional[float] = None) -> bool:
+        if not self.approved:
+            return False
+        return self.expires_at is None or self.expires_at > (time.time() if now is None else now)
+
+
+TypeFilter = Optional[Iterable[str]]
+
+
+class TreatyGraph:
+    """Typed, undirected treaty graph with neighbourhood, sphere and path queries."""
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger(__name__)
+        self._edges: Dict[int, TreatyEdge] = {}
+        # alliance id -> treaty ids touching it
+        self._adjacency: Dict[int, Set[int]] = {}
+        # alliance id -> {'id', 'name', 'acronym', 'flag'}
+        self._alliances: Dict[int, Dict[str, Any]] = {}
+        # alliance id -> epoch its complete treaty list was fetched
+        self._fetched_at: Dict[int, float] = {}
+        # Set once the saved copy has been merged in; ``dirty`` once it needs saving
+        self.loaded = False
+        self.dirty = False
+
+    def __len__(self) -> int:
+        return len(self._edges)
+
+    # ------------------------------------------------------------------
+    # Updates
+    # ------------------------------------------------------------------
+
+    def _edge_from_treaty(self, t: Dict[str, Any], fetched_at: float) -> Optional[TreatyEdge]:
+        tid, a, b = _int(t.get('id')), _int(t.get('alliance1_id')), _int(t.get('alliance2_id'))
+        if not tid or not a or not b or a == b:
+            return None
+        turns_left = t.get('turns_left')
+        expires_at = None
+        if turns_left is not None and str(turns_left).strip() not in ('', '-1'):
+            expires_at = fetched_at + max(0, _int(turns_left)) * TURN_SECONDS
+        approved = t.get('approved')
+        return TreatyEdge(
+            treaty_id=tid,
+            alliance1_id=a,
+            alliance2_id=b,
+            treaty_type=normalize_treaty_type(t.get('treaty_type') or ''),
+            date=str(t.get('date') or ''),
+            treaty_url=str(t.get('treaty_url') or ''),
+            approved=True if approved is None else bool(approved),
+            expires_at=expires_at,
+        )
+
+    def _note_alliance(self, info: Any) -> None:
+        if not isinstance(info, dict):
+            return
+        aid = _int(info.get('id'))
+        if not aid:
+            return
+        entry = self._alliances.setdefault(aid, {'id': aid})
+        for key in ('name', 'acronym', 'flag'):
+            if info.get(key):
+                entry[key] = info[key]
+
+    def _put(self, edge: TreatyEdge) -> bool:
+        if self._edges.get(edge.treaty_id) == edge:
+            return False
+        self._drop(edge.treaty_id)
+        self._edges[edge.treaty_id] = edge
+        self._adjacency.setdefault(edge.alliance1_id, set()).add(edge.treaty_id)
+        self._adjacency.setdefault(edge.alliance2_id, set()).add(edge.treaty_id)
+        return True
+
+    def _drop(self, treaty_id: int) -> bool:
+        edge = self._edges.pop(treaty_id, None)
+        if edge is None:
+            return False
+        for aid in (edge.alliance1_id, edge.alliance2_id):
+            ids = self._adjacency.get(aid)
+            if ids is not None:
+                ids.discard(treaty_id)
+                if not ids:
+                    self._adjacency.pop(aid, None)
+        return True
+
+    def update_alliance(
+        self,
+        alliance_id: Any,
+        treaties: Iterable[Dict[str, Any]],
+        fetched_at: Optional[float] = None,
+        complete: bool = True,
+    ) -> int:
+        """Fold one alliance's fetched treaties into the graph; returns how many edges changed.
+
+        With ``complete`` (the list is the alliance's whole treaty set) edges of the
+        alliance that are not in ``treaties`` are removed. A list older than the one
+        already stored for the alliance is ignored.
+        """
+        aid = _int(alliance_id)
+        when = time.time() if fetched_at is None else float(fetched_at)
+        if not aid or (complete and self._fetched_at.get(aid, 0.0) > when):
+            return 0
+        changed = 0
+        seen: Set[int] = set()
+        for t in treaties or []:
+            if not isinstance(t, dict):
+                continue
+            self._note_alliance(t.get('alliance1'))
+            self._note_alliance(t.get('alliance2'))
+            edge = self._edge_from_treaty(t, when)
+            if edge is None:
+                continue
+            seen.add(edge.treaty_id)
+            changed += int(self._put(edge))
+        if complete:
+            for tid in list(self._adjacency.get(aid, ())):
+                if tid not in seen:
+                    changed += int(self._drop(tid))
+            self._fetched_at[aid] = when
+            self.dirty = True
+        if changed:
+            self.dirty = True
+        return changed
+
+    def forget(self, alliance_id: Any) -> None:
+        """Drop an alliance (e.g. disbanded) and all of its edges."""
+        aid = _int(alliance_id)
+        for tid in list(self._adjacency.get(aid, ())):
+            self._drop(tid)
+        self._alliances.pop(aid, None)
+        self._fetched_at.pop(aid, None)
+        self.dirty = True
+
+    # ------------------------------------------------------------------
+    # Bookkeeping
+    # ------------------------------------------------------------------
+
+    def age(self, alliance_id: Any, now: Optional[float] = None) -> Optional[float]:
+        """Seconds since the alliance's treaty list was fetched, or None if never."""
+        when = self._fetched_at.get(_int(alliance_id))
+        return None if when is None else (time.time() if now is None else now) - when
+
+    def stale(self, alliance_ids: Iterable[Any], max_age: float) -> List[int]:
+        """Alliances in ``alliance_ids`` whose treaty list is missing or at least ``max_age`` old."""
+        now = time.time()
+        out: List[int] = []
+        for aid in alliance_ids or []:
+            age = self.age(aid, now)
+            if age is None or age >= max_age:
+                out.append(_int(aid))
+        return [a for a in dict.fromkeys(out) if a]
+
+    def alliance(self, alliance_id: Any) -> Dict[str, Any]:
+        aid = _int(alliance_id)
+        return dict(self._alliances.get(aid) or {'id': aid})
+
+    def name(self, alliance_id: Any) -> str:
+        info = self._alliances.get(_int(alliance_id)) or {}
+        return str(info.get('name') or info.get('acronym') or alliance_id)
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    def edges(self, alliance_id: Any, types: TypeFilter = None) -> List[TreatyEdge]:
+        """Active treaties of an alliance, optionally limited to ``types``."""
+        wanted = None if types is None else set(types)
+        now = time.time()
+        out = []
+        for tid in self._adjacency.get(_int(alliance_id), ()):
+            edge = self._edges[tid]
+            if edge.active(now) and (wanted is None or edge.treaty_type in wanted):
+                out.append(edge)
+        out.sort(key=lambda e: e.treaty_id)
+        return out
+
+    def neighbors(self, alliance_id: Any, types: TypeFilter = None) -> List[int]:
+        aid = _int(alliance_id)
+        return list(dict.fromkeys(e.other(aid) for e in self.edges(aid, types)))
+
+    def _bfs(self, start: int, types: TypeFilter, max_hops: Optional[int]) -> Dict[int, Tuple[int, Optional[TreatyEdge]]]:
+        """alliance -> (previous alliance, edge used) for everything reachable from ``start``."""
+        wanted = None if types is None else frozenset(types)
+        parents: Dict[int, Tuple[int, Optional[TreatyEdge]]] = {start: (0, None)}
+        depth = {start: 0}
+        queue = deque([start])
+        while queue:
+            current = queue.popleft()
+            if max_hops is not None and depth[current] >= max_hops:
+                continue
+            for edge in self.edges(current, wanted):
+                nxt = edge.other(current)
+                if nxt in parents:
+                    continue
+                parents[nxt] = (current, edge)
+                depth[nxt] = depth[current] + 1
+                queue.append(nxt)
+        return parents
+
+    @staticmethod
+    def _path_to(parents: Dict[int, Tuple[int, Optional[TreatyEdge]]], target: int) -> List[TreatyEdge]:
+        path: List[TreatyEdge] = []
+        node = target
+        while True:
+            prev, edge = parents[node]
+            if edge is None:
+                break
+            path.append(edge)
+            node = prev
+        path.reverse()
+        return path
+
+    def k_hop(self, alliance_id: Any, k: int, types: TypeFilter = None) -> Dict[int, int]:
+        """Alliances within ``k`` treaty hops (excluding the start), mapped to their hop count."""
+        start = _int(alliance_id)
+        parents = self._bfs(start, types, max(0, int(k)))
+        return {aid: len(self._path_to(parents, aid)) for aid in parents if aid != start}
+
+    def sphere(self, alliance_id: Any, types: TypeFilter = None) -> Set[int]:
+        """Connected component containing the alliance (including itself)."""
+        return set(self._bfs(_int(alliance_id), types, None))
+
+    def spheres(self, types: TypeFilter = None, min_size: int = 2) -> List[Set[int]]:
+        """All connected components with at least ``min_size`` alliances, largest first."""
+        seen: Set[int] = set()
+        out: List[Set[int]] = []
+        for aid in sorted(self._adjacency):
+            if aid in seen:
+                continue
+            component = self.sphere(aid, types)
+            seen |= component
+            if len(component) >= min_size:
+                out.append(component)
+        out.sort(key=len, reverse=True)
+        return out
+
+    def shortest_path(self, source: Any, target: Any, types: TypeFilter = None) -> Optional[List[TreatyEdge]]:
+        """Fewest-treaty chain from ``source`` to ``target`` ([] when equal, None when unconnected)."""
+        src, dst = _int(source), _int(target)
+        parents = self._bfs(src, types, None)
+        return self._path_to(parents, dst) if dst in parents else None
+
+    def pulled_into_war(
+        self,
+        target: Any,
+        include_optional: bool = False,
+        max_hops: Optional[int] = None,
+    ) -> Dict[int, List[TreatyEdge]]:
+        """Alliances that would defend ``target`` if it is attacked, with the treaty chain that pulls each in.
+
+        Defense treaties chain: an ally that enters the war can be hit in turn and
+        call on its own defense partners. ``include_optional`` adds ODP/ODoAP
+        partners; ``max_hops`` bounds the chain length.
+        """
+        start = _int(target)
+        types = DEFENSE_TYPES | OPTIONAL_DEFENSE_TYPES if include_optional else DEFENSE_TYPES
+        parents = self._bfs(start, types, max_hops)
+        return {aid: self._path_to(parents, aid) for aid in parents if aid != start}
+
+    # ------------------------------------------------------------------
+    # Persistence
+    # ------------------------------------------------------------------
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'edges': [asdict(e) for e in self._edges.values()],
+            'alliances': list(self._alliances.values()),
+            'fetched_at': {str(k): v for k, v in self._fetched_at.items()},
+            'last_updated': time.time(),
+        }
+
+    def load_dict(self, data: Dict[str, Any]) -> None:
+        """Merge a persisted graph; alliances fetched more recently in memory keep their edges."""
+        self.loaded = True
+        if not isinstance(data, dict):
+            return
+        fresher = {aid for aid, when in self._fetched_at.items()
+                   if when >= float((data.get('fetched_at') or {}).get(str(aid), 0.0))}
+        for info in data.get('alliances') or []:
+            self._note_alliance(info)
+        for raw in data.get('edges') or []:
+            try:
+                edge = TreatyEdge(**raw)
+            except Exception:
+                continue
+            if edge.treaty_id in self._edges or edge.alliance1_id in fresher or edge.alliance2_id in fresher:
+                continue
+            self._put(edge)
+        for aid, when in (data.get('fetched_at') or {}).items():
+            if _int(aid) not in fresher:
+                self._fetched_at[_int(aid)] = float(when)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'alliances': len(self._adjacency),
+            'treaties': len(self._edges),
+            'fetched_alliances': len(self._fetched_at),
+        }
+
+
+_graph: Optional[TreatyGraph] = None
+
+
+def get_treaty_graph() -> TreatyGraph:
+    """Process-wide treaty graph shared by query.py and the MA cogs."""
+    global _graph
+    if _graph is None:
+        _graph = TreatyGraph()
+    return _graph
@@ -0,0 +1,159 @@
+"""PnW turn clock and a turn-aligned background refresh loop.
+
+Game turns fall every two hours on even UTC hours; the 00:00 UTC turn is
+also the day change. ``TurnRefreshScheduler`` sleeps until shortly after
+each boundary (fixed delay plus random jitter, so many bots do not hit the
+API in the same second) and runs an async job with the new turn id. If the
+data held at start-up is not from the current turn, it catches up once
+after the initial jitter instead of waiting up to two hours.
+"""
+
+import asyncio
+import logging
+import os
+import random
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+TURN_SECONDS = 2 * 60 * 60
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def _utc(now: Optional[datetime] = None) -> datetime:
+    if now is None:
+        return datetime.now(timezone.utc)
+    # Naive datetimes in this codebase are local time; astimezone treats them as such
+    return now.astimezone(timezone.utc)
+
+
+def turn_start(now: Optional[datetime] = None) -> datetime:
+    """UTC start of the turn containing ``now``."""
+    now = _utc(now)
+    return now.replace(hour=now.hour - now.hour % 2, minute=0, second=0, microsecond=0)
+
+
+def next_turn_start(now: Optional[datetime] = None) -> datetime:
+    """UTC start of the turn after the one containing ``now``."""
+    return turn_start(now) + timedelta(seconds=TURN_SECONDS)
+
+
+def turn_id(now: Optional[datetime] = None) -> str:
+    """Sortable id of the turn containing ``now``, e.g. ``2026-10-18T14``."""
+    return turn_start(now).strftime('%Y-%m-%dT%H')
+
+
+def is_day_change(turn: Optional[datetime] = None) -> bool:
+    """True if ``turn`` (or the current turn) is the 00:00 UTC day-change turn."""
+    return turn_start(turn).hour == 0
+
+
+def seconds_until_next_turn(now: Optional[datetime] = None) -> float:
+    now = _utc(now)
+    return max(0.0, (next_turn_start(now) - now).total_seconds())
+
+
+class TurnRefreshScheduler:
+    """Runs ``job(turn_id)`` once per game turn, shortly after the boundary.
+
+    ``is_current`` reports whether the data the job maintains already belongs
+    to a given turn; it is used to skip the start-up catch-up run and to
+    avoid repeating a turn that a manual refresh already covered.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        job: Callable[[str], Awaitable[Any]],
+        is_current: Optional[Callable[[str], bool]] = None,
+        delay_seconds: Optional[float] = None,
+        jitter_seconds: Optional[float] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.name = name
+        self.job = job
+        self.is_current = is_current
+        self.logger = logger or logging.getLogger(__name__)
+        self.delay_seconds = float(delay_seconds if delay_seconds is not None else _env_number('PNW_TURN_REFRESH_DELAY', 90))
+        self.jitter_seconds = float(jitter_seconds if jitter_seconds is not None else _env_number('PNW_TURN_REFRESH_JITTER', 60))
+        self._task: Optional[asyncio.Task] = None
+        self.last_turn: Optional[str] = None
+        self.last_run_at: Optional[datetime] = None
+        self.last_duration: Optional[float] = None
+        self.next_run_at: Optional[datetime] = None
+        self.failures = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        if self.running:
+            return
+        self._task = asyncio.get_running_loop().create_task(self._loop(), name=f"turn-refresh:{self.name}")
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self.next_run_at = None
+
+    def _jitter(self) -> float:
+        return random.uniform(0.0, max(0.0, self.jitter_seconds))
+
+    async def _sleep_until(self, when: datetime) -> None:
+        self.next_run_at = when
+        while True:
+            remaining = (when - _utc()).total_seconds()
+            if remaining <= 0:
+                return
+            # Re-check the wall clock periodically; monotonic sleeps drift across suspend/resume
+            await asyncio.sleep(min(remaining, 300.0))
+
+    async def _run(self, turn: str) -> None:
+        if self.is_current is not None:
+            try:
+                if self.is_current(turn):
+                    self.logger.debug(f"TurnRefreshScheduler[{self.name}]: turn {turn} already current, skipping")
+                    self.last_turn = turn
+                    return
+            except Exception:
+                pass
+        started = asyncio.get_running_loop().time()
+        try:
+            await self.job(turn)
+            self.last_turn = turn
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.failures += 1
+            self.logger.error(f"TurnRefreshScheduler[{self.name}]: refresh for turn {turn} failed: {e}")
+        finally:
+            self.last_run_at = _utc()
+            self.last_duration = asyncio.get_running_loop().time() - started
+
+    async def _loop(self) -> None:
+        # Catch up once at start-up if the held data predates the current turn
+        await self._sleep_until(_utc() + timedelta(seconds=self._jitter()))
+        await self._run(turn_id())
+        while True:
+            boundary = next_turn_start()
+            await self._sleep_until(boundary + timedelta(seconds=self.delay_seconds + self._jitter()))
+            await self._run(turn_id(boundary))
+
+    def get_status(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'running': self.running,
+            'current_turn': turn_id(),
+            'last_turn': self.last_turn,
+            'last_run_at': self.last_run_at.isoformat() if self.last_run_at else None,
+            'last_duration_seconds': self.last_duration,
+            'next_run_at': self.next_run_at.isoformat() if self.next_run_at else None,
+            'failures': self.failures,
+        }
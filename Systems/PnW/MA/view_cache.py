@@ -0,0 +1,168 @@
+"""Memoized view models for the paginated bloc and alliance views.
+
+Views switch between alliances and between military / improvements /
+projects pages many times on the same data. Entries here hold what a page
+needs to be redrawn (the built embed plus any aggregates the view keeps),
+keyed by:
+
+* the snapshot version of the nations shown, taken from the identity of the
+  nation records: a refresh replaces every record, so a new snapshot never
+  matches an old entry. Entries keep their records alive, so the identities
+  cannot be reused while an entry exists;
+* the view type (``'bloc.military'``, ``'alliance.projects'``, ...);
+* the page and filter state that changes the output (alliance key,
+  selected alliances, ...).
+
+``precompute`` builds a page in a background task so the next click is a
+lookup. Values are returned as stored; callers copy anything they mutate.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+try:
+    from .inflight import InflightCalls
+except ImportError:
+    from Systems.PnW.MA.inflight import InflightCalls
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, str(default)))
+    except Exception:
+        return default
+
+
+def snapshot_token(records: Iterable[Any]) -> Tuple[int, int]:
+    """Version token for a list of nation records (count plus identity hash)."""
+    ids = tuple(id(r) for r in records)
+    return len(ids), hash(ids)
+
+
+class ViewModelCache:
+    """LRU of built view models with a TTL, in-flight sharing and background precompute."""
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        ttl_seconds: Optional[float] = None,
+        logger: Optional[logging.Logger] = None,
+    ):
+        self.logger = logger or logging.getLogger(__name__)
+        self.max_entries = int(max_entries or _env_number('PNW_VIEW_CACHE_ENTRIES', 256))
+        # Views time out after 5 minutes; keep pages a little longer for re-opened commands
+        self.ttl_seconds = float(ttl_seconds or _env_number('PNW_VIEW_CACHE_TTL', 900))
+        # Let the interaction that triggered a precompute send its response first
+        self.precompute_delay = _env_number('PNW_VIEW_PRECOMPUTE_DELAY', 0.25)
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any, List[Any]]]' = OrderedDict()
+        self._inflight = InflightCalls()
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats: Dict[str, int] = {'hits': 0, 'misses': 0, 'coalesced': 0, 'precomputed': 0, 'uncacheable': 0}
+
+    @staticmethod
+    def make_key(view_kind: str, records: List[Any], filters: Tuple[Hashable, ...] = ()) -> Hashable:
+        return (view_kind, snapshot_token(records), filters)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        stored_at, value, _ = entry
+        if time.monotonic() - stored_at > self.ttl_seconds:
+            self._entries.pop(key, None)
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any, records: List[Any]) -> None:
+        self._entries[key] = (time.monotonic(), value, list(records))
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def has(self, key: Hashable) -> bool:
+        return key in self._inflight or self.get(key) is not None
+
+    async def get_or_build(
+        self,
+        view_kind: str,
+        records: List[Any],
+        build: Callable[[], Awaitable[Any]],
+        filters: Tuple[Hashable, ...] = (),
+        cacheable: Optional[Callable[[Any], bool]] = None,
+    ) -> Any:
+        """Cached view model for ``(view_kind, records, filters)`` or the result of ``build()``.
+
+        Results rejected by ``cacheable`` (error pages) are returned but not stored. Concurrent
+        callers with the same key share one build (see inflight.py).
+        """
+        key = self.make_key(view_kind, records, filters)
+        value = self.get(key)
+        if value is not None:
+            self.stats['hits'] += 1
+            return value
+        if key in self._inflight:
+            self.stats['coalesced'] += 1
+        else:
+            self.stats['misses'] += 1
+
+        async def _build() -> Any:
+            value = await build()
+            if cacheable is None or cacheable(value):
+                self.put(key, value, records)
+            else:
+                self.stats['uncacheable'] += 1
+            return value
+
+        return await self._inflight.run(key, _build)
+
+    def precompute(
+        self,
+        view_kind: str,
+        records: List[Any],
+        build: Callable[[], Awaitable[Any]],
+        filters: Tuple[Hashable, ...] = (),
+        cacheable: Optional[Callable[[Any], bool]] = None,
+    ) -> None:
+        """Build a page in the background unless it is cached or already being built."""
+        if not records or self.has(self.make_key(view_kind, records, filters)):
+            return
+
+        async def _run() -> None:
+            try:
+                await asyncio.sleep(self.precompute_delay)
+                await self.get_or_build(view_kind, records, build, filters, cacheable)
+                self.stats['precomputed'] += 1
+            except Exception as e:
+                self.logger.debug(f"ViewModelCache: precompute of {view_kind} failed: {e}")
+
+        try:
+            task = asyncio.get_running_loop().create_task(_run())
+        except RuntimeError:
+            return
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = dict(self.stats)
+        out['entries'] = len(self._entries)
+        out['pending_precompute'] = len(self._tasks)
+        return out
+
+
+_cache: Optional[ViewModelCache] = None
+
+
+def get_view_cache() -> ViewModelCache:
+    """Process-wide view model cache shared by bloc.py and alliance.py."""
+    global _cache
+    if _cache is None:
+        _cache = ViewModelCache()
+    return _cache
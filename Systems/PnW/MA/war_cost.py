@@ -4,7 +4,9 @@ from discord.ext import commands
 
 import re
 import logging
-from typing import Any, Dict, List, Optional, Tuple, Set
+from datetime import datetime, timezone
+from time import monotonic
+from typing import Any, Dict, List, Optional, Tuple, Set, Union
 from io import BytesIO
 
 import sys
@@ -21,15 +23,6 @@ except Exception:
     except Exception:
         create_query_instance = None
 
-# UserDataManager for reading cached saved files
-try:
-    from Systems.user_data_manager import UserDataManager
-except Exception:
-    try:
-        from ..user_data_manager import UserDataManager
-    except Exception:
-        UserDataManager = None
-
 try:
     from .bloc import AERO_ALLIANCES
 except Exception:
@@ -38,15 +31,23 @@ except Exception:
     except Exception:
         AERO_ALLIANCES = {}
 
-# Optional image generation support (same pattern as compare.py)
 try:
-    from PIL import Image, ImageDraw, ImageFont
-    PIL_AVAILABLE = True
-except Exception:
-    Image = None
-    ImageDraw = None
-    ImageFont = None
-    PIL_AVAILABLE = False
+    from .war_stream import WarCostAggregator
+except ImportError:
+    from Systems.PnW.MA.war_stream import WarCostAggregator
+
+try:
+    from .freshness import freshness_command
+except ImportError:
+    from Systems.PnW.MA.freshness import freshness_command
+
+# Chart rendering runs in a worker process pool (same pattern as compare.py)
+try:
+    from .charts import WAR_COST_PALETTE, ChartSpec
+    from .render import get_render_service
+except ImportError:
+    from Systems.PnW.MA.charts import WAR_COST_PALETTE, ChartSpec
+    from Systems.PnW.MA.render import get_render_service
 
 
 class WarsCostCog(commands.Cog):
@@ -61,15 +62,11 @@ class WarsCostCog(commands.Cog):
                 self.query_instance = create_query_instance(logger=self.logger)
         except Exception as e:
             self.logger.warning(f"war_cost.py: Failed to init query instance: {e}")
-        # Initialize data manager for cached payloads
+        # Seconds between live partial-total updates while /wars streams pages
         try:
-            if UserDataManager:
-                self.user_data_manager = UserDataManager()
-            else:
-                self.user_data_manager = None
-        except Exception as e:
-            self.user_data_manager = None
-            self.logger.warning(f"war_cost.py: Failed to init UserDataManager: {e}")
+            self.progress_interval = float(os.getenv('PNW_WARS_PROGRESS_INTERVAL', '3'))
+        except Exception:
+            self.progress_interval = 3.0
         # No external icon URLs; we will use server custom emojis if available
         # Server-specific custom emoji codes (exact strings as provided)
         self.SERVER_EMOJI_CODES = {
@@ -240,11 +237,12 @@ class WarsCostCog(commands.Cog):
                 full_val = f"{prefix}{aid}" if prefix else str(aid)
                 choices.append(app_commands.Choice(name=f"Alliance ID {aid}", value=full_val))
 
-            # REST-backed alliance search by token
+            # Alliance search by token: exact or prefix hits in the local name index are answered
+            # without a request, anything else goes to the API (see PNWAPIQuery.search_alliances)
             try:
                 q = getattr(self, 'query_instance', None)
-                if q:
-                    results = await q.search_alliances(token, max_results=max(0, 25 - len(choices)))
+                if q and token:
+                    results = await q.search_alliances(token, max_results=max(1, 25 - len(choices)))
                     for a in results or []:
                         rid = str(a.get('id') or '')
                         name = (a.get('name') or '').strip()
@@ -260,7 +258,7 @@ class WarsCostCog(commands.Cog):
 
             # Fallback: Known AERO alliances filtered by token
             try:
-                if len(choices) < 25:
+                if not choices:
                     cur_lower = (token or '').lower()
                     for _, cfg in (AERO_ALLIANCES or {}).items():
                         name = (cfg.get('name') or '')
@@ -295,127 +293,9 @@ class WarsCostCog(commands.Cog):
         Home/Away are explicit party sets (attackers vs defenders input), not initial war sides.
         Returns keys like 'home_gas_used', 'away_gas_used', etc. Missing fields default to 0.
         """
-        fields = [
-            'gas_used', 'mun_used', 'alum_used', 'steel_used',
-            'infra_destroyed', 'infra_destroyed_value', 'money_looted',
-            'soldiers_lost', 'tanks_lost', 'aircraft_lost', 'ships_lost',
-            'missiles_lost', 'nukes_lost',
-            'gas_looted', 'mun_looted', 'alum_looted', 'steel_looted', 'food_looted',
-            'coal_looted', 'oil_looted', 'uran_looted', 'iron_looted', 'baux_looted', 'lead_looted'
-        ]
-        totals: Dict[str, float] = {}
-        for prefix in ('home', 'away'):
-            for f in fields:
-                totals[f"{prefix}_{f}"] = 0.0
-
-        for w in wars or []:
-            attacks = w.get('attacks') or []
-            use_attacks = isinstance(attacks, list) and len(attacks) > 0
-
-            try:
-                war_att_id = int(w.get('att_id') or w.get('attid') or 0)
-            except Exception:
-                war_att_id = 0
-            try:
-                war_def_id = int(w.get('def_id') or w.get('defid') or 0)
-            except Exception:
-                war_def_id = 0
-            try:
-                war_att_alliance_id = int(w.get('att_alliance_id') or (w.get('attacker') or {}).get('alliance_id') or 0)
-            except Exception:
-                war_att_alliance_id = 0
-            try:
-                war_def_alliance_id = int(w.get('def_alliance_id') or (w.get('defender') or {}).get('alliance_id') or 0)
-            except Exception:
-                war_def_alliance_id = 0
-
-            if use_attacks:
-                for a in attacks:
-                    try:
-                        atk_id = int(a.get('att_id') or a.get('attid') or 0)
-                    except Exception:
-                        atk_id = 0
-                    if atk_id and war_att_id and atk_id == war_att_id:
-                        atk_alliance = war_att_alliance_id
-                        def_alliance = war_def_alliance_id
-                    elif atk_id and war_def_id and atk_id == war_def_id:
-                        atk_alliance = war_def_alliance_id
-                        def_alliance = war_att_alliance_id
-                    else:
-                        atk_alliance = war_att_alliance_id
-                        def_alliance = war_def_alliance_id
-                    atk_party = 'home' if atk_alliance in home_ids else ('away' if atk_alliance in away_ids else None)
-                    def_party = 'home' if def_alliance in home_ids else ('away' if def_alliance in away_ids else None)
-                    att_gas = float(a.get('att_gas_used', 0) or 0)
-                    def_gas = float(a.get('def_gas_used', 0) or 0)
-                    att_mun = float(a.get('att_mun_used', 0) or 0)
-                    def_mun = float(a.get('def_mun_used', 0) or 0)
-                    infra_lvl = float((a.get('infra_destroyed') if a.get('infra_destroyed') is not None else a.get('infradestroyed')) or 0)
-                    infra_val = float(a.get('infra_destroyed_value', 0) or 0)
-                    money_loot = float(
-                        (a.get('money_stolen') if a.get('money_stolen') is not None else a.get('moneystolen'))
-                        or a.get('money_looted') or 0
-                    )
-                    att_soldiers_lost = float(a.get('att_soldiers_lost', 0) or 0)
-                    def_soldiers_lost = float(a.get('def_soldiers_lost', 0) or 0)
-                    att_tanks_lost = float(a.get('att_tanks_lost', 0) or 0)
-                    def_tanks_lost = float(a.get('def_tanks_lost', 0) or 0)
-                    att_aircraft_lost = float(a.get('att_aircraft_lost', 0) or 0)
-                    def_aircraft_lost = float(a.get('def_aircraft_lost', 0) or 0)
-                    att_ships_lost = float(a.get('att_ships_lost', 0) or 0)
-                    def_ships_lost = float(a.get('def_ships_lost', 0) or 0)
-                    att_missiles_lost = float(a.get('att_missiles_lost', 0) or 0)
-                    def_missiles_lost = float(a.get('def_missiles_lost', 0) or 0)
-                    att_nukes_lost = float(a.get('att_nukes_lost', 0) or 0)
-                    def_nukes_lost = float(a.get('def_nukes_lost', 0) or 0)
-                    loot_gas = float(a.get('gasoline_looted', 0) or 0)
-                    loot_mun = float(a.get('munitions_looted', 0) or 0)
-                    loot_alum = float(a.get('aluminum_looted', 0) or 0)
-                    loot_steel = float(a.get('steel_looted', 0) or 0)
-                    loot_food = float(a.get('food_looted', 0) or 0)
-                    loot_coal = float(a.get('coal_looted', 0) or 0)
-                    loot_oil = float(a.get('oil_looted', 0) or 0)
-                    loot_uran = float(a.get('uranium_looted', 0) or 0)
-                    loot_iron = float(a.get('iron_looted', 0) or 0)
-                    loot_baux = float(a.get('bauxite_looted', 0) or 0)
-                    loot_lead = float(a.get('lead_looted', 0) or 0)
-                    if atk_party:
-                        totals[f"{atk_party}_gas_used"] += att_gas
-                        totals[f"{atk_party}_mun_used"] += att_mun
-                        totals[f"{atk_party}_money_looted"] += money_loot
-                        totals[f"{atk_party}_gas_looted"] += loot_gas
-                        totals[f"{atk_party}_mun_looted"] += loot_mun
-                        totals[f"{atk_party}_alum_looted"] += loot_alum
-                        totals[f"{atk_party}_steel_looted"] += loot_steel
-                        totals[f"{atk_party}_food_looted"] += loot_food
-                        totals[f"{atk_party}_coal_looted"] += loot_coal
-                        totals[f"{atk_party}_oil_looted"] += loot_oil
-                        totals[f"{atk_party}_uran_looted"] += loot_uran
-                        totals[f"{atk_party}_iron_looted"] += loot_iron
-                        totals[f"{atk_party}_baux_looted"] += loot_baux
-                        totals[f"{atk_party}_lead_looted"] += loot_lead
-                        totals[f"{atk_party}_soldiers_lost"] += att_soldiers_lost
-                        totals[f"{atk_party}_tanks_lost"] += att_tanks_lost
-                        totals[f"{atk_party}_aircraft_lost"] += att_aircraft_lost
-                        totals[f"{atk_party}_ships_lost"] += att_ships_lost
-                        totals[f"{atk_party}_missiles_lost"] += att_missiles_lost
-                        totals[f"{atk_party}_nukes_lost"] += att_nukes_lost
-                    if def_party:
-                        totals[f"{def_party}_gas_used"] += def_gas
-                        totals[f"{def_party}_mun_used"] += def_mun
-                        totals[f"{def_party}_infra_destroyed"] += infra_lvl
-                        totals[f"{def_party}_infra_destroyed_value"] += infra_val
-                        totals[f"{def_party}_soldiers_lost"] += def_soldiers_lost
-                        totals[f"{def_party}_tanks_lost"] += def_tanks_lost
-                        totals[f"{def_party}_aircraft_lost"] += def_aircraft_lost
-                        totals[f"{def_party}_ships_lost"] += def_ships_lost
-                        totals[f"{def_party}_missiles_lost"] += def_missiles_lost
-                        totals[f"{def_party}_nukes_lost"] += def_nukes_lost
-            else:
-                pass
-
-        totals['war_count'] = float(len(wars or []))
-        return totals
+        aggregator = WarCostAggregator(home_ids, away_ids)
+        aggregator.add_page(wars or [])
+        return aggregator.totals()
 
     def _format_columns(self, left_hdr: str, right_hdr: str, rows: List[Tuple[str, str, str]], fixed_widths: Optional[Tuple[int, int, int]] = None, include_header: bool = True) -> str:
         """Format aligned three columns: Stat | Home | Away, without code blocks.
@@ -495,12 +375,21 @@ class WarsCostCog(commands.Cog):
             lines.append(f"{lbl.ljust(label_width)} | {left.rjust(left_width)} | {right.rjust(right_width)}")
         return "```" + "\n".join(lines) + "```"
 
-    async def _get_price_map(self) -> Dict[str, float]:
-        """Fetch average prices for key resources used in wars."""
+    async def _get_price_map(self, attack_hours: Optional[Dict[float, int]] = None) -> Dict[str, float]:
+        """Average prices for key resources used in wars.
+
+        With ``attack_hours`` (attacks per hour), each hour is valued at the trade
+        prices recorded then, from the price history, without extra API calls.
+        """
         price_map: Dict[str, float] = {}
         try:
             if not self.query_instance:
                 return price_map
+            service = getattr(self.query_instance, 'trade_prices', None)
+            if attack_hours and service is not None:
+                weighted = await service.weighted_prices(attack_hours)
+                if weighted:
+                    return weighted
             vals = await self.query_instance.get_trade_resource_values()
             for item in vals or []:
                 r = (item.get('resource') or '').upper()
@@ -532,24 +421,43 @@ class WarsCostCog(commands.Cog):
         except Exception:
             return "0"
 
-    # ---------------------------
-    # Chart generation helpers (PIL)
-    # ---------------------------
-    def _get_font(self, size: int = 16) -> Optional[Any]:
-        if not PIL_AVAILABLE:
-            return None
+    async def _send_progress(self, interaction: discord.Interaction, message: Optional[Any], aggregator: WarCostAggregator, time_label: Optional[str]) -> Optional[Any]:
+        """Post or update the partial-totals message shown while war pages are still streaming."""
+        p = aggregator.progress()
+        window = f" in the last {time_label}" if time_label else ""
+        embed = discord.Embed(
+            title="⏳ Collecting wars...",
+            description=f"{p['wars']:,} wars and {p['attacks']:,} attacks so far{window} ({p['elapsed']:.0f}s)",
+            color=discord.Color.light_grey(),
+        )
+        embed.add_field(
+            name="Gasoline / Munitions used",
+            value=(
+                f"Home: {self._fmt_money_short(p['home_gas_used'])} / {self._fmt_money_short(p['home_mun_used'])}\n"
+                f"Away: {self._fmt_money_short(p['away_gas_used'])} / {self._fmt_money_short(p['away_mun_used'])}"
+            ),
+            inline=False,
+        )
+        embed.add_field(
+            name="Infra destroyed (value)",
+            value=(
+                f"Home: ${self._fmt_money_short(p['home_infra_destroyed_value'])}\n"
+                f"Away: ${self._fmt_money_short(p['away_infra_destroyed_value'])}"
+            ),
+            inline=False,
+        )
         try:
-            return ImageFont.truetype("C:\\Windows\\Fonts\\seguiemj.ttf", size)
-        except Exception:
-            try:
-                return ImageFont.truetype("C:\\Windows\\Fonts\\segoeui.ttf", size)
-            except Exception:
-                try:
-                    return ImageFont.truetype("arial.ttf", size)
-                except Exception:
-                    return ImageFont.load_default()
+            if message is None:
+                return await interaction.followup.send(embed=embed, wait=True)
+            await message.edit(embed=embed)
+        except Exception as e:
+            self.logger.debug(f"war_cost.py: progress update failed: {e}")
+        return message
 
-    def _generate_war_cost_pies(self, home_vals: List[float], away_vals: List[float], categories: List[str]) -> Optional[Tuple[BytesIO, str]]:
+    # ---------------------------
+    # Chart generation (rendered off-loop, see render.py)
+    # ---------------------------
+    async def _generate_war_cost_pies(self, home_vals: List[float], away_vals: List[float], categories: List[str]) -> Optional[Tuple[BytesIO, str]]:
         """Generate a side-by-side pie chart image for Home and Away.
 
         home_vals/away_vals: monetary totals per category in the order of `categories`.
@@ -557,8 +465,9 @@ class WarsCostCog(commands.Cog):
         """
         if not categories:
             return None
+        service = get_render_service()
         # If PIL is unavailable, return a tiny placeholder PNG to ensure an image is always attached
-        if not PIL_AVAILABLE:
+        if not service.available:
             try:
                 import base64
                 # 1x1 transparent PNG
@@ -570,222 +479,33 @@ class WarsCostCog(commands.Cog):
                 return (bio, "chart_war_cost_pies.png")
             except Exception:
                 return None
-        # Pad values if lengths mismatch
-        if len(home_vals) != len(categories):
-            home_vals = list(home_vals) + [0.0] * (len(categories) - len(home_vals))
-        if len(away_vals) != len(categories):
-            away_vals = list(away_vals) + [0.0] * (len(categories) - len(away_vals))
-        try:
-            # Image dimensions and layout
-            width = 900
-            height = 420
-            pad = 20
-            title_h = 40
-            # Minimal footer height since there is no legend; keep space for totals only
-            line_step = 22
-            legend_h = 48
-            pie_area_h = height - title_h - legend_h - (pad * 2)
-            pie_diameter = min(260, pie_area_h)
-            # Space pies slightly further apart horizontally
-            home_center = (int(width * 0.24), title_h + pad + pie_area_h // 2)
-            away_center = (int(width * 0.76), title_h + pad + pie_area_h // 2)
-            radius = pie_diameter // 2
-
-            # Colors per category (consistent palette)
-            palette = {
-                "Resource": (46, 134, 222),   # Blue (legacy alias)
-                "Consumption": (46, 134, 222),   # Blue
-                "Units": (230, 126, 34),      # Orange
-                "Infra": (142, 68, 173),      # Purple
-                "Loot": (39, 174, 96),        # Green
-            }
-            # Build ordered colors list aligned to categories
-            colors = [palette.get(cat, (200, 200, 200)) for cat in categories]
-
-            img = Image.new("RGB", (width, height), (26, 26, 26))
-            draw = ImageDraw.Draw(img)
-            font_title = self._get_font(20)
-            font_small = self._get_font(14)
-            font_label = self._get_font(16)
-
-            # Titles
-            draw.text((pad, 10), "War Cost Breakdown", fill=(255, 255, 255), font=font_title)
-            draw.text((home_center[0] - 30, title_h), "Home", fill=(220, 220, 220), font=font_label)
-            draw.text((away_center[0] - 28, title_h), "Away", fill=(220, 220, 220), font=font_label)
-
-            # Money formatting used by labels and legend
-            def _fmt_money(x: float) -> str:
-                try:
-                    return f"${int(float(x or 0)):,}"
-                except Exception:
-                    return "$0"
-
-            def _draw_pie(center: Tuple[int, int], vals: List[float]):
-                total = sum([abs(float(v or 0)) for v in vals])
-                bbox = [center[0] - radius, center[1] - radius, center[0] + radius, center[1] + radius]
-                start_angle = 0.0
-                if total <= 0:
-                    # Draw a faint circle to indicate empty
-                    draw.ellipse(bbox, outline=(90, 90, 90), width=2)
-                    return
-                for idx, v in enumerate(vals):
-                    val = abs(float(v or 0))
-                    frac = (val / total) if total > 0 else 0
-                    end_angle = start_angle + 360.0 * frac
-                    draw.pieslice(bbox, start=start_angle, end=end_angle, fill=colors[idx])
-                    start_angle = end_angle
-
-            # Draw both pies
-            _draw_pie(home_center, home_vals)
-            _draw_pie(away_center, away_vals)
-
-            # Slice labels drawn INSIDE each slice: value only (short form)
-            def _draw_slice_labels(center: Tuple[int, int], vals: List[float]):
-                total = sum([abs(float(v or 0)) for v in vals])
-                if total <= 0:
-                    return
-                import math
-                start_angle = 0.0
-                for idx, v in enumerate(vals):
-                    val = abs(float(v or 0))
-                    frac = (val / total) if total > 0 else 0
-                    # Skip extremely small slices to avoid clutter
-                    if frac <= 0.03:
-                        continue
-                    mid_angle = start_angle + (360.0 * frac) / 2.0
-                    # Convert angle to radians
-                    ang = math.radians(mid_angle)
-                    # Label anchor inside the slice
-                    label_r = int(radius * 0.60)
-                    x1 = center[0] + int(label_r * math.cos(ang))
-                    y1 = center[1] + int(label_r * math.sin(ang))
-                    # Prepare single-line label: short value only
-                    val_txt = self._fmt_money_short(val)
-                    try:
-                        bbox1 = draw.textbbox((0, 0), val_txt, font=font_small)
-                        tw1 = bbox1[2] - bbox1[0]
-                        th1 = bbox1[3] - bbox1[1]
-                    except Exception:
-                        tw1, th1 = 40, 12
-                    tx1 = x1 - tw1 // 2
-                    ty1 = y1 - th1 // 2
-                    draw.text((tx1, ty1), val_txt, fill=(250, 250, 250), font=font_small)
-                    start_angle += 360.0 * frac
-
-            # Draw value labels next to each slice
-            _draw_slice_labels(home_center, home_vals)
-            _draw_slice_labels(away_center, away_vals)
-
-            # No legend; draw outside labels for each slice with percentage under the category
-            legend_y = height - legend_h + 12
-            # Compute title bounding boxes to avoid overlapping
-            try:
-                home_title_bbox = draw.textbbox((home_center[0] - 30, title_h), "Home", font=font_label)
-                away_title_bbox = draw.textbbox((away_center[0] - 28, title_h), "Away", font=font_label)
-            except Exception:
-                home_title_bbox = (home_center[0] - 50, title_h - 10, home_center[0] + 50, title_h + 10)
-                away_title_bbox = (away_center[0] - 50, title_h - 10, away_center[0] + 50, title_h + 10)
-
-            def _rects_intersect(a, b):
-                return not (a[2] < b[0] or a[0] > b[2] or a[3] < b[1] or a[1] > b[3])
-
-            def _draw_outside_labels(center: Tuple[int, int], vals: List[float], title_bbox: Tuple[int, int, int, int]):
-                total = sum([abs(float(v or 0)) for v in vals])
-                if total <= 0:
-                    return
-                import math
-                placed: List[Tuple[int, int, int, int]] = []
-                start_angle = 0.0
-                for idx, v in enumerate(vals):
-                    val = abs(float(v or 0))
-                    frac = (val / total) if total > 0 else 0
-                    if frac <= 0.03:
-                        start_angle += 360.0 * frac
-                        continue
-                    mid_angle = start_angle + (360.0 * frac) / 2.0
-                    ang = math.radians(mid_angle)
-                    # Initial label anchor outside the pie
-                    label_r = radius + 24
-                    x1 = center[0] + int(label_r * math.cos(ang))
-                    y1 = center[1] + int(label_r * math.sin(ang))
-                    # Two-line label: category name and percentage
-                    name_txt = categories[idx]
-                    pct_txt = f"{int(round(100.0 * frac))}%"
-                    try:
-                        bbox1 = draw.textbbox((0, 0), name_txt, font=font_small)
-                        tw1 = bbox1[2] - bbox1[0]
-                        th1 = bbox1[3] - bbox1[1]
-                    except Exception:
-                        tw1, th1 = 40, 12
-                    try:
-                        bbox2 = draw.textbbox((0, 0), pct_txt, font=font_small)
-                        tw2 = bbox2[2] - bbox2[0]
-                        th2 = bbox2[3] - bbox2[1]
-                    except Exception:
-                        tw2, th2 = 24, 12
-                    block_w = max(tw1, tw2)
-                    block_h = th1 + th2 + 2
-                    # Position left or right of anchor based on angle sign
-                    side_right = (math.cos(ang) >= 0)
-                    if side_right:
-                        tx = x1 + 6
-                    else:
-                        tx = x1 - block_w - 6
-                    ty = y1 - block_h // 2
-                    # Avoid overlaps with prior labels and title bbox by nudging vertically
-                    max_iter = 30
-                    step = 12
-                    rect = (tx, ty, tx + block_w, ty + block_h)
-                    def _overlaps_any(r):
-                        if _rects_intersect(r, title_bbox):
-                            return True
-                        for pr in placed:
-                            if _rects_intersect(r, pr):
-                                return True
-                        return False
-                    i = 0
-                    direction = -1
-                    while _overlaps_any(rect) and i < max_iter:
-                        ty += direction * step
-                        rect = (tx, ty, tx + block_w, ty + block_h)
-                        direction *= -1
-                        i += 1
-                    # Clamp within image bounds
-                    ty = max(8, min(ty, height - block_h - legend_h - 8))
-                    rect = (tx, ty, tx + block_w, ty + block_h)
-                    # No connector line as requested; only draw text labels
-                    # Draw the text
-                    draw.text((tx, ty), name_txt, fill=(230, 230, 230), font=font_small)
-                    draw.text((tx, ty + th1 + 2), pct_txt, fill=(210, 210, 210), font=font_small)
-                    placed.append(rect)
-                    start_angle += 360.0 * frac
-
-            # Draw outside labels with percentages and connector lines
-            _draw_outside_labels(home_center, home_vals, home_title_bbox)
-            _draw_outside_labels(away_center, away_vals, away_title_bbox)
-
-            # Totals under pies (short form)
-            home_total = sum([abs(float(v or 0)) for v in home_vals])
-            away_total = sum([abs(float(v or 0)) for v in away_vals])
-            totals_y = height - legend_h + 8
-            # Display clear totals under each pie
-            draw.text((home_center[0] - 170, totals_y), f"Total war cost: {_fmt_money(home_total)}", fill=(255, 255, 255), font=font_label)
-            draw.text((away_center[0] - 170, totals_y), f"Total war cost: {_fmt_money(away_total)}", fill=(255, 255, 255), font=font_label)
-
-            bio = BytesIO()
-            img.save(bio, format="PNG")
-            bio.seek(0)
-            return (bio, "chart_war_cost_pies.png")
-        except Exception:
+        spec = ChartSpec(
+            kind="war_cost_pies",
+            title="War Cost Breakdown",
+            labels=list(categories),
+            series=[[float(v or 0) for v in home_vals], [float(v or 0) for v in away_vals]],
+            names=["Home", "Away"],
+            palette=[WAR_COST_PALETTE.get(cat, (200, 200, 200)) for cat in categories],
+            filename="chart_war_cost_pies.png",
+        )
+        data = await service.render(spec)
+        if not data:
             return None
+        return (BytesIO(data), spec.filename)
 
-    async def _build_wars_embed(self, attackers_name: str, defenders_name: str, wars_between: List[Dict[str, Any]], home_ids: List[int], away_ids: List[int], guild: Optional[discord.Guild]) -> Tuple[discord.Embed, List[discord.File]]:
-        agg = self._aggregate_war_costs_by_party(wars_between, set(int(x) for x in (home_ids or [])), set(int(x) for x in (away_ids or [])))
+    async def _build_wars_embed(self, attackers_name: str, defenders_name: str, wars_between: Union[List[Dict[str, Any]], WarCostAggregator], home_ids: List[int], away_ids: List[int], guild: Optional[discord.Guild]) -> Tuple[discord.Embed, List[discord.File]]:
+        # Accept an aggregator already fed by the streaming fetch, or a plain wars list
+        if isinstance(wars_between, WarCostAggregator):
+            aggregator = wars_between
+        else:
+            aggregator = WarCostAggregator(home_ids or [], away_ids or [])
+            aggregator.add_page(wars_between or [])
+        agg = aggregator.totals()
         emoji_map = self._build_emoji_map_for_guild(guild)
         files: List[discord.File] = []
 
-        # Fetch average prices
-        prices = await self._get_price_map()
+        # Average prices, weighted by when the attacks happened
+        prices = await self._get_price_map(aggregator.attack_hours())
         p_gas = float(prices.get('GASOLINE', 0) or 0)
         p_mun = float(prices.get('MUNITIONS', 0) or 0)
         p_alum = float(prices.get('ALUMINUM', 0) or 0)
@@ -933,8 +653,6 @@ class WarsCostCog(commands.Cog):
             embed.title = name
 
         # Parties: show Home vs Away labels and alliance counts inferred from wars
-        home_alliance_ids: Set[int] = set(int(x) for x in (home_ids or []))
-        away_alliance_ids: Set[int] = set(int(x) for x in (away_ids or []))
         parties_value = (
             f"Home: {attackers_name or 'Home'}\n"
             f"Away: {defenders_name or 'Away'}"
@@ -944,60 +662,11 @@ class WarsCostCog(commands.Cog):
         # Removed War Types section to streamline embed and reduce clutter
 
         # War Status: Home victory/defeat (ended wars), plus Peace/Active/Expired
-        home_victory = 0
-        home_defeat = 0
-        peace_count = 0
-        active_count = 0
-        expired_count = 0
-
-        for w in wars_between or []:
-            # Determine active vs ended and peace/expired
-            end_raw = w.get('end_date') or None
-            att_peace = bool(w.get('att_peace') or w.get('attpeace') or False)
-            def_peace = bool(w.get('def_peace') or w.get('defpeace') or False)
-            if not end_raw:
-                active_count += 1
-            else:
-                if att_peace or def_peace:
-                    peace_count += 1
-                else:
-                    expired_count += 1
-
-            # Winner side only counted for ended wars with a known winner
-            try:
-                winner_id = int(w.get('winner_id') or 0)
-            except Exception:
-                winner_id = 0
-            if winner_id:
-                # Attacker/Defender nation and alliance IDs
-                try:
-                    war_att_nation_id = int(w.get('att_id') or w.get('attid') or (w.get('attacker') or {}).get('id') or 0)
-                except Exception:
-                    war_att_nation_id = 0
-                try:
-                    war_def_nation_id = int(w.get('def_id') or w.get('defid') or (w.get('defender') or {}).get('id') or 0)
-                except Exception:
-                    war_def_nation_id = 0
-                try:
-                    war_att_alliance_id = int(w.get('att_alliance_id') or (w.get('attacker') or {}).get('alliance_id') or 0)
-                except Exception:
-                    war_att_alliance_id = 0
-                try:
-                    war_def_alliance_id = int(w.get('def_alliance_id') or (w.get('defender') or {}).get('alliance_id') or 0)
-                except Exception:
-                    war_def_alliance_id = 0
-
-                winner_alliance_id = 0
-                if winner_id and war_att_nation_id and winner_id == war_att_nation_id:
-                    winner_alliance_id = war_att_alliance_id
-                elif winner_id and war_def_nation_id and winner_id == war_def_nation_id:
-                    winner_alliance_id = war_def_alliance_id
-
-                if winner_alliance_id:
-                    if winner_alliance_id in home_alliance_ids:
-                        home_victory += 1
-                    elif winner_alliance_id in away_alliance_ids:
-                        home_defeat += 1
+        home_victory = aggregator.home_victory
+        home_defeat = aggregator.home_defeat
+        peace_count = aggregator.peace
+        active_count = aggregator.active
+        expired_count = aggregator.expired
 
         # Group status by state so it sums to the total, and separate ended outcomes
         ended_count = peace_count + expired_count
@@ -1012,13 +681,7 @@ class WarsCostCog(commands.Cog):
         embed.add_field(name="War Status", value="\n".join(state_lines), inline=False)
 
         # War Types: count by war_type across all wars in scope, display with emojis
-        type_counts: Dict[str, int] = {}
-        for w in wars_between or []:
-            t_raw = w.get('war_type') or w.get('wartype')
-            t = str(t_raw).strip().upper() if t_raw is not None else ''
-            if not t:
-                t = 'UNKNOWN'
-            type_counts[t] = type_counts.get(t, 0) + 1
+        type_counts: Dict[str, int] = dict(aggregator.type_counts)
 
         # Display in preferred order with custom emojis
         ordered_types = ["RAID", "ATTRITION", "ORDINARY"]
@@ -1196,7 +859,7 @@ class WarsCostCog(commands.Cog):
         home_vals = [att_cons_val, att_units_total_val, float(agg.get('home_infra_destroyed_value', 0) or 0), def_loot_val]
         away_vals = [def_cons_val, def_units_total_val, float(agg.get('away_infra_destroyed_value', 0) or 0), att_loot_val]
         try:
-            pie = self._generate_war_cost_pies(home_vals, away_vals, categories)
+            pie = await self._generate_war_cost_pies(home_vals, away_vals, categories)
             if pie:
                 bio, fname = pie
                 f = discord.File(bio, filename=fname)
@@ -1340,120 +1003,29 @@ class WarsCostCog(commands.Cog):
                         return True
                 return False
 
-            wars_between = await q.get_wars_between_parties(
-                home_alliance_ids=attackers_ids,
-                away_alliance_ids=defenders_ids,
-                cutoff_dt=cutoff_dt,
-                limit=None,
-                force_refresh=True,
-            )
-            # Derive deterministic parties key to load unified cached payload
-            try:
-                norm_home_ids = sorted({int(x) for x in (attackers_ids or []) if int(x) > 0})
-                norm_away_ids = sorted({int(x) for x in (defenders_ids or []) if int(x) > 0})
-                home_party_id = "-".join([str(a) for a in norm_home_ids]) or "none"
-                away_party_id = "-".join([str(b) for b in norm_away_ids]) or "none"
-                parties_key = f"war_parties_{home_party_id}_vs_{away_party_id}"
-            except Exception:
-                parties_key = None
-
-            # Load saved parties payload and prefer its complete data
-            payload_wars: List[Dict[str, Any]] = wars_between
-            payload_home_ids: List[int] = attackers_ids
-            payload_away_ids: List[int] = defenders_ids
-            payload_created: Optional[str] = None
-            payload_total: Optional[int] = None
-            try:
-                if parties_key and getattr(self, 'user_data_manager', None):
-                    payload = await self.user_data_manager.get_json_data(parties_key, {})
-                    if isinstance(payload, dict):
-                        # Prefer wars list from saved file
-                        maybe_wars = payload.get('wars')
-                        if isinstance(maybe_wars, list) and maybe_wars:
-                            payload_wars = maybe_wars
-                        # Prefer canonical home/away ids from saved file
-                        try:
-                            h_items = payload.get('home_alliances') or []
-                            a_items = payload.get('away_alliances') or []
-                            h_ids = [int((it or {}).get('id') or 0) for it in h_items]
-                            a_ids = [int((it or {}).get('id') or 0) for it in a_items]
-                            payload_home_ids = [i for i in h_ids if i > 0] or payload_home_ids
-                            payload_away_ids = [j for j in a_ids if j > 0] or payload_away_ids
-                        except Exception:
-                            pass
-                        payload_created = payload.get('created_at') or None
-                        try:
-                            tv = payload.get('total_wars')
-                            payload_total = int(tv) if tv is not None else None
-                        except Exception:
-                            payload_total = None
-            except Exception as e:
-                # Non-fatal; continue with direct wars_between
-                self.logger.debug(f"war_cost.py: failed to load parties payload for {parties_key}: {e}")
-
-            # Persist side-specific Home/Away wars payloads with deterministic keys and auto-delete scheduling
-            try:
-                if getattr(self, 'user_data_manager', None):
-                    # Build keys that include the party identifiers for safe reuse and cleanup
-                    home_wars_key = f"war_party_home_{home_party_id}_wars" if 'home_party_id' in locals() else "war_party_home_wars"
-                    away_wars_key = f"war_party_away_{away_party_id}_wars" if 'away_party_id' in locals() else "war_party_away_wars"
-
-                    # Normalize cutoff to ISO string if provided
-                    cutoff_iso = None
-                    try:
-                        if cutoff_dt:
-                            cutoff_iso = cutoff_dt.isoformat()
-                    except Exception:
-                        cutoff_iso = None
-
-                    now_iso = None
-                    try:
-                        from datetime import datetime, timezone
-                        now_iso = datetime.now(timezone.utc).isoformat()
-                    except Exception:
-                        now_iso = None
-
-                    home_payload = {
-                        'role': 'party_wars',
-                        'side': 'home',
-                        'alliances': [{'id': int(i)} for i in (payload_home_ids or []) if isinstance(i, int) and i > 0],
-                        'wars': list(payload_wars or []),
-                        'total_wars': len(payload_wars or []),
-                        'created_at': now_iso,
-                        'cutoff': cutoff_iso,
-                    }
-                    away_payload = {
-                        'role': 'party_wars',
-                        'side': 'away',
-                        'alliances': [{'id': int(j)} for j in (payload_away_ids or []) if isinstance(j, int) and j > 0],
-                        'wars': list(payload_wars or []),
-                        'total_wars': len(payload_wars or []),
-                        'created_at': now_iso,
-                        'cutoff': cutoff_iso,
-                    }
-
-                    try:
-                        await self.user_data_manager.save_json_data(home_wars_key, home_payload)
-                    except Exception as e:
-                        self.logger.warning(f"war_cost.py: failed to save Home wars payload {home_wars_key}: {e}")
-                    try:
-                        await self.user_data_manager.save_json_data(away_wars_key, away_payload)
-                    except Exception as e:
-                        self.logger.warning(f"war_cost.py: failed to save Away wars payload {away_wars_key}: {e}")
-            except Exception as e:
-                # Do not block embed generation on persistence errors
-                try:
-                    self.logger.debug(f"war_cost.py: error persisting party wars payloads: {e}")
-                except Exception:
-                    pass
-
-            # Build and send embed (and optional image files) using cached payload
+            # Stream war pages into the aggregator: each page is folded in while the next one
+            # downloads, so only a page or two of wars is ever held, and partial totals are shown
+            aggregator = WarCostAggregator(attackers_ids, defenders_ids)
+            progress_message = None
+            last_progress = monotonic()
+            with freshness_command('wars'):
+                async for page in q.stream_wars_between_parties(
+                    home_alliance_ids=attackers_ids,
+                    away_alliance_ids=defenders_ids,
+                    cutoff_dt=cutoff_dt,
+                ):
+                    aggregator.add_page(page)
+                    if monotonic() - last_progress >= self.progress_interval:
+                        last_progress = monotonic()
+                        progress_message = await self._send_progress(interaction, progress_message, aggregator, time_label)
+
+            # Build and send embed (and optional image files) from the streamed totals
             embed, files = await self._build_wars_embed(
                 attackers_name,
                 defenders_name,
-                payload_wars,
-                payload_home_ids,
-                payload_away_ids,
+                aggregator,
+                attackers_ids,
+                defenders_ids,
                 interaction.guild,
             )
             if time_label:
@@ -1468,20 +1040,17 @@ class WarsCostCog(commands.Cog):
                     embed.description = f"{embed.description}."
                 except Exception:
                     pass
-            # Append payload metadata when available
+            # Append the war count to the footer
             try:
-                extra_bits: List[str] = []
-                if isinstance(payload_total, int):
-                    extra_bits.append(f"wars={payload_total}")
-                if payload_created:
-                    extra_bits.append(f"saved={payload_created}")
-                if extra_bits:
-                    foot = embed.footer.text or ""
-                    sep = " | " if foot else ""
-                    embed.set_footer(text=f"{foot}{sep}{' '.join(extra_bits)}")
+                foot = embed.footer.text or ""
+                sep = " | " if foot else ""
+                embed.set_footer(text=f"{foot}{sep}wars={aggregator.war_count}")
             except Exception:
                 pass
-            await interaction.followup.send(embed=embed, files=files)
+            if progress_message is not None:
+                await progress_message.edit(content=None, embed=embed, attachments=files)
+            else:
+                await interaction.followup.send(embed=embed, files=files)
         except Exception as e:
             try:
                 await interaction.followup.send(f"❌ Error fetching wars: {e}")
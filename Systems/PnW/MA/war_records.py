@@ -0,0 +1,402 @@
+"""Compact column storage for wars and attacks.
+
+API payloads hold every war and attack as a nested dict with string keys and
+string-encoded numbers; an attack costs a few kilobytes that way. ``WarTable``
+parses each payload once at ingest into typed ``array`` columns
+(struct-of-arrays): ids as int32, amounts as float64, unit losses as int32
+and dates as epoch seconds. Alliance ids and war/attack type strings are
+interned into small tables and stored as codes. An attack then takes about
+230 bytes.
+
+``dumps``/``loads`` write a table as a zlib-compressed binary blob (magic
+``PWT1``, JSON header, raw columns). Parties caches use it instead of JSON
+(see ``UserDataManager.save_binary_data``). ``WarRecord`` and
+``AttackRecord`` are ``__slots__`` views with a dict-style ``get`` for code
+that expects payload dicts, and ``to_dicts`` rebuilds the payload form.
+
+Only the fields the war tools read are kept; free-text fields such as
+``reason`` are dropped.
+"""
+
+import json
+import math
+import struct
+import sys
+import zlib
+from array import array
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+MAGIC = b'PWT1'
+
+# Scalar war columns: name -> typecode
+WAR_INT_FIELDS = ('id', 'att_id', 'def_id', 'winner_id', 'ground_control', 'air_superiority', 'naval_blockade')
+ATTACK_INT_FIELDS = ('id', 'att_id', 'def_id', 'victor', 'city_id')
+# Amounts that may be fractional (resources, money, infra)
+ATTACK_FLOAT_FIELDS = (
+    'infra_destroyed', 'infra_destroyed_value', 'money_stolen', 'resistance_lost',
+    'att_mun_used', 'def_mun_used', 'att_gas_used', 'def_gas_used',
+    'gasoline_looted', 'munitions_looted', 'aluminum_looted', 'steel_looted', 'food_looted',
+    'coal_looted', 'oil_looted', 'uranium_looted', 'iron_looted', 'bauxite_looted', 'lead_looted',
+)
+ATTACK_UNIT_FIELDS = (
+    'att_soldiers_lost', 'def_soldiers_lost', 'att_tanks_lost', 'def_tanks_lost',
+    'att_aircraft_lost', 'def_aircraft_lost', 'att_ships_lost', 'def_ships_lost',
+    'att_missiles_lost', 'def_missiles_lost', 'att_nukes_lost', 'def_nukes_lost',
+)
+# Legacy payload spellings read when the canonical field is absent
+_ALIASES = {
+    'att_id': ('attid',),
+    'def_id': ('defid',),
+    'city_id': ('cityid',),
+    'infra_destroyed': ('infradestroyed',),
+    'money_stolen': ('moneystolen', 'money_looted'),
+}
+
+_WAR_PEACE_ATT = 1
+_WAR_PEACE_DEF = 2
+
+
+def _int(value: Any) -> int:
+    try:
+        return int(float(value or 0))
+    except Exception:
+        return 0
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except Exception:
+        return 0.0
+
+
+def _pick(d: Dict[str, Any], name: str) -> Any:
+    value = d.get(name)
+    if value is None:
+        for alias in _ALIASES.get(name, ()):
+            value = d.get(alias)
+            if value is not None:
+                break
+    return value
+
+
+def _epoch(value: Any) -> float:
+    """Epoch seconds for an API timestamp (naive values are UTC); NaN if missing."""
+    if not value:
+        return math.nan
+    try:
+        dt = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        return dt.timestamp()
+    except Exception:
+        return math.nan
+
+
+def _iso(ts: float) -> Optional[str]:
+    if ts != ts:
+        return None
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
+class _Interner:
+    """Value <-> small integer code table."""
+
+    __slots__ = ('values', '_codes')
+
+    def __init__(self, values: Iterable[Any] = ()):
+        self.values: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+        for v in values:
+            self.code(v)
+
+    def code(self, value: Any) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            code = len(self.values)
+            self.values.append(value)
+            self._codes[value] = code
+        return code
+
+
+class WarTable:
+    """Struct-of-arrays store of wars and their attacks."""
+
+    def __init__(self):
+        self.alliances = _Interner([0])
+        self.types = _Interner([''])
+        self.war_int = {name: array('i') for name in WAR_INT_FIELDS}
+        self.att_alliance = array('H')
+        self.def_alliance = array('H')
+        self.war_type = array('B')
+        self.war_flags = array('B')
+        self.war_date = array('d')
+        self.war_end = array('d')
+        # Attacks of war i are rows attack_start[i]:attack_start[i + 1]
+        self.attack_start = array('I', [0])
+        self.atk_int = {name: array('i') for name in ATTACK_INT_FIELDS}
+        self.atk_float = {name: array('d') for name in ATTACK_FLOAT_FIELDS}
+        self.atk_units = {name: array('i') for name in ATTACK_UNIT_FIELDS}
+        self.atk_type = array('B')
+        self.atk_success = array('b')
+        self.atk_date = array('d')
+
+    # ------------------------------------------------------------------
+    # Ingest
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_wars(cls, wars: Iterable[Dict[str, Any]]) -> 'WarTable':
+        table = cls()
+        table.extend(wars)
+        return table
+
+    def extend(self, wars: Iterable[Dict[str, Any]]) -> None:
+        for w in wars or []:
+            if isinstance(w, dict):
+                self.add_war(w)
+
+    def _alliance_code(self, value: Any) -> int:
+        code = self.alliances.code(_int(value))
+        if code > 0xFFFF and self.att_alliance.typecode == 'H':
+            self.att_alliance = array('I', self.att_alliance)
+            self.def_alliance = array('I', self.def_alliance)
+        return code
+
+    def _type_code(self, value: Any) -> int:
+        code = self.types.code(str(value).strip().upper() if value is not None else '')
+        if code > 0xFF and self.war_type.typecode == 'B':
+            self.war_type = array('H', self.war_type)
+            self.atk_type = array('H', self.atk_type)
+        return code
+
+    def add_war(self, w: Dict[str, Any]) -> None:
+        attacker = w.get('attacker') or {}
+        defender = w.get('defender') or {}
+        for name in WAR_INT_FIELDS:
+            value = _pick(w, name)
+            if value is None and name in ('att_id', 'def_id'):
+                value = (attacker if name == 'att_id' else defender).get('id')
+            self.war_int[name].append(_int(value))
+        self.att_alliance.append(self._alliance_code(w.get('att_alliance_id') or attacker.get('alliance_id')))
+        self.def_alliance.append(self._alliance_code(w.get('def_alliance_id') or defender.get('alliance_id')))
+        self.war_type.append(self._type_code(w.get('war_type') or w.get('wartype')))
+        flags = 0
+        if w.get('att_peace') or w.get('attpeace'):
+            flags |= _WAR_PEACE_ATT
+        if w.get('def_peace') or w.get('defpeace'):
+            flags |= _WAR_PEACE_DEF
+        self.war_flags.append(flags)
+        self.war_date.append(_epoch(w.get('date')))
+        self.war_end.append(_epoch(w.get('end_date')))
+        attacks = w.get('attacks') or []
+        for a in attacks if isinstance(attacks, list) else []:
+            if isinstance(a, dict):
+                self._add_attack(a)
+        self.attack_start.append(len(self.atk_date))
+
+    def _add_attack(self, a: Dict[str, Any]) -> None:
+        for name in ATTACK_INT_FIELDS:
+            self.atk_int[name].append(_int(_pick(a, name)))
+        for name in ATTACK_FLOAT_FIELDS:
+            self.atk_float[name].append(_float(_pick(a, name)))
+        for name in ATTACK_UNIT_FIELDS:
+            self.atk_units[name].append(_int(a.get(name)))
+        self.atk_type.append(self._type_code(a.get('type')))
+        success = a.get('success')
+        self.atk_success.append(-1 if success is None else _int(success))
+        self.atk_date.append(_epoch(a.get('date')))
+
+    # ------------------------------------------------------------------
+    # Access
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return len(self.war_date)
+
+    @property
+    def attack_count(self) -> int:
+        return len(self.atk_date)
+
+    def alliance_id(self, code: int) -> int:
+        return self.alliances.values[code]
+
+    def war(self, i: int) -> 'WarRecord':
+        return WarRecord(self, i)
+
+    def __iter__(self) -> Iterator['WarRecord']:
+        for i in range(len(self)):
+            yield WarRecord(self, i)
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Rebuild payload-style dicts (for code that still needs them)."""
+        return [rec.to_dict() for rec in self]
+
+    def nbytes(self) -> int:
+        """Approximate in-memory size of the columns."""
+        return sum(col.itemsize * len(col) for col in self._columns().values())
+
+    # ------------------------------------------------------------------
+    # Binary serialization
+    # ------------------------------------------------------------------
+
+    def _columns(self) -> Dict[str, array]:
+        cols: Dict[str, array] = {f"war.{k}": v for k, v in self.war_int.items()}
+        cols.update({
+            'war.att_alliance': self.att_alliance,
+            'war.def_alliance': self.def_alliance,
+            'war.type': self.war_type,
+            'war.flags': self.war_flags,
+            'war.date': self.war_date,
+            'war.end_date': self.war_end,
+            'war.attack_start': self.attack_start,
+            'atk.type': self.atk_type,
+            'atk.success': self.atk_success,
+            'atk.date': self.atk_date,
+        })
+        cols.update({f"atk.{k}": v for k, v in self.atk_int.items()})
+        cols.update({f"atk.{k}": v for k, v in self.atk_float.items()})
+        cols.update({f"atk.{k}": v for k, v in self.atk_units.items()})
+        return cols
+
+    def _set_column(self, name: str, col: array) -> None:
+        group, field = name.split('.', 1)
+        simple = {
+            'war.att_alliance': 'att_alliance', 'war.def_alliance': 'def_alliance', 'war.type': 'war_type',
+            'war.flags': 'war_flags', 'war.date': 'war_date', 'war.end_date': 'war_end',
+            'war.attack_start': 'attack_start', 'atk.type': 'atk_type', 'atk.success': 'atk_success',
+            'atk.date': 'atk_date',
+        }
+        if name in simple:
+            setattr(self, simple[name], col)
+        elif group == 'war' and field in self.war_int:
+            self.war_int[field] = col
+        elif group == 'atk' and field in self.atk_int:
+            self.atk_int[field] = col
+        elif group == 'atk' and field in self.atk_float:
+            self.atk_float[field] = col
+        elif group == 'atk' and field in self.atk_units:
+            self.atk_units[field] = col
+
+    def dumps(self, meta: Optional[Dict[str, Any]] = None, level: int = 6) -> bytes:
+        columns = self._columns()
+        header = {
+            'byteorder': sys.byteorder,
+            'wars': len(self),
+            'attacks': self.attack_count,
+            'alliances': self.alliances.values,
+            'types': self.types.values,
+            'columns': [[name, col.typecode, len(col)] for name, col in columns.items()],
+            'meta': meta or {},
+        }
+        head = json.dumps(header, separators=(',', ':')).encode('utf-8')
+        body = zlib.compress(b''.join(col.tobytes() for col in columns.values()), level)
+        return MAGIC + struct.pack('<I', len(head)) + head + body
+
+    @classmethod
+    def loads(cls, data: bytes) -> Tuple['WarTable', Dict[str, Any]]:
+        """Parse a ``dumps`` blob; returns (table, meta)."""
+        if data[:4] != MAGIC:
+            raise ValueError("not a war table blob")
+        (head_len,) = struct.unpack('<I', data[4:8])
+        header = json.loads(data[8:8 + head_len].decode('utf-8'))
+        body = zlib.decompress(data[8 + head_len:])
+        table = cls()
+        table.alliances = _Interner(header.get('alliances') or [0])
+        table.types = _Interner(header.get('types') or [''])
+        swap = header.get('byteorder') != sys.byteorder
+        offset = 0
+        for name, typecode, length in header.get('columns') or []:
+            col = array(typecode)
+            size = col.itemsize * int(length)
+            col.frombytes(body[offset:offset + size])
+            offset += size
+            if swap:
+                col.byteswap()
+            table._set_column(name, col)
+        return table, header.get('meta') or {}
+
+
+class AttackRecord:
+    """Read-only view of one attack row."""
+
+    __slots__ = ('_t', '_i')
+
+    def __init__(self, table: WarTable, index: int):
+        self._t = table
+        self._i = index
+
+    def get(self, key: str, default: Any = None) -> Any:
+        t, i = self._t, self._i
+        if key in t.atk_float:
+            return t.atk_float[key][i]
+        if key in t.atk_units:
+            return t.atk_units[key][i]
+        if key in t.atk_int:
+            return t.atk_int[key][i]
+        if key == 'date':
+            return _iso(t.atk_date[i])
+        if key == 'type':
+            return t.types.values[t.atk_type[i]] or None
+        if key == 'success':
+            value = t.atk_success[i]
+            return None if value < 0 else value
+        for canonical, aliases in _ALIASES.items():
+            if key in aliases:
+                return self.get(canonical, default)
+        return default
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {name: self.get(name) for name in ATTACK_INT_FIELDS + ATTACK_FLOAT_FIELDS + ATTACK_UNIT_FIELDS}
+        out.update(date=self.get('date'), type=self.get('type'), success=self.get('success'))
+        return out
+
+
+class WarRecord:
+    """Read-only view of one war row and its attacks."""
+
+    __slots__ = ('_t', '_i')
+
+    def __init__(self, table: WarTable, index: int):
+        self._t = table
+        self._i = index
+
+    @property
+    def attack_range(self) -> range:
+        return range(self._t.attack_start[self._i], self._t.attack_start[self._i + 1])
+
+    def attacks(self) -> List[AttackRecord]:
+        return [AttackRecord(self._t, j) for j in self.attack_range]
+
+    def get(self, key: str, default: Any = None) -> Any:
+        t, i = self._t, self._i
+        if key in t.war_int:
+            return t.war_int[key][i]
+        if key == 'att_alliance_id':
+            return t.alliance_id(t.att_alliance[i])
+        if key == 'def_alliance_id':
+            return t.alliance_id(t.def_alliance[i])
+        if key == 'war_type':
+            return t.types.values[t.war_type[i]] or None
+        if key == 'att_peace':
+            return bool(t.war_flags[i] & _WAR_PEACE_ATT)
+        if key == 'def_peace':
+            return bool(t.war_flags[i] & _WAR_PEACE_DEF)
+        if key == 'date':
+            return _iso(t.war_date[i])
+        if key == 'end_date':
+            return _iso(t.war_end[i])
+        if key == 'attacks':
+            return self.attacks()
+        for canonical, aliases in _ALIASES.items():
+            if key in aliases:
+                return self.get(canonical, default)
+        return default
+
+    def to_dict(self) -> Dict[str, Any]:
+        out = {name: self.get(name) for name in WAR_INT_FIELDS}
+        for key in ('att_alliance_id', 'def_alliance_id', 'war_type', 'att_peace', 'def_peace', 'date', 'end_date'):
+            out[key] = self.get(key)
+        out['attacks'] = [a.to_dict() for a in self.attacks()]
+        return out
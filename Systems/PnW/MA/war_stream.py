@@ -0,0 +1,294 @@
+"""Incremental war cost aggregation for streamed war pages.
+
+``WarCostAggregator`` folds wars into Home/Away totals one page at a time,
+so ``/wars`` can aggregate while the next page downloads and never holds
+the whole window. It also keeps the war status, outcome and war-type
+counters the embed shows, and can report partial totals for progress
+updates. ``WarsCostCog._aggregate_war_costs_by_party`` uses the same
+aggregator for in-memory war lists, so both paths produce identical totals.
+Pages may also be ``WarTable``s, which are folded column by column.
+Attacks are also counted per UTC hour, so costs can be valued at the trade
+prices of the hours the fighting happened in.
+"""
+
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, Optional, Set, Union
+
+try:
+    from .war_records import WarTable
+except ImportError:
+    from Systems.PnW.MA.war_records import WarTable
+
+# Per-party totals, reported as '<home|away>_<field>'
+WAR_COST_FIELDS = (
+    'gas_used', 'mun_used', 'alum_used', 'steel_used',
+    'infra_destroyed', 'infra_destroyed_value', 'money_looted',
+    'soldiers_lost', 'tanks_lost', 'aircraft_lost', 'ships_lost',
+    'missiles_lost', 'nukes_lost',
+    'gas_looted', 'mun_looted', 'alum_looted', 'steel_looted', 'food_looted',
+    'coal_looted', 'oil_looted', 'uran_looted', 'iron_looted', 'baux_looted', 'lead_looted'
+)
+
+# Attack field -> total credited to the attacking party
+_ATTACKER_FIELDS = (
+    ('att_gas_used', 'gas_used'),
+    ('att_mun_used', 'mun_used'),
+    ('gasoline_looted', 'gas_looted'),
+    ('munitions_looted', 'mun_looted'),
+    ('aluminum_looted', 'alum_looted'),
+    ('steel_looted', 'steel_looted'),
+    ('food_looted', 'food_looted'),
+    ('coal_looted', 'coal_looted'),
+    ('oil_looted', 'oil_looted'),
+    ('uranium_looted', 'uran_looted'),
+    ('iron_looted', 'iron_looted'),
+    ('bauxite_looted', 'baux_looted'),
+    ('lead_looted', 'lead_looted'),
+    ('att_soldiers_lost', 'soldiers_lost'),
+    ('att_tanks_lost', 'tanks_lost'),
+    ('att_aircraft_lost', 'aircraft_lost'),
+    ('att_ships_lost', 'ships_lost'),
+    ('att_missiles_lost', 'missiles_lost'),
+    ('att_nukes_lost', 'nukes_lost'),
+)
+
+# Attack field -> total credited to the defending party
+_DEFENDER_FIELDS = (
+    ('def_gas_used', 'gas_used'),
+    ('def_mun_used', 'mun_used'),
+    ('infra_destroyed_value', 'infra_destroyed_value'),
+    ('def_soldiers_lost', 'soldiers_lost'),
+    ('def_tanks_lost', 'tanks_lost'),
+    ('def_aircraft_lost', 'aircraft_lost'),
+    ('def_ships_lost', 'ships_lost'),
+    ('def_missiles_lost', 'missiles_lost'),
+    ('def_nukes_lost', 'nukes_lost'),
+)
+
+
+def _int(value: Any) -> int:
+    try:
+        return int(value or 0)
+    except Exception:
+        return 0
+
+
+def _float(value: Any) -> float:
+    try:
+        return float(value or 0)
+    except Exception:
+        return 0.0
+
+
+class WarCostAggregator:
+    """Running Home/Away cost totals plus status and type counters over a stream of wars."""
+
+    def __init__(self, home_ids: Iterable[int], away_ids: Iterable[int]):
+        self.home_ids: Set[int] = {int(x) for x in (home_ids or [])}
+        self.away_ids: Set[int] = {int(x) for x in (away_ids or [])}
+        self.party_totals: Dict[str, Dict[str, float]] = {
+            'home': dict.fromkeys(WAR_COST_FIELDS, 0.0),
+            'away': dict.fromkeys(WAR_COST_FIELDS, 0.0),
+        }
+        self.war_count = 0
+        self.attack_count = 0
+        self.pages = 0
+        self.active = 0
+        self.peace = 0
+        self.expired = 0
+        self.home_victory = 0
+        self.home_defeat = 0
+        self.type_counts: Dict[str, int] = {}
+        # Attacks per UTC hour: epoch hour for tables, 'YYYY-MM-DDTHH' prefix for payload dicts
+        self._hours: Dict[int, int] = {}
+        self._hour_labels: Dict[str, int] = {}
+        self.started = time.monotonic()
+
+    def _party(self, alliance_id: int) -> Optional[str]:
+        if alliance_id in self.home_ids:
+            return 'home'
+        if alliance_id in self.away_ids:
+            return 'away'
+        return None
+
+    def add_page(self, wars: Union[Iterable[Dict[str, Any]], WarTable]) -> None:
+        self.pages += 1
+        if isinstance(wars, WarTable):
+            self.add_table(wars)
+            return
+        for w in wars or []:
+            self.add_war(w)
+
+    def add_table(self, table: WarTable) -> None:
+        """Fold a ``WarTable`` in, reading its columns directly."""
+        att_ids, def_ids = table.war_int['att_id'], table.war_int['def_id']
+        winners = table.war_int['winner_id']
+        att_codes, def_codes = table.att_alliance, table.def_alliance
+        starts = table.attack_start
+        atk_att_ids = table.atk_int['att_id']
+        parties = [self._party(a) for a in table.alliances.values]
+        columns = {**table.atk_float, **table.atk_units}
+        attacker_cols = [(columns[src], dst) for src, dst in _ATTACKER_FIELDS]
+        defender_cols = [(columns[src], dst) for src, dst in _DEFENDER_FIELDS]
+        money = table.atk_float['money_stolen']
+        infra = table.atk_float['infra_destroyed']
+        dates = table.atk_date
+        hours = self._hours
+        for i in range(len(table)):
+            self.war_count += 1
+            war_att_id, war_def_id = att_ids[i], def_ids[i]
+            att_party, def_party = parties[att_codes[i]], parties[def_codes[i]]
+            for j in range(starts[i], starts[i + 1]):
+                self.attack_count += 1
+                d = dates[j]
+                if d == d:
+                    hour = int(d // 3600)
+                    hours[hour] = hours.get(hour, 0) + 1
+                atk_id = atk_att_ids[j]
+                if atk_id and war_def_id and atk_id == war_def_id and not (war_att_id and atk_id == war_att_id):
+                    atk_party, dfn_party = def_party, att_party
+                else:
+                    atk_party, dfn_party = att_party, def_party
+                if atk_party:
+                    totals = self.party_totals[atk_party]
+                    for col, dst in attacker_cols:
+                        totals[dst] += col[j]
+                    totals['money_looted'] += money[j]
+                if dfn_party:
+                    totals = self.party_totals[dfn_party]
+                    for col, dst in defender_cols:
+                        totals[dst] += col[j]
+                    totals['infra_destroyed'] += infra[j]
+
+            if table.war_end[i] != table.war_end[i]:
+                self.active += 1
+            elif table.war_flags[i]:
+                self.peace += 1
+            else:
+                self.expired += 1
+
+            winner_id = winners[i]
+            if winner_id:
+                winner_code = 0
+                if war_att_id and winner_id == war_att_id:
+                    winner_code = att_codes[i]
+                elif war_def_id and winner_id == war_def_id:
+                    winner_code = def_codes[i]
+                winner_party = parties[winner_code] if winner_code else None
+                if winner_party == 'home':
+                    self.home_victory += 1
+                elif winner_party == 'away':
+                    self.home_defeat += 1
+
+            t = table.types.values[table.war_type[i]] or 'UNKNOWN'
+            self.type_counts[t] = self.type_counts.get(t, 0) + 1
+
+    def add_war(self, w: Dict[str, Any]) -> None:
+        self.war_count += 1
+        attacker = w.get('attacker') or {}
+        defender = w.get('defender') or {}
+        war_att_id = _int(w.get('att_id') or w.get('attid'))
+        war_def_id = _int(w.get('def_id') or w.get('defid'))
+        war_att_alliance = _int(w.get('att_alliance_id') or attacker.get('alliance_id'))
+        war_def_alliance = _int(w.get('def_alliance_id') or defender.get('alliance_id'))
+
+        attacks = w.get('attacks') or []
+        if isinstance(attacks, list):
+            for a in attacks:
+                self._add_attack(a, war_att_id, war_def_id, war_att_alliance, war_def_alliance)
+
+        # War status: active, or ended through peace / expiry
+        if not w.get('end_date'):
+            self.active += 1
+        elif w.get('att_peace') or w.get('attpeace') or w.get('def_peace') or w.get('defpeace'):
+            self.peace += 1
+        else:
+            self.expired += 1
+
+        winner_id = _int(w.get('winner_id'))
+        if winner_id:
+            att_nation = _int(w.get('att_id') or w.get('attid') or attacker.get('id'))
+            def_nation = _int(w.get('def_id') or w.get('defid') or defender.get('id'))
+            winner_alliance = 0
+            if att_nation and winner_id == att_nation:
+                winner_alliance = war_att_alliance
+            elif def_nation and winner_id == def_nation:
+                winner_alliance = war_def_alliance
+            if winner_alliance:
+                if winner_alliance in self.home_ids:
+                    self.home_victory += 1
+                elif winner_alliance in self.away_ids:
+                    self.home_defeat += 1
+
+        t_raw = w.get('war_type') or w.get('wartype')
+        t = str(t_raw).strip().upper() if t_raw is not None else ''
+        t = t or 'UNKNOWN'
+        self.type_counts[t] = self.type_counts.get(t, 0) + 1
+
+    def _add_attack(self, a: Dict[str, Any], war_att_id: int, war_def_id: int, war_att_alliance: int, war_def_alliance: int) -> None:
+        self.attack_count += 1
+        date = a.get('date')
+        if isinstance(date, str) and len(date) >= 13:
+            label = date[:13]
+            self._hour_labels[label] = self._hour_labels.get(label, 0) + 1
+        atk_id = _int(a.get('att_id') or a.get('attid'))
+        # The attack's attacker may be either side of the war
+        if atk_id and war_def_id and atk_id == war_def_id and not (war_att_id and atk_id == war_att_id):
+            atk_alliance, def_alliance = war_def_alliance, war_att_alliance
+        else:
+            atk_alliance, def_alliance = war_att_alliance, war_def_alliance
+        atk_party = self._party(atk_alliance)
+        def_party = self._party(def_alliance)
+        if atk_party:
+            totals = self.party_totals[atk_party]
+            for src, dst in _ATTACKER_FIELDS:
+                totals[dst] += _float(a.get(src))
+            money = a.get('money_stolen') if a.get('money_stolen') is not None else a.get('moneystolen')
+            totals['money_looted'] += _float(money or a.get('money_looted'))
+        if def_party:
+            totals = self.party_totals[def_party]
+            for src, dst in _DEFENDER_FIELDS:
+                totals[dst] += _float(a.get(src))
+            infra = a.get('infra_destroyed') if a.get('infra_destroyed') is not None else a.get('infradestroyed')
+            totals['infra_destroyed'] += _float(infra)
+
+    def totals(self) -> Dict[str, float]:
+        """Flat '<party>_<field>' totals plus 'war_count' (the historical aggregate shape)."""
+        out: Dict[str, float] = {}
+        for party in ('home', 'away'):
+            for f, v in self.party_totals[party].items():
+                out[f"{party}_{f}"] = v
+        out['war_count'] = float(self.war_count)
+        return out
+
+    def attack_hours(self) -> Dict[float, int]:
+        """Attack counts keyed by the epoch of the middle of each UTC hour."""
+        out: Dict[float, int] = {}
+        for hour, count in self._hours.items():
+            key = hour * 3600.0 + 1800.0
+            out[key] = out.get(key, 0) + count
+        for label, count in self._hour_labels.items():
+            try:
+                start = datetime.strptime(label, '%Y-%m-%dT%H').replace(tzinfo=timezone.utc).timestamp()
+            except ValueError:
+                continue
+            key = start + 1800.0
+            out[key] = out.get(key, 0) + count
+        return out
+
+    def progress(self) -> Dict[str, Any]:
+        """Partial counters for live progress updates."""
+        home, away = self.party_totals['home'], self.party_totals['away']
+        return {
+            'pages': self.pages,
+            'wars': self.war_count,
+            'attacks': self.attack_count,
+            'elapsed': time.monotonic() - self.started,
+            'home_gas_used': home['gas_used'],
+            'away_gas_used': away['gas_used'],
+            'home_mun_used': home['mun_used'],
+            'away_mun_used': away['mun_used'],
+            'home_infra_destroyed_value': home['infra_destroyed_value'],
+            'away_infra_destroyed_value': away['infra_destroyed_value'],
+        }
@@ -61,6 +61,12 @@ from config import (
 # Import the recruitment tracker
 from .recruitment_tracker import RecruitmentTracker
 
+# Shared PnW API scheduler: the nation crawl runs as background traffic
+try:
+    from .MA.scheduler import BACKGROUND, get_scheduler
+except ImportError:
+    from Systems.PnW.MA.scheduler import BACKGROUND, get_scheduler
+
 class RecruitCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -123,6 +129,17 @@ class RecruitCog(commands.Cog):
                 self._messages_loaded = True
         return self.recruit_messages
 
+    @staticmethod
+    def _scheduled_get(query):
+        """Run a pnwkit query in a background API slot and count it against the shared quota."""
+        scheduler = get_scheduler()
+        with scheduler.slot(BACKGROUND):
+            try:
+                return query.get()
+            finally:
+                # A failed request still used up quota
+                scheduler.record_response()
+
     async def get_all_filtered_nations(self):
         """
         Fetches ALL nations from PnW API and filters out:
@@ -168,7 +185,7 @@ class RecruitCog(commands.Cog):
                         num_cities
                     """)
                     
-                    result = query.get()
+                    result = await asyncio.get_running_loop().run_in_executor(None, self._scheduled_get, query)
                     
                     if not result or not hasattr(result, 'nations'):
                         print(f"🔍 DEBUG: Page {page_num} - No result or no nations attribute")
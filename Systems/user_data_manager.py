@@ -175,6 +175,7 @@ class UserDataManager:
         self._save_compress_threshold_bytes: int = 100 * 1024  # write .json.gz when payload is large
         self._save_verify_threshold_bytes: int = 5 * 1024 * 1024  # verify by reading back when very large
         self._compact_json: bool = True  # write compact JSON to reduce size and time
+        self._binary_snapshots: bool = os.getenv("PNW_BINARY_SNAPSHOTS", "1") != "0"  # write .pnb next to Bloc snapshots
         
         # Preload critical game data files
         self._critical_files = {'pet_equipment', 'monsters', 'bosses', 'titans', 'pets_level', 'energon_game', 'cybercoin_market_data', 'roasts', 'trivia_transformers_culture', 'trivia_transformers_characters', 'trivia_transformers_factions', 'trivia_transformers_movies', 'trivia_transformers_shows'}
@@ -306,7 +307,8 @@ class UserDataManager:
         
         # Auto-clear tracking for alliance files
         self._alliance_auto_clear_tasks = {}  # Track scheduled clear tasks
-        self._alliance_clear_delay = 3600  # 1 hour in seconds
+        # Matches the query layer's hard staleness ceiling; readers revalidate after the 1 hour TTL
+        self._alliance_clear_delay = 6 * 3600  # 6 hours in seconds
 
         # Auto-delete tracking for temporary war-party files (home/away)
         self._war_party_auto_delete_tasks: Dict[str, asyncio.Task] = {}
@@ -475,13 +477,14 @@ class UserDataManager:
             else:
                 file_path = self._file_paths[war_key]
 
-            # Remove file if it exists
-            try:
-                if file_path.exists():
-                    file_path.unlink(missing_ok=True)
-                    logging.info(f"Deleted war-party data file for {war_key}: {file_path}")
-            except Exception as e:
-                logging.error(f"Failed to delete war-party file for {war_key}: {e}")
+            # Remove the JSON file and any packed war table or binary snapshot if they exist
+            for path in (file_path, file_path.with_suffix('.pwt'), file_path.with_suffix('.pnb')):
+                try:
+                    if path.exists():
+                        path.unlink(missing_ok=True)
+                        logging.info(f"Deleted war-party data file for {war_key}: {path}")
+                except Exception as e:
+                    logging.error(f"Failed to delete war-party file for {war_key}: {e}")
 
             # Evict cache entries
             cache_key = self._get_cache_key(file_path)
@@ -546,6 +549,7 @@ class UserDataManager:
         
         self._metrics['cache_misses'] += 1
         self._loading_in_progress.add(cache_key)
+        create_missing = False
         
         try:
             async with self._acquire_file_lock(file_path):
@@ -555,31 +559,40 @@ class UserDataManager:
                     return self._cache[cache_key]
                 
                 if file_path.exists():
-                    # Use optimized loading with compression support for large files
-                    file_size = file_path.stat().st_size
-                    if file_size > 50000:  # 50KB threshold for compression
-                        data = await self._load_json_with_compression(file_path)
-                    else:
-                        try:
-                            import rapidjson
-                            # Use utf-8-sig to gracefully handle files starting with BOM
-                            with open(file_path, 'r', encoding='utf-8-sig') as f:
-                                data = rapidjson.load(f)
-                        except (ImportError, Exception):
-                            # Fallback to standard json with utf-8-sig for BOM compatibility
-                            with open(file_path, 'r', encoding='utf-8-sig') as f:
-                                data = json.load(f)
+                    data = None
+                    if self._binary_snapshots and file_path.parent.name == "Bloc":
+                        # Alliance and war-party snapshots decode faster from a current .pnb sidecar
+                        data = await self._load_snapshot_sidecar(file_path)
+                    if data is None:
+                        # Use optimized loading with compression support for large files
+                        file_size = file_path.stat().st_size
+                        if file_size > 50000:  # 50KB threshold for compression
+                            data = await self._load_json_with_compression(file_path)
+                        else:
+                            try:
+                                import rapidjson
+                                # Use utf-8-sig to gracefully handle files starting with BOM
+                                with open(file_path, 'r', encoding='utf-8-sig') as f:
+                                    data = rapidjson.load(f)
+                            except (ImportError, Exception):
+                                # Fallback to standard json with utf-8-sig for BOM compatibility
+                                with open(file_path, 'r', encoding='utf-8-sig') as f:
+                                    data = json.load(f)
                 else:
                     data = default_data or {}
-                    await self._save_json_optimized(file_path, data)
+                    create_missing = True
                 
                 self._cache[cache_key] = data
                 ttl = self._lazy_cache_ttl if lazy else self._cache_ttl
                 self._cache_timestamps[cache_key] = datetime.now()
                 self._loaded_files.add(cache_key)
                 self._evict_lru_cache()
-                
-                return data
+            
+            # Create the missing file only after releasing the lock: _save_json_optimized takes
+            # the same per-file asyncio.Lock, which is not reentrant
+            if create_missing:
+                await self._save_json_optimized(file_path, data)
+            return data
                 
         except Exception as e:
             self._metrics['errors'] += 1
@@ -590,6 +603,15 @@ class UserDataManager:
     
     @retry_on_failure(max_retries=3, delay=1.0, backoff_factor=2.0)
     async def _save_json_optimized(self, file_path: Path, data: Any) -> bool:
+        saved = await self._save_json_locked(file_path, data)
+        # Alliance and war-party snapshots also get a binary sidecar. It is written after the
+        # file lock is released; it records the JSON file it was built from, so readers skip
+        # it if a later save replaced the JSON in the meantime
+        if saved and self._binary_snapshots and file_path.parent.name == "Bloc":
+            await self._write_snapshot_sidecar(file_path, data)
+        return saved
+
+    async def _save_json_locked(self, file_path: Path, data: Any) -> bool:
         async with self._acquire_file_lock(file_path):
             try:
                 # Validate data integrity before saving
@@ -938,6 +960,128 @@ class UserDataManager:
             logging.error(f"load_json_data error for key '{key}': {e}")
             return {}
 
+    async def _write_snapshot_sidecar(self, file_path: Path, data: Any) -> None:
+        """Write the .pnb sidecar of an alliance or war-party snapshot (see PnW/MA/snapshot_file.py)."""
+        try:
+            from Systems.PnW.MA.snapshot_file import is_snapshot_file, open_snapshot, sidecar_path, source_stamp, write_snapshot
+        except ImportError:
+            return
+        if not is_snapshot_file(file_path):
+            return
+
+        def _write() -> None:
+            # Unchanged saves skip the JSON write, and their sidecar is still current
+            current = open_snapshot(file_path)
+            if current is not None:
+                current.close()
+                return
+            write_snapshot(sidecar_path(file_path), data, source=source_stamp(file_path))
+
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._thread_pool, _write)
+        except Exception as e:
+            # Readers fall back to the JSON file when the sidecar is missing or stale
+            logging.warning(f"Binary snapshot save failed for {file_path}: {e}")
+
+    async def _load_snapshot_sidecar(self, file_path: Path) -> Optional[Any]:
+        """Contents of a Bloc snapshot decoded from its current .pnb sidecar, or None to read the JSON."""
+        try:
+            from Systems.PnW.MA.snapshot_file import is_snapshot_file, open_snapshot
+        except ImportError:
+            return None
+        if not is_snapshot_file(file_path):
+            return None
+
+        def _read() -> Optional[Any]:
+            snapshot = open_snapshot(file_path)
+            if snapshot is None:
+                return None
+            with snapshot:
+                return snapshot.load()
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._thread_pool, _read)
+        except Exception as e:
+            logging.warning(f"Binary snapshot read failed for {file_path}, reading JSON: {e}")
+            return None
+
+    def open_snapshot(self, key: str) -> Optional[Any]:
+        """Open the binary sidecar of an alliance or war-party snapshot key, if one is current.
+
+        Returns a ``SnapshotFile`` (close it, or use it in a ``with`` block) whose header
+        fields, record count and index columns are read without decoding any record.
+        """
+        try:
+            from Systems.PnW.MA.snapshot_file import open_snapshot
+        except ImportError:
+            return None
+        if not isinstance(key, str) or not key.startswith(('alliance_', 'war_party_', 'war_parties_')):
+            return None
+        file_path = self._file_paths.get(key) or self.json_path / "Bloc" / f"{key}.json"
+        return open_snapshot(file_path)
+
+    def json_data_exists(self, key: str) -> bool:
+        """Whether the file behind ``key`` exists, without loading it or creating a default one."""
+        file_path = self._file_paths.get(key)
+        if file_path is None:
+            if not isinstance(key, str) or not key.startswith(('alliance_', 'treaties_', 'war_party_', 'war_parties_')):
+                return False
+            file_path = self.json_path / "Bloc" / f"{key}.json"
+        return file_path.exists()
+
+    def _binary_path(self, key: str) -> Path:
+        if key.startswith('war_party_') or key.startswith('war_parties_'):
+            return self.json_path / "Bloc" / f"{key}.pwt"
+        if key in ('trade_prices', 'nation_series'):
+            return self.json_path / "Bloc" / f"{key}.bin"
+        raise ValueError(f"Binary storage is not supported for key '{key}'")
+
+    async def save_binary_data(self, key: str, payload: bytes) -> bool:
+        """Atomically write a binary blob for a war-party key (a packed war table), 'trade_prices' or 'nation_series'.
+
+        War-party files live next to the JSON ones as Bloc/<key>.pwt and share their auto-delete
+        schedule; the trade price history and nation time series are kept as Bloc/<key>.bin.
+        """
+        try:
+            if not isinstance(key, str) or key.strip() == "":
+                raise ValueError("Invalid key provided to save_binary_data")
+            file_path = self._binary_path(key)
+            async with self._acquire_file_lock(file_path):
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                temp_path = file_path.with_name(file_path.name + '.tmp')
+                loop = asyncio.get_running_loop()
+                await loop.run_in_executor(None, temp_path.write_bytes, bytes(payload))
+                temp_path.replace(file_path)
+            self._metrics['writes'] += 1
+            if key.startswith('war_party'):
+                delay = 900 if key.startswith('war_parties_') else None
+                try:
+                    await self._schedule_war_party_auto_delete(key, delay_seconds=delay)
+                except Exception as e:
+                    logging.warning(f"Failed to schedule auto-delete for '{key}': {e}")
+            return True
+        except Exception as e:
+            self._metrics['errors'] += 1
+            logging.error(f"save_binary_data error for key '{key}': {e}")
+            return False
+
+    async def load_binary_data(self, key: str) -> Optional[bytes]:
+        """Read the blob saved by save_binary_data, or None if there is none."""
+        try:
+            file_path = self._binary_path(key)
+            if not file_path.exists():
+                return None
+            async with self._acquire_file_lock(file_path):
+                loop = asyncio.get_running_loop()
+                data = await loop.run_in_executor(None, file_path.read_bytes)
+            self._metrics['reads'] += 1
+            return data
+        except Exception as e:
+            logging.error(f"load_binary_data error for key '{key}': {e}")
+            return None
+
     # User Data Methods (Optimized)
     def _get_user_file_path(self, user_id: str) -> Path:
         return self.base_path / f"{user_id}.json"
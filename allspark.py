@@ -51,8 +51,13 @@ def setup_environment():
     for i, path in enumerate(sys.path[:8]):  # Show first entries including local_packages and project
         print(f"   {i+1}. {path}")
 
-# Setup environment before imports
-setup_environment()
+# Setup environment before imports. Only when run as the bot: the chart render pool
+# (Systems/PnW/MA/render.py) starts its workers with the spawn method, and each worker
+# re-imports this file as __mp_main__ with sys.path and the working directory already set.
+# Process setup, configuration and the bot itself therefore live behind __main__ guards
+# so a worker only gets the definitions below.
+if __name__ == "__main__":
+    setup_environment()
 
 # Import UserDataManager for unified data storage
 from Systems.user_data_manager import UserDataManager
@@ -127,46 +132,48 @@ class ColoredFormatter(logging.Formatter):
         return super().format(record)
 
 # Configure logging to avoid duplicates
-# Ensure UTF-8 encoding for console output
-if hasattr(sys.stdout, 'reconfigure'):
-    sys.stdout.reconfigure(encoding='utf-8')
-elif hasattr(sys.stdout, 'buffer'):
-    import io
-    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-
-# Create file handler
-file_handler = logging.FileHandler('bot_debug.log', mode='a', encoding='utf-8')
-file_handler.setFormatter(logging.Formatter(
-    '%(asctime)s | %(levelname)s | %(name)s | %(funcName)s:%(lineno)d | %(message)s'
-))
-
-# Create colored console handler
-console_handler = logging.StreamHandler(sys.stdout)
-console_handler.setFormatter(ColoredFormatter(
-    '%(asctime)s | %(levelname)s | %(name)s | %(funcName)s:%(lineno)d | %(message)s'
-))
-
-# Configure root logger to avoid basicConfig
-root_logger = logging.getLogger()
-root_logger.setLevel(logging.DEBUG)
-
-# Clear any existing handlers to prevent duplicates
-for handler in root_logger.handlers[:]:
-    root_logger.removeHandler(handler)
-
-# Add our handlers
-root_logger.addHandler(file_handler)
-root_logger.addHandler(console_handler)
+def configure_logging():
+    """Send all logs to bot_debug.log and the console (called once at startup)."""
+    # Ensure UTF-8 encoding for console output
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(encoding='utf-8')
+    elif hasattr(sys.stdout, 'buffer'):
+        import io
+        sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+    # Create file handler
+    file_handler = logging.FileHandler('bot_debug.log', mode='a', encoding='utf-8')
+    file_handler.setFormatter(logging.Formatter(
+        '%(asctime)s | %(levelname)s | %(name)s | %(funcName)s:%(lineno)d | %(message)s'
+    ))
+
+    # Create colored console handler
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(ColoredFormatter(
+        '%(asctime)s | %(levelname)s | %(name)s | %(funcName)s:%(lineno)d | %(message)s'
+    ))
+
+    # Configure root logger to avoid basicConfig
+    root_logger = logging.getLogger()
+    root_logger.setLevel(logging.DEBUG)
+
+    # Clear any existing handlers to prevent duplicates
+    for handler in root_logger.handlers[:]:
+        root_logger.removeHandler(handler)
+
+    # Add our handlers
+    root_logger.addHandler(file_handler)
+    root_logger.addHandler(console_handler)
+
+    # Suppress discord.py debug logs
+    logging.getLogger('discord').setLevel(logging.INFO)
+    logging.getLogger('discord.http').setLevel(logging.WARNING)
+    logging.getLogger('discord.gateway').setLevel(logging.INFO)
 
 # Get our specific logger
 logger = logging.getLogger('AllsparkBot')
 logger.setLevel(logging.DEBUG)
 
-# Suppress discord.py debug logs
-logging.getLogger('discord').setLevel(logging.INFO)
-logging.getLogger('discord.http').setLevel(logging.WARNING)
-logging.getLogger('discord.gateway').setLevel(logging.INFO)
-
 # Import configuration with enhanced validation
 def validate_configuration():
     """Validate configuration for SparkedHost deployment"""
@@ -187,9 +194,6 @@ def validate_configuration():
         logger.error(f"❌ Configuration validation failed: {e}")
         raise
 
-# Load and validate configuration
-TOKEN, PREFIX, ADMIN_USER_ID, RESULTS_CHANNEL_ID, GRUMP_USER_ID, ARIES_USER_ID, ROLE_IDS = validate_configuration()
-
 # Bot intents
 intents = discord.Intents.default()
 intents.message_content = True
@@ -805,14 +809,8 @@ async def features(ctx):
     embed = view.get_embed()
     await ctx.send(embed=embed, view=view)
 
-# Create bot instance
-bot = AllsparkBot()
-
-# Add commands to bot
-bot.add_command(features)
-
 # Debug command for testing error handling
-@bot.command(name='debug', hidden=True)
+@commands.command(name='debug', hidden=True)
 @commands.is_owner()
 async def debug_info(ctx):
     """Display detailed debug information"""
@@ -822,6 +820,7 @@ async def debug_info(ctx):
         color=discord.Color.blue(),
         timestamp=datetime.now()
     )
+    bot = ctx.bot
     
     embed.add_field(
         name="📊 Module Status",
@@ -849,7 +848,7 @@ async def debug_info(ctx):
     
     await ctx.send(embed=embed)
 
-@bot.command(name='test_error', hidden=True)
+@commands.command(name='test_error', hidden=True)
 @commands.is_owner()
 async def test_error(ctx):
     """Test error handling system"""
@@ -862,6 +861,19 @@ async def test_error(ctx):
 
 # Run the bot
 if __name__ == "__main__":
+    configure_logging()
+
+    # Load and validate configuration
+    TOKEN, PREFIX, ADMIN_USER_ID, RESULTS_CHANNEL_ID, GRUMP_USER_ID, ARIES_USER_ID, ROLE_IDS = validate_configuration()
+
+    # Create bot instance
+    bot = AllsparkBot()
+
+    # Add commands to bot
+    bot.add_command(features)
+    bot.add_command(debug_info)
+    bot.add_command(test_error)
+
     try:
         logger.info("🚀 Starting AllsparkBot for SparkedHost deployment...")
         logger.info("=" * 60)